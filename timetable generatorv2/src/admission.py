@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .decompose import section_components
+    from .models import ProblemData
+    from .portfolio import DEFAULT_PORTFOLIO, MIN_WORKERS, available_cores
+    from .rolling import section_groups
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from decompose import section_components
+    from models import ProblemData
+    from portfolio import DEFAULT_PORTFOLIO, MIN_WORKERS, available_cores
+    from rolling import section_groups
+
+
+# Cores shared by all running jobs (default: the CPU affinity mask)
+CORE_BUDGET = int(os.environ.get("ATGS_CORE_BUDGET", "0")) or available_cores()
+# Estimated solve memory allowed across running jobs; 0 = 80% of physical memory
+MEMORY_LIMIT_MB = float(os.environ.get("ATGS_MEMORY_LIMIT_MB", "0"))
+# CP-SAT workers of a job that has the machine to itself (make_solver's default)
+MAX_JOB_WORKERS = 8
+# Higher runs first: an interactive repair jumps ahead of full generations
+PRIORITY_REPAIR = 10
+PRIORITY_SOLVE = 0
+
+# Peak solve RSS was about 150 MB plus 8 KB per CP-SAT variable with 8
+# workers, for every room mode (TT_Flexinput, large_1000/3000/5000)
+BASE_MB = 150.0
+KB_PER_VARIABLE = 8.0
+
+
+def physical_memory_mb() -> float:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):  # pragma: no cover - not POSIX
+        return 0.0
+
+
+def section_variables(cp: CompiledProblem, room_mode: str = "per_slot", optimize_gaps: bool = False, gap_mode: str = "triple") -> np.ndarray:
+    """Upper bound on the time-indexed model's variables per section, from
+    the compiled problem alone (no model is built)."""
+    n_slots = len(cp.grid.non_break)
+    n_blocks = sum(len(blocks) for blocks in cp.blocks_by_day.values())
+    lecture_vars = np.where(cp.lectures > 0, n_slots, 0).sum(axis=1)
+    lab_vars = np.zeros(len(cp.section_ids), dtype=int)
+    for s_idx, c_idx in cp.scheduled_labs():
+        lab_vars[s_idx] += len(cp.lab_starts[int(cp.lab_block[s_idx, c_idx])])
+    counts = (lecture_vars + lab_vars).astype(float)
+    if cp.have_rooms:
+        rooms = np.array([len(c) for c in cp.candidate_rooms], dtype=float)
+        if room_mode == "per_slot":
+            lab_rooms = np.array([len(c) for c in cp.lab_rooms], dtype=float)
+            counts += lecture_vars * rooms + lab_vars * lab_rooms + n_blocks * rooms
+        elif room_mode == "compact":
+            counts += n_blocks * (rooms + 1)
+        elif room_mode == "classes":
+            counts += n_blocks * (np.array([len(c) for c in cp.candidate_room_classes], dtype=float) + 1)
+    if optimize_gaps and gap_mode == "span":
+        counts += 3 * len(cp.grid.non_break_by_day)
+    elif optimize_gaps:
+        counts += n_slots + sum(max(0, len(ordered) - 2) for ordered in cp.grid.non_break_by_day.values())
+    return counts
+
+
+def parallel_processes(tasks: int, workers: int) -> int:
+    """Processes solving ``tasks`` models side by side with ``workers``
+    CP-SAT workers in all (split_workers in src/portfolio.py)."""
+    return max(1, min(tasks, workers // MIN_WORKERS))
+
+
+def estimate_memory_mb(
+    problem: ProblemData,
+    room_mode: str = "per_slot",
+    optimize_gaps: bool = False,
+    strategy: str = "direct",
+    group_by: str = "auto",
+    gap_mode: str = "triple",
+    engine: str = "time_indexed",
+    portfolio: bool = False,
+) -> float:
+    """Estimated peak memory of solving ``problem``: the models the
+    strategy holds at once (rolling builds one per section group in turn,
+    decomposed one per section group and day_split one per day in parallel
+    processes, two_stage has no room variables), times the racing
+    processes with ``portfolio``. The local engine builds none."""
+    # The most workers admission hands a job, split between racing processes
+    workers = min(MAX_JOB_WORKERS, max(MIN_WORKERS, CORE_BUDGET))
+    racing = parallel_processes(len(DEFAULT_PORTFOLIO), workers) if portfolio else 1
+    workers //= racing
+    if engine == "local":
+        return racing * BASE_MB
+    cp = compile_problem(problem)
+    per_section = section_variables(cp, "deferred" if strategy == "two_stage" else room_mode, optimize_gaps, gap_mode)
+    if strategy == "decomposed":
+        # The largest groups may be solved side by side
+        sizes = sorted((float(per_section[c].sum()) for c in section_components(cp)), reverse=True)
+        parallel = parallel_processes(len(sizes), workers)
+        return round(racing * (parallel * BASE_MB + sum(sizes[:parallel]) * KB_PER_VARIABLE / 1024), 1)
+    if strategy == "rolling":
+        variables = max(per_section[[cp.section_index[s] for s in g]].sum() for g in section_groups(problem, group_by))
+    elif strategy == "day_split":
+        # One model per day, as many at once as there are processes
+        days = max(1, len(cp.grid.non_break_by_day))
+        parallel = parallel_processes(days, workers)
+        return round(racing * parallel * (BASE_MB + float(per_section.sum()) / days * KB_PER_VARIABLE / 1024), 1)
+    else:
+        variables = per_section.sum()
+    return round(racing * (BASE_MB + float(variables) * KB_PER_VARIABLE / 1024), 1)
+
+
+class MemoryLimitExceeded(ValueError):
+    """A job whose estimated memory exceeds the limit even on an idle machine."""
+
+
+class Admission:
+    """Core and memory budget for concurrent solves, with a priority queue.
+
+    At most CORE_BUDGET // MIN_WORKERS jobs run at once (at least one).
+    A job starting while others wait gets an equal share of the cores, a
+    job alone every free core, up to MAX_JOB_WORKERS. It runs that many
+    CP-SAT workers, but at least MIN_WORKERS: fewer are much slower, so
+    below 2 * MIN_WORKERS cores jobs run one at a time instead. Waiting jobs start highest priority
+    first, then in arrival order, and only when their estimated memory fits
+    next to the running jobs'. Nothing is skipped ahead of the head of the
+    queue, so a large job cannot starve.
+    """
+
+    def __init__(self, cores: int = CORE_BUDGET, memory_limit_mb: float = MEMORY_LIMIT_MB) -> None:
+        self.cores = max(1, cores)
+        self.memory_limit_mb = memory_limit_mb or 0.8 * physical_memory_mb()
+        self.max_running = max(1, self.cores // MIN_WORKERS)
+        self._queue: List[Tuple[int, int, str]] = []  # (-priority, arrival, job id)
+        self._waiting: Dict[str, Tuple[float, float, int]] = {}  # job id -> (memory_mb, enqueued, priority)
+        self._running: Dict[str, Tuple[int, float]] = {}  # job id -> (cores, memory_mb)
+        self._arrivals = itertools.count()
+        self._waits: Deque[float] = deque(maxlen=200)
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def request(self, job_id: str, priority: int = PRIORITY_SOLVE, memory_mb: float = 0.0) -> None:
+        """Queue a job; MemoryLimitExceeded if it can never fit."""
+        with self._lock:
+            if self.memory_limit_mb and memory_mb > self.memory_limit_mb:
+                self.rejected += 1
+                raise MemoryLimitExceeded(
+                    f"estimated {memory_mb:.0f} MB exceeds the {self.memory_limit_mb:.0f} MB limit; "
+                    "try roomMode compact or classes, or strategy two_stage or rolling"
+                )
+            heapq.heappush(self._queue, (-priority, next(self._arrivals), job_id))
+            self._waiting[job_id] = (memory_mb, time.perf_counter(), priority)
+
+    def withdraw(self, job_id: str) -> bool:
+        """Remove a job that has not started; False if it is not waiting."""
+        with self._lock:
+            if self._waiting.pop(job_id, None) is None:
+                return False
+            self._queue = [entry for entry in self._queue if entry[2] != job_id]
+            heapq.heapify(self._queue)
+            return True
+
+    def admit(self) -> List[Tuple[str, int]]:
+        """Start as many waiting jobs as fit: [(job id, CP-SAT workers)]."""
+        started: List[Tuple[str, int]] = []
+        with self._lock:
+            while self._queue and len(self._running) < self.max_running:
+                _prio, _arrival, job_id = self._queue[0]
+                memory_mb, enqueued, _priority = self._waiting[job_id]
+                used_cores = sum(c for c, _m in self._running.values())
+                used_mb = sum(m for _c, m in self._running.values())
+                free = self.cores - used_cores
+                if self._running and (free < min(MIN_WORKERS, self.cores) or used_mb + memory_mb > self.memory_limit_mb):
+                    break
+                heapq.heappop(self._queue)
+                del self._waiting[job_id]
+                share = self.cores // min(self.max_running, len(self._running) + 1 + len(self._queue))
+                workers = max(MIN_WORKERS, min(MAX_JOB_WORKERS, max(1, min(free, share))))
+                # Below MIN_WORKERS cores the job runs alone on all of them
+                self._running[job_id] = (min(self.cores, workers), memory_mb)
+                self._waits.append(time.perf_counter() - enqueued)
+                started.append((job_id, workers))
+        return started
+
+    def release(self, job_id: str) -> None:
+        with self._lock:
+            self._running.pop(job_id, None)
+
+    def position(self, job_id: str) -> Optional[int]:
+        """0-based place of a waiting job in the queue, None if not waiting."""
+        with self._lock:
+            if job_id not in self._waiting:
+                return None
+            return sorted(self._queue).index(next(e for e in self._queue if e[2] == job_id))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.perf_counter()
+            waits = sorted(self._waits)
+            return {
+                "cores": self.cores,
+                "coresInUse": sum(c for c, _m in self._running.values()),
+                "maxRunning": self.max_running,
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "queuedByPriority": dict(Counter(str(p) for _m, _e, p in self._waiting.values())),
+                "oldestWaitSec": round(max((now - e for _m, e, _p in self._waiting.values()), default=0.0), 3),
+                "memoryLimitMb": round(self.memory_limit_mb, 1),
+                "memoryInUseMb": round(sum(m for _c, m in self._running.values()), 1),
+                "rejected": self.rejected,
+                "waitSec": {
+                    "count": len(waits),
+                    "mean": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    "p95": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))], 3) if waits else 0.0,
+                    "max": round(waits[-1], 3) if waits else 0.0,
+                },
+            }
@@ -1,23 +1,49 @@
 from __future__ import annotations
 
 import base64
+import json
 import os
 import tempfile
-from typing import Dict, List
+import time
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 try:
+    from .admission import PRIORITY_REPAIR, PRIORITY_SOLVE, MemoryLimitExceeded, estimate_memory_mb
+    from .cache import ModelCache, ResultCache, cache_key
     from .exporter import build_grids_by_faculty, build_grids_by_section
     from .feasibility import pre_solve_feasibility_check
+    from .hints import load_hint_from_section_rows
+    from .jobs import Job, JobStore
     from .loader import load_problem_from_directory
-    from .timetable_solver import solve
+    from .models import RoomPolicy
+    from .portfolio import load_stats, solve_portfolio
+    from .progress import ProgressFn, done_event
+    from .repair import RepairChanges, repair
+    from .room_policy import with_room_policy
+    from .stopping import StopCriteria
+    from .timetable_solver import RANDOM_SEED, STOP_REQUESTED, solve
+    from .tuning import select_profile
 except ImportError:  # pragma: no cover - running as script
+    from admission import PRIORITY_REPAIR, PRIORITY_SOLVE, MemoryLimitExceeded, estimate_memory_mb
+    from cache import ModelCache, ResultCache, cache_key
     from exporter import build_grids_by_faculty, build_grids_by_section
     from feasibility import pre_solve_feasibility_check
+    from hints import load_hint_from_section_rows
+    from jobs import Job, JobStore
     from loader import load_problem_from_directory
-    from timetable_solver import solve
+    from models import RoomPolicy
+    from portfolio import load_stats, solve_portfolio
+    from progress import ProgressFn, done_event
+    from repair import RepairChanges, repair
+    from room_policy import with_room_policy
+    from stopping import StopCriteria
+    from timetable_solver import RANDOM_SEED, STOP_REQUESTED, solve
+    from tuning import select_profile
 
 
 class FilePayload(BaseModel):
@@ -29,9 +55,66 @@ class SolveRequest(BaseModel):
     files: List[FilePayload]
     timeLimit: int = 90
     optimizeGaps: bool = False
+    gapMode: str = "triple"  # "triple" | "span"
+    roomMode: str = "per_slot"  # "per_slot" | "compact" | "classes"
+    engine: str = "time_indexed"  # "time_indexed" | "interval" | "local"
+    strategy: str = "direct"  # "direct" | "two_stage" | "decomposed" | "rolling" | "labs_first" | "day_split"
+    groupBy: str = "auto"  # rolling strategy: "auto" | "group" | "year" | "prefix" | "chunk"
+    profile: str = "auto"  # "auto" | "fast" | "balanced" | "quality" (tuned CP-SAT parameters)
+    polishSec: float = 0  # with optimizeGaps: local search on the gaps of a FEASIBLE result
+    useCache: bool = True  # reuse the stored result of an identical earlier solve
+    portfolio: bool = False  # race several CP-SAT configurations in parallel processes
+    greedy: bool = False  # constructive heuristic first: the result without optimizeGaps, else the hint
+    # Room candidates, see src/room_policy.py
+    separateLabRooms: bool = False  # lectures in non-lab rooms, labs in lab rooms
+    maxRoomCandidates: Optional[int] = Field(None, ge=1)  # k best-fitting rooms per section
+    # Early stop (direct and two_stage strategies), see src/stopping.py
+    stopAtFirstFeasible: bool = False
+    relativeGap: Optional[float] = None  # e.g. 0.05: stop within 5% of the best bound
+    noImprovementSec: Optional[float] = None
+    targetObjective: Optional[int] = None
+    feasibilityTimeLimit: Optional[float] = None  # seconds to find a first timetable
+    optimizationTimeLimit: Optional[float] = None  # seconds to optimize after it
+
+
+class RepairRequest(BaseModel):
+    files: List[FilePayload]
+    baseSections: Dict[str, List[Dict]]  # "sections" of a previous /api/solve response
+    facultyUnavailable: Dict[str, List[int]] = {}  # facultyId -> timeslotIds ([] = whole week)
+    roomUnavailable: Dict[str, List[int]] = {}  # roomId -> timeslotIds ([] = whole week)
+    sections: List[str] = []  # sections to re-place entirely
+    radius: int = 0
+    timeLimit: int = 30
+    roomMode: str = "compact"
+    # The room policy of the base timetable's solve
+    separateLabRooms: bool = False
+    maxRoomCandidates: Optional[int] = Field(None, ge=1)
 
 
 app = FastAPI(title="ATGS v2 Scheduler API", version="2.0.0")
+result_cache = ResultCache()
+model_cache = ModelCache()
+# Key of the cache counter changes a job's process returns with its response
+_CACHE_COUNTERS = "_cacheCounters"
+
+
+def _cache_counters() -> Dict[str, Dict[str, int]]:
+    return {"results": result_cache.counters(), "models": model_cache.counters()}
+
+
+def _merge_cache_counters(response: Dict) -> Dict:
+    """Jobs run in pool processes with their own cache instances: add the
+    hits, misses and evictions a job counted to this process's caches."""
+    counted = response.pop(_CACHE_COUNTERS, None) if isinstance(response, dict) else None
+    if counted:
+        result_cache.add_counters(counted["results"])
+        model_cache.add_counters(counted["models"])
+    return response
+
+
+jobs = JobStore(on_result=_merge_cache_counters)
+# Seconds DELETE /api/jobs/{id} waits for a stopped search to return its best timetable
+JOB_STOP_WAIT_SEC = 30.0
 
 
 @app.get("/health")
@@ -39,24 +122,168 @@ def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+def _load_payload_problem(files: List[FilePayload], tmpdir: str, room_policy: Optional[RoomPolicy] = None):
+    # write provided csvs
+    for f in files:
+        raw = base64.b64decode(f.content.encode("utf-8"))
+        out_path = os.path.join(tmpdir, f.name)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, "wb") as out:
+            out.write(raw)
+
+    try:
+        problem = load_problem_from_directory(tmpdir)
+    except Exception as e:  # pragma: no cover
+        raise HTTPException(status_code=400, detail=f"INPUT_ERROR: {e}")
+    return with_room_policy(problem, room_policy) if room_policy is not None else problem
+
+
+def _room_policy(payload) -> Optional[RoomPolicy]:
+    if payload.separateLabRooms or payload.maxRoomCandidates is not None:
+        return RoomPolicy(separate_lab_rooms=payload.separateLabRooms, max_candidates=payload.maxRoomCandidates)
+    return None
+
+
+@app.get("/api/cache")
+def cache_stats() -> Dict:
+    return {"results": result_cache.stats(), "models": model_cache.stats()}
+
+
+@app.get("/api/portfolio")
+def portfolio_stats() -> Dict:
+    return load_stats()
+
+
+@app.get("/api/scheduler")
+def scheduler_stats() -> Dict:
+    """Core budget, running and queued jobs, memory in use and queue wait times."""
+    return jobs.admission.stats()
+
+
+def _submit(fn, payload, priority: int, room_mode: str, optimize_gaps: bool = False, strategy: str = "direct", group_by: str = "auto", gap_mode: str = "triple", engine: str = "time_indexed", portfolio: bool = False) -> Job:
+    # The problem is loaded here too, to estimate its memory before queueing it
+    if not payload.files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        problem = _load_payload_problem(payload.files, tmpdir, _room_policy(payload))
+        try:
+            memory_mb = estimate_memory_mb(problem, room_mode=room_mode, optimize_gaps=optimize_gaps, strategy=strategy, group_by=group_by, gap_mode=gap_mode, engine=engine, portfolio=portfolio)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"INVALID_OPTION: {e}")
+    try:
+        return jobs.submit(fn, payload, priority=priority, memory_mb=memory_mb)
+    except MemoryLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=f"MEMORY_LIMIT: {e}")
+
+
+def _counting(fn, payload, progress: Optional[ProgressFn] = None) -> Dict:
+    """fn(payload) in a job's process, returning the change in its cache
+    counters with the response (see _merge_cache_counters)."""
+    before = _cache_counters()
+    response = fn(payload, progress=progress)
+    after = _cache_counters()
+    response[_CACHE_COUNTERS] = {
+        cache: {name: after[cache][name] - count for name, count in counts.items()} for cache, counts in before.items()
+    }
+    return response
+
+
+def _solve_job(payload: SolveRequest, progress: Optional[ProgressFn] = None) -> Dict:
+    return _counting(_solve_payload, payload, progress)
+
+
+def _repair_job(payload: RepairRequest, progress: Optional[ProgressFn] = None) -> Dict:
+    return _counting(_repair_payload, payload, progress)
+
+
+def _submit_solve(payload: SolveRequest) -> Job:
+    return _submit(_solve_job, payload, PRIORITY_SOLVE, payload.roomMode, payload.optimizeGaps, payload.strategy, payload.groupBy, payload.gapMode, payload.engine, payload.portfolio)
+
+
+def _submit_repair(payload: RepairRequest) -> Job:
+    return _submit(_repair_job, payload, PRIORITY_REPAIR, payload.roomMode)
+
+
+def _job_result(job: Job) -> Dict:
+    job.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_code, detail=job.error)
+    return job.result
+
+
 @app.post("/api/solve")
 def solve_api(payload: SolveRequest):
+    # Runs as a job too, so it shares the core budget and queue
+    return _job_result(_submit_solve(payload))
+
+
+@app.post("/api/jobs")
+def create_job(payload: SolveRequest) -> Dict:
+    """Queue a /api/solve request to run in a background process; poll
+    GET /api/jobs/{id} or follow GET /api/jobs/{id}/events."""
+    job = _submit_solve(payload)
+    return {"jobId": job.job_id, "status": job.status}
+
+
+@app.post("/api/jobs/repair")
+def create_repair_job(payload: RepairRequest) -> Dict:
+    """Queue a /api/repair request; repairs start before queued solves."""
+    job = _submit_repair(payload)
+    return {"jobId": job.job_id, "status": job.status}
+
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str) -> Dict:
+    """Status, queue position, latest progress event and, once done, the response."""
+    return jobs.summary(_get_job(job_id))
+
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str) -> Dict:
+    """Cancel a job. A queued job never runs; a running one stops its CP-SAT
+    search and returns the best timetable found so far (status "cancelled",
+    result status FEASIBLE, or INFEASIBLE if none was found yet)."""
+    job = _get_job(job_id)
+    jobs.cancel(job)
+    job.wait(JOB_STOP_WAIT_SEC)
+    return jobs.summary(job)
+
+
+def _event_stream(job: Job, after: int = 0) -> Iterator[str]:
+    for item in job.iter_events(after):
+        if item is None:
+            yield ": keep-alive\n\n"
+            continue
+        i, event = item
+        yield f"id: {i + 1}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@app.get("/api/jobs/{job_id}/events")
+def job_events(job_id: str, last_event_id: Optional[int] = Header(default=None)) -> StreamingResponse:
+    """Server-sent events: status, model, solution (objective, best bound,
+    solution count, elapsed time), done / error. The stream ends with the job;
+    a reconnecting client's Last-Event-ID resumes after that event."""
+    job = _get_job(job_id)
+    return StreamingResponse(
+        _event_stream(job, after=last_event_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _solve_payload(payload: SolveRequest, progress: Optional[ProgressFn] = None) -> Dict:
     if not payload.files:
         raise HTTPException(status_code=400, detail="No files provided")
 
     with tempfile.TemporaryDirectory() as tmpdir:
-        # write provided csvs
-        for f in payload.files:
-            raw = base64.b64decode(f.content.encode("utf-8"))
-            out_path = os.path.join(tmpdir, f.name)
-            os.makedirs(os.path.dirname(out_path), exist_ok=True)
-            with open(out_path, "wb") as out:
-                out.write(raw)
-
-        try:
-            problem = load_problem_from_directory(tmpdir)
-        except Exception as e:  # pragma: no cover
-            raise HTTPException(status_code=400, detail=f"INPUT_ERROR: {e}")
+        problem = _load_payload_problem(payload.files, tmpdir, _room_policy(payload))
 
         try:
             report = pre_solve_feasibility_check(problem)
@@ -67,103 +294,203 @@ def solve_api(payload: SolveRequest):
             return {"status": "FEASIBILITY_ERROR", "errors": report.errors, "warnings": report.warnings}
 
         try:
-            result = solve(problem, time_limit_sec=payload.timeLimit, optimize_gaps=payload.optimizeGaps)
+            stop = StopCriteria(
+                relative_gap=payload.relativeGap,
+                no_improvement_sec=payload.noImprovementSec,
+                target_objective=payload.targetObjective,
+                first_feasible=payload.stopAtFirstFeasible,
+                feasibility_sec=payload.feasibilityTimeLimit,
+                optimization_sec=payload.optimizationTimeLimit,
+            )
+            profile_params = select_profile(problem, payload.profile, payload.optimizeGaps)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"INVALID_OPTION: {e}")
+
+        key = cache_key(
+            problem,
+            time_limit_sec=payload.timeLimit,
+            optimize_gaps=payload.optimizeGaps,
+            gap_mode=payload.gapMode,
+            room_mode=payload.roomMode,
+            engine=payload.engine,
+            strategy=payload.strategy,
+            group_by=payload.groupBy,
+            seed=RANDOM_SEED,
+            portfolio=payload.portfolio,
+            greedy=payload.greedy,
+            polish_sec=payload.polishSec,
+            profile=profile_params,
+            stop=asdict(stop),
+        )
+        start = time.perf_counter()
+        result = result_cache.get(key) if payload.useCache else None
+        cached = result is not None
+        if result is None:
+            options = dict(
+                time_limit_sec=payload.timeLimit,
+                optimize_gaps=payload.optimizeGaps,
+                gap_mode=payload.gapMode,
+                room_mode=payload.roomMode,
+                engine=payload.engine,
+                strategy=payload.strategy,
+                group_by=payload.groupBy,
+                greedy=payload.greedy,
+                polish_sec=payload.polishSec,
+                profile=payload.profile,
+                stop=stop,
+            )
+            try:
+                if payload.portfolio:
+                    # The configurations run in other processes; only "done" is reported
+                    result = solve_portfolio(problem, **options)
+                else:
+                    result = solve(problem, model_cache=model_cache if payload.useCache else None, progress=progress, **options)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"INVALID_OPTION: {e}")
+            except Exception as e:  # pragma: no cover
+                raise HTTPException(status_code=500, detail=f"SOLVER_ERROR: {e}")
+            # A stopped (cancelled) search is not the answer to this request
+            if payload.useCache and not STOP_REQUESTED.is_set():
+                result_cache.put(key, result)
+        if progress is not None:
+            progress(dict(done_event(result, time.perf_counter() - start), cached=cached))
+
+        response = _result_response(problem, result, report.warnings)
+        response["cached"] = cached
+        return response
+
+
+@app.post("/api/repair")
+def repair_api(payload: RepairRequest):
+    return _job_result(_submit_repair(payload))
+
+
+def _repair_payload(payload: RepairRequest, progress: Optional[ProgressFn] = None) -> Dict:
+    if not payload.files:
+        raise HTTPException(status_code=400, detail="No files provided")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        problem = _load_payload_problem(payload.files, tmpdir, _room_policy(payload))
+        base = load_hint_from_section_rows(problem, payload.baseSections)
+        changes = RepairChanges(
+            faculty_unavailable=payload.facultyUnavailable,
+            room_unavailable=payload.roomUnavailable,
+            sections=payload.sections,
+        )
+        start = time.perf_counter()
+        try:
+            repaired = repair(problem, base, changes, radius=payload.radius, time_limit_sec=payload.timeLimit, room_mode=payload.roomMode)
+        except (ValueError, KeyError) as e:
+            raise HTTPException(status_code=400, detail=f"INVALID_OPTION: {e}")
         except Exception as e:  # pragma: no cover
             raise HTTPException(status_code=500, detail=f"SOLVER_ERROR: {e}")
+        if progress is not None:
+            progress(done_event(repaired.result, time.perf_counter() - start))
+
+        response = _result_response(problem, repaired.result, [])
+        response["repair"] = {
+            "radius": repaired.radius,
+            "freedClasses": repaired.freed_classes,
+            "movedClasses": repaired.moved_classes,
+        }
+        return response
+
+
+def _result_response(problem, result, warnings: List[str]) -> Dict:
+    # build per-section / per-faculty grids
+    section_grids = build_grids_by_section(result)
+    faculty_grids = build_grids_by_faculty(result)
+
+    # collect structures for backend
+    timeslot_by_id = {t.timeslot_id: t for t in result.timeslots}
+
+    sections: Dict[str, List[Dict]] = {}
+    for section_id, slots in result.schedule_by_section.items():
+        rows: List[Dict] = []
+        for tid, (course_id, faculty_id, room_id, kind) in slots.items():
+            ts = timeslot_by_id.get(tid)
+            if not ts:
+                continue
+            rows.append({
+                "timeslotId": tid,
+                "dayIndex": ts.day_index,
+                "dayName": ts.day_name,
+                "periodIndex": ts.period_index,
+                "courseId": course_id,
+                "facultyId": faculty_id,
+                "roomId": room_id,
+                "kind": kind,
+            })
+        sections[section_id] = rows
+
+    faculty: Dict[str, List[Dict]] = {}
+    for fac_id, slots in result.schedule_by_faculty.items():
+        rows: List[Dict] = []
+        for tid, (course_id, section_id, room_id, kind) in slots.items():
+            ts = timeslot_by_id.get(tid)
+            if not ts:
+                continue
+            rows.append({
+                "timeslotId": tid,
+                "dayIndex": ts.day_index,
+                "dayName": ts.day_name,
+                "periodIndex": ts.period_index,
+                "courseId": course_id,
+                "sectionId": section_id,
+                "roomId": room_id,
+                "kind": kind,
+            })
+        faculty[fac_id] = rows
+
+    # available rooms per time slot
+    all_rooms = [r.room_id for r in (problem.rooms or [])]
+    available_rooms: List[Dict] = []
+    if all_rooms:
+        # compute occupied by scanning section schedules per timeslot
+        occupied_by_tid: Dict[int, List[str]] = {}
+        for sec_map in result.schedule_by_section.values():
+            for tid, (_c, _f, room_id, _k) in sec_map.items():
+                if room_id:
+                    occupied_by_tid.setdefault(tid, []).append(room_id)
 
-        # build per-section / per-faculty grids
-        section_grids = build_grids_by_section(result)
-        faculty_grids = build_grids_by_faculty(result)
-
-        # collect structures for backend
-        timeslot_by_id = {t.timeslot_id: t for t in result.timeslots}
-
-        sections: Dict[str, List[Dict]] = {}
-        for section_id, slots in result.schedule_by_section.items():
-            rows: List[Dict] = []
-            for tid, (course_id, faculty_id, room_id, kind) in slots.items():
-                ts = timeslot_by_id.get(tid)
-                if not ts:
-                    continue
-                rows.append({
-                    "timeslotId": tid,
-                    "dayIndex": ts.day_index,
-                    "dayName": ts.day_name,
-                    "periodIndex": ts.period_index,
-                    "courseId": course_id,
-                    "facultyId": faculty_id,
-                    "roomId": room_id,
-                    "kind": kind,
-                })
-            sections[section_id] = rows
-
-        faculty: Dict[str, List[Dict]] = {}
-        for fac_id, slots in result.schedule_by_faculty.items():
-            rows: List[Dict] = []
-            for tid, (course_id, section_id, room_id, kind) in slots.items():
-                ts = timeslot_by_id.get(tid)
-                if not ts:
-                    continue
-                rows.append({
-                    "timeslotId": tid,
-                    "dayIndex": ts.day_index,
-                    "dayName": ts.day_name,
-                    "periodIndex": ts.period_index,
-                    "courseId": course_id,
-                    "sectionId": section_id,
-                    "roomId": room_id,
-                    "kind": kind,
-                })
-            faculty[fac_id] = rows
-
-        # available rooms per time slot
-        all_rooms = [r.room_id for r in (problem.rooms or [])]
-        available_rooms: List[Dict] = []
-        if all_rooms:
-            # compute occupied by scanning section schedules per timeslot
-            occupied_by_tid: Dict[int, List[str]] = {}
-            for sec_map in result.schedule_by_section.values():
-                for tid, (_c, _f, room_id, _k) in sec_map.items():
-                    if room_id:
-                        occupied_by_tid.setdefault(tid, []).append(room_id)
-
-            for ts in result.timeslots:
-                if ts.is_break:
-                    continue
-                occ = set(occupied_by_tid.get(ts.timeslot_id, []))
-                free = [r for r in all_rooms if r not in occ]
-                available_rooms.append({
-                    "timeslotId": ts.timeslot_id,
-                    "dayIndex": ts.day_index,
-                    "dayName": ts.day_name,
-                    "periodIndex": ts.period_index,
-                    "rooms": free,
-                })
-
-        # available faculty per time slot (list of faculty ids free at the timeslot)
-        available_faculty: List[Dict] = []
-        avail_map = getattr(result, "available_faculty", None) or {}
         for ts in result.timeslots:
             if ts.is_break:
                 continue
-            facs = avail_map.get(ts.timeslot_id, [])
-            available_faculty.append({
+            occ = set(occupied_by_tid.get(ts.timeslot_id, []))
+            free = [r for r in all_rooms if r not in occ]
+            available_rooms.append({
                 "timeslotId": ts.timeslot_id,
                 "dayIndex": ts.day_index,
                 "dayName": ts.day_name,
                 "periodIndex": ts.period_index,
-                "faculty": facs,
+                "rooms": free,
             })
 
-        return {
-            "status": result.status,
-            "warnings": report.warnings,
-            "sections": sections,
-            "faculty": faculty,
-            "sectionGrids": {k: df.reset_index().to_dict(orient="records") for k, df in section_grids.items()},
-            "facultyGrids": {k: df.reset_index().to_dict(orient="records") for k, df in faculty_grids.items()},
-            "availableRooms": available_rooms,
-            "availableFaculty": available_faculty,
-        }
-
+    # available faculty per time slot (list of faculty ids free at the timeslot)
+    available_faculty: List[Dict] = []
+    avail_map = getattr(result, "available_faculty", None) or {}
+    for ts in result.timeslots:
+        if ts.is_break:
+            continue
+        facs = avail_map.get(ts.timeslot_id, [])
+        available_faculty.append({
+            "timeslotId": ts.timeslot_id,
+            "dayIndex": ts.day_index,
+            "dayName": ts.day_name,
+            "periodIndex": ts.period_index,
+            "faculty": facs,
+        })
 
+    return {
+        "status": result.status,
+        "objectiveValue": result.objective_value,
+        "bestBound": result.best_bound,
+        "stopReason": result.stop_reason,
+        "warnings": warnings,
+        "sections": sections,
+        "faculty": faculty,
+        "sectionGrids": {k: df.reset_index().to_dict(orient="records") for k, df in section_grids.items()},
+        "facultyGrids": {k: df.reset_index().to_dict(orient="records") for k, df in faculty_grids.items()},
+        "availableRooms": available_rooms,
+        "availableFaculty": available_faculty,
+    }
@@ -125,6 +125,8 @@ with st.sidebar:
         up_sec_req = st.file_uploader("section_course_requirements.csv (constraints)", type=["csv"], key="up_sec_req")
         up_fac_course = st.file_uploader("faculty_courses.csv", type=["csv"], key="up_fac_course")
         up_rooms = st.file_uploader("rooms.csv (optional)", type=["csv"], key="up_rooms")
+        up_fac_unavail = st.file_uploader("faculty_unavailability.csv (optional)", type=["csv"], key="up_fac_unavail")
+        up_room_unavail = st.file_uploader("room_unavailability.csv (optional)", type=["csv"], key="up_room_unavail")
 
         if st.button("Save uploads to Inputs directory"):
             missing = [
@@ -153,9 +155,14 @@ with st.sidebar:
                 ]:
                     with open(os.path.join(inputs_dir, fname), "wb") as out:
                         out.write(fobj.getbuffer())
-                if up_rooms is not None:
-                    with open(os.path.join(inputs_dir, "rooms.csv"), "wb") as out:
-                        out.write(up_rooms.getbuffer())
+                for (fname, fobj) in [
+                    ("rooms.csv", up_rooms),
+                    ("faculty_unavailability.csv", up_fac_unavail),
+                    ("room_unavailability.csv", up_room_unavail),
+                ]:
+                    if fobj is not None:
+                        with open(os.path.join(inputs_dir, fname), "wb") as out:
+                            out.write(fobj.getbuffer())
                 st.success(f"Saved CSVs to: {inputs_dir}")
 
     st.divider()
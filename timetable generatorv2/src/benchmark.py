@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+try:
+    from .cache import ModelCache
+    from .compiled import compile_problem
+    from .feasibility import validate_solution
+    from .generate_synthetic import generate_dataset
+    from .greedy import _construct, construct
+    from .hints import solve_with_hint
+    from .loader import load_problem_from_directory
+    from .models import RoomPolicy
+    from .progress import solve_with_progress
+    from .room_policy import with_room_policy
+    from .timetable_solver import GAP_MODES, ROOM_MODES, _extract_result, build_interval_model, build_model, make_solver, solve
+except ImportError:
+    from cache import ModelCache
+    from compiled import compile_problem
+    from feasibility import validate_solution
+    from generate_synthetic import generate_dataset
+    from greedy import _construct, construct
+    from hints import solve_with_hint
+    from loader import load_problem_from_directory
+    from models import RoomPolicy
+    from progress import solve_with_progress
+    from room_policy import with_room_policy
+    from timetable_solver import GAP_MODES, ROOM_MODES, _extract_result, build_interval_model, build_model, make_solver, solve
+
+
+DEFAULT_DATASETS = ["data/large_1000", "data/large_3000", "data/large_5000"]
+
+
+def _model_size(model) -> Dict[str, int]:
+    proto = model.Proto()
+    return {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def _isolated(fn: Callable[..., Dict], **kwargs) -> Dict:
+    """Run one measurement in a fresh process so peak memory is per run."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+        try:
+            return ex.submit(fn, **kwargs).result()
+        except BrokenProcessPool:
+            # Typically the OOM killer on large per-slot models
+            row = {"dataset": kwargs.get("inputs_dir")}
+            if "engine" in kwargs:
+                row["engine"] = _engine_label(kwargs["engine"], kwargs.get("room_mode", ""))
+            elif "room_mode" in kwargs:
+                row["room_mode"] = kwargs["room_mode"]
+            row["status"] = "KILLED"
+            return row
+
+
+def _measure_build(inputs_dir: str, optimize_gaps: bool = False, room_mode: str = "per_slot", model_cache_dir: Optional[str] = None) -> Dict:
+    problem = load_problem_from_directory(inputs_dir)
+    t0 = time.perf_counter()
+    built = build_model(problem, optimize_gaps=optimize_gaps, room_mode=room_mode)
+    elapsed = time.perf_counter() - t0
+    row = {"dataset": inputs_dir, "room_mode": room_mode, "build_sec": round(elapsed, 3)}
+    row.update(_model_size(built.model))
+    if model_cache_dir is not None:
+        cache = ModelCache(model_cache_dir)
+        key = cache.key(problem, optimize_gaps=optimize_gaps, room_mode=room_mode)
+        cache.put(key, built)
+        t0 = time.perf_counter()
+        cache.get(key, load_problem_from_directory(inputs_dir))
+        cached = time.perf_counter() - t0
+        row.update({"cached_sec": round(cached, 3), "saved_pct": round(100.0 * (1 - cached / elapsed), 1)})
+    row["peak_rss_mb"] = _peak_rss_mb()
+    return row
+
+
+def _occupancy_by_day(result) -> List[List[bool]]:
+    # Per section and day: whether each non-break slot has a class
+    by_day: Dict[int, List[int]] = {}
+    for ts in result.timeslots:
+        if not ts.is_break:
+            by_day.setdefault(ts.day_index, []).append(ts.timeslot_id)
+    return [[t in by_t for t in ordered] for by_t in (result.schedule_by_section or {}).values() for ordered in by_day.values()]
+
+
+def _count_gaps(result) -> int:
+    """Single free periods between two classes of a section on a day (the triple gap objective)."""
+    return sum(
+        sum(occupied[i - 1] and occupied[i + 1] and not occupied[i] for i in range(1, len(occupied) - 1))
+        for occupied in _occupancy_by_day(result)
+    )
+
+
+def _count_idle(result) -> int:
+    """Free periods between a section's first and last class of a day (the span gap objective)."""
+    idle = 0
+    for occupied in _occupancy_by_day(result):
+        used = [i for i, o in enumerate(occupied) if o]
+        if used:
+            idle += used[-1] - used[0] + 1 - len(used)
+    return idle
+
+
+def _measure_solve(inputs_dir: str, time_limit_sec: int, **solve_kwargs) -> Dict:
+    problem = load_problem_from_directory(inputs_dir)
+    t0 = time.perf_counter()
+    result = solve(problem, time_limit_sec=time_limit_sec, **solve_kwargs)
+    row = {"dataset": inputs_dir}
+    row.update({k: v for k, v in solve_kwargs.items()})
+    row.update({"status": result.status, "wall_sec": round(time.perf_counter() - t0, 2)})
+    if result.status in ("OPTIMAL", "FEASIBLE"):
+        row["gaps"] = _count_gaps(result)
+    row["peak_rss_mb"] = _peak_rss_mb()
+    return row
+
+
+def _measure_room_policy(inputs_dir: str, room_mode: str, time_limit_sec: int, separate_lab_rooms: bool = False, max_candidates: Optional[int] = None) -> Dict:
+    problem = load_problem_from_directory(inputs_dir)
+    problem = with_room_policy(problem, RoomPolicy(separate_lab_rooms=separate_lab_rooms, max_candidates=max_candidates))
+    cp = compile_problem(problem)
+    policy = ("separate" if separate_lab_rooms else "all") + (f", k={max_candidates}" if max_candidates else "")
+    row = {"dataset": inputs_dir, "room_mode": room_mode, "policy": policy}
+    row["candidates"] = round(sum(len(c) for c in cp.candidate_rooms) / max(1, len(cp.candidate_rooms)), 1)
+    t0 = time.perf_counter()
+    built = build_model(problem, room_mode=room_mode)
+    row["build_sec"] = round(time.perf_counter() - t0, 3)
+    row.update(_model_size(built.model))
+    if time_limit_sec:
+        t0 = time.perf_counter()
+        result = solve(problem, time_limit_sec=time_limit_sec, room_mode=room_mode)
+        row.update({"status": result.status, "wall_sec": round(time.perf_counter() - t0, 2)})
+    row["peak_rss_mb"] = _peak_rss_mb()
+    return row
+
+
+def _measure_gap_mode(inputs_dir: str, gap_mode: str, time_limit_sec: int, room_mode: str = "compact") -> Dict:
+    problem = load_problem_from_directory(inputs_dir)
+    t0 = time.perf_counter()
+    built = build_model(problem, optimize_gaps=True, room_mode=room_mode, gap_mode=gap_mode)
+    row = {"dataset": inputs_dir, "gap_mode": gap_mode, "build_sec": round(time.perf_counter() - t0, 3)}
+    row.update(_model_size(built.model))
+    events: List[Dict] = []
+    solver = make_solver(time_limit_sec)
+    status = solve_with_progress(solver, built.model, events.append, has_objective=True)
+    row["first_solution_sec"] = events[0]["elapsed_sec"] if events else None
+    row["solutions"] = len(events)
+    row["status"] = solver.StatusName(status)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        result = _extract_result(problem, built, solver, status)
+        row.update({"objective": result.objective_value, "single_gaps": _count_gaps(result), "idle_periods": _count_idle(result)})
+    row.update({"wall_sec": round(solver.WallTime(), 2), "peak_rss_mb": _peak_rss_mb()})
+    return row
+
+
+def _measure_greedy(inputs_dir: str, passes: int) -> Dict:
+    problem = load_problem_from_directory(inputs_dir)
+    cp = compile_problem(problem)
+    t0 = time.perf_counter()
+    succeeded = sum(_construct(cp, random.Random(seed)) is not None for seed in range(passes))
+    pass_ms = (time.perf_counter() - t0) * 1000 / passes
+    t0 = time.perf_counter()
+    result = construct(problem)
+    row = {
+        "dataset": inputs_dir,
+        "passes_ok": f"{succeeded}/{passes}",
+        "pass_ms": round(pass_ms, 1),
+        "construct": "ok" if result is not None else "failed",
+        "construct_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    if result is not None:
+        row.update({"violations": len(validate_solution(problem, result.schedule_by_section)), "single_gaps": _count_gaps(result), "idle_periods": _count_idle(result)})
+    return row
+
+
+def _engine_label(engine: str, room_mode: str) -> str:
+    # The interval engine always uses block rooms
+    return engine if engine == "interval" else f"{engine}/{room_mode}"
+
+
+class _FirstSolution(cp_model.CpSolverSolutionCallback):
+    def __init__(self) -> None:
+        super().__init__()
+        self.first_solution_sec: float = -1.0
+
+    def on_solution_callback(self) -> None:
+        self.first_solution_sec = self.WallTime()
+        self.StopSearch()
+
+
+def _measure_first_feasible(inputs_dir: str, engine: str, time_limit_sec: int, room_mode: str = "compact") -> Dict:
+    problem = load_problem_from_directory(inputs_dir)
+    t0 = time.perf_counter()
+    if engine == "interval":
+        built = build_interval_model(problem)
+    else:
+        built = build_model(problem, room_mode=room_mode)
+    build_sec = time.perf_counter() - t0
+    callback = _FirstSolution()
+    solver = make_solver(time_limit_sec)
+    status = solver.Solve(built.model, callback)
+    row = {"dataset": inputs_dir, "engine": _engine_label(engine, room_mode)}
+    row.update(_model_size(built.model))
+    row.update({
+        "build_sec": round(build_sec, 2),
+        "first_feasible_sec": round(callback.first_solution_sec, 2) if callback.first_solution_sec >= 0 else f">{time_limit_sec}",
+        "status": solver.StatusName(status),
+    })
+    return row
+
+
+def _reassign_one_faculty(problem) -> None:
+    # A near-identical dataset: move one assignment to the least loaded faculty
+    load: Dict[str, int] = {f.faculty_id: 0 for f in problem.faculty}
+    for a in problem.faculty_courses:
+        load[a.faculty_id] = load.get(a.faculty_id, 0) + 1
+    target = min(load, key=load.get)
+    moved = next(a for a in problem.faculty_courses if a.faculty_id != target)
+    moved.faculty_id = target
+
+
+def _measure_hinted(inputs_dir: str, time_limit_sec: int, room_mode: str = "per_slot") -> List[Dict]:
+    base = solve(load_problem_from_directory(inputs_dir), time_limit_sec=time_limit_sec, room_mode="classes")
+    rows: List[Dict] = []
+    for hinted in (False, True):
+        problem = load_problem_from_directory(inputs_dir)
+        _reassign_one_faculty(problem)
+        t0 = time.perf_counter()
+        built = build_model(problem, room_mode=room_mode)
+        if hinted:
+            solver, status, _reason = solve_with_hint(built, base, time_limit_sec)
+            first_sec = time.perf_counter() - t0
+        else:
+            callback = _FirstSolution()
+            solver = make_solver(time_limit_sec)
+            status = solver.Solve(built.model, callback)
+            first_sec = time.perf_counter() - t0 if callback.first_solution_sec >= 0 else None
+        rows.append({
+            "dataset": inputs_dir,
+            "room_mode": room_mode,
+            "hint": "previous" if hinted else "none",
+            "first_feasible_sec": round(first_sec, 2) if first_sec is not None else f">{time_limit_sec}",
+            "status": solver.StatusName(status),
+        })
+    return rows
+
+
+def bench_build(datasets: List[str], optimize_gaps: bool = False, room_modes: List[str] = ("per_slot",), model_cache: bool = False) -> List[Dict]:
+    """Time Python-side model construction (no search) for each dataset;
+    with ``model_cache`` also the time to load the same model from a ModelCache."""
+    rows: List[Dict] = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for inputs_dir in datasets:
+            for room_mode in room_modes:
+                rows.append(_isolated(
+                    _measure_build,
+                    inputs_dir=inputs_dir,
+                    optimize_gaps=optimize_gaps,
+                    room_mode=room_mode,
+                    model_cache_dir=tmpdir if model_cache else None,
+                ))
+    return rows
+
+
+def bench_solve(datasets: List[str], time_limit_sec: int, variants: List[Dict]) -> List[Dict]:
+    """Full solve (build + search) per dataset and option variant."""
+    rows: List[Dict] = []
+    for inputs_dir in datasets:
+        for variant in variants:
+            rows.append(_isolated(_measure_solve, inputs_dir=inputs_dir, time_limit_sec=time_limit_sec, **variant))
+    return rows
+
+
+def bench_engines(datasets: List[str], time_limit_sec: int) -> List[Dict]:
+    """Time to first feasible solution per engine (search stops at the first solution)."""
+    rows: List[Dict] = []
+    variants = [("time_indexed", "per_slot"), ("time_indexed", "compact"), ("interval", "compact")]
+    for inputs_dir in datasets:
+        for engine, room_mode in variants:
+            rows.append(_isolated(_measure_first_feasible, inputs_dir=inputs_dir, engine=engine, time_limit_sec=time_limit_sec, room_mode=room_mode))
+    return rows
+
+
+def bench_hint(datasets: List[str], time_limit_sec: int, room_modes: List[str]) -> List[Dict]:
+    """Build plus time to first feasible after one faculty change, cold vs hinted with the previous result."""
+    rows: List[Dict] = []
+    for inputs_dir in datasets:
+        for room_mode in room_modes:
+            measured = _isolated(_measure_hinted, inputs_dir=inputs_dir, time_limit_sec=time_limit_sec, room_mode=room_mode)
+            rows.extend(measured if isinstance(measured, list) else [measured])
+    return rows
+
+
+def bench_candidates(datasets: List[str], time_limit_sec: int, room_modes: List[str], max_candidates: int) -> List[Dict]:
+    """Room candidate policies: every fitting room (today) vs separate lab
+    rooms vs separate lab rooms and the k best fits, by model size and solve time."""
+    policies = [{}, {"separate_lab_rooms": True}, {"separate_lab_rooms": True, "max_candidates": max_candidates}]
+    return [
+        _isolated(_measure_room_policy, inputs_dir=inputs_dir, room_mode=room_mode, time_limit_sec=time_limit_sec, **policy)
+        for inputs_dir in datasets
+        for room_mode in room_modes
+        for policy in policies
+    ]
+
+
+def bench_gaps(datasets: List[str], time_limit_sec: int, room_mode: str = "compact") -> List[Dict]:
+    """Gap objective encodings: model size, time to first solution and final gaps by both measures."""
+    return [
+        _isolated(_measure_gap_mode, inputs_dir=inputs_dir, gap_mode=gap_mode, time_limit_sec=time_limit_sec, room_mode=room_mode)
+        for inputs_dir in datasets
+        for gap_mode in GAP_MODES
+    ]
+
+
+def bench_greedy(datasets: List[str], passes: int) -> List[Dict]:
+    """Greedy constructor: single-pass success rate over ``passes`` seeds, and construct() (several passes)."""
+    return [_measure_greedy(inputs_dir, passes) for inputs_dir in datasets]
+
+
+def _print_rows(rows: List[Dict]) -> None:
+    if not rows:
+        return
+    cols: List[str] = []
+    for r in rows:
+        cols.extend(c for c in r if c not in cols)
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in cols))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark timetable model building and solving")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Measure CP-SAT model build time")
+    p_build.add_argument("datasets", nargs="*", default=DEFAULT_DATASETS, help="Input directories")
+    p_build.add_argument("--optimize_gaps", action="store_true", help="Include the gap objective")
+    p_build.add_argument("--room_mode", choices=ROOM_MODES, nargs="+", default=["per_slot"])
+    p_build.add_argument("--model_cache", action="store_true", help="Also time loading the built model from the model cache")
+
+    p_rooms = sub.add_parser("rooms", help="Compare room formulations and the two-stage strategy (model size, memory, optional solve)")
+    p_rooms.add_argument("datasets", nargs="*", default=DEFAULT_DATASETS, help="Input directories")
+    p_rooms.add_argument("--solve_sec", type=int, default=0, help="Also solve with this time limit (0 = build only)")
+
+    p_candidates = sub.add_parser("candidates", help="Room candidate policies: all fitting rooms vs separate lab rooms vs k best fits (model size, solve time)")
+    p_candidates.add_argument("datasets", nargs="*", default=["TT_Flexinput", "data/large_1000"], help="Input directories")
+    p_candidates.add_argument("--time_limit_sec", type=int, default=60, help="Also solve with this time limit (0 = build only)")
+    p_candidates.add_argument("--room_mode", choices=ROOM_MODES, nargs="+", default=["per_slot", "compact"])
+    p_candidates.add_argument("--max_candidates", type=int, default=3, metavar="K")
+
+    p_engines = sub.add_parser("engines", help="Time to first feasible solution: time-indexed vs interval engine")
+    p_engines.add_argument("datasets", nargs="*", default=["TT_Flexinput"] + DEFAULT_DATASETS, help="Input directories")
+    p_engines.add_argument("--time_limit_sec", type=int, default=120)
+
+    p_hint = sub.add_parser("hint", help="Time to first feasible after a small change: cold vs warm-started")
+    p_hint.add_argument("datasets", nargs="*", default=["TT_Flexinput", "data/large_1000"], help="Input directories")
+    p_hint.add_argument("--time_limit_sec", type=int, default=120)
+    p_hint.add_argument("--room_mode", choices=ROOM_MODES, nargs="+", default=["per_slot", "compact"])
+
+    p_rolling = sub.add_parser("rolling", help="Monolithic vs rolling group-by-group solve (wall time, gaps, memory)")
+    p_rolling.add_argument("datasets", nargs="*", default=["data/large_3000", "data/large_5000"], help="Input directories")
+    p_rolling.add_argument("--time_limit_sec", type=int, default=120)
+    p_rolling.add_argument("--room_mode", choices=ROOM_MODES, default="compact")
+    p_rolling.add_argument("--optimize_gaps", action="store_true", help="Minimise gaps in both")
+
+    p_gaps = sub.add_parser("gaps", help="Gap objective encodings: triple vs span (model size, first solution, final gaps)")
+    p_gaps.add_argument("datasets", nargs="*", default=["TT_Flexinput"] + DEFAULT_DATASETS[:2], help="Input directories")
+    p_gaps.add_argument("--time_limit_sec", type=int, default=60)
+    p_gaps.add_argument("--room_mode", choices=ROOM_MODES, default="compact")
+
+    p_greedy = sub.add_parser("greedy", help="Greedy constructor: success rate and time per pass")
+    p_greedy.add_argument("datasets", nargs="*", default=["TT_Flexinput"] + DEFAULT_DATASETS, help="Input directories")
+    p_greedy.add_argument("--passes", type=int, default=20, help="Seeds tried, one pass each")
+    p_greedy.add_argument("--time_limit_sec", type=int, default=30, help="Also solve with --optimize_gaps, cold and greedy-hinted, for this long (0 = skip)")
+
+    p_local = sub.add_parser("local", help="Local search engine vs CP-SAT, and CP-SAT polished by local search (wall time, gaps, memory)")
+    p_local.add_argument("datasets", nargs="*", default=DEFAULT_DATASETS, help="Input directories")
+    p_local.add_argument("--time_limit_sec", type=int, default=60)
+    p_local.add_argument("--polish_sec", type=float, default=20, help="Local search after the CP-SAT time limit")
+
+    p_labs = sub.add_parser("labs", help="Direct vs labs-first strategy on lab-heavy generated instances (wall time, memory)")
+    p_labs.add_argument("datasets", nargs="*", default=[], help="Input directories")
+    p_labs.add_argument("--generate", type=int, nargs="*", default=[1200, 3000], metavar="STUDENTS", help="Also generated instances with these total student counts, 6 of 10 courses labs")
+    p_labs.add_argument("--time_limit_sec", type=int, default=60)
+    p_labs.add_argument("--room_mode", choices=ROOM_MODES, default="compact")
+    p_labs.add_argument("--optimize_gaps", action="store_true", help="Minimise gaps in both")
+
+    p_days = sub.add_parser("days", help="Direct vs day_split strategy as section counts grow (wall time, gaps, memory)")
+    p_days.add_argument("datasets", nargs="*", default=DEFAULT_DATASETS[1:], help="Input directories")
+    p_days.add_argument("--generate", type=int, nargs="*", default=[6000, 9000], metavar="STUDENTS", help="Also generated instances with these total student counts")
+    p_days.add_argument("--time_limit_sec", type=int, default=90)
+    p_days.add_argument("--room_mode", choices=ROOM_MODES, default="compact")
+
+    args = parser.parse_args()
+    datasets = [d for d in args.datasets if os.path.isdir(d)]
+
+    if args.command == "build":
+        _print_rows(bench_build(datasets, optimize_gaps=args.optimize_gaps, room_modes=args.room_mode, model_cache=args.model_cache))
+    elif args.command == "rooms":
+        _print_rows(bench_build(datasets, room_modes=list(ROOM_MODES)))
+        if args.solve_sec:
+            variants = [{"room_mode": m} for m in ROOM_MODES] + [{"strategy": "two_stage"}]
+            _print_rows(bench_solve(datasets, args.solve_sec, variants))
+    elif args.command == "candidates":
+        _print_rows(bench_candidates(datasets, args.time_limit_sec, args.room_mode, args.max_candidates))
+    elif args.command == "engines":
+        _print_rows(bench_engines(datasets, args.time_limit_sec))
+    elif args.command == "hint":
+        _print_rows(bench_hint(datasets, args.time_limit_sec, args.room_mode))
+    elif args.command == "gaps":
+        _print_rows(bench_gaps(datasets, args.time_limit_sec, args.room_mode))
+    elif args.command == "greedy":
+        _print_rows(bench_greedy(datasets, args.passes))
+        if args.time_limit_sec:
+            common = {"room_mode": "compact", "optimize_gaps": True}
+            _print_rows(bench_solve(datasets, args.time_limit_sec, [dict(common, greedy=False), dict(common, greedy=True)]))
+    elif args.command == "local":
+        common = {"optimize_gaps": True, "greedy": True}
+        variants = [dict(common, room_mode="compact"), dict(common, engine="local"), dict(common, room_mode="compact", polish_sec=args.polish_sec)]
+        _print_rows(bench_solve(datasets, args.time_limit_sec, variants))
+    elif args.command == "labs":
+        common = {"room_mode": args.room_mode, "optimize_gaps": args.optimize_gaps}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for students in args.generate:
+                out_dir = os.path.join(tmpdir, f"labs_{students}")
+                generate_dataset(out_dir, total_students=students, section_size=60, num_courses=10, num_lab_courses=6)
+                datasets.append(out_dir)
+            _print_rows(bench_solve(datasets, args.time_limit_sec, [dict(common, strategy="direct"), dict(common, strategy="labs_first")]))
+    elif args.command == "days":
+        common = {"room_mode": args.room_mode, "optimize_gaps": True}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for students in args.generate:
+                out_dir = os.path.join(tmpdir, f"generated_{students}")
+                generate_dataset(out_dir, total_students=students, section_size=60, num_courses=10, num_lab_courses=3)
+                datasets.append(out_dir)
+            _print_rows(bench_solve(datasets, args.time_limit_sec, [dict(common, strategy="direct"), dict(common, strategy="day_split")]))
+    elif args.command == "rolling":
+        common = {"room_mode": args.room_mode, "optimize_gaps": args.optimize_gaps}
+        _print_rows(bench_solve(datasets, args.time_limit_sec, [dict(common, strategy="direct"), dict(common, strategy="rolling")]))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+import ortools
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import compile_problem
+    from .models import ProblemData, Timeslot
+    from .timetable_solver import BuiltModel, SolveResult, build_model
+except ImportError:
+    from compiled import compile_problem
+    from models import ProblemData, Timeslot
+    from timetable_solver import BuiltModel, SolveResult, build_model
+
+
+# Bump whenever build_model's constraints or solve()'s behaviour change (the
+# timetable the same inputs give), so results and models cached before are stale.
+# 2: triple-gap objective fix, stop criteria, solver profiles
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = os.environ.get("ATGS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "atgs_result_cache"))
+DEFAULT_MAX_BYTES = int(os.environ.get("ATGS_CACHE_MAX_MB", "256")) * 1024 * 1024
+DEFAULT_MODEL_CACHE_DIR = os.environ.get("ATGS_MODEL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "atgs_model_cache"))
+DEFAULT_MODEL_MAX_BYTES = int(os.environ.get("ATGS_MODEL_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+# Only found timetables are cached; an INFEASIBLE status may just be a time-out
+CACHEABLE_STATUSES = ("OPTIMAL", "FEASIBLE")
+
+
+def _records(rows: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    dumped = [r.model_dump() if hasattr(r, "model_dump") else r.dict() for r in rows or []]
+    # Row order in the CSVs does not change the problem
+    return sorted(dumped, key=lambda d: json.dumps(d, sort_keys=True))
+
+
+def problem_fingerprint(problem: ProblemData) -> str:
+    """SHA-256 of a canonical form of ``problem`` (row order ignored)."""
+    canonical = {
+        "day_periods": _records(problem.day_periods),
+        "sections": _records(problem.sections),
+        "faculty": _records(problem.faculty),
+        "courses": _records(problem.courses),
+        "section_requirements": _records(problem.section_requirements),
+        "faculty_courses": _records(problem.faculty_courses),
+        "rooms": _records(problem.rooms),
+        "faculty_unavailability": _records(problem.faculty_unavailability),
+        "room_unavailability": _records(problem.room_unavailability),
+        "room_policy": _records([problem.room_policy]),
+    }
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cache_key(problem: ProblemData, **params: Any) -> str:
+    """Key for a solve of ``problem`` with solver parameters ``params``
+    (time limit, optimize_gaps, room_mode, engine, strategy, seed, ...).
+    The cache version and the OR-Tools version are part of every key."""
+    versions = {"cache": CACHE_VERSION, "ortools": ortools.__version__}
+    blob = json.dumps({"v": versions, "problem": problem_fingerprint(problem), "params": params}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def result_to_dict(result: SolveResult) -> Dict[str, Any]:
+    def by_tid(schedule: Optional[Dict[str, Dict[int, Any]]]) -> Dict[str, Dict[str, Any]]:
+        return {k: {str(t): list(v) for t, v in by_t.items()} for k, by_t in (schedule or {}).items()}
+
+    return {
+        "status": result.status,
+        "objective_value": result.objective_value,
+        "timeslots": [asdict(t) for t in result.timeslots],
+        "schedule_by_section": by_tid(result.schedule_by_section),
+        "schedule_by_faculty": by_tid(result.schedule_by_faculty),
+        "available_rooms": {str(t): v for t, v in (result.available_rooms or {}).items()},
+        "available_faculty": {str(t): v for t, v in (result.available_faculty or {}).items()},
+        "best_bound": result.best_bound,
+        "stop_reason": result.stop_reason,
+    }
+
+
+def result_from_dict(data: Dict[str, Any]) -> SolveResult:
+    def by_tid(schedule: Dict[str, Dict[str, List[str]]]) -> Dict[str, Dict[int, tuple]]:
+        return {k: {int(t): tuple(v) for t, v in by_t.items()} for k, by_t in schedule.items()}
+
+    return SolveResult(
+        status=data["status"],
+        schedule_by_section=by_tid(data["schedule_by_section"]),
+        schedule_by_faculty=by_tid(data["schedule_by_faculty"]),
+        timeslots=[Timeslot(**t) for t in data["timeslots"]],
+        objective_value=data["objective_value"],
+        available_rooms={int(t): v for t, v in data["available_rooms"].items()},
+        available_faculty={int(t): v for t, v in data["available_faculty"].items()},
+        best_bound=data.get("best_bound"),
+        stop_reason=data.get("stop_reason"),
+    )
+
+
+class _DiskCache:
+    """One file per key under ``directory``, evicted least recently used
+    first once the files exceed ``max_bytes``.
+
+    File modification times record use: a hit touches its file.
+    """
+    suffix = ""
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _write(self, key: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # Atomic, so concurrent readers never see a partial file
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _m, size, _n in entries)
+        for _mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def add_counters(self, counts: Dict[str, int]) -> None:
+        """Add hits, misses and evictions counted elsewhere (e.g. in a job's
+        pool process, which has its own instance of the same cache)."""
+        with self._lock:
+            self.hits += counts.get("hits", 0)
+            self.misses += counts.get("misses", 0)
+            self.evictions += counts.get("evictions", 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith(self.suffix):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self) -> Dict[str, Any]:
+        entries = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(self.suffix)]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(os.path.getsize(p) for p in entries if os.path.exists(p)),
+            "maxBytes": self.max_bytes,
+        }
+
+
+class ResultCache(_DiskCache):
+    """SolveResults on local disk as JSON."""
+    suffix = ".json"
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        super().__init__(directory, max_bytes)
+
+    def get(self, key: str) -> Optional[SolveResult]:
+        data = self._read(key)
+        try:
+            result = result_from_dict(json.loads(data)) if data is not None else None
+        except (ValueError, KeyError, TypeError):
+            result = None
+        self._count(result is not None)
+        return result
+
+    def put(self, key: str, result: SolveResult) -> bool:
+        """Store ``result`` if its status is cacheable. Returns whether it was stored."""
+        if result.status not in CACHEABLE_STATUSES:
+            return False
+        self._write(key, json.dumps(result_to_dict(result), separators=(",", ":")).encode("utf-8"))
+        return True
+
+
+# BuiltModel fields holding {key: variable}; stored as {key: proto index}
+_VAR_MAPS = ("X_lec", "Y_lab_start", "R_lec", "R_lab_start", "SectionBlockRoom", "SectionBlockActive", "SectionBlockClass")
+
+
+class ModelCache(_DiskCache):
+    """Built time-indexed CP-SAT models on local disk.
+
+    Each entry is the model proto (text format, names stripped: the only
+    format the OR-Tools Python proto can parse) plus the proto index of
+    every decoded variable, so a hit skips the Python model construction.
+    Entries are pickles: point the cache at a trusted local directory only.
+    The encoding needs the pybind proto API of recent OR-Tools; where it is
+    missing nothing is stored and every lookup misses, so build_model runs.
+    """
+    suffix = ".model"
+
+    def __init__(self, directory: str = DEFAULT_MODEL_CACHE_DIR, max_bytes: int = DEFAULT_MODEL_MAX_BYTES) -> None:
+        super().__init__(directory, max_bytes)
+
+    @staticmethod
+    def key(problem: ProblemData, **options: Any) -> str:
+        return cache_key(problem, kind="model", **options)
+
+    def get(self, key: str, problem: ProblemData) -> Optional[BuiltModel]:
+        data = self._read(key)
+        built = None
+        if data is not None:
+            try:
+                built = self._decode(pickle.loads(data), problem)
+            except (pickle.UnpicklingError, ValueError, KeyError, TypeError, EOFError, AttributeError):
+                built = None
+        self._count(built is not None)
+        return built
+
+    def put(self, key: str, built: BuiltModel) -> None:
+        if not hasattr(built.model, "remove_all_names"):
+            # OR-Tools before the pybind proto API: the model cannot be encoded
+            return
+        unnamed = built.model.Clone()
+        unnamed.remove_all_names()
+        entry = {
+            "proto": str(unnamed.Proto()),
+            "maps": {name: [(k, v.Index()) for k, v in getattr(built, name).items()] for name in _VAR_MAPS},
+            "objective_terms": [v.Index() for v in built.objective_terms],
+            "lab_block_size": built.lab_block_size,
+            "blocked_block_rooms": built.blocked_block_rooms,
+        }
+        self._write(key, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _decode(entry: Dict[str, Any], problem: ProblemData) -> BuiltModel:
+        model = cp_model.CpModel()
+        proto = model.Proto()
+        proto.parse_text_format(entry["proto"])
+        # Direct construction skips the per-variable checks of GetBoolVarFromProtoIndex
+        maps = {name: {k: cp_model.IntVar(proto, i) for k, i in pairs} for name, pairs in entry["maps"].items()}
+        cp = compile_problem(problem)
+        return BuiltModel(
+            model=model,
+            compiled=cp,
+            timeslots=cp.timeslots,
+            lab_block_size=entry["lab_block_size"],
+            objective_terms=[cp_model.IntVar(proto, i) for i in entry["objective_terms"]],
+            blocked_block_rooms=entry["blocked_block_rooms"],
+            **maps,
+        )
+
+    def build_model(self, problem: ProblemData, optimize_gaps: bool = False, room_mode: str = "per_slot", gap_mode: str = "triple") -> BuiltModel:
+        """build_model() through the cache."""
+        key = self.key(problem, optimize_gaps=optimize_gaps, room_mode=room_mode, gap_mode=gap_mode)
+        built = self.get(key, problem)
+        if built is None:
+            built = build_model(problem, optimize_gaps=optimize_gaps, room_mode=room_mode, gap_mode=gap_mode)
+            self.put(key, built)
+        return built
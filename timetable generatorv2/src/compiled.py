@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .models import ProblemData, Timeslot
+    from .room_policy import section_room_candidates
+except ImportError:
+    from models import ProblemData, Timeslot
+    from room_policy import section_room_candidates
+
+
+@dataclass
+class TimeGrid:
+    """Day/period lookup tables for a list of timeslots."""
+    timeslots: List[Timeslot]
+    timeslot_by_id: Dict[int, Timeslot]
+    day_period_to_tid: Dict[Tuple[int, int], int]
+    days: List[Tuple[int, str]]  # (day_index, day_name) in day order
+    periods_by_day: Dict[int, List[int]]  # day_index -> sorted period indexes
+    non_break: List[int]  # non-break timeslot ids in (day, period) order
+    non_break_by_day: Dict[int, List[int]]  # day_index -> non-break timeslot ids in period order
+    p1_timeslots: Set[int]  # non-break timeslots with period_index == 1
+
+    @classmethod
+    def from_timeslots(cls, timeslots: List[Timeslot]) -> "TimeGrid":
+        ordered = sorted(timeslots, key=lambda t: (t.day_index, t.period_index))
+        periods_by_day: Dict[int, List[int]] = defaultdict(list)
+        non_break_by_day: Dict[int, List[int]] = defaultdict(list)
+        for t in ordered:
+            periods_by_day[t.day_index].append(t.period_index)
+            if not t.is_break:
+                non_break_by_day[t.day_index].append(t.timeslot_id)
+        return cls(
+            timeslots=timeslots,
+            timeslot_by_id={t.timeslot_id: t for t in timeslots},
+            day_period_to_tid={(t.day_index, t.period_index): t.timeslot_id for t in timeslots},
+            days=sorted({(t.day_index, t.day_name) for t in timeslots}, key=lambda x: x[0]),
+            periods_by_day={d: sorted(set(ps)) for d, ps in periods_by_day.items()},
+            non_break=[t.timeslot_id for t in ordered if not t.is_break],
+            non_break_by_day=dict(non_break_by_day),
+            p1_timeslots={t.timeslot_id for t in timeslots if t.period_index == 1 and not t.is_break},
+        )
+
+
+@dataclass
+class CompiledProblem:
+    """Integer-interned view of a ProblemData, built once and shared by every stage.
+
+    Sections, courses, faculty and rooms are mapped to dense indexes. Weekly
+    demands are resolved once (section-course override, else course default)
+    into (section, course) NumPy arrays, so no stage repeats the default
+    resolution or string-keyed lookups.
+    """
+    problem: ProblemData
+    section_ids: List[str]
+    course_ids: List[str]
+    faculty_ids: List[str]
+    room_ids: List[str]
+    section_index: Dict[str, int]
+    course_index: Dict[str, int]
+    faculty_index: Dict[str, int]
+    room_index: Dict[str, int]
+    section_size: np.ndarray  # (S,)
+    course_is_lab: np.ndarray  # (C,) bool
+    room_capacity: np.ndarray  # (R,)
+    room_is_lab: np.ndarray  # (R,) bool
+    lectures: np.ndarray  # (S, C) weekly lecture periods
+    lab_sessions: np.ndarray  # (S, C) weekly lab sessions
+    lab_block: np.ndarray  # (S, C) effective lab block size (0 = none)
+    faculty_of: np.ndarray  # (S, C) faculty index, -1 when unassigned
+    grid: TimeGrid
+    blocks_by_day: Dict[int, List[Tuple[int, List[int]]]]  # day_index -> [(block_id, [timeslot_ids])]
+    timeslot_to_block: Dict[int, int]
+    lab_starts: Dict[int, List[int]] = field(default_factory=dict)  # block size -> valid start timeslot ids
+    lab_cover: Dict[int, Dict[int, List[int]]] = field(default_factory=dict)  # block size -> start -> covered timeslot ids
+    candidate_rooms: List[List[int]] = field(default_factory=list)  # section index -> room indexes
+    lecture_rooms: List[List[int]] = field(default_factory=list)  # section index -> room indexes of a block without labs
+    lab_rooms: List[List[int]] = field(default_factory=list)  # section index -> room indexes of a block holding a lab
+    room_classes: List[List[int]] = field(default_factory=list)  # class index -> interchangeable room indexes
+    room_class_of: Optional[np.ndarray] = None  # (R,) class index per room
+    candidate_room_classes: List[List[int]] = field(default_factory=list)  # section index -> class indexes
+    faculty_unavailable: Set[Tuple[int, int]] = field(default_factory=set)  # (faculty index, timeslot id)
+    room_unavailable: Set[Tuple[int, int]] = field(default_factory=set)  # (timeslot id, room index)
+    unavailable_block_rooms: Set[Tuple[int, int]] = field(default_factory=set)  # (block_id, room index) unavailable somewhere in the block
+
+    @property
+    def timeslots(self) -> List[Timeslot]:
+        return self.grid.timeslots
+
+    @property
+    def have_rooms(self) -> bool:
+        return len(self.room_ids) > 0
+
+    def scheduled_lectures(self) -> Iterator[Tuple[int, int]]:
+        """(section index, course index) pairs with weekly lectures."""
+        for s_idx, c_idx in zip(*np.nonzero(self.lectures > 0)):
+            yield int(s_idx), int(c_idx)
+
+    def scheduled_labs(self) -> Iterator[Tuple[int, int]]:
+        """(section index, course index) pairs with schedulable lab sessions."""
+        for s_idx, c_idx in zip(*np.nonzero((self.lab_sessions > 0) & (self.lab_block > 0))):
+            yield int(s_idx), int(c_idx)
+
+    def block_rooms(self, s_idx: int, has_lab: bool) -> List[int]:
+        """Candidate rooms of a section's block, by whether it holds a lab."""
+        return self.lab_rooms[s_idx] if has_lab else self.lecture_rooms[s_idx]
+
+    @property
+    def splits_room_kinds(self) -> bool:
+        """True if some section's lecture and lab blocks have different candidates."""
+        return any(lec is not lab and lec != lab for lec, lab in zip(self.lecture_rooms, self.lab_rooms))
+
+    def faculty_id_of(self, s_idx: int, c_idx: int) -> Optional[str]:
+        f_idx = int(self.faculty_of[s_idx, c_idx])
+        return self.faculty_ids[f_idx] if f_idx >= 0 else None
+
+    def required_periods(self) -> np.ndarray:
+        """Total weekly periods per section (lectures plus lab blocks)."""
+        labs = np.where(self.lab_block > 0, self.lab_sessions * self.lab_block, 0)
+        return (self.lectures + labs).sum(axis=1)
+
+
+def _compute_lab_tables(grid: TimeGrid, block_size: int) -> Tuple[List[int], Dict[int, List[int]]]:
+    try:
+        from .feasibility import compute_valid_lab_starts
+    except ImportError:
+        from feasibility import compute_valid_lab_starts
+    starts_by_day = compute_valid_lab_starts(grid.timeslots, block_size)
+    starts = [ts for day in sorted(starts_by_day) for ts in starts_by_day[day]]
+    cover: Dict[int, List[int]] = {}
+    for start_t in starts:
+        start_ts = grid.timeslot_by_id[start_t]
+        cover[start_t] = [grid.day_period_to_tid[(start_ts.day_index, start_ts.period_index + k)] for k in range(block_size)]
+    return starts, cover
+
+
+def unavailable_timeslots(grid: TimeGrid, day_name: str, period_index: Optional[int]) -> List[int]:
+    """Timeslot ids of an unavailability row: one period, or the whole day
+    when ``period_index`` is None. Unknown days and periods give none."""
+    day_idx = next((d for d, name in grid.days if name == day_name), None)
+    if day_idx is None:
+        return []
+    if period_index is None:
+        return [grid.day_period_to_tid[(day_idx, p)] for p in grid.periods_by_day[day_idx]]
+    tid = grid.day_period_to_tid.get((day_idx, period_index))
+    return [] if tid is None else [tid]
+
+
+def compile_problem(problem: ProblemData) -> CompiledProblem:
+    """Return the CompiledProblem for ``problem``, building it on first use."""
+    cached = problem._compiled
+    if cached is not None:
+        return cached
+
+    try:
+        from .timetable_solver import _identify_continuous_blocks
+    except ImportError:
+        from timetable_solver import _identify_continuous_blocks
+
+    section_ids = [s.section_id for s in problem.sections]
+    course_ids = [c.course_id for c in problem.courses]
+    faculty_ids = [f.faculty_id for f in problem.faculty]
+    rooms = problem.rooms or []
+    room_ids = [r.room_id for r in rooms]
+
+    section_index = {sid: i for i, sid in enumerate(section_ids)}
+    course_index = {cid: i for i, cid in enumerate(course_ids)}
+    faculty_index = {fid: i for i, fid in enumerate(faculty_ids)}
+    # Faculty referenced only through faculty_courses still need an index
+    for a in problem.faculty_courses:
+        if a.faculty_id not in faculty_index:
+            faculty_index[a.faculty_id] = len(faculty_ids)
+            faculty_ids.append(a.faculty_id)
+    room_index = {rid: i for i, rid in enumerate(room_ids)}
+
+    S, C = len(section_ids), len(course_ids)
+    course_is_lab = np.array([c.is_lab for c in problem.courses], dtype=bool)
+    default_lectures = np.array([c.lecture_periods_per_week for c in problem.courses], dtype=np.int64)
+    default_labs = np.array([c.lab_sessions_per_week if c.is_lab else 0 for c in problem.courses], dtype=np.int64)
+    default_block = np.array([c.lab_block_size if c.is_lab else 0 for c in problem.courses], dtype=np.int64)
+
+    # Course defaults apply wherever no section-course override exists
+    lectures = np.tile(default_lectures, (S, 1))
+    lab_sessions = np.tile(default_labs, (S, 1))
+    lab_block = np.tile(default_block, (S, 1))
+    for r in problem.section_requirements:
+        s_idx = section_index.get(r.section_id)
+        c_idx = course_index.get(r.course_id)
+        if s_idx is None or c_idx is None:
+            continue
+        lectures[s_idx, c_idx] = r.weekly_lectures
+        lab_sessions[s_idx, c_idx] = r.weekly_lab_sessions
+        lab_block[s_idx, c_idx] = r.lab_block_size or default_block[c_idx]
+
+    faculty_of = np.full((S, C), -1, dtype=np.int64)
+    for a in problem.faculty_courses:
+        s_idx = section_index.get(a.section_id)
+        c_idx = course_index.get(a.course_id)
+        if s_idx is None or c_idx is None:
+            continue
+        faculty_of[s_idx, c_idx] = faculty_index[a.faculty_id]
+
+    section_size = np.array([s.num_students for s in problem.sections], dtype=np.int64)
+    room_capacity = np.array([r.capacity for r in rooms], dtype=np.int64)
+    room_is_lab = np.array([r.is_lab for r in rooms], dtype=bool)
+
+    grid = TimeGrid.from_timeslots(problem.build_timeslots())
+    blocks_by_day = _identify_continuous_blocks(grid.timeslots)
+    timeslot_to_block = {tid: block_id for blocks in blocks_by_day.values() for block_id, tids in blocks for tid in tids}
+
+    lab_starts: Dict[int, List[int]] = {}
+    lab_cover: Dict[int, Dict[int, List[int]]] = {}
+    for bsize in sorted({int(b) for b in np.unique(lab_block[(lab_sessions > 0) & (lab_block > 0)])}):
+        lab_starts[bsize], lab_cover[bsize] = _compute_lab_tables(grid, bsize)
+
+    # Unavailable (faculty, slot) and (slot, room) pairs; unknown ids are reported by the feasibility check
+    faculty_unavailable = {
+        (faculty_index[u.faculty_id], t)
+        for u in problem.faculty_unavailability
+        if u.faculty_id in faculty_index
+        for t in unavailable_timeslots(grid, u.day_name, u.period_index)
+    }
+    room_unavailable = {
+        (t, room_index[u.room_id])
+        for u in problem.room_unavailability
+        if u.room_id in room_index
+        for t in unavailable_timeslots(grid, u.day_name, u.period_index)
+    }
+    unavailable_block_rooms = {(timeslot_to_block[t], r_idx) for t, r_idx in room_unavailable if t in timeslot_to_block}
+
+    # Rooms with sufficient capacity, narrowed by the room policy (src/room_policy.py)
+    candidate_rooms: List[List[int]] = []
+    lecture_rooms: List[List[int]] = []
+    lab_rooms: List[List[int]] = []
+    if rooms:
+        lecture_rooms, lab_rooms, candidate_rooms = section_room_candidates(
+            problem,
+            section_size,
+            room_capacity,
+            room_is_lab,
+            needs_lectures=(lectures > 0).any(axis=1),
+            needs_labs=((lab_sessions > 0) & (lab_block > 0)).any(axis=1),
+        )
+
+    # Rooms with identical capacity, lab flag and building are interchangeable
+    # (the room policy treats them alike)
+    class_key_index: Dict[Tuple[int, bool, Optional[str]], int] = {}
+    room_classes: List[List[int]] = []
+    room_class_of = np.zeros(len(room_ids), dtype=np.int64)
+    for r_idx, rm in enumerate(rooms):
+        key = (rm.capacity, rm.is_lab, rm.building)
+        if key not in class_key_index:
+            class_key_index[key] = len(room_classes)
+            room_classes.append([])
+        room_classes[class_key_index[key]].append(r_idx)
+        room_class_of[r_idx] = class_key_index[key]
+    candidate_room_classes = [sorted({int(room_class_of[r_idx]) for r_idx in cands}) for cands in candidate_rooms]
+
+    compiled = CompiledProblem(
+        problem=problem,
+        section_ids=section_ids,
+        course_ids=course_ids,
+        faculty_ids=faculty_ids,
+        room_ids=room_ids,
+        section_index=section_index,
+        course_index=course_index,
+        faculty_index=faculty_index,
+        room_index=room_index,
+        section_size=section_size,
+        course_is_lab=course_is_lab,
+        room_capacity=room_capacity,
+        room_is_lab=room_is_lab,
+        lectures=lectures,
+        lab_sessions=lab_sessions,
+        lab_block=lab_block,
+        faculty_of=faculty_of,
+        grid=grid,
+        blocks_by_day=blocks_by_day,
+        timeslot_to_block=timeslot_to_block,
+        lab_starts=lab_starts,
+        lab_cover=lab_cover,
+        candidate_rooms=candidate_rooms,
+        lecture_rooms=lecture_rooms,
+        lab_rooms=lab_rooms,
+        room_classes=room_classes,
+        room_class_of=room_class_of,
+        candidate_room_classes=candidate_room_classes,
+        faculty_unavailable=faculty_unavailable,
+        room_unavailable=room_unavailable,
+        unavailable_block_rooms=unavailable_block_rooms,
+    )
+    problem._compiled = compiled
+    return compiled
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .greedy import P1_LIMIT
+    from .models import Course, ProblemData, SectionCourseRequirement
+    from .portfolio import child_solvers, init_child, split_workers
+    from .timetable_solver import Assignment, SolveResult, _extract_result, build_model, make_solver, result_from_assignments, solve
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from greedy import P1_LIMIT
+    from models import Course, ProblemData, SectionCourseRequirement
+    from portfolio import child_solvers, init_child, split_workers
+    from timetable_solver import Assignment, SolveResult, _extract_result, build_model, make_solver, result_from_assignments, solve
+
+
+# Share of the time limit given to the day plan
+DAY_PLAN_SHARE = 0.2
+# Smallest search time limit given to one day
+MIN_DAY_SEC = 2.0
+# Plan objective weight of a repeated (section, course) on one day, against 1 per P1 allowance
+REPEAT_WEIGHT = 10
+
+# day_index -> (section index, course index) -> (lecture periods, lab blocks)
+DayPlan = Dict[int, Dict[Tuple[int, int], Tuple[int, int]]]
+
+
+@dataclass
+class PlanModel:
+    """Level-1 CP-SAT model: classes per (section, course, day) and P1 allowances per (faculty, day)."""
+    model: cp_model.CpModel
+    days: List[int]
+    lec: Dict[Tuple[int, int, int], cp_model.IntVar]  # (section, course, day) -> lecture periods
+    lab: Dict[Tuple[int, int, int], cp_model.IntVar]  # (section, course, day) -> lab blocks
+    allowed: Dict[Tuple[int, int], cp_model.IntVar]  # (faculty, day) -> may teach in P1
+
+
+def build_plan_model(cp: CompiledProblem) -> PlanModel:
+    """Level 1: how many lecture periods and lab blocks every (section,
+    course) gets on each day, and which faculty may teach in P1 that day.
+
+    Per day, each section's and faculty's periods fit the day's teaching
+    periods (less the faculty's unavailable ones), each section's lab
+    periods fit whole lab blocks of its continuous stretches, and sections
+    needing capacity >= v never need more room periods than available
+    rooms with capacity >= v provide. A section or
+    faculty busy all day has a P1 class, so one of that day's faculty is
+    allowed P1, at most P1_LIMIT days per faculty. Repeating a course on a
+    day is penalised, so courses spread over the week.
+    """
+    model = cp_model.CpModel()
+    days = sorted(cp.grid.non_break_by_day)
+    capacity = {d: len(cp.grid.non_break_by_day[d]) for d in days}
+    day_of = {t: d for d in days for t in cp.grid.non_break_by_day[d]}
+    # Teaching periods left per faculty and day, and days whose P1 a faculty cannot teach
+    faculty_capacity: Dict[Tuple[int, int], int] = {}
+    no_p1: Set[Tuple[int, int]] = set()
+    for f_idx, t in cp.faculty_unavailable:
+        if t in day_of:
+            key = (f_idx, day_of[t])
+            faculty_capacity[key] = faculty_capacity.get(key, capacity[day_of[t]]) - 1
+            if t in cp.grid.p1_timeslots:
+                no_p1.add(key)
+    stretches = {d: [len(tids) for _block_id, tids in cp.blocks_by_day.get(d, [])] for d in days}
+    pairs = sorted(set(cp.scheduled_lectures()) | set(cp.scheduled_labs()))
+
+    lec: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+    lab: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+    load: Dict[Tuple[int, int], List] = {}
+    lab_load: Dict[Tuple[int, int], List] = {}
+    faculty_load: Dict[Tuple[int, int], List] = {}
+    taught: Dict[Tuple[int, int, int], List] = {}  # (section, faculty, day) -> its classes that day
+    penalties: List = []
+    for s_idx, c_idx in pairs:
+        lectures = int(cp.lectures[s_idx, c_idx])
+        sessions = int(cp.lab_sessions[s_idx, c_idx]) if cp.lab_block[s_idx, c_idx] > 0 else 0
+        block = int(cp.lab_block[s_idx, c_idx])
+        f_idx = int(cp.faculty_of[s_idx, c_idx])
+        for d in days:
+            x = model.NewIntVar(0, min(lectures, capacity[d]), f"lec_{s_idx}_{c_idx}_{d}")
+            y = model.NewIntVar(0, min(sessions, sum(n // block for n in stretches[d])) if sessions else 0, f"lab_{s_idx}_{c_idx}_{d}")
+            lec[(s_idx, c_idx, d)], lab[(s_idx, c_idx, d)] = x, y
+            load.setdefault((s_idx, d), []).extend([x, block * y])
+            lab_load.setdefault((s_idx, d), []).append(block * y)
+            if f_idx >= 0:
+                faculty_load.setdefault((f_idx, d), []).extend([x, block * y])
+                taught.setdefault((s_idx, f_idx, d), []).extend([x, y])
+            repeat = model.NewIntVar(0, capacity[d], f"repeat_{s_idx}_{c_idx}_{d}")
+            model.Add(repeat >= x + y - 1)
+            penalties.append(repeat)
+        model.Add(sum(lec[(s_idx, c_idx, d)] for d in days) == lectures)
+        model.Add(sum(lab[(s_idx, c_idx, d)] for d in days) == sessions)
+
+    for (s_idx, d), terms in load.items():
+        model.Add(sum(terms) <= capacity[d])
+        blocks = [int(b) for b in cp.lab_block[s_idx][(cp.lab_sessions[s_idx] > 0) & (cp.lab_block[s_idx] > 0)]]
+        if blocks:
+            # Lab blocks of the shortest size tile each stretch at best
+            shortest = min(blocks)
+            model.Add(sum(lab_load[(s_idx, d)]) <= sum(n // shortest * shortest for n in stretches[d]))
+    for (f_idx, d), terms in faculty_load.items():
+        model.Add(sum(terms) <= faculty_capacity.get((f_idx, d), capacity[d]))
+
+    if cp.have_rooms:
+        room_periods = {(r_idx, d): capacity[d] for r_idx in range(len(cp.room_ids)) for d in days}
+        for t, r_idx in cp.room_unavailable:
+            if t in day_of:
+                room_periods[(r_idx, day_of[t])] -= 1
+        for size in sorted({int(v) for v in cp.section_size}):
+            rooms = [r_idx for r_idx in range(len(cp.room_ids)) if cp.room_capacity[r_idx] >= size]
+            needing = [s_idx for s_idx in range(len(cp.section_ids)) if cp.section_size[s_idx] >= size]
+            for d in days:
+                terms = [v for s_idx in needing for v in load.get((s_idx, d), [])]
+                if terms:
+                    model.Add(sum(terms) <= sum(room_periods[(r_idx, d)] for r_idx in rooms))
+
+    # P1 allowances: a section busy all day needs one of its faculty that day
+    has_p1 = {d: any(t in cp.grid.p1_timeslots for t in cp.grid.non_break_by_day[d]) for d in days}
+    allowed: Dict[Tuple[int, int], cp_model.IntVar] = {}
+    covers: Dict[Tuple[int, int], List] = {}  # (section, day) -> its faculty covering P1
+    by_faculty_day: Dict[Tuple[int, int], List] = {}
+    for (s_idx, f_idx, d), terms in taught.items():
+        if not has_p1[d] or (f_idx, d) in no_p1:
+            continue
+        if (f_idx, d) not in allowed:
+            allowed[(f_idx, d)] = model.NewBoolVar(f"p1_{f_idx}_{d}")
+        z = model.NewBoolVar(f"p1_cover_{s_idx}_{f_idx}_{d}")
+        model.Add(z <= sum(terms))
+        model.AddImplication(z, allowed[(f_idx, d)])
+        covers.setdefault((s_idx, d), []).append(z)
+        by_faculty_day.setdefault((f_idx, d), []).append(z)
+    for zs in by_faculty_day.values():
+        model.Add(sum(zs) <= 1)
+    for f_idx in {f for f, _d in allowed}:
+        model.Add(sum(v for (f, _d), v in allowed.items() if f == f_idx) <= P1_LIMIT)
+    for (f_idx, d), terms in faculty_load.items():
+        if has_p1[d] and (f_idx, d) not in no_p1:
+            # A faculty busy all day teaches P1 too
+            model.Add(sum(terms) <= faculty_capacity.get((f_idx, d), capacity[d]) - 1 + allowed[(f_idx, d)])
+    unassigned = {s_idx for s_idx, c_idx in pairs if cp.faculty_of[s_idx, c_idx] < 0}
+    for (s_idx, d), terms in load.items():
+        if has_p1[d] and s_idx not in unassigned:
+            # Below a full day, or one of the faculty teaches P1
+            model.Add(sum(terms) <= capacity[d] - 1 + sum(covers.get((s_idx, d), [])))
+
+    model.Minimize(REPEAT_WEIGHT * sum(penalties) - sum(allowed.values()))
+    return PlanModel(model=model, days=days, lec=lec, lab=lab, allowed=allowed)
+
+
+def solve_plan(cp: CompiledProblem, planned: PlanModel, time_limit_sec: float) -> Tuple[Optional[DayPlan], Dict[int, Set[str]], int]:
+    """The plan, the faculty allowed P1 per day, and the CP-SAT status."""
+    solver = make_solver(time_limit_sec)
+    status = solver.Solve(planned.model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, {}, status
+    plan: DayPlan = {d: {} for d in planned.days}
+    for (s_idx, c_idx, d), x in planned.lec.items():
+        counts = (solver.Value(x), solver.Value(planned.lab[(s_idx, c_idx, d)]))
+        if any(counts):
+            plan[d][(s_idx, c_idx)] = counts
+    p1_allowed: Dict[int, Set[str]] = {d: set() for d in planned.days}
+    for (f_idx, d), v in planned.allowed.items():
+        if solver.Value(v):
+            p1_allowed[d].add(cp.faculty_ids[f_idx])
+    return plan, p1_allowed, status
+
+
+def day_problem(problem: ProblemData, cp: CompiledProblem, days: List[int], counts: Dict[Tuple[int, int], Tuple[int, int]]) -> ProblemData:
+    """``problem`` restricted to ``days``, with their share of the classes as weekly demand."""
+    return ProblemData(
+        day_periods=[p for p in problem.day_periods if p.day_index in days],
+        sections=problem.sections,
+        faculty=problem.faculty,
+        courses=[
+            Course(
+                course_id=c.course_id,
+                course_name=c.course_name,
+                is_lab=c.is_lab,
+                lecture_periods_per_week=0,
+                lab_sessions_per_week=0,
+                lab_block_size=c.lab_block_size,
+            )
+            for c in problem.courses
+        ],
+        section_requirements=[
+            SectionCourseRequirement(
+                section_id=cp.section_ids[s_idx],
+                course_id=cp.course_ids[c_idx],
+                weekly_lectures=lectures,
+                weekly_lab_sessions=labs,
+                lab_block_size=int(cp.lab_block[s_idx, c_idx]) or None,
+            )
+            for (s_idx, c_idx), (lectures, labs) in sorted(counts.items())
+        ],
+        faculty_courses=problem.faculty_courses,
+        rooms=problem.rooms,
+        faculty_unavailability=problem.faculty_unavailability,
+        room_unavailability=problem.room_unavailability,
+        room_policy=problem.room_policy,
+    )
+
+
+# Classes of a day model as (section, course, kind, day index, period index, room)
+DayClasses = List[Tuple[str, str, str, int, int, str]]
+
+
+def _solve_day(
+    problem: ProblemData,
+    time_limit_sec: float,
+    room_mode: str,
+    optimize_gaps: bool,
+    gap_mode: str,
+    faculty_p1_used: Dict[str, int],
+) -> Optional[Tuple[DayClasses, Optional[int]]]:
+    """The day model's classes and objective, or None if none were found in time."""
+    built = build_model(problem, optimize_gaps=optimize_gaps, room_mode=room_mode, faculty_p1_used=faculty_p1_used, gap_mode=gap_mode)
+    solver = make_solver(time_limit_sec)
+    status = solver.Solve(built.model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    result = _extract_result(problem, built, solver, status)
+    slot_of = {t.timeslot_id: (t.day_index, t.period_index) for t in result.timeslots}
+    classes = [
+        (s, c, kind, *slot_of[t], room_id)
+        for s, by_t in result.schedule_by_section.items()
+        for t, (c, _f, room_id, kind) in by_t.items()
+    ]
+    return classes, result.objective_value
+
+
+def _p1_used(cp: CompiledProblem, solved: List[Tuple[DayClasses, Optional[int]]]) -> Dict[str, int]:
+    """P1 classes per faculty in the solved day models."""
+    used: Dict[str, int] = defaultdict(int)
+    for classes, _objective in solved:
+        for s, c, _kind, d, period, _room_id in classes:
+            f = cp.faculty_id_of(cp.section_index[s], cp.course_index[c])
+            if f and cp.grid.day_period_to_tid[(d, period)] in cp.grid.p1_timeslots:
+                used[f] += 1
+    return dict(used)
+
+
+def solve_day_split(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    optimize_gaps: bool = False,
+    room_mode: str = "compact",
+    gap_mode: str = "triple",
+    processes: Optional[int] = None,
+) -> SolveResult:
+    """Plan the classes of every day first, then solve each day on its own.
+
+    Level 1 (build_plan_model) is a small integer model over (section,
+    course, day) counts and per-day P1 allowances. Level 2 solves one
+    model per day with those counts as demand, in parallel processes when
+    the CP-SAT workers of worker_budget() allow more than one (or
+    ``processes`` asks for them); the processes split those workers, use
+    the solver profile in effect and stop with stop_searches(). Days share
+    nothing but the weekly counts and the P1 limit, both fixed by the
+    plan, so the days' timetables merge without conflicts.
+
+    The plan's P1 allowances and counts are a guess. The days that find
+    no timetable with them are solved again after the others as one
+    model, with their classes free to move between them and the P1
+    classes the solved days actually use as the only limit. If that finds
+    none either, the whole problem is solved directly, warm-started from
+    the solved days. The result is FEASIBLE, not OPTIMAL: the plan fixes how classes
+    spread over the week.
+    """
+    deadline = time.perf_counter() + time_limit_sec
+    cp = compile_problem(problem)
+    plan, p1_allowed, status = solve_plan(cp, build_plan_model(cp), max(1.0, DAY_PLAN_SHARE * time_limit_sec))
+    if plan is None and status == cp_model.INFEASIBLE:
+        return SolveResult(
+            status="INFEASIBLE",
+            schedule_by_section={},
+            schedule_by_faculty={},
+            timeslots=cp.timeslots,
+            objective_value=None,
+            stop_reason="infeasible",
+        )
+
+    solved: List[Tuple[DayClasses, Optional[int]]] = []
+    failed: List[int] = []
+    if plan is not None:
+        days = [d for d in sorted(plan) if plan[d]]
+        faculty = set(cp.faculty_ids)
+        processes, workers = split_workers(len(days), processes)
+        remaining = deadline - time.perf_counter()
+        limit = min(remaining, max(MIN_DAY_SEC, remaining * processes / max(1, len(days))))
+        args = [
+            (day_problem(problem, cp, [d], plan[d]), limit, room_mode, optimize_gaps, gap_mode, {f: P1_LIMIT - (f in p1_allowed[d]) for f in faculty})
+            for d in days
+        ]
+        if processes > 1:
+            ctx = multiprocessing.get_context("spawn")
+            with child_solvers(ctx, workers) as child, ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=init_child, initargs=child) as ex:
+                futures = [ex.submit(_solve_day, *a) for a in args]
+                results = [f.result() for f in futures]
+        else:
+            results = [_solve_day(*a) for a in args]
+        solved = [result for result in results if result is not None]
+        failed = [d for d, result in zip(days, results) if result is None]
+
+        remaining = deadline - time.perf_counter()
+        if failed and remaining > 0:
+            # One model for the failed days, free to move classes between them
+            counts: Dict[Tuple[int, int], Tuple[int, int]] = {}
+            for d in failed:
+                for key, (lectures, labs) in plan[d].items():
+                    before = counts.get(key, (0, 0))
+                    counts[key] = (before[0] + lectures, before[1] + labs)
+            result = _solve_day(day_problem(problem, cp, failed, counts), remaining, room_mode, optimize_gaps, gap_mode, _p1_used(cp, solved))
+            if result is not None:
+                solved.append(result)
+                failed = []
+
+    assignments: List[Assignment] = [
+        (s, c, kind, [cp.grid.day_period_to_tid[(d, period)]], room_id)
+        for classes, _objective in solved
+        for s, c, kind, d, period, room_id in classes
+    ]
+    if plan is not None and not failed:
+        objectives = [objective for _classes, objective in solved]
+        objective = sum(objectives) if optimize_gaps and all(o is not None for o in objectives) else None
+        return result_from_assignments(problem, assignments, status="FEASIBLE", objective_value=objective)
+
+    # No plan in time, or a day without a timetable: solve everything at once
+    hint = result_from_assignments(problem, assignments, status="IMPORTED")
+    return solve(
+        problem,
+        time_limit_sec=max(1, int(deadline - time.perf_counter())),
+        optimize_gaps=optimize_gaps,
+        room_mode=room_mode,
+        hint=hint,
+        gap_mode=gap_mode,
+    )
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .models import ProblemData
+    from .pipeline import assign_rooms_for_occupancy
+    from .portfolio import child_solvers, init_child, split_workers
+    from .timetable_solver import Assignment, SolveResult, result_from_assignments, solve
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from models import ProblemData
+    from pipeline import assign_rooms_for_occupancy
+    from portfolio import child_solvers, init_child, split_workers
+    from timetable_solver import Assignment, SolveResult, result_from_assignments, solve
+
+
+# Smallest search time limit given to one component
+MIN_COMPONENT_SEC = 2.0
+
+
+def section_components(cp: CompiledProblem) -> List[List[int]]:
+    """Connected components of the section-faculty graph, as sorted section
+    indexes, largest first.
+
+    Rooms are not edges: candidate rooms only depend on capacity, so nearly
+    every section can use nearly every room and room edges would merge
+    everything. Rooms are instead reconciled after the components are solved.
+    """
+    parent = list(range(len(cp.section_ids)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    first_section_of: Dict[int, int] = {}
+    for s_idx, c_idx in zip(*np.nonzero(cp.faculty_of >= 0)):
+        f_idx = int(cp.faculty_of[s_idx, c_idx])
+        if f_idx in first_section_of:
+            parent[find(int(s_idx))] = find(first_section_of[f_idx])
+        else:
+            first_section_of[f_idx] = int(s_idx)
+
+    components: Dict[int, List[int]] = defaultdict(list)
+    for s_idx in range(len(parent)):
+        components[find(s_idx)].append(s_idx)
+    return sorted(components.values(), key=lambda c: (-len(c), c[0]))
+
+
+def subproblem(problem: ProblemData, section_ids: List[str]) -> ProblemData:
+    """``problem`` restricted to ``section_ids`` (all timeslots, courses and rooms)."""
+    keep = set(section_ids)
+    faculty_courses = [a for a in problem.faculty_courses if a.section_id in keep]
+    used_faculty = {a.faculty_id for a in faculty_courses}
+    return ProblemData(
+        day_periods=problem.day_periods,
+        sections=[s for s in problem.sections if s.section_id in keep],
+        faculty=[f for f in problem.faculty if f.faculty_id in used_faculty],
+        courses=problem.courses,
+        section_requirements=[r for r in problem.section_requirements if r.section_id in keep],
+        faculty_courses=faculty_courses,
+        rooms=problem.rooms,
+        faculty_unavailability=problem.faculty_unavailability,
+        room_unavailability=problem.room_unavailability,
+        room_policy=problem.room_policy,
+    )
+
+
+def _solve_component(problem: ProblemData, time_limit_sec: float, solve_kwargs: Dict[str, Any]) -> SolveResult:
+    return solve(problem, time_limit_sec=time_limit_sec, **solve_kwargs)
+
+
+def _component_limits(cp: CompiledProblem, components: List[List[int]], time_limit_sec: float, processes: int) -> List[float]:
+    # Split the budget by weekly periods; components solved side by side share it
+    periods = cp.required_periods()
+    total = max(1, int(sum(periods[c].sum() for c in components)))
+    return [
+        min(float(time_limit_sec), max(MIN_COMPONENT_SEC, time_limit_sec * processes * float(periods[c].sum()) / total))
+        for c in components
+    ]
+
+
+def _merge(results: List[SolveResult]) -> List[Assignment]:
+    return [
+        (s, c, kind, [t], room_id)
+        for result in results
+        for s, by_t in result.schedule_by_section.items()
+        for t, (c, _f, room_id, kind) in by_t.items()
+    ]
+
+
+def _reconcile_rooms(cp: CompiledProblem, assignments: List[Assignment]) -> Optional[Tuple[List[Assignment], int]]:
+    """Re-assign rooms in every block where two sections use the same room at
+    the same timeslot; class times stay fixed. Returns the new assignments and
+    the number of blocks re-roomed, or None if some block cannot be roomed."""
+    users: Dict[Tuple[str, int], set] = defaultdict(set)
+    occupancy: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+    labs = set()
+    for s, _c, kind, tids, room_id in assignments:
+        for t in tids:
+            occupancy[cp.timeslot_to_block[t]][s].append(t)
+            if room_id:
+                users[(room_id, t)].add(s)
+            if kind == "lab":
+                labs.add((s, cp.timeslot_to_block[t]))
+    clashing = {cp.timeslot_to_block[t] for (_r, t), sections in users.items() if len(sections) > 1}
+    if not clashing:
+        return assignments, 0
+
+    block_room, failed = assign_rooms_for_occupancy(cp, {b: occupancy[b] for b in clashing}, labs=labs)
+    if failed:
+        return None
+    rebuilt: List[Assignment] = []
+    for s, c, kind, tids, room_id in assignments:
+        block_id = cp.timeslot_to_block[tids[0]]
+        if block_id in clashing:
+            room_id = block_room.get((s, block_id), room_id)
+        rebuilt.append((s, c, kind, tids, room_id))
+    return rebuilt, len(clashing)
+
+
+def solve_decomposed(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    processes: Optional[int] = None,
+    **solve_kwargs: Any,
+) -> SolveResult:
+    """Solve each independent group of sections separately and merge.
+
+    Sections are grouped by section_components; each group is solved with
+    solve(**solve_kwargs), in parallel processes when the CP-SAT workers of
+    worker_budget() allow more than one (or ``processes`` asks for them);
+    the processes split those workers and stop with this one's
+    stop_searches(). Rooms are shared, so blocks where merged
+    groups collide on a room are re-roomed by per-block matching with the
+    class times fixed. If that fails, or a group finds no timetable in its
+    share of the time, the whole problem is solved directly, warm-started
+    from the merged timetable.
+    """
+    deadline = time.perf_counter() + time_limit_sec
+    cp = compile_problem(problem)
+    components = section_components(cp)
+    if len(components) <= 1:
+        return solve(problem, time_limit_sec=time_limit_sec, **solve_kwargs)
+
+    processes, workers = split_workers(len(components), processes)
+    limits = _component_limits(cp, components, time_limit_sec, processes)
+    subproblems = [subproblem(problem, [cp.section_ids[s_idx] for s_idx in c]) for c in components]
+    if processes > 1:
+        ctx = multiprocessing.get_context("spawn")
+        with child_solvers(ctx, workers) as child, ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=init_child, initargs=child) as ex:
+            futures = [ex.submit(_solve_component, sub, limit, solve_kwargs) for sub, limit in zip(subproblems, limits)]
+            results = [f.result() for f in futures]
+    else:
+        results = [_solve_component(sub, limit, solve_kwargs) for sub, limit in zip(subproblems, limits)]
+
+    solved = [r for r in results if r.status in ("OPTIMAL", "FEASIBLE")]
+    merged = _merge(solved)
+    if len(solved) == len(results):
+        objectives = [r.objective_value for r in results]
+        objective = sum(objectives) if all(o is not None for o in objectives) else None
+        status = "OPTIMAL" if all(r.status == "OPTIMAL" for r in results) else "FEASIBLE"
+        reconciled = _reconcile_rooms(cp, merged)
+        if reconciled is not None:
+            return result_from_assignments(problem, reconciled[0], status=status, objective_value=objective)
+
+    # A group that timed out, or rooms that cannot be reconciled: solve everything at once
+    hint = result_from_assignments(problem, merged, status="IMPORTED")
+    return solve(problem, time_limit_sec=max(1, int(deadline - time.perf_counter())), hint=hint, **solve_kwargs)
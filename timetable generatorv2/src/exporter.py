@@ -1,16 +1,15 @@
 from __future__ import annotations
 
 import os
-from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List
 
 import pandas as pd
 
 try:
-    from .models import ProblemData, Timeslot
+    from .compiled import TimeGrid
     from .timetable_solver import SolveResult
 except ImportError:
-    from models import ProblemData, Timeslot
+    from compiled import TimeGrid
     from timetable_solver import SolveResult
 
 
@@ -20,13 +19,9 @@ def _ensure_dir(path: str) -> None:
 
 def build_grids_by_section(result: SolveResult) -> Dict[str, pd.DataFrame]:
     # Build a grid day x period_index per section
-    timeslots = result.timeslots
-    days = sorted({(t.day_index, t.day_name) for t in timeslots}, key=lambda x: x[0])
-    periods_by_day: Dict[int, List[int]] = defaultdict(list)
-    for t in timeslots:
-        periods_by_day[t.day_index].append(t.period_index)
-    for k in periods_by_day:
-        periods_by_day[k] = sorted(sorted(set(periods_by_day[k])))
+    grid = TimeGrid.from_timeslots(result.timeslots)
+    days = grid.days
+    periods_by_day = grid.periods_by_day
 
     grids: Dict[str, pd.DataFrame] = {}
     for section_id, by_t in result.schedule_by_section.items():
@@ -37,8 +32,7 @@ def build_grids_by_section(result: SolveResult) -> Dict[str, pd.DataFrame]:
         for day_idx, day_name in days:
             cols: List[str] = []
             for p in periods_by_day[day_idx]:
-                # find timeslot_id
-                tid = next(t.timeslot_id for t in timeslots if t.day_index == day_idx and t.period_index == p)
+                tid = grid.day_period_to_tid[(day_idx, p)]
                 entry = by_t.get(tid)
                 label = ""
                 if entry is not None:
@@ -52,7 +46,7 @@ def build_grids_by_section(result: SolveResult) -> Dict[str, pd.DataFrame]:
                     label = " ".join(parts)
                 else:
                     # break or free
-                    if next(t for t in timeslots if t.timeslot_id == tid).is_break:
+                    if grid.timeslot_by_id[tid].is_break:
                         label = "BREAK"
                     else:
                         label = ""
@@ -69,13 +63,9 @@ def build_grids_by_section(result: SolveResult) -> Dict[str, pd.DataFrame]:
 
 def build_grids_by_faculty(result: SolveResult) -> Dict[str, pd.DataFrame]:
     # Similar to section grids
-    timeslots = result.timeslots
-    days = sorted({(t.day_index, t.day_name) for t in timeslots}, key=lambda x: x[0])
-    periods_by_day: Dict[int, List[int]] = defaultdict(list)
-    for t in timeslots:
-        periods_by_day[t.day_index].append(t.period_index)
-    for k in periods_by_day:
-        periods_by_day[k] = sorted(sorted(set(periods_by_day[k])))
+    grid = TimeGrid.from_timeslots(result.timeslots)
+    days = grid.days
+    periods_by_day = grid.periods_by_day
 
     grids: Dict[str, pd.DataFrame] = {}
     for faculty_id, by_t in result.schedule_by_faculty.items():
@@ -84,7 +74,7 @@ def build_grids_by_faculty(result: SolveResult) -> Dict[str, pd.DataFrame]:
         for day_idx, day_name in days:
             cols: List[str] = []
             for p in periods_by_day[day_idx]:
-                tid = next(t.timeslot_id for t in timeslots if t.day_index == day_idx and t.period_index == p)
+                tid = grid.day_period_to_tid[(day_idx, p)]
                 entry = by_t.get(tid)
                 label = ""
                 if entry is not None:
@@ -94,7 +84,7 @@ def build_grids_by_faculty(result: SolveResult) -> Dict[str, pd.DataFrame]:
                         parts.append(f"@{room_id}")
                     label = " ".join(parts)
                 else:
-                    if next(t for t in timeslots if t.timeslot_id == tid).is_break:
+                    if grid.timeslot_by_id[tid].is_break:
                         label = "BREAK"
                     else:
                         label = ""
@@ -118,14 +108,10 @@ def build_availability_grid(result: SolveResult, resource_type: str = "rooms") -
     Returns:
         DataFrame with days as rows, periods as columns, cells show available resources
     """
-    timeslots = result.timeslots
-    days = sorted({(t.day_index, t.day_name) for t in timeslots}, key=lambda x: x[0])
-    periods_by_day: Dict[int, List[int]] = defaultdict(list)
-    for t in timeslots:
-        periods_by_day[t.day_index].append(t.period_index)
-    for k in periods_by_day:
-        periods_by_day[k] = sorted(set(periods_by_day[k]))
-    
+    grid = TimeGrid.from_timeslots(result.timeslots)
+    days = grid.days
+    periods_by_day = grid.periods_by_day
+
     availability_map = result.available_rooms if resource_type == "rooms" else result.available_faculty
     if availability_map is None:
         availability_map = {}
@@ -135,8 +121,8 @@ def build_availability_grid(result: SolveResult, resource_type: str = "rooms") -
     for day_idx, day_name in days:
         row: List[str] = []
         for p in periods_by_day[day_idx]:
-            tid = next(t.timeslot_id for t in timeslots if t.day_index == day_idx and t.period_index == p)
-            if next(t for t in timeslots if t.timeslot_id == tid).is_break:
+            tid = grid.day_period_to_tid[(day_idx, p)]
+            if grid.timeslot_by_id[tid].is_break:
                 row.append("BREAK")
             else:
                 available = availability_map.get(tid, [])
@@ -170,22 +156,21 @@ def export_all(result: SolveResult, output_dir: str) -> None:
 
     # Write a master timetable combining all sections' occupancy (course ids only)
     # Build grid of days x periods with a cell containing comma-separated "Sec:Course"
-    timeslots = result.timeslots
+    grid = TimeGrid.from_timeslots(result.timeslots)
     rows: List[List[str]] = []
     index: List[str] = []
-    days = sorted({(t.day_index, t.day_name) for t in timeslots}, key=lambda x: x[0])
-    periods = sorted(set(t.period_index for t in timeslots))
+    days = grid.days
+    periods = sorted(set(t.period_index for t in grid.timeslots))
     # For each day, one row per period set
     for day_idx, day_name in days:
         row: List[str] = []
         for p in periods:
             # find tid or mark N/A if that period doesn't exist for that day
-            matches = [t for t in timeslots if t.day_index == day_idx and t.period_index == p]
-            if not matches:
+            tid = grid.day_period_to_tid.get((day_idx, p))
+            if tid is None:
                 row.append("N/A")
                 continue
-            tid = matches[0].timeslot_id
-            if matches[0].is_break:
+            if grid.timeslot_by_id[tid].is_break:
                 row.append("BREAK")
                 continue
             entries: List[str] = []
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
 
 try:
+    from .compiled import CompiledProblem, compile_problem, unavailable_timeslots
     from .models import ProblemData, Timeslot
 except ImportError:
+    from compiled import CompiledProblem, compile_problem, unavailable_timeslots
     from models import ProblemData, Timeslot
 
 
@@ -45,128 +49,222 @@ def compute_valid_lab_starts(timeslots: List[Timeslot], block_size: int) -> Dict
     return starts_by_day
 
 
+def disjoint_lab_blocks(cp: CompiledProblem, block_size: int, usable: Callable[[int], bool]) -> int:
+    """Most non-overlapping lab blocks of ``block_size`` whose periods are all
+    ``usable``. Starts are in (day, period) order, so taking every block that
+    starts after the last one taken ends is optimal."""
+    count, last_end = 0, -1
+    for start_t in cp.lab_starts.get(block_size, []):
+        covered = cp.lab_cover[block_size][start_t]
+        if covered[0] > last_end and all(usable(t) for t in covered):
+            count += 1
+            last_end = covered[-1]
+    return count
+
+
+def _check_unavailability_rows(problem: ProblemData, cp: CompiledProblem, report: FeasibilityReport) -> None:
+    for kind, rows, known in (
+        ("Faculty", [(u.faculty_id, u.day_name, u.period_index) for u in problem.faculty_unavailability], cp.faculty_index),
+        ("Room", [(u.room_id, u.day_name, u.period_index) for u in problem.room_unavailability], cp.room_index),
+    ):
+        for item_id, day_name, period_index in rows:
+            if item_id not in known:
+                report.add_warning(f"{kind} unavailability for unknown {kind.lower()} {item_id} is ignored.")
+            elif not unavailable_timeslots(cp.grid, day_name, period_index):
+                when = day_name if period_index is None else f"{day_name} period {period_index}"
+                report.add_warning(f"{kind} {item_id} unavailability on unknown timeslot {when} is ignored.")
+
+
 def pre_solve_feasibility_check(problem: ProblemData) -> FeasibilityReport:
     report = FeasibilityReport()
-    timeslots = problem.build_timeslots()
-    non_break_slots_by_day: Dict[int, int] = defaultdict(int)
-    non_break_slots_total = 0
-    for t in timeslots:
-        if not t.is_break:
-            non_break_slots_by_day[t.day_index] += 1
-            non_break_slots_total += 1
-
-    # Aggregate required periods per section
-    req_map = problem.section_course_requirements_map()
-    course_defaults = problem.course_by_id()
-    per_section_required_periods: Dict[str, int] = defaultdict(int)
-    per_section_lab_blocks: Dict[Tuple[str, int], int] = defaultdict(int)  # (section_id, block_size) -> count
-
-    for section in problem.sections:
-        for course in problem.courses:
-            r = req_map.get((section.section_id, course.course_id))
-            if r is None:
-                # If not specified, use course defaults (could be zeros)
-                weekly_lectures = course.lecture_periods_per_week
-                weekly_lab_sessions = course.lab_sessions_per_week if course.is_lab else 0
-                block_size = course.lab_block_size if course.is_lab else 0
-            else:
-                weekly_lectures = r.weekly_lectures
-                weekly_lab_sessions = r.weekly_lab_sessions
-                block_size = r.lab_block_size if r.lab_block_size is not None else (
-                    course.lab_block_size if course.is_lab else 0
-                )
+    cp = compile_problem(problem)
+    non_break_slots_total = len(cp.grid.non_break)
+    _check_unavailability_rows(problem, cp, report)
 
-            per_section_required_periods[section.section_id] += weekly_lectures
-            if weekly_lab_sessions and block_size:
-                per_section_required_periods[section.section_id] += weekly_lab_sessions * block_size
-                per_section_lab_blocks[(section.section_id, block_size)] += weekly_lab_sessions
+    # Aggregate required periods per section (demands already resolved against course defaults)
+    has_labs = (cp.lab_sessions > 0) & (cp.lab_block > 0)
+    required_periods = cp.required_periods()
 
     # Check availability vs demand per section
-    for section in problem.sections:
-        if per_section_required_periods[section.section_id] > non_break_slots_total:
+    for s_idx, section_id in enumerate(cp.section_ids):
+        if required_periods[s_idx] > non_break_slots_total:
             report.add_error(
-                f"Section {section.section_id} requires {per_section_required_periods[section.section_id]} periods but only "
+                f"Section {section_id} requires {required_periods[s_idx]} periods but only "
                 f"{non_break_slots_total} non-break timeslots exist in the week."
             )
 
-    # Check lab start feasibility per day by block size
-    # Coarse check: ensure total possible starts across week >= required sessions
-    # This is conservative but catches obvious infeasibility
-    max_block_size = 0
-    for (_, block_size), sessions in per_section_lab_blocks.items():
-        if block_size > max_block_size:
-            max_block_size = block_size
-    if max_block_size:
-        starts_cache: Dict[int, List[int]] = {}
-        for bsize in sorted({bs for (_, bs) in per_section_lab_blocks.keys()}):
-            # count valid starts across all days
-            by_day_starts = compute_valid_lab_starts(timeslots, bsize)
-            starts_cache[bsize] = [t for day in by_day_starts.values() for t in day]
-
-        for (section_id, block_size), sessions in per_section_lab_blocks.items():
-            possible_starts = len(starts_cache.get(block_size, []))
-            if possible_starts < sessions:
+    # Check lab blocks per block size: a section's lab blocks cannot overlap,
+    # so count the non-overlapping blocks that fit in the week
+    for s_idx, section_id in enumerate(cp.section_ids):
+        sessions_by_size: Dict[int, int] = defaultdict(int)
+        for c_idx in np.nonzero(has_labs[s_idx])[0]:
+            sessions_by_size[int(cp.lab_block[s_idx, c_idx])] += int(cp.lab_sessions[s_idx, c_idx])
+        for block_size, sessions in sessions_by_size.items():
+            possible = disjoint_lab_blocks(cp, block_size, lambda t: True)
+            if possible < sessions:
                 report.add_error(
                     f"Section {section_id} needs {sessions} lab blocks of size {block_size}, "
-                    f"but only {possible_starts} valid starting positions exist in the week."
+                    f"but only {possible} non-overlapping lab blocks fit in the week."
                 )
 
-    # Assignment coverage check: each (section,course) with nonzero requirement must have a faculty assignment
-    fac_map = problem.faculty_assignment_map()
-    for section in problem.sections:
-        for course in problem.courses:
-            r = req_map.get((section.section_id, course.course_id))
-            if r is None:
-                weekly_lectures = course.lecture_periods_per_week
-                weekly_lab_sessions = course.lab_sessions_per_week if course.is_lab else 0
-                block_size_eff = course.lab_block_size if course.is_lab else 0
-            else:
-                weekly_lectures = r.weekly_lectures
-                weekly_lab_sessions = r.weekly_lab_sessions
-                block_size_eff = r.lab_block_size if r.lab_block_size is not None else (course.lab_block_size if course.is_lab else 0)
-            if (weekly_lectures or weekly_lab_sessions) and (section.section_id, course.course_id) not in fac_map:
+    # Faculty capacity: periods and lab blocks taught against the slots left
+    # once the faculty member's unavailability is taken out
+    unavailable_by_faculty: Dict[int, set] = defaultdict(set)
+    for f_idx, t in cp.faculty_unavailable:
+        unavailable_by_faculty[f_idx].add(t)
+    non_break = set(cp.grid.non_break)
+    lab_periods = np.where(has_labs, cp.lab_sessions * cp.lab_block, 0)
+    for f_idx, faculty_id in enumerate(cp.faculty_ids):
+        taught = cp.faculty_of == f_idx
+        if not taught.any():
+            continue
+        unavailable = unavailable_by_faculty.get(f_idx, set())
+        available = len(non_break - unavailable)
+        periods = int(cp.lectures[taught].sum() + lab_periods[taught].sum())
+        if periods > available:
+            report.add_error(
+                f"Faculty {faculty_id} teaches {periods} periods but is available in only {available} non-break timeslots."
+            )
+        sessions_by_size = defaultdict(int)
+        for s_idx, c_idx in zip(*np.nonzero(taught & has_labs)):
+            sessions_by_size[int(cp.lab_block[s_idx, c_idx])] += int(cp.lab_sessions[s_idx, c_idx])
+        for block_size, sessions in sessions_by_size.items():
+            possible = disjoint_lab_blocks(cp, block_size, lambda t: t not in unavailable)
+            if possible < sessions:
                 report.add_error(
-                    f"Missing faculty assignment for Section {section.section_id}, Course {course.course_id}."
+                    f"Faculty {faculty_id} teaches {sessions} lab blocks of size {block_size}, "
+                    f"but only {possible} non-overlapping lab blocks fit in the available timeslots."
                 )
-            # Enforce: labs must be exactly two consecutive periods
-            if weekly_lab_sessions and course.is_lab:
-                if block_size_eff != 2:
-                    report.add_error(
-                        f"Lab block size must be 2 periods for Section {section.section_id}, Course {course.course_id} (found {block_size_eff})."
-                    )
+
+    # Assignment coverage check: each (section,course) with nonzero requirement must have a faculty assignment
+    needs_any = (cp.lectures > 0) | (cp.lab_sessions > 0)
+    for s_idx, c_idx in zip(*np.nonzero(needs_any & (cp.faculty_of < 0))):
+        report.add_error(
+            f"Missing faculty assignment for Section {cp.section_ids[s_idx]}, Course {cp.course_ids[c_idx]}."
+        )
+    # Enforce: labs must be exactly two consecutive periods
+    bad_block = (cp.lab_sessions > 0) & cp.course_is_lab[np.newaxis, :] & (cp.lab_block != 2)
+    for s_idx, c_idx in zip(*np.nonzero(bad_block)):
+        report.add_error(
+            f"Lab block size must be 2 periods for Section {cp.section_ids[s_idx]}, Course {cp.course_ids[c_idx]} "
+            f"(found {int(cp.lab_block[s_idx, c_idx])})."
+        )
 
     # Room feasibility checks (if rooms provided): ensure at least one suitable room exists per section needs
-    if problem.rooms:
-        nonlab_rooms = [rm for rm in problem.rooms if not rm.is_lab]
-        lab_rooms = [rm for rm in problem.rooms if rm.is_lab]
-        # Quick lookup per section for capacity-feasible rooms
-        for section in problem.sections:
+    if cp.have_rooms:
+        nonlab_caps = cp.room_capacity[~cp.room_is_lab]
+        lab_caps = cp.room_capacity[cp.room_is_lab]
+        needs_lecture = (cp.lectures > 0).any(axis=1)
+        needs_lab = (cp.lab_sessions > 0).any(axis=1)
+        for s_idx, section_id in enumerate(cp.section_ids):
+            size = int(cp.section_size[s_idx])
             # If any lectures required for this section across courses, ensure some non-lab room can host
-            needs_lecture = False
-            needs_lab = False
-            for course in problem.courses:
-                r = req_map.get((section.section_id, course.course_id))
-                if r is None:
-                    weekly_lectures = course.lecture_periods_per_week
-                    weekly_lab_sessions = course.lab_sessions_per_week if course.is_lab else 0
-                else:
-                    weekly_lectures = r.weekly_lectures
-                    weekly_lab_sessions = r.weekly_lab_sessions
-                needs_lecture = needs_lecture or (weekly_lectures > 0)
-                needs_lab = needs_lab or (weekly_lab_sessions > 0)
-            if needs_lecture:
-                possible = any(rm.capacity >= section.num_students for rm in nonlab_rooms)
-                if not possible:
-                    report.add_error(
-                        f"Section {section.section_id} requires lecture periods but no non-lab room has capacity >= {section.num_students}."
-                    )
-            if needs_lab:
-                possible = any(rm.capacity >= section.num_students for rm in lab_rooms)
-                if not possible:
-                    report.add_error(
-                        f"Section {section.section_id} requires lab sessions but no lab room has capacity >= {section.num_students}."
-                    )
+            if needs_lecture[s_idx] and not (nonlab_caps >= size).any():
+                report.add_error(
+                    f"Section {section_id} requires lecture periods but no non-lab room has capacity >= {size}."
+                )
+            if needs_lab[s_idx] and not (lab_caps >= size).any():
+                report.add_error(
+                    f"Section {section_id} requires lab sessions but no lab room has capacity >= {size}."
+                )
+
+        # Room-slot capacity: the sections of size >= v need their weekly periods
+        # in rooms of capacity >= v, at the timeslots those rooms are available
+        room_slots = np.array(
+            [len(non_break) - sum(1 for t in non_break if (t, r_idx) in cp.room_unavailable) for r_idx in range(len(cp.room_ids))],
+            dtype=np.int64,
+        )
+        roomed = np.array([bool(c) for c in cp.candidate_rooms])
+        for v in sorted({int(cp.section_size[s_idx]) for s_idx in np.nonzero(roomed)[0]}):
+            needed = int(required_periods[roomed & (cp.section_size >= v)].sum())
+            available = int(room_slots[cp.room_capacity >= v].sum())
+            if needed > available:
+                report.add_error(
+                    f"Sections of {v}+ students need {needed} room periods but rooms with capacity >= {v} "
+                    f"are available for only {available}."
+                )
 
     return report
 
 
+def validate_solution(problem: ProblemData, schedule_by_section: Dict[str, Dict[int, Tuple[str, str, str, str]]]) -> List[str]:
+    """Check a section schedule against the hard constraints.
+
+    Returns a list of human-readable violations (empty when the schedule is
+    valid): unmet weekly demand, classes on breaks, faculty or room clashes,
+    undersized rooms, more than one room per section per block, classes
+    at a timeslot their faculty or room is unavailable, rooms the room
+    policy does not offer the section's block, and the faculty P1 limit.
+    """
+    cp = compile_problem(problem)
+    violations: List[str] = []
+    timeslot_by_id = cp.grid.timeslot_by_id
+
+    lecture_count: Dict[Tuple[str, str], int] = defaultdict(int)
+    lab_periods: Dict[Tuple[str, str], int] = defaultdict(int)
+    faculty_at: Dict[Tuple[str, int], List[str]] = defaultdict(list)
+    room_at: Dict[Tuple[str, int], List[str]] = defaultdict(list)
+    rooms_in_block: Dict[Tuple[str, int], set] = defaultdict(set)
+    lab_blocks: set = set()
+    faculty_p1: Dict[str, int] = defaultdict(int)
+
+    for section_id, by_t in schedule_by_section.items():
+        s_idx = cp.section_index.get(section_id)
+        for tid, (course_id, faculty_id, room_id, kind) in by_t.items():
+            ts = timeslot_by_id.get(tid)
+            if ts is None or ts.is_break:
+                violations.append(f"Section {section_id} has {course_id} on break/unknown timeslot {tid}.")
+                continue
+            if kind == "lab":
+                lab_periods[(section_id, course_id)] += 1
+                lab_blocks.add((section_id, cp.timeslot_to_block[tid]))
+            else:
+                lecture_count[(section_id, course_id)] += 1
+            if faculty_id:
+                faculty_at[(faculty_id, tid)].append(section_id)
+                if (cp.faculty_index.get(faculty_id), tid) in cp.faculty_unavailable:
+                    violations.append(f"Faculty {faculty_id} is unavailable at timeslot {tid} but teaches Section {section_id}.")
+                if ts.period_index == 1:
+                    faculty_p1[faculty_id] += 1
+            if room_id:
+                room_at[(room_id, tid)].append(section_id)
+                rooms_in_block[(section_id, cp.timeslot_to_block[tid])].add(room_id)
+                r_idx = cp.room_index.get(room_id)
+                if (tid, r_idx) in cp.room_unavailable:
+                    violations.append(f"Room {room_id} is unavailable at timeslot {tid} but hosts Section {section_id}.")
+                if s_idx is not None and r_idx is not None and cp.room_capacity[r_idx] < cp.section_size[s_idx]:
+                    violations.append(f"Room {room_id} is too small for Section {section_id}.")
+
+    for s_idx, section_id in enumerate(cp.section_ids):
+        for c_idx, course_id in enumerate(cp.course_ids):
+            want_lec = int(cp.lectures[s_idx, c_idx])
+            want_lab = int(cp.lab_sessions[s_idx, c_idx] * cp.lab_block[s_idx, c_idx]) if cp.lab_block[s_idx, c_idx] > 0 else 0
+            if lecture_count[(section_id, course_id)] != want_lec:
+                violations.append(
+                    f"Section {section_id}, Course {course_id}: {lecture_count[(section_id, course_id)]} lectures scheduled, {want_lec} required."
+                )
+            if lab_periods[(section_id, course_id)] != want_lab:
+                violations.append(
+                    f"Section {section_id}, Course {course_id}: {lab_periods[(section_id, course_id)]} lab periods scheduled, {want_lab} required."
+                )
+    for (faculty_id, tid), sections in faculty_at.items():
+        if len(sections) > 1:
+            violations.append(f"Faculty {faculty_id} double-booked at timeslot {tid}: {sorted(sections)}.")
+    for (room_id, tid), sections in room_at.items():
+        if len(sections) > 1:
+            violations.append(f"Room {room_id} double-booked at timeslot {tid}: {sorted(sections)}.")
+    for (section_id, block_id), rooms in rooms_in_block.items():
+        if len(rooms) > 1:
+            violations.append(f"Section {section_id} uses {len(rooms)} rooms in block {block_id}: {sorted(rooms)}.")
+        s_idx = cp.section_index.get(section_id)
+        if s_idx is None:
+            continue
+        candidates = cp.block_rooms(s_idx, (section_id, block_id) in lab_blocks)
+        for room_id in sorted(rooms):
+            r_idx = cp.room_index.get(room_id)
+            if r_idx is not None and cp.room_capacity[r_idx] >= cp.section_size[s_idx] and r_idx not in candidates:
+                violations.append(f"Room {room_id} is not a candidate for Section {section_id} in block {block_id} under the room policy.")
+    for faculty_id, count in faculty_p1.items():
+        if count > 3:
+            violations.append(f"Faculty {faculty_id} teaches {count} first periods (max 3).")
+    return violations
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import itertools
+import random
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .models import ProblemData
+    from .pipeline import assign_rooms_for_occupancy
+    from .timetable_solver import RANDOM_SEED, Assignment, SolveResult, result_from_assignments
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from models import ProblemData
+    from pipeline import assign_rooms_for_occupancy
+    from timetable_solver import RANDOM_SEED, Assignment, SolveResult, result_from_assignments
+
+
+# Constructions tried (with different tie-breaks) before giving up
+GREEDY_ATTEMPTS = 5
+# Weekly first-period classes per faculty (build_model's P1 limit)
+P1_LIMIT = 3
+
+# (section index, course index, lab block size or 0 for a lecture)
+_Item = Tuple[int, int, int]
+
+
+def _items(cp: CompiledProblem, rng: random.Random) -> List[_Item]:
+    """Classes to place, most constrained first: longer lab blocks, then
+    classes of the busiest faculty, then of the busiest sections."""
+    periods = cp.required_periods()
+    faculty_load: Dict[int, int] = defaultdict(int)
+    items: List[_Item] = []
+    for s_idx, c_idx in cp.scheduled_labs():
+        size = int(cp.lab_block[s_idx, c_idx])
+        faculty_load[int(cp.faculty_of[s_idx, c_idx])] += int(cp.lab_sessions[s_idx, c_idx]) * size
+        items.extend([(s_idx, c_idx, size)] * int(cp.lab_sessions[s_idx, c_idx]))
+    for s_idx, c_idx in cp.scheduled_lectures():
+        faculty_load[int(cp.faculty_of[s_idx, c_idx])] += int(cp.lectures[s_idx, c_idx])
+        items.extend([(s_idx, c_idx, 0)] * int(cp.lectures[s_idx, c_idx]))
+    tiebreak = {key: rng.random() for key in set(items)}
+
+    def order(item: _Item) -> Tuple:
+        s_idx, c_idx, size = item
+        f_idx = int(cp.faculty_of[s_idx, c_idx])
+        return (-size, -(faculty_load[f_idx] if f_idx >= 0 else 0), -int(periods[s_idx]), tiebreak[item])
+
+    return sorted(items, key=order)
+
+
+class _Timetable:
+    """Classes placed so far plus the occupancy indexes the greedy checks.
+
+    A section's first class in a block takes a room there; per block, the
+    sections needing capacity >= v may not outnumber the rooms that fit
+    them, which keeps a distinct room per section and block assignable.
+    """
+
+    def __init__(self, cp: CompiledProblem, rng: random.Random) -> None:
+        self.cp = cp
+        self.rng = rng
+        grid = cp.grid
+        self.day_of = {t: grid.timeslot_by_id[t].day_index for t in grid.non_break}
+        self.lecture_starts = [(t, [t]) for t in grid.non_break]
+        self.thresholds = sorted({int(v) for v in cp.section_size})
+        # (block, v) -> rooms of capacity >= v available for the whole block
+        self.rooms_fitting: Dict[Tuple[int, int], int] = {}
+        for block_id in set(cp.timeslot_to_block.values()):
+            capacities = sorted(int(cp.room_capacity[r]) for r in range(len(cp.room_ids)) if (block_id, r) not in cp.unavailable_block_rooms)
+            for v in self.thresholds:
+                self.rooms_fitting[(block_id, v)] = len(capacities) - bisect_left(capacities, v)
+        self.placed: Dict[int, Tuple[_Item, int, List[int]]] = {}  # class id -> (item, start, covered)
+        self.ids = itertools.count()
+        self.section_at: Dict[Tuple[int, int], int] = {}  # (section, t) -> class id
+        self.faculty_at: Dict[Tuple[int, int], int] = {}  # (faculty, t) -> class id
+        self.faculty_p1: Dict[int, int] = defaultdict(int)
+        self.block_classes: Dict[Tuple[int, int], int] = defaultdict(int)  # (section, block) -> classes
+        self.active_fitting: Dict[Tuple[int, int], int] = defaultdict(int)  # (block, v) -> active sections of size >= v
+        self.course_day: Dict[Tuple[int, int, int], int] = defaultdict(int)  # (section, course, day) -> classes
+        self.section_day: Dict[Tuple[int, int], int] = defaultdict(int)  # (section, day) -> periods
+
+    def starts(self, item: _Item) -> List[Tuple[int, List[int]]]:
+        size = item[2]
+        return [(t, self.cp.lab_cover[size][t]) for t in self.cp.lab_starts[size]] if size else self.lecture_starts
+
+    def _size_thresholds(self, s_idx: int) -> List[int]:
+        if not (self.cp.have_rooms and self.cp.candidate_rooms[s_idx]):
+            return []
+        return [v for v in self.thresholds if v <= self.cp.section_size[s_idx]]
+
+    def blockers(self, item: _Item, start_t: int, covered: List[int]) -> Optional[Set[int]]:
+        """Classes clashing with ``item`` at ``start_t`` (section or faculty),
+        or None if it cannot go there even without them (faculty
+        unavailable, P1 limit, rooms)."""
+        cp = self.cp
+        s_idx, c_idx, _size = item
+        f_idx = int(cp.faculty_of[s_idx, c_idx])
+        clashes = {self.section_at[(s_idx, t)] for t in covered if (s_idx, t) in self.section_at}
+        if f_idx >= 0:
+            if any((f_idx, t) in cp.faculty_unavailable for t in covered):
+                return None
+            clashes.update(self.faculty_at[(f_idx, t)] for t in covered if (f_idx, t) in self.faculty_at)
+            if start_t in cp.grid.p1_timeslots and self.faculty_p1[f_idx] >= P1_LIMIT:
+                return None
+        block_id = cp.timeslot_to_block[start_t]
+        if not self.block_classes[(s_idx, block_id)] and any(
+            self.active_fitting[(block_id, v)] >= self.rooms_fitting[(block_id, v)] for v in self._size_thresholds(s_idx)
+        ):
+            return None
+        return clashes
+
+    def best_start(self, item: _Item, exclude: int = -1) -> Optional[Tuple[int, List[int]]]:
+        """The free start that repeats the course least that day, needs no
+        new block room and keeps the section's days balanced."""
+        s_idx, c_idx, _size = item
+        best = None
+        for start_t, covered in self.starts(item):
+            if start_t == exclude or self.blockers(item, start_t, covered) != set():
+                continue
+            day = self.day_of[start_t]
+            new_block = not self.block_classes[(s_idx, self.cp.timeslot_to_block[start_t])]
+            score = (self.course_day[(s_idx, c_idx, day)], new_block, self.section_day[(s_idx, day)], self.rng.random())
+            if best is None or score < best[0]:
+                best = (score, start_t, covered)
+        return None if best is None else (best[1], best[2])
+
+    def _update(self, item: _Item, start_t: int, covered: List[int], step: int) -> None:
+        cp = self.cp
+        s_idx, c_idx, _size = item
+        f_idx = int(cp.faculty_of[s_idx, c_idx])
+        block_id = cp.timeslot_to_block[start_t]
+        if f_idx >= 0 and start_t in cp.grid.p1_timeslots:
+            self.faculty_p1[f_idx] += step
+        before = self.block_classes[(s_idx, block_id)]
+        self.block_classes[(s_idx, block_id)] += step
+        if (before == 0) != (self.block_classes[(s_idx, block_id)] == 0):
+            for v in self._size_thresholds(s_idx):
+                self.active_fitting[(block_id, v)] += step
+        day = self.day_of[start_t]
+        self.course_day[(s_idx, c_idx, day)] += step
+        self.section_day[(s_idx, day)] += step * len(covered)
+
+    def place(self, item: _Item, start_t: int, covered: List[int]) -> int:
+        class_id = next(self.ids)
+        s_idx, c_idx, _size = item
+        f_idx = int(self.cp.faculty_of[s_idx, c_idx])
+        self.placed[class_id] = (item, start_t, covered)
+        for t in covered:
+            self.section_at[(s_idx, t)] = class_id
+            if f_idx >= 0:
+                self.faculty_at[(f_idx, t)] = class_id
+        self._update(item, start_t, covered, 1)
+        return class_id
+
+    def remove(self, class_id: int) -> Tuple[_Item, int, List[int]]:
+        item, start_t, covered = self.placed.pop(class_id)
+        s_idx, c_idx, _size = item
+        f_idx = int(self.cp.faculty_of[s_idx, c_idx])
+        for t in covered:
+            del self.section_at[(s_idx, t)]
+            if f_idx >= 0:
+                del self.faculty_at[(f_idx, t)]
+        self._update(item, start_t, covered, -1)
+        return item, start_t, covered
+
+    def eject(self, item: _Item) -> bool:
+        """Place ``item`` by moving the classes in its way elsewhere: try each
+        start that only clashes with other classes, re-place those classes
+        greedily, and undo if one of them fits nowhere."""
+        options = [(start_t, covered, len(clashes)) for start_t, covered in self.starts(item) for clashes in [self.blockers(item, start_t, covered)] if clashes]
+        self.rng.shuffle(options)
+        for start_t, covered, _n in sorted(options, key=lambda o: o[2]):
+            # Undoing an earlier option re-places classes under new ids
+            removed = [self.remove(class_id) for class_id in self.blockers(item, start_t, covered) or ()]
+            if self.blockers(item, start_t, covered) != set():
+                for old in removed:
+                    self.place(*old)
+                continue
+            new_id = self.place(item, start_t, covered)
+            moved: List[int] = []
+            for old_item, old_start, _covered in removed:
+                # A moved class may not go back where it was
+                found = self.best_start(old_item, exclude=old_start)
+                if found is None:
+                    break
+                moved.append(self.place(old_item, *found))
+            else:
+                return True
+            for class_id in moved:
+                self.remove(class_id)
+            self.remove(new_id)
+            for old in removed:
+                self.place(*old)
+        return False
+
+
+def _construct(cp: CompiledProblem, rng: random.Random) -> Optional[List[Tuple[int, int, int, List[int]]]]:
+    """One greedy pass: (section, course, lab block size, covered timeslots)
+    per class, or None if some class fits nowhere, even after moving the
+    classes in its way (_Timetable.eject)."""
+    timetable = _Timetable(cp, rng)
+    for item in _items(cp, rng):
+        found = timetable.best_start(item)
+        if found is not None:
+            timetable.place(item, *found)
+        elif not timetable.eject(item):
+            return None
+    return [(s_idx, c_idx, size, covered) for (s_idx, c_idx, size), _start, covered in timetable.placed.values()]
+
+
+def construct(problem: ProblemData, attempts: int = GREEDY_ATTEMPTS, seed: int = RANDOM_SEED) -> Optional[SolveResult]:
+    """A timetable built without search, or None if none of ``attempts``
+    greedy passes (see _construct) placed every class.
+
+    Rooms are assigned per block afterwards by bipartite matching alone
+    (a pass with a block that cannot be matched is dropped). The result
+    satisfies every hard constraint of build_model in all room modes (one
+    room per section and block, no room shared within a block), so it can
+    be returned as is (status FEASIBLE, stop_reason "greedy") or
+    used as a CP-SAT hint.
+    """
+    cp = compile_problem(problem)
+    for attempt in range(attempts):
+        placed = _construct(cp, random.Random(seed + attempt))
+        if placed is None:
+            continue
+        occupancy: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        labs: Set[Tuple[str, int]] = set()
+        for s_idx, _c_idx, size, covered in placed:
+            occupancy[cp.timeslot_to_block[covered[0]]][cp.section_ids[s_idx]].extend(covered)
+            if size:
+                labs.add((cp.section_ids[s_idx], cp.timeslot_to_block[covered[0]]))
+        block_room, failed = assign_rooms_for_occupancy(cp, occupancy, labs=labs, share_rooms=False)
+        if failed:
+            # The capacity counts make every block matchable unless a room policy narrows the candidates;
+            # shared rooms would break the compact and classes room modes
+            continue
+        assignments: List[Assignment] = []
+        for s_idx, c_idx, size, covered in placed:
+            s = cp.section_ids[s_idx]
+            room_id = block_room.get((s, cp.timeslot_to_block[covered[0]]), "")
+            assignments.append((s, cp.course_ids[c_idx], "lab" if size else "lecture", covered, room_id))
+        result = result_from_assignments(problem, assignments, status="FEASIBLE")
+        result.stop_reason = "greedy"
+        return result
+    return None
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import glob
+import os
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .models import ProblemData
+    from .progress import ProgressFn
+    from .stopping import EARLY_STOPS, StopCriteria
+    from .timetable_solver import Assignment, BuiltModel, IntervalModel, SolveResult, make_solver, result_from_assignments, run_search
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from models import ProblemData
+    from progress import ProgressFn
+    from stopping import EARLY_STOPS, StopCriteria
+    from timetable_solver import Assignment, BuiltModel, IntervalModel, SolveResult, make_solver, result_from_assignments, run_search
+
+
+# Exported section cell: "COURSE (FACULTY) [kind] @ROOM", faculty and room optional
+_EXPORTED_CELL = re.compile(r"^(?P<course>\S+)(?: \((?P<faculty>[^)]*)\))? \[(?P<kind>\w+)\](?: @(?P<room>\S+))?$")
+
+
+@dataclass
+class HintPlan:
+    """A previous timetable resolved against the current problem."""
+    sections: Set[str]  # sections the hint covers
+    lectures: Dict[Tuple[str, str], List[int]]  # (section, course) -> lecture timeslots in time order
+    lab_starts: Dict[Tuple[str, str], List[int]]  # (section, course) -> lab start timeslots in time order
+    block_room: Dict[Tuple[str, int], str]  # (section, block) -> room of the section's first class there
+    dropped: Set[Tuple[str, str]] = field(default_factory=set)  # (section, course) pairs left unhinted
+
+
+def plan_hint(cp: CompiledProblem, schedule_by_section: Dict[str, Dict[int, Tuple[str, str, str, str]]]) -> HintPlan:
+    """Keep only sections, courses, timeslots and rooms that still exist."""
+    plan = HintPlan(sections=set(), lectures=defaultdict(list), lab_starts=defaultdict(list), block_room={})
+    lab_tids: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for s, by_t in schedule_by_section.items():
+        if s not in cp.section_index:
+            continue
+        plan.sections.add(s)
+        for tid in sorted(by_t):
+            c, _f, room_id, kind = by_t[tid]
+            if c not in cp.course_index or tid not in cp.timeslot_to_block:
+                continue
+            if room_id and room_id in cp.room_index:
+                plan.block_room.setdefault((s, cp.timeslot_to_block[tid]), room_id)
+            if kind == "lab":
+                lab_tids[(s, c)].append(tid)
+            else:
+                plan.lectures[(s, c)].append(tid)
+
+    # A lab occupies its whole block; read starts back greedily in time order
+    for (s, c), tids in lab_tids.items():
+        bsize = int(cp.lab_block[cp.section_index[s], cp.course_index[c]])
+        cover = cp.lab_cover.get(bsize, {})
+        remaining = set(tids)
+        for tid in tids:
+            if tid in remaining and tid in cover and set(cover[tid]) <= remaining:
+                plan.lab_starts[(s, c)].append(tid)
+                remaining.difference_update(cover[tid])
+
+    _drop_conflicts(cp, plan)
+    return plan
+
+
+def _drop_conflicts(cp: CompiledProblem, plan: HintPlan) -> None:
+    """Drop classes that the current problem no longer allows.
+
+    Demands or faculty may have changed since the hint was made. A
+    (section, course) whose class counts no longer match, or whose faculty is
+    now double-booked or over the P1 limit, is left out, so the remaining
+    hint stays consistent and CP-SAT only has to place the dropped classes.
+    """
+    dropped = set()
+    for key, tids in plan.lectures.items():
+        s_idx, c_idx = cp.section_index[key[0]], cp.course_index[key[1]]
+        if len(tids) != int(cp.lectures[s_idx, c_idx]):
+            dropped.add(key)
+    for key, tids in plan.lab_starts.items():
+        s_idx, c_idx = cp.section_index[key[0]], cp.course_index[key[1]]
+        if len(tids) != int(cp.lab_sessions[s_idx, c_idx]):
+            dropped.add(key)
+
+    # Faculty clashes and the P1 limit under the current faculty assignments; the first class wins
+    faculty_busy = set()
+    faculty_p1: Dict[int, int] = defaultdict(int)
+    classes = [(key, t, False) for key, tids in plan.lectures.items() for t in tids]
+    classes += [(key, t, True) for key, tids in plan.lab_starts.items() for t in tids]
+    for key, start_t, is_lab in sorted(classes, key=lambda x: (x[1], x[0])):
+        if key in dropped:
+            continue
+        s_idx, c_idx = cp.section_index[key[0]], cp.course_index[key[1]]
+        f_idx = int(cp.faculty_of[s_idx, c_idx])
+        if f_idx < 0:
+            continue
+        tids = cp.lab_cover[int(cp.lab_block[s_idx, c_idx])][start_t] if is_lab else [start_t]
+        p1 = start_t in cp.grid.p1_timeslots
+        if any((f_idx, t) in faculty_busy for t in tids) or (p1 and faculty_p1[f_idx] >= 3):
+            dropped.add(key)
+            continue
+        faculty_busy.update((f_idx, t) for t in tids)
+        faculty_p1[f_idx] += int(p1)
+
+    for key in dropped:
+        plan.lectures.pop(key, None)
+        plan.lab_starts.pop(key, None)
+    plan.dropped = dropped
+
+
+def _hint_block_rooms(model: cp_model.CpModel, plan: HintPlan, section_block_room) -> None:
+    for (s, block_id, rid), v in section_block_room.items():
+        if s in plan.sections:
+            model.AddHint(v, int(plan.block_room.get((s, block_id)) == rid))
+
+
+def apply_hint(built: Union[BuiltModel, IntervalModel], hint: SolveResult) -> HintPlan:
+    """Add CP-SAT solution hints from a previous timetable to a built model.
+
+    Sections present in the hint get a full 0/1 hint on their time variables
+    and room choices; entries that no longer exist in the model, or that
+    conflict with it (see _drop_conflicts), are ignored.
+    """
+    cp = built.compiled
+    model = built.model
+    plan = plan_hint(cp, hint.schedule_by_section)
+    model.ClearHints()
+
+    if isinstance(built, IntervalModel):
+        pos_of = {tid: p for p, tid in built.pos_to_tid.items()}
+        for (s, c, kind, k), start in built.starts.items():
+            placed = plan.lab_starts if kind == "lab" else plan.lectures
+            if (s, c) in plan.dropped:
+                continue
+            tids = placed.get((s, c), [])
+            # Starts of one course are ordered in the model, so the k-th start is the k-th class
+            if k < len(tids):
+                model.AddHint(start, pos_of[tids[k]])
+        _hint_block_rooms(model, plan, built.SectionBlockRoom)
+        return plan
+
+    lecture_set = {(s, c, t) for (s, c), tids in plan.lectures.items() for t in tids}
+    lab_set = {(s, c, t) for (s, c), tids in plan.lab_starts.items() for t in tids}
+    for (s, c, t), x in built.X_lec.items():
+        if s in plan.sections and (s, c) not in plan.dropped:
+            model.AddHint(x, int((s, c, t) in lecture_set))
+    for (s, c, t), y in built.Y_lab_start.items():
+        if s in plan.sections and (s, c) not in plan.dropped:
+            model.AddHint(y, int((s, c, t) in lab_set))
+
+    for (s, c, t, rid), rv in built.R_lec.items():
+        if s in plan.sections and (s, c) not in plan.dropped:
+            on = (s, c, t) in lecture_set and plan.block_room.get((s, cp.timeslot_to_block[t])) == rid
+            model.AddHint(rv, int(on))
+    for (s, c, t, rid), rv in built.R_lab_start.items():
+        if s in plan.sections and (s, c) not in plan.dropped:
+            on = (s, c, t) in lab_set and plan.block_room.get((s, cp.timeslot_to_block[t])) == rid
+            model.AddHint(rv, int(on))
+    _hint_block_rooms(model, plan, built.SectionBlockRoom)
+
+    active_blocks = {(s, cp.timeslot_to_block[t]) for s, _c, t in lecture_set | lab_set}
+    for (s, block_id), v in built.SectionBlockActive.items():
+        if s in plan.sections:
+            model.AddHint(v, int((s, block_id) in active_blocks))
+    for (s, block_id, k), v in built.SectionBlockClass.items():
+        if s in plan.sections:
+            rid = plan.block_room.get((s, block_id))
+            model.AddHint(v, int(rid is not None and int(cp.room_class_of[cp.room_index[rid]]) == k))
+    return plan
+
+
+def _time_values(built: BuiltModel, plan: HintPlan, free: Set[Tuple[str, str]]) -> List[Tuple[cp_model.IntVar, int]]:
+    """Hinted 0/1 values of the time variables of every (section, course) not in ``free``."""
+    lecture_set = {(s, c, t) for (s, c), tids in plan.lectures.items() for t in tids}
+    lab_set = {(s, c, t) for (s, c), tids in plan.lab_starts.items() for t in tids}
+    values = [
+        (x, int((s, c, t) in lecture_set)) for (s, c, t), x in built.X_lec.items()
+        if s in plan.sections and (s, c) not in free
+    ]
+    values += [
+        (y, int((s, c, t) in lab_set)) for (s, c, t), y in built.Y_lab_start.items()
+        if s in plan.sections and (s, c) not in free
+    ]
+    return values
+
+
+def _neighbourhood(cp: CompiledProblem, plan: HintPlan) -> Set[Tuple[str, str]]:
+    """Dropped classes plus every class of their sections and faculty."""
+    sections = {s for s, _c in plan.dropped}
+    faculty = {int(cp.faculty_of[cp.section_index[s], cp.course_index[c]]) for s, c in plan.dropped} - {-1}
+    free = set(plan.dropped)
+    for s_idx, c_idx in list(cp.scheduled_lectures()) + list(cp.scheduled_labs()):
+        s, c = cp.section_ids[s_idx], cp.course_ids[c_idx]
+        if s in sections or int(cp.faculty_of[s_idx, c_idx]) in faculty:
+            free.add((s, c))
+    return free
+
+
+def solve_with_hint(
+    built: BuiltModel,
+    hint: SolveResult,
+    time_limit_sec: float,
+    progress: Optional[ProgressFn] = None,
+    stop: Optional[StopCriteria] = None,
+) -> Tuple[cp_model.CpSolver, int, str]:
+    """Solve a time-indexed model warm-started from ``hint``.
+
+    Hints alone barely help on large models, where presolve dominates the
+    time to the first solution. So the model is first solved with the hinted
+    time variables fixed, which presolve collapses almost entirely. Only the
+    dropped classes are free. If that is infeasible, the sections and
+    faculty of the dropped classes are freed as well. Without an objective,
+    the first feasible restriction is returned as is. Otherwise its solution
+    becomes a complete hint for the full model, which gets the remaining
+    time. ``progress`` gets the solutions of the restricted and full solves
+    and ``stop`` applies to both: ``feasibility_sec`` is the budget for the
+    first timetable from either, and a restricted solution that meets an
+    early stop is returned as is. Returns the solver, its status and the
+    stop reason (see run_search).
+    """
+    started = time.perf_counter()
+    deadline = started + time_limit_sec
+    cp = built.compiled
+    plan = apply_hint(built, hint)
+    has_objective = bool(built.objective_terms)
+    found = False
+
+    if plan.sections:
+        for free in (set(plan.dropped), _neighbourhood(cp, plan)):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            restricted = built.model.Clone()
+            for var, value in _time_values(built, plan, free):
+                restricted.Add(restricted.GetBoolVarFromProtoIndex(var.Index()) == value)
+            solver = make_solver(min(remaining, max(1.0, 0.25 * time_limit_sec)))
+            status, reason = run_search(solver, restricted, progress, has_objective, _stop_after(stop, started, found))
+            if reason in ("feasibility_time", "cancelled"):
+                return solver, status, reason
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                continue
+            if not has_objective or reason in EARLY_STOPS:
+                # A restriction of the model: its solution is a solution of the full model
+                return solver, status, reason
+            found = True
+            built.model.ClearHints()
+            for i in range(len(built.model.Proto().variables)):
+                var = built.model.GetIntVarFromProtoIndex(i)
+                built.model.AddHint(var, solver.Value(var))
+            break
+
+    solver = make_solver(max(0.0, deadline - time.perf_counter()))
+    status, reason = run_search(solver, built.model, progress, has_objective, _stop_after(stop, started, found))
+    return solver, status, reason
+
+
+def _stop_after(stop: Optional[StopCriteria], started: float, found: bool) -> Optional[StopCriteria]:
+    """``stop`` for a later search of the same solve: the feasibility budget
+    less the time spent since ``started``, or none once a timetable is found."""
+    if stop is None or stop.feasibility_sec is None:
+        return stop
+    left = None if found else max(0.0, stop.feasibility_sec - (time.perf_counter() - started))
+    return replace(stop, feasibility_sec=left)
+
+
+def load_hint_from_sections_dir(problem: ProblemData, path: str) -> SolveResult:
+    """Read exported ``section_<id>.csv`` grids (an export directory or its
+    ``sections`` subdirectory) back into a SolveResult."""
+    cp = compile_problem(problem)
+    sections_dir = os.path.join(path, "sections") if os.path.isdir(os.path.join(path, "sections")) else path
+    day_by_name = {name: day_idx for day_idx, name in cp.grid.days}
+
+    assignments: List[Assignment] = []
+    for csv_path in sorted(glob.glob(os.path.join(sections_dir, "section_*.csv"))):
+        section_id = os.path.basename(csv_path)[len("section_"):-len(".csv")]
+        df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+        for _, row in df.iterrows():
+            day_idx = day_by_name.get(str(row["Day"]).strip())
+            if day_idx is None:
+                continue
+            periods = cp.grid.periods_by_day[day_idx]
+            for i, col in enumerate(c for c in df.columns if c != "Day"):
+                m = _EXPORTED_CELL.match(str(row[col]).strip())
+                if not m or i >= len(periods):
+                    continue
+                tid = cp.grid.day_period_to_tid[(day_idx, periods[i])]
+                assignments.append((section_id, m.group("course"), m.group("kind"), [tid], m.group("room") or ""))
+    return result_from_assignments(problem, _known(cp, assignments), status="IMPORTED")
+
+
+def load_hint_from_section_rows(problem: ProblemData, sections: Dict[str, List[Dict]]) -> SolveResult:
+    """Rebuild a SolveResult from the ``sections`` rows of an /api/solve response
+    (``timeslotId``, ``courseId``, ``roomId``, ``kind`` per row)."""
+    cp = compile_problem(problem)
+    assignments: List[Assignment] = [
+        (section_id, row["courseId"], row.get("kind", "lecture"), [int(row["timeslotId"])], row.get("roomId") or "")
+        for section_id, rows in sections.items()
+        for row in rows
+    ]
+    return result_from_assignments(problem, _known(cp, assignments), status="IMPORTED")
+
+
+def _resolve_course(cp: CompiledProblem, tokens: List[str]) -> Optional[str]:
+    # "DE-L", "SS-Lab" name the lab course; "CD-T", "DE(T)" are tutorials of the lecture course
+    is_lab = any(tok in ("L", "LAB") for tok in tokens[1:])
+    base = tokens[0]
+    names = ["-".join(tokens)]
+    if is_lab:
+        names += [f"{base}-LAB", f"{base}-L"]
+    names.append(base)
+    for name in names:
+        if name in cp.course_index:
+            return name
+    return None
+
+
+def load_hint_from_timetable_xlsx(problem: ProblemData, path: str) -> SolveResult:
+    """Read a hand-made timetable workbook such as ``TT_Flexinput/main time table.xlsx``.
+
+    One sheet per section named ``SEC<n>`` (the n-th section of the problem),
+    one row per day (``MON``, ``TUE``, ...) and one column per period
+    including breaks; cells look like ``CN-407``, ``DE-L-301`` or
+    ``DE-407(T)`` (course, optional lab/tutorial marker, room name). Courses
+    and rooms that do not match the problem are skipped.
+    """
+    cp = compile_problem(problem)
+    sheets = pd.read_excel(path, sheet_name=None, header=None, dtype=str)
+    day_by_prefix = {name[:3].upper(): day_idx for day_idx, name in cp.grid.days}
+    room_by_name = {str(r.room_name).strip().upper(): r.room_id for r in problem.rooms or []}
+
+    assignments: List[Assignment] = []
+    for sheet_name, df in sheets.items():
+        m = re.fullmatch(r"SEC(\d+)", sheet_name.strip().upper())
+        if not m or not 1 <= int(m.group(1)) <= len(cp.section_ids):
+            continue
+        section_id = cp.section_ids[int(m.group(1)) - 1]
+        prev_lab: Optional[str] = None
+        for _, row in df.iterrows():
+            day_idx = day_by_prefix.get(str(row[0]).strip()[:3].upper())
+            if day_idx is None:
+                continue
+            periods = cp.grid.periods_by_day[day_idx]
+            prev_lab = None
+            for i, p in enumerate(periods, start=1):
+                cell = row[i] if i < len(row) else None
+                if cell is None or pd.isna(cell):
+                    continue
+                text = str(cell).strip().upper().replace("(T)", "").replace(" ", "-")
+                tokens = [tok for tok in text.split("-") if tok]
+                if not tokens or tokens[0] == "BREAK":
+                    prev_lab = None
+                    continue
+                room_id = room_by_name.get(tokens[-1], "") if tokens[-1].isdigit() else ""
+                if tokens[-1].isdigit():
+                    tokens = tokens[:-1]
+                course_id = _resolve_course(cp, tokens) if tokens else None
+                tid = cp.grid.day_period_to_tid[(day_idx, p)]
+                if course_id is None:
+                    prev_lab = None
+                    continue
+                c_idx = cp.course_index[course_id]
+                if cp.course_is_lab[c_idx]:
+                    # Workbooks name a lab once, in its first period
+                    if course_id != prev_lab:
+                        bsize = int(cp.lab_block[cp.section_index[section_id], c_idx])
+                        tids = cp.lab_cover.get(bsize, {}).get(tid, [tid])
+                        assignments.append((section_id, course_id, "lab", tids, room_id))
+                    prev_lab = course_id
+                else:
+                    assignments.append((section_id, course_id, "lecture", [tid], room_id))
+                    prev_lab = None
+    return result_from_assignments(problem, _known(cp, assignments), status="IMPORTED")
+
+
+def _known(cp: CompiledProblem, assignments: List[Assignment]) -> List[Assignment]:
+    return [a for a in assignments if a[0] in cp.section_index and a[1] in cp.course_index]
+
+
+def load_hint(problem: ProblemData, path: str) -> SolveResult:
+    """Load a hint from an ``.xlsx`` timetable workbook or an export directory."""
+    if path.lower().endswith((".xlsx", ".xls")):
+        return load_hint_from_timetable_xlsx(problem, path)
+    if os.path.isdir(path):
+        return load_hint_from_sections_dir(problem, path)
+    raise FileNotFoundError(f"Hint must be an export directory or an .xlsx workbook: {path}")
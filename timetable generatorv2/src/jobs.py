@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from . import timetable_solver
+    from .admission import PRIORITY_SOLVE, Admission
+except ImportError:
+    import timetable_solver
+    from admission import PRIORITY_SOLVE, Admission
+
+
+# Finished jobs kept for GET /api/jobs/{id}; the oldest are dropped first
+MAX_FINISHED_JOBS = 100
+# How often a cancelled job's process repeats StopSearch until its solve returns
+STOP_POLL_SEC = 0.2
+FINISHED = ("done", "failed", "cancelled")
+# Put on a job's event queue by the parent once its process has returned
+_END = None
+
+
+class JobError(Exception):
+    """A job failure carried back from its pool process (picklable, unlike HTTPException)."""
+
+    def __init__(self, detail: str, status_code: int = 500) -> None:
+        super().__init__(detail, status_code)
+        self.detail = detail
+        self.status_code = status_code
+
+
+@dataclass
+class Job:
+    """One background solve: its status, progress events and final response."""
+    job_id: str
+    created: float = field(default_factory=time.time)
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_code: int = 500  # HTTP status for a failed job
+    _changed: threading.Condition = field(default_factory=threading.Condition, repr=False)
+    _call: Any = field(default=None, repr=False)  # (fn, args)
+    _future: Optional[Future] = field(default=None, repr=False)
+    _cancel: Any = field(default=None, repr=False)  # manager Event shared with the job's process, once started
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        with self._changed:
+            # Final statuses are set by _finish, together with the result
+            if event.get("event") == "status" and event["status"] not in FINISHED and self.status not in FINISHED:
+                self.status = event["status"]
+            self.events.append(dict(event, time=round(time.time() - self.created, 3)))
+            self._changed.notify_all()
+
+    def _finish(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None, error_code: int = 500) -> None:
+        with self._changed:
+            self.status, self.result, self.error, self.error_code = status, result, error, error_code
+            self._changed.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; False if ``timeout`` passed first."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.status in FINISHED, timeout)
+
+    def iter_events(self, after: int = 0, heartbeat_sec: float = 15.0) -> Iterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """Yield (index, event) from index ``after`` on, blocking for new ones
+        until the job finishes; None when ``heartbeat_sec`` passes without one."""
+        i = after
+        while True:
+            with self._changed:
+                if i >= len(self.events) and self.status not in FINISHED:
+                    self._changed.wait(heartbeat_sec)
+                pending = self.events[i:]
+                finished = self.status in FINISHED
+            if pending:
+                for event in pending:
+                    yield i, event
+                    i += 1
+            elif finished:
+                return
+            else:
+                yield None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.job_id,
+            "status": self.status,
+            "events": len(self.events),
+            "progress": self.events[-1] if self.events else None,
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+def _run_in_process(fn: Callable[..., Dict[str, Any]], args: Tuple, events: Any, cancel: Any, workers: int) -> Dict[str, Any]:
+    """Job body in a pool process: ``workers`` CP-SAT workers, events to the
+    ``events`` queue; a watcher thread stops the searches once ``cancel`` is set."""
+    timetable_solver.STOP_REQUESTED.clear()
+    timetable_solver.SOLVER_PARAMS.clear()
+    timetable_solver.SOLVER_PARAMS["num_search_workers"] = workers
+    finished = threading.Event()
+
+    def watch() -> None:
+        while not finished.is_set():
+            if cancel.wait(STOP_POLL_SEC):
+                timetable_solver.stop_searches()
+                finished.wait(STOP_POLL_SEC)
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    events.put({"event": "status", "status": "running", "workers": workers})
+    try:
+        return fn(*args, progress=events.put)
+    except Exception as e:
+        raise JobError(str(getattr(e, "detail", "") or e), getattr(e, "status_code", 500)) from None
+    finally:
+        finished.set()
+        watcher.join()
+
+
+class JobStore:
+    """Runs job functions in a pool of spawned processes and keeps their Job records.
+
+    A job function is a module-level function called as fn(*args,
+    progress=...) in the pool process; it returns the JSON response, and an
+    exception marks the job failed with its message and status code (an
+    HTTPException's, if it is one). Jobs wait in ``admission`` (see
+    src/admission.py) until cores and memory allow them to start, and run
+    with the CP-SAT workers it grants. Progress events reach the Job through
+    a manager queue, relayed by one thread per running job. The pool and
+    manager start with the first job. ``on_result``, if given, is called in
+    this process with each returned response and gives the one to keep.
+    """
+
+    def __init__(self, admission: Optional[Admission] = None, on_result: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> None:
+        self.admission = admission or Admission()
+        self.on_result = on_result
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager: Any = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.admission.max_running, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args: Any, priority: int = PRIORITY_SOLVE, memory_mb: float = 0.0) -> Job:
+        """Queue fn(*args); MemoryLimitExceeded if ``memory_mb`` can never fit."""
+        job = Job(job_id=uuid.uuid4().hex, _call=(fn, args))
+        self.admission.request(job.job_id, priority, memory_mb)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._drop_finished()
+        self._dispatch()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def summary(self, job: Job) -> Dict[str, Any]:
+        return dict(job.summary(), queuePosition=self.admission.position(job.job_id))
+
+    def cancel(self, job: Job) -> None:
+        """Drop a queued job; stop a running one's search, which then
+        finishes as "cancelled" with its best timetable so far."""
+        with self._lock:
+            if job.status in FINISHED:
+                return
+            if self.admission.withdraw(job.job_id):
+                job.emit({"event": "status", "status": "cancelled"})
+                job._finish("cancelled")
+                return
+            job._cancel.set()
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            for job_id, workers in self.admission.admit():
+                self._start(self._jobs[job_id], workers)
+
+    def _start(self, job: Job, workers: int) -> None:
+        if self._executor is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+            self._executor = self._new_pool()
+        events, job._cancel = self._manager.Queue(), self._manager.Event()
+        fn, args = job._call
+        try:
+            job._future = self._executor.submit(_run_in_process, fn, args, events, job._cancel, workers)
+        except BrokenProcessPool:
+            # A pool process died (e.g. out of memory); start a fresh pool
+            self._executor = self._new_pool()
+            job._future = self._executor.submit(_run_in_process, fn, args, events, job._cancel, workers)
+        threading.Thread(target=self._relay, args=(job, events), daemon=True).start()
+        job._future.add_done_callback(lambda _f: events.put(_END))
+
+    def _relay(self, job: Job, events: Any) -> None:
+        while True:
+            event = events.get()
+            if event is _END:
+                break
+            job.emit(event)
+        future = job._future
+        error = future.exception()
+        result = None
+        if error is None:
+            result = future.result()
+            if self.on_result is not None:
+                result = self.on_result(result)
+        if job._cancel.is_set():
+            job.emit({"event": "status", "status": "cancelled"})
+            job._finish("cancelled", result=result)
+        elif error is not None:
+            detail = getattr(error, "detail", None) or str(error) or repr(error)
+            job.emit({"event": "error", "detail": detail})
+            job._finish("failed", error=detail, error_code=getattr(error, "status_code", 500))
+        else:
+            job._finish("done", result=result)
+        self.admission.release(job.job_id)
+        self._dispatch()
+
+    def _drop_finished(self) -> None:
+        finished = sorted((j.created, j.job_id) for j in self._jobs.values() if j.status in FINISHED)
+        for _created, job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import compile_problem
+    from .greedy import construct
+    from .hints import plan_hint
+    from .models import Course, ProblemData, SectionCourseRequirement
+    from .progress import ProgressFn, model_event
+    from .timetable_solver import BuiltModel, SolveResult, _extract_result, build_model, make_solver, run_search
+except ImportError:
+    from compiled import compile_problem
+    from greedy import construct
+    from hints import plan_hint
+    from models import Course, ProblemData, SectionCourseRequirement
+    from progress import ProgressFn, model_event
+    from timetable_solver import BuiltModel, SolveResult, _extract_result, build_model, make_solver, run_search
+
+
+# Lab placements tried (each excluding the conflicts of the last) before the joint model
+LABS_FIRST_ROUNDS = 3
+# Share of the remaining time a lab stage may use
+LAB_STAGE_SHARE = 0.25
+
+
+def labs_only(problem: ProblemData) -> ProblemData:
+    """``problem`` without lectures: same sections, timeslots, faculty and rooms."""
+    return ProblemData(
+        day_periods=problem.day_periods,
+        sections=problem.sections,
+        faculty=problem.faculty,
+        courses=[
+            Course(
+                course_id=c.course_id,
+                course_name=c.course_name,
+                is_lab=c.is_lab,
+                lecture_periods_per_week=0,
+                lab_sessions_per_week=c.lab_sessions_per_week,
+                lab_block_size=c.lab_block_size,
+            )
+            for c in problem.courses
+        ],
+        section_requirements=[
+            SectionCourseRequirement(
+                section_id=r.section_id,
+                course_id=r.course_id,
+                weekly_lectures=0,
+                weekly_lab_sessions=r.weekly_lab_sessions,
+                lab_block_size=r.lab_block_size,
+            )
+            for r in problem.section_requirements
+        ],
+        faculty_courses=problem.faculty_courses,
+        rooms=problem.rooms,
+        faculty_unavailability=problem.faculty_unavailability,
+        room_unavailability=problem.room_unavailability,
+        room_policy=problem.room_policy,
+    )
+
+
+# Lab start and lab room variables of a BuiltModel, by attribute name
+_LAB_VARIABLES = ("Y_lab_start", "R_lab_start", "SectionBlockRoom", "SectionBlockClass")
+
+# attribute name -> keys of the variables set to 1
+Placement = Dict[str, Set[Tuple]]
+
+
+def _solved_placement(labs: BuiltModel, solver: cp_model.CpSolver) -> Placement:
+    """The lab model's chosen lab starts and rooms. It has no lectures, so
+    every block room it picks belongs to a lab."""
+    return {name: {key for key, var in getattr(labs, name).items() if solver.Value(var) == 1} for name in _LAB_VARIABLES}
+
+
+def _greedy_placement(problem: ProblemData) -> Optional[Placement]:
+    """Lab starts and rooms of the greedy constructor (src/greedy.py) on the
+    labs alone, as variable keys of any time-indexed room mode."""
+    result = construct(labs_only(problem))
+    if result is None:
+        return None
+    cp = compile_problem(problem)
+    plan = plan_hint(cp, result.schedule_by_section)
+    placement: Placement = {name: set() for name in _LAB_VARIABLES}
+    for (s, c), starts in plan.lab_starts.items():
+        for t in starts:
+            placement["Y_lab_start"].add((s, c, t))
+            room_id = plan.block_room.get((s, cp.timeslot_to_block[t]))
+            if room_id:
+                placement["R_lab_start"].add((s, c, t, room_id))
+    for (s, block_id), room_id in plan.block_room.items():
+        placement["SectionBlockRoom"].add((s, block_id, room_id))
+        if cp.room_class_of is not None:
+            placement["SectionBlockClass"].add((s, block_id, int(cp.room_class_of[cp.room_index[room_id]])))
+    return placement
+
+
+def _literals(built: BuiltModel, placement: Placement) -> List[Tuple[str, Tuple, cp_model.IntVar]]:
+    """(attribute name, key, variable) of the placement's variables that ``built`` has."""
+    out = []
+    for name, keys in placement.items():
+        variables = getattr(built, name)
+        out.extend((name, key, variables[key]) for key in keys if key in variables)
+    return out
+
+
+def solve_labs_first(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    optimize_gaps: bool = False,
+    room_mode: str = "per_slot",
+    progress: Optional[ProgressFn] = None,
+    gap_mode: str = "triple",
+) -> SolveResult:
+    """Place labs and their rooms first, then lectures around them.
+
+    Stage 1 places the labs of labs_only(problem): by the greedy
+    constructor at first, by the CP-SAT model of the labs after a
+    backtrack. Stage 2 solves the full model with the chosen lab starts and
+    rooms as CP-SAT assumptions. If stage 2 is infeasible, its infeasible
+    core (the lab choices that cannot coexist with the lectures) is
+    excluded from the lab model and both stages run again, up to
+    LABS_FIRST_ROUNDS times; if stage 2 runs out of its time share, the
+    whole placement is excluded. After that, or if no lab placement is
+    found, the full model is solved with the last placement as a hint.
+    ``progress`` gets the full model and its solutions.
+    """
+    deadline = time.perf_counter() + time_limit_sec
+    build_start = time.perf_counter()
+    full = build_model(problem, optimize_gaps=optimize_gaps, room_mode=room_mode, gap_mode=gap_mode)
+    if progress is not None:
+        progress(model_event(full.model, time.perf_counter() - build_start))
+    has_objective = bool(full.objective_terms)
+    labs: Optional[BuiltModel] = None  # built on the first backtrack
+    placement = _greedy_placement(problem)
+    tried: Placement = {}
+    status, reason = cp_model.UNKNOWN, "time_limit"
+
+    for round_ in range(LABS_FIRST_ROUNDS):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        if placement is None:
+            if labs is None:
+                labs = build_model(labs_only(problem), room_mode=room_mode)
+            lab_solver = make_solver(max(1.0, LAB_STAGE_SHARE * remaining))
+            lab_status = lab_solver.Solve(labs.model)
+            if lab_status == cp_model.INFEASIBLE and round_ == 0:
+                # The labs alone do not fit
+                status, reason = cp_model.INFEASIBLE, "infeasible"
+                break
+            if lab_status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                break
+            placement = _solved_placement(labs, lab_solver)
+        tried = placement
+
+        assumed = _literals(full, placement)
+        full.model.ClearAssumptions()
+        full.model.AddAssumptions([var for _name, _key, var in assumed])
+        remaining = deadline - time.perf_counter()
+        # Half the time, so that a placement that cannot be proven wrong leaves time for others
+        solver = make_solver(max(0.0, remaining if round_ == LABS_FIRST_ROUNDS - 1 else 0.5 * remaining))
+        status, reason = run_search(solver, full.model, progress, has_objective)
+        full.model.ClearAssumptions()
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            result = _extract_result(problem, full, solver, status)
+            result.stop_reason = reason
+            return result
+        if status == cp_model.INFEASIBLE:
+            core = set(solver.SufficientAssumptionsForInfeasibility())
+            if not core:
+                break  # infeasible whatever the labs: no use trying others
+            conflict = [(name, key) for name, key, var in assumed if var.Index() in core]
+        else:
+            conflict = [(name, key) for name, key, _var in assumed]
+        if labs is None:
+            labs = build_model(labs_only(problem), room_mode=room_mode)
+        lab_vars = [getattr(labs, name)[key] for name, key in conflict if key in getattr(labs, name)]
+        if not lab_vars:
+            break
+        labs.model.AddBoolOr([var.Not() for var in lab_vars])
+        placement = None
+        status, reason = cp_model.UNKNOWN, "time_limit"
+
+    remaining = deadline - time.perf_counter()
+    if status != cp_model.INFEASIBLE and remaining > 0:
+        full.model.ClearHints()
+        for _name, _key, var in _literals(full, tried):
+            full.model.AddHint(var, 1)
+        solver = make_solver(remaining)
+        status, reason = run_search(solver, full.model, progress, has_objective)
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            result = _extract_result(problem, full, solver, status)
+            result.stop_reason = reason
+            return result
+
+    return SolveResult(
+        status="INFEASIBLE",
+        schedule_by_section={},
+        schedule_by_faculty={},
+        timeslots=full.timeslots,
+        objective_value=None,
+        stop_reason=reason,
+    )
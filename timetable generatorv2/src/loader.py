@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import pandas as pd
 
@@ -11,8 +11,10 @@ try:
         DayPeriod,
         Faculty,
         FacultyCourseAssignment,
+        FacultyUnavailability,
         ProblemData,
         Room,
+        RoomUnavailability,
         Section,
         SectionCourseRequirement,
     )
@@ -22,8 +24,10 @@ except ImportError:
         DayPeriod,
         Faculty,
         FacultyCourseAssignment,
+        FacultyUnavailability,
         ProblemData,
         Room,
+        RoomUnavailability,
         Section,
         SectionCourseRequirement,
     )
@@ -38,6 +42,29 @@ def _read_csv(path: str) -> pd.DataFrame:
     return df
 
 
+def _read_unavailability(path: str, id_column: str) -> List[Tuple[str, str, Optional[int]]]:
+    """(id, day_name, period_index) rows of an optional unavailability CSV; a
+    blank period_index (or no such column) marks the whole day."""
+    if not os.path.exists(path):
+        return []
+    df = _read_csv(path)
+    required_cols = {id_column, "day_name"}
+    missing = required_cols - set(df.columns)
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} missing columns: {sorted(missing)}")
+    rows = []
+    for _, row in df.iterrows():
+        period = row["period_index"] if "period_index" in df.columns else None
+        rows.append(
+            (
+                str(row[id_column]).strip(),
+                str(row["day_name"]).strip(),
+                int(period) if pd.notna(period) and str(period).strip() != "" else None,
+            )
+        )
+    return rows
+
+
 def load_problem_from_directory(inputs_dir: str, optional_rooms: bool = True) -> ProblemData:
     day_df = _read_csv(os.path.join(inputs_dir, "day_worksheet.csv"))
     sections_df = _read_csv(os.path.join(inputs_dir, "sections.csv"))
@@ -91,6 +118,12 @@ def load_problem_from_directory(inputs_dir: str, optional_rooms: bool = True) ->
                 section_id=str(row["section_id"]).strip(),
                 section_name=str(row["section_name"]).strip(),
                 num_students=int(row["num_students"]),
+                group=str(row["group"]).strip() if "group" in sections_df.columns and pd.notna(row["group"]) else None,
+                preferred_buildings=(
+                    [b.strip() for b in str(row["preferred_buildings"]).split(";") if b.strip()]
+                    if "preferred_buildings" in sections_df.columns and pd.notna(row["preferred_buildings"])
+                    else []
+                ),
             )
         )
 
@@ -185,9 +218,20 @@ def load_problem_from_directory(inputs_dir: str, optional_rooms: bool = True) ->
                     room_name=str(row["room_name"]).strip(),
                     capacity=int(row["capacity"]),
                     is_lab=bool(int(row["is_lab"])) if str(row["is_lab"]).strip() != "" else False,
+                    building=str(row["building"]).strip() if "building" in rooms_df.columns and pd.notna(row["building"]) else None,
                 )
             )
 
+    # Optional: slots a faculty member or a room cannot be used in
+    faculty_unavailability = [
+        FacultyUnavailability(faculty_id=i, day_name=d, period_index=p)
+        for i, d, p in _read_unavailability(os.path.join(inputs_dir, "faculty_unavailability.csv"), "faculty_id")
+    ]
+    room_unavailability = [
+        RoomUnavailability(room_id=i, day_name=d, period_index=p)
+        for i, d, p in _read_unavailability(os.path.join(inputs_dir, "room_unavailability.csv"), "room_id")
+    ]
+
     return ProblemData(
         day_periods=day_periods,
         sections=sections,
@@ -196,6 +240,8 @@ def load_problem_from_directory(inputs_dir: str, optional_rooms: bool = True) ->
         section_requirements=section_requirements,
         faculty_courses=faculty_courses,
         rooms=rooms,
+        faculty_unavailability=faculty_unavailability,
+        room_unavailability=room_unavailability,
     )
 
 
@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .greedy import P1_LIMIT, construct
+    from .hints import plan_hint
+    from .models import ProblemData
+    from .progress import ProgressFn
+    from .timetable_solver import GAP_MODES, RANDOM_SEED, Assignment, SolveResult, result_from_assignments
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from greedy import P1_LIMIT, construct
+    from hints import plan_hint
+    from models import ProblemData
+    from progress import ProgressFn
+    from timetable_solver import GAP_MODES, RANDOM_SEED, Assignment, SolveResult, result_from_assignments
+
+
+# Search cost of one hard violation, in gaps
+HARD_WEIGHT = 20
+# Annealing temperature (in gaps) at the start and at the end of the time limit
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.05
+# Iterations a moved class stays tabu, unless moving it gives a new best
+TABU_TENURE = 10
+# Iterations between clock checks and between refreshes of the conflict list
+CHECK_EVERY = 200
+
+
+class LocalState:
+    """A timetable as NumPy arrays with incrementally maintained costs.
+
+    ``grid[s, p]`` is the class occupying section s at non-break position p
+    (-1 if free). Classes are the weekly lectures and lab sessions of every
+    section and course; ``start[k]`` is the position where class k starts.
+    Rooms are chosen per section and block (``block_room``), so a section
+    keeps one room for all its classes in a block by construction, and
+    every move keeps a section in at most one class per period. What moves
+    can break is counted and updated on every write: faculty double
+    bookings, faculty over the P1 limit, rooms double-booked in a period
+    (an unavailable faculty slot or room counts as booked), blocks in a
+    room of the wrong kind under separate lab rooms, and the gaps of each
+    section's day. Writes are journalled so a rejected
+    move is undone exactly.
+    """
+
+    def __init__(self, cp: CompiledProblem, optimize_gaps: bool, gap_mode: str, rng: random.Random) -> None:
+        self.cp = cp
+        self.optimize_gaps = optimize_gaps
+        self.gap_mode = gap_mode
+        self.rng = rng
+        grid = cp.grid
+        self.tids = list(grid.non_break)
+        pos_of = {t: i for i, t in enumerate(self.tids)}
+        self.pos_of = pos_of
+        days = sorted(grid.non_break_by_day)
+        self.day_positions = [np.array([pos_of[t] for t in grid.non_break_by_day[d]]) for d in days]
+        self.pos_day = np.zeros(len(self.tids), dtype=np.int32)
+        for d, positions in enumerate(self.day_positions):
+            self.pos_day[positions] = d
+        block_ids = sorted(set(cp.timeslot_to_block.values()))
+        block_of = {b: i for i, b in enumerate(block_ids)}
+        self.block_ids = block_ids
+        self.pos_block = np.array([block_of[cp.timeslot_to_block[t]] for t in self.tids], dtype=np.int32)
+        self.block_positions = [np.flatnonzero(self.pos_block == b) for b in range(len(block_ids))]
+        self.p1 = np.array([t in grid.p1_timeslots for t in self.tids])
+        self.lab_starts: Dict[int, List[int]] = {
+            size: [pos_of[t] for t in starts] for size, starts in cp.lab_starts.items()
+        }
+        self.lab_cover: Dict[int, Dict[int, List[int]]] = {
+            size: {pos_of[t]: [pos_of[x] for x in cover] for t, cover in by_start.items()} for size, by_start in cp.lab_cover.items()
+        }
+
+        classes: List[Tuple[int, int, int]] = []  # (section, course, lab block size or 0 for a lecture)
+        for s_idx, c_idx in cp.scheduled_labs():
+            classes.extend([(s_idx, c_idx, int(cp.lab_block[s_idx, c_idx]))] * int(cp.lab_sessions[s_idx, c_idx]))
+        for s_idx, c_idx in cp.scheduled_lectures():
+            classes.extend([(s_idx, c_idx, 0)] * int(cp.lectures[s_idx, c_idx]))
+        self.section = np.array([s for s, _c, _size in classes], dtype=np.int32)
+        self.course = np.array([c for _s, c, _size in classes], dtype=np.int32)
+        self.size = np.array([size for _s, _c, size in classes], dtype=np.int32)
+        self.faculty = np.array([int(cp.faculty_of[s, c]) for s, c, _size in classes], dtype=np.int32)
+        self.start = np.full(len(classes), -1, dtype=np.int32)
+        self.classes_of_faculty: Dict[int, List[int]] = {}
+        for k, f_idx in enumerate(self.faculty):
+            self.classes_of_faculty.setdefault(int(f_idx), []).append(k)
+
+        n_sections, n_positions, n_blocks = len(cp.section_ids), len(self.tids), len(block_ids)
+        self.rooms = [sorted(c, key=lambda r: int(cp.room_capacity[r])) for c in cp.candidate_rooms] if cp.have_rooms else [[] for _ in cp.section_ids]
+        self.grid = np.full((n_sections, n_positions), -1, dtype=np.int32)
+        self.faculty_occ = np.zeros((len(cp.faculty_ids), n_positions), dtype=np.int32)
+        self.p1_count = np.zeros(len(cp.faculty_ids), dtype=np.int32)
+        self.block_periods = np.zeros((n_sections, n_blocks), dtype=np.int32)
+        self.block_room = np.full((n_sections, n_blocks), -1, dtype=np.int32)
+        self.room_occ = np.zeros((len(cp.room_ids), n_positions), dtype=np.int32)
+        # Separate lab rooms (room policy): a block's room must suit whether it holds a lab
+        self.split_kinds = cp.have_rooms and cp.splits_room_kinds
+        if self.split_kinds:
+            self.lecture_ok = np.zeros((n_sections, len(cp.room_ids)), dtype=bool)
+            self.lab_ok = np.zeros((n_sections, len(cp.room_ids)), dtype=bool)
+            for s_idx in range(n_sections):
+                self.lecture_ok[s_idx, cp.lecture_rooms[s_idx]] = True
+                self.lab_ok[s_idx, cp.lab_rooms[s_idx]] = True
+        self.block_labs = np.zeros((n_sections, n_blocks), dtype=np.int32)
+        self.misfit = np.zeros((n_sections, n_blocks), dtype=np.int32)
+        # Unavailable faculty slots and rooms start booked, so a class there is a clash
+        for f_idx, t in cp.faculty_unavailable:
+            if t in pos_of:
+                self.faculty_occ[f_idx, pos_of[t]] = 1
+        for t, r_idx in cp.room_unavailable:
+            if t in pos_of:
+                self.room_occ[r_idx, pos_of[t]] = 1
+        self.row_gaps = np.zeros((n_sections, len(days)), dtype=np.int32)
+        self.faculty_conflicts = 0
+        self.p1_excess = 0
+        self.room_conflicts = 0
+        self.room_misfits = 0
+        self.gaps = 0
+        self._journal: Optional[List[Tuple[np.ndarray, Tuple, Any]]] = None
+        self._dirty: Set[Tuple[int, int]] = set()
+
+    # -- costs ---------------------------------------------------------------
+
+    @property
+    def hard(self) -> int:
+        return self.faculty_conflicts + self.p1_excess + self.room_conflicts + self.room_misfits
+
+    @property
+    def cost(self) -> int:
+        return HARD_WEIGHT * self.hard + (self.gaps if self.optimize_gaps else 0)
+
+    def _row_gaps(self, s_idx: int, day: int) -> int:
+        occ = self.grid[s_idx, self.day_positions[day]] >= 0
+        if self.gap_mode == "span":
+            used = np.flatnonzero(occ)
+            return int(used[-1] - used[0] + 1 - len(used)) if len(used) else 0
+        return int(np.count_nonzero(occ[:-2] & occ[2:] & ~occ[1:-1]))
+
+    # -- journalled writes ----------------------------------------------------
+
+    def _set(self, array: np.ndarray, index: Tuple, value: int) -> None:
+        if self._journal is not None:
+            self._journal.append((array, index, array[index]))
+        array[index] = value
+
+    def _add(self, array: np.ndarray, index: Tuple, step: int) -> int:
+        """array[index] += step; returns the change in its excess over 1."""
+        old = int(array[index])
+        self._set(array, index, old + step)
+        return max(0, old + step - 1) - max(0, old - 1)
+
+    def _check_misfit(self, s_idx: int, b: int) -> None:
+        if not self.split_kinds:
+            return
+        room = int(self.block_room[s_idx, b])
+        fits = self.lab_ok if self.block_labs[s_idx, b] else self.lecture_ok
+        bad = int(room >= 0 and not fits[s_idx, room])
+        old = int(self.misfit[s_idx, b])
+        if bad != old:
+            self._set(self.misfit, (s_idx, b), bad)
+            self.room_misfits += bad - old
+
+    def _occupy(self, k: int, p: int, step: int) -> None:
+        s_idx, f_idx, b = int(self.section[k]), int(self.faculty[k]), int(self.pos_block[p])
+        self._set(self.grid, (s_idx, p), k if step > 0 else -1)
+        if f_idx >= 0:
+            self.faculty_conflicts += self._add(self.faculty_occ, (f_idx, p), step)
+        before = int(self.block_periods[s_idx, b])
+        self._set(self.block_periods, (s_idx, b), before + step)
+        if self.size[k]:
+            self._set(self.block_labs, (s_idx, b), int(self.block_labs[s_idx, b]) + step)
+        rooms = self.rooms[s_idx]
+        if rooms:
+            if before == 0:
+                # First class of the section in this block: the smallest room of its kind free now
+                if self.split_kinds:
+                    rooms = [r for r in rooms if (self.lab_ok if self.size[k] else self.lecture_ok)[s_idx, r]] or rooms
+                free = [r for r in rooms if self.room_occ[r, p] == 0]
+                self._set(self.block_room, (s_idx, b), (free or rooms)[0])
+            self.room_conflicts += self._add(self.room_occ, (int(self.block_room[s_idx, b]), p), step)
+            if before + step == 0:
+                self._set(self.block_room, (s_idx, b), -1)
+            self._check_misfit(s_idx, b)
+        self._dirty.add((s_idx, int(self.pos_day[p])))
+
+    def _cover(self, k: int, start: int) -> List[int]:
+        size = int(self.size[k])
+        return self.lab_cover[size][start] if size else [start]
+
+    def place(self, k: int, start: int) -> None:
+        for p in self._cover(k, start):
+            self._occupy(k, p, 1)
+        f_idx = int(self.faculty[k])
+        if f_idx >= 0 and self.p1[start]:
+            old = int(self.p1_count[f_idx])
+            self._set(self.p1_count, (f_idx,), old + 1)
+            self.p1_excess += max(0, old + 1 - P1_LIMIT) - max(0, old - P1_LIMIT)
+        self._set(self.start, (k,), start)
+
+    def lift(self, k: int) -> int:
+        start = int(self.start[k])
+        for p in self._cover(k, start):
+            self._occupy(k, p, -1)
+        f_idx = int(self.faculty[k])
+        if f_idx >= 0 and self.p1[start]:
+            old = int(self.p1_count[f_idx])
+            self._set(self.p1_count, (f_idx,), old - 1)
+            self.p1_excess += max(0, old - 1 - P1_LIMIT) - max(0, old - P1_LIMIT)
+        self._set(self.start, (k,), -1)
+        return start
+
+    def set_room(self, s_idx: int, b: int, room: int) -> None:
+        old = int(self.block_room[s_idx, b])
+        for p in self.block_positions[b]:
+            if self.grid[s_idx, p] >= 0:
+                self.room_conflicts += self._add(self.room_occ, (old, p), -1)
+                self.room_conflicts += self._add(self.room_occ, (room, p), 1)
+        self._set(self.block_room, (s_idx, b), room)
+        self._check_misfit(s_idx, b)
+
+    def _refresh_gaps(self) -> None:
+        for s_idx, day in self._dirty:
+            new = self._row_gaps(s_idx, day)
+            self.gaps += new - int(self.row_gaps[s_idx, day])
+            self._set(self.row_gaps, (s_idx, day), new)
+        self._dirty.clear()
+
+    def begin(self) -> Tuple[int, int, int, int, int]:
+        self._journal = []
+        return (self.faculty_conflicts, self.p1_excess, self.room_conflicts, self.room_misfits, self.gaps)
+
+    def commit(self) -> None:
+        self._refresh_gaps()
+        self._journal = None
+
+    def rollback(self, totals: Tuple[int, int, int, int, int]) -> None:
+        for array, index, value in reversed(self._journal):
+            array[index] = value
+        self.faculty_conflicts, self.p1_excess, self.room_conflicts, self.room_misfits, self.gaps = totals
+        self._journal = None
+        self._dirty.clear()
+
+    # -- moves -----------------------------------------------------------------
+    # Each returns the classes it moved, or None if it does not apply; the
+    # caller evaluates the cost change and commits or rolls back.
+
+    def swap(self, s_idx: int, p1: int, p2: int) -> Optional[List[int]]:
+        """Exchange the lectures (or free periods) of a section at p1 and p2."""
+        k1, k2 = int(self.grid[s_idx, p1]), int(self.grid[s_idx, p2])
+        if p1 == p2 or (k1 < 0 and k2 < 0) or (k1 >= 0 and self.size[k1]) or (k2 >= 0 and self.size[k2]):
+            return None
+        moved = [k for k in (k1, k2) if k >= 0]
+        for k in moved:
+            self.lift(k)
+        if k1 >= 0:
+            self.place(k1, p2)
+        if k2 >= 0:
+            self.place(k2, p1)
+        return moved
+
+    def move_lab(self, k: int, start: int) -> Optional[List[int]]:
+        """Move lab block k to ``start``; lectures in the way take the periods it left."""
+        old = int(self.start[k])
+        if start == old:
+            return None
+        s_idx = int(self.section[k])
+        old_cover, new_cover = self._cover(k, old), self._cover(k, start)
+        displaced = [int(self.grid[s_idx, p]) for p in new_cover if p not in old_cover and self.grid[s_idx, p] >= 0]
+        if any(self.size[j] for j in displaced):
+            return None
+        for j in displaced:
+            self.lift(j)
+        self.lift(k)
+        self.place(k, start)
+        free = [p for p in old_cover if p not in new_cover]
+        for j, p in zip(displaced, free):
+            self.place(j, p)
+        return [k] + displaced
+
+    def move_room(self, s_idx: int, b: int, room: int) -> Optional[List[int]]:
+        if self.block_room[s_idx, b] < 0 or room == self.block_room[s_idx, b]:
+            return None
+        self.set_room(s_idx, b, room)
+        return []
+
+    def swap_rooms(self, s1: int, s2: int, b: int) -> Optional[List[int]]:
+        """Exchange the block rooms of two sections, if each fits the other."""
+        r1, r2 = int(self.block_room[s1, b]), int(self.block_room[s2, b])
+        if s1 == s2 or r1 < 0 or r2 < 0 or r1 == r2 or r2 not in self.rooms[s1] or r1 not in self.rooms[s2]:
+            return None
+        self.set_room(s1, b, r2)
+        self.set_room(s2, b, r1)
+        return []
+
+    # -- construction and results ------------------------------------------------
+
+    def load(self, schedule_by_section: Dict[str, Dict[int, Tuple[str, str, str, str]]]) -> bool:
+        """Place the classes of a timetable (src/hints.py reading), the rest
+        at random free periods; False if some section has no room for them."""
+        cp = self.cp
+        plan = plan_hint(cp, schedule_by_section)
+        wanted: Dict[Tuple[int, int, int], List[int]] = {}
+        for (s, c), tids in plan.lab_starts.items():
+            s_idx, c_idx = cp.section_index[s], cp.course_index[c]
+            wanted[(s_idx, c_idx, 1)] = [self.pos_of[t] for t in tids]
+        for (s, c), tids in plan.lectures.items():
+            s_idx, c_idx = cp.section_index[s], cp.course_index[c]
+            wanted[(s_idx, c_idx, 0)] = [self.pos_of[t] for t in tids]
+        unplaced: List[int] = []
+        for k in range(len(self.section)):
+            s_idx = int(self.section[k])
+            starts = wanted.get((s_idx, int(self.course[k]), int(self.size[k] > 0)), [])
+            while starts:
+                start = starts.pop(0)
+                if all(self.grid[s_idx, p] < 0 for p in self._cover(k, start)):
+                    self.place(k, start)
+                    break
+            else:
+                unplaced.append(k)
+        # Labs first: they need consecutive free periods
+        for k in sorted(unplaced, key=lambda k: -int(self.size[k])):
+            s_idx = int(self.section[k])
+            options = self.lab_starts[int(self.size[k])] if self.size[k] else list(range(len(self.tids)))
+            free = [p for p in options if all(self.grid[s_idx, q] < 0 for q in self._cover(k, p))]
+            if not free:
+                return False
+            self.place(k, self.rng.choice(free))
+        for (s, block_id), room_id in plan.block_room.items():
+            s_idx, r_idx = cp.section_index[s], cp.room_index[room_id]
+            b = self.block_ids.index(block_id)
+            if self.block_room[s_idx, b] >= 0 and r_idx in self.rooms[s_idx]:
+                self.set_room(s_idx, b, r_idx)
+        self._refresh_gaps()
+        return True
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.start.copy(), self.block_room.copy()
+
+    def assignments(self, snapshot: Tuple[np.ndarray, np.ndarray]) -> List[Assignment]:
+        cp = self.cp
+        start, block_room = snapshot
+        out: List[Assignment] = []
+        for k in range(len(start)):
+            s_idx, p = int(self.section[k]), int(start[k])
+            room = int(block_room[s_idx, self.pos_block[p]])
+            out.append((
+                cp.section_ids[s_idx],
+                cp.course_ids[int(self.course[k])],
+                "lab" if self.size[k] else "lecture",
+                [self.tids[q] for q in self._cover(k, p)],
+                cp.room_ids[room] if room >= 0 else "",
+            ))
+        return out
+
+
+def _conflicted_classes(state: LocalState) -> List[int]:
+    """Classes involved in a faculty clash, a P1 excess, a room clash or a
+    block in a room of the wrong kind."""
+    hot: Set[int] = set()
+    for f_idx, p in zip(*np.nonzero(state.faculty_occ > 1)):
+        hot.update(k for k in state.classes_of_faculty[int(f_idx)] if p in state._cover(k, int(state.start[k])))
+    for f_idx in np.flatnonzero(state.p1_count > P1_LIMIT):
+        hot.update(k for k in state.classes_of_faculty[int(f_idx)] if state.p1[state.start[k]])
+    for r_idx, p in zip(*np.nonzero(state.room_occ > 1)):
+        b = state.pos_block[p]
+        for s_idx in np.flatnonzero((state.block_room[:, b] == r_idx) & (state.grid[:, p] >= 0)):
+            hot.add(int(state.grid[s_idx, p]))
+    for s_idx, b in zip(*np.nonzero(state.misfit)):
+        hot.update(int(k) for k in state.grid[s_idx, state.block_positions[b]] if k >= 0)
+    return sorted(hot)
+
+
+def _random_move(state: LocalState, rng: random.Random, k: int) -> Optional[List[int]]:
+    s_idx = int(state.section[k])
+    r = rng.random()
+    if state.rooms[s_idx] and r < 0.15:
+        b = int(state.pos_block[state.start[k]])
+        if r < 0.05:
+            others = np.flatnonzero(state.block_room[:, b] >= 0)
+            return state.swap_rooms(s_idx, int(rng.choice(others)), b)
+        return state.move_room(s_idx, b, rng.choice(state.rooms[s_idx]))
+    if state.size[k]:
+        return state.move_lab(k, rng.choice(state.lab_starts[int(state.size[k])]))
+    return state.swap(s_idx, int(state.start[k]), rng.randrange(len(state.tids)))
+
+
+def search(
+    state: LocalState,
+    time_limit_sec: float,
+    progress: Optional[ProgressFn] = None,
+) -> Tuple[Tuple[np.ndarray, np.ndarray], int, int]:
+    """Simulated annealing with a short tabu list over swap, lab and room
+    moves. Conflicted classes are moved first while hard violations remain.
+    Stops at the time limit, or as soon as the timetable is valid (without
+    gaps to minimise) or valid with no gaps. Returns the best state
+    (snapshot), its hard violations and its gaps."""
+    rng = state.rng
+    deadline = time.perf_counter() + time_limit_sec
+    start_time = time.perf_counter()
+    best = state.snapshot()
+    best_key = (state.hard, state.gaps)
+    best_cost = state.cost
+    tabu: Dict[int, int] = {}
+    hot: List[int] = []
+    solutions = 0
+
+    def report() -> None:
+        nonlocal solutions
+        if state.hard == 0 and progress is not None:
+            solutions += 1
+            progress({
+                "event": "solution",
+                "solutions": solutions,
+                "elapsed_sec": round(time.perf_counter() - start_time, 3),
+                "objective": state.gaps if state.optimize_gaps else None,
+                "best_bound": None,
+            })
+
+    report()  # the start may already be valid
+    iteration = 0
+    temperature = START_TEMPERATURE
+    n_classes = len(state.section)
+    while n_classes:
+        if iteration % CHECK_EVERY == 0:
+            now = time.perf_counter()
+            if now >= deadline or (state.hard == 0 and (not state.optimize_gaps or state.gaps == 0)):
+                break
+            frac = (now - start_time) / max(time_limit_sec, 1e-9)
+            temperature = START_TEMPERATURE * (END_TEMPERATURE / START_TEMPERATURE) ** frac
+            hot = _conflicted_classes(state) if state.hard else []
+        iteration += 1
+        k = rng.choice(hot) if hot and rng.random() < 0.7 else rng.randrange(n_classes)
+        before = state.cost
+        totals = state.begin()
+        moved = _random_move(state, rng, k)
+        if moved is None:
+            state.rollback(totals)
+            continue
+        state._refresh_gaps()
+        delta = state.cost - before
+        is_best = state.cost < best_cost
+        if any(tabu.get(j, 0) > iteration for j in moved) and not is_best:
+            state.rollback(totals)
+            continue
+        if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+            state.rollback(totals)
+            continue
+        state.commit()
+        for j in moved:
+            tabu[j] = iteration + TABU_TENURE
+        key = (state.hard, state.gaps)
+        if key < best_key:
+            best, best_key, best_cost = state.snapshot(), key, state.cost
+            report()
+    return best, best_key[0], best_key[1]
+
+
+def solve_local(
+    problem: ProblemData,
+    time_limit_sec: float = 60,
+    optimize_gaps: bool = False,
+    gap_mode: str = "triple",
+    start: Optional[SolveResult] = None,
+    seed: int = RANDOM_SEED,
+    progress: Optional[ProgressFn] = None,
+) -> SolveResult:
+    """Local search engine: no CP-SAT model, memory linear in sections x periods.
+
+    Starts from ``start`` (a previous or CP-SAT timetable) if given, else
+    from the greedy construction (src/greedy.py), else from random free
+    periods, and runs ``search`` until the timetable is valid (and, with
+    optimize_gaps, has no gaps) or the time limit. The result is FEASIBLE
+    (OPTIMAL with zero gaps) with the gap count as objective, or INFEASIBLE
+    if hard violations remain.
+    """
+    if gap_mode not in GAP_MODES:
+        raise ValueError(f"Unknown gap_mode {gap_mode!r}; expected one of {GAP_MODES}")
+    deadline = time.perf_counter() + time_limit_sec
+    cp = compile_problem(problem)
+    state = LocalState(cp, optimize_gaps, gap_mode, random.Random(seed))
+    if start is None:
+        start = construct(problem)
+    if not state.load(start.schedule_by_section if start is not None else {}):
+        return SolveResult(status="INFEASIBLE", schedule_by_section={}, schedule_by_faculty={}, timeslots=cp.timeslots, stop_reason="infeasible")
+    best, hard, gaps = search(state, max(0.0, deadline - time.perf_counter()), progress)
+    if hard:
+        return SolveResult(status="INFEASIBLE", schedule_by_section={}, schedule_by_faculty={}, timeslots=cp.timeslots, stop_reason="time_limit")
+    done = not optimize_gaps or gaps == 0
+    result = result_from_assignments(
+        problem,
+        state.assignments(best),
+        status="OPTIMAL" if optimize_gaps and gaps == 0 else "FEASIBLE",
+        objective_value=gaps if optimize_gaps else None,
+    )
+    result.stop_reason = ("optimal" if optimize_gaps else "feasible") if done else "time_limit"
+    return result
+
+
+def polish(
+    problem: ProblemData,
+    result: SolveResult,
+    time_limit_sec: float,
+    gap_mode: str = "triple",
+    progress: Optional[ProgressFn] = None,
+) -> SolveResult:
+    """Lower the gaps of a valid timetable (e.g. CP-SAT's at its time limit)
+    by local search; returns ``result`` unchanged if that finds nothing better."""
+    if result.status != "FEASIBLE" or result.objective_value is None:
+        return result
+    polished = solve_local(problem, time_limit_sec, optimize_gaps=True, gap_mode=gap_mode, start=result, progress=progress)
+    if polished.status not in ("OPTIMAL", "FEASIBLE") or polished.objective_value >= result.objective_value:
+        return result
+    polished.best_bound = result.best_bound
+    return polished
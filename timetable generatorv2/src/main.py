@@ -3,11 +3,20 @@ from __future__ import annotations
 import argparse
 import os
 import sys
+import time
 
 from .exporter import export_all
 from .feasibility import pre_solve_feasibility_check
+from .hints import load_hint
 from .loader import load_problem_from_directory
-from .timetable_solver import solve
+from .models import RoomPolicy
+from .portfolio import solve_portfolio
+from .progress import JsonLinesWriter, done_event
+from .room_policy import with_room_policy
+from .rolling import GROUP_BY
+from .stopping import StopCriteria
+from .timetable_solver import ENGINES, GAP_MODES, ROOM_MODES, STRATEGIES, solve
+from .tuning import PROFILES
 
 
 def main() -> int:
@@ -16,34 +25,100 @@ def main() -> int:
     parser.add_argument("--output", required=True, help="Directory to write outputs")
     parser.add_argument("--time_limit_sec", type=int, default=60, help="Solver time limit in seconds")
     parser.add_argument("--optimize_gaps", action="store_true", help="Minimize gaps (slower)")
+    parser.add_argument("--gap_mode", choices=GAP_MODES, default="triple", help="Gap objective: single free periods between classes (triple) or all idle periods via per-day first/last slot (span)")
+    parser.add_argument("--room_mode", choices=ROOM_MODES, default="per_slot", help="Room formulation: per-slot room variables, compact block rooms or block room classes")
+    parser.add_argument("--separate_lab_rooms", action="store_true", help="Room candidates: lectures only in non-lab rooms, labs only in lab rooms")
+    parser.add_argument("--max_room_candidates", type=int, default=None, metavar="K", help="Room candidates: keep each section's K best-fitting rooms (least spare capacity, ties kept)")
+    parser.add_argument("--engine", choices=ENGINES, default="time_indexed", help="CP-SAT formulation (time-indexed booleans or intervals with NoOverlap), or local search without CP-SAT")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="direct", help="direct: one model; two_stage: times first, then rooms per block; decomposed: solve faculty-independent section groups separately; rolling: solve section groups in sequence; labs_first: labs and their rooms first, then lectures; day_split: classes per day first, then each day in parallel")
+    parser.add_argument("--group_by", choices=GROUP_BY, default="auto", help="Section groups of the rolling strategy: sections.csv group column, id year/prefix, or chunks of 20")
+    parser.add_argument("--hint", default=None, help="Warm start from a previous export directory (sections/*.csv) or a timetable .xlsx workbook")
+    parser.add_argument("--portfolio", type=int, nargs="?", const=0, default=None, metavar="PROCESSES", help="Race several CP-SAT configurations in parallel processes (default: one per 4 cores)")
+    parser.add_argument("--greedy", action="store_true", help="Try a constructive heuristic first: its timetable is the result (without --optimize_gaps) or the CP-SAT hint")
+    parser.add_argument("--polish_sec", type=float, default=0, help="With --optimize_gaps: seconds of local search on the gaps of a FEASIBLE result")
+    parser.add_argument("--profile", choices=("auto",) + PROFILES, default="auto", help="Tuned CP-SAT parameters for the instance size (python -m src.tuning); auto: balanced with --optimize_gaps, else fast")
+    parser.add_argument("--first_feasible", action="store_true", help="Stop at the first timetable found")
+    parser.add_argument("--relative_gap", type=float, default=None, help="Stop optimizing once (objective - bound) / objective is at most this, e.g. 0.05")
+    parser.add_argument("--no_improvement_sec", type=float, default=None, help="Stop optimizing after this many seconds without a better objective")
+    parser.add_argument("--target_objective", type=int, default=None, help="Stop optimizing once the objective is at most this")
+    parser.add_argument("--feasibility_sec", type=float, default=None, help="Give up if no timetable is found within this many seconds")
+    parser.add_argument("--optimization_sec", type=float, default=None, help="Stop optimizing this many seconds after the first timetable")
+    parser.add_argument("--progress", choices=["jsonl"], default=None, help="Print solver progress events (model size, each solution's objective and bound, final status, then a summary) as JSON lines on stdout; other output goes to stderr")
     args = parser.parse_args()
 
     problem = load_problem_from_directory(args.inputs)
+    if args.separate_lab_rooms or args.max_room_candidates is not None:
+        if args.max_room_candidates is not None and args.max_room_candidates < 1:
+            parser.error("--max_room_candidates must be at least 1")
+        problem = with_room_policy(problem, RoomPolicy(separate_lab_rooms=args.separate_lab_rooms, max_candidates=args.max_room_candidates))
     report = pre_solve_feasibility_check(problem)
+    # With --progress jsonl stdout carries JSON lines only; the text goes to stderr
+    progress = JsonLinesWriter(sys.stdout) if args.progress == "jsonl" else None
+    out = sys.stderr if progress is not None else sys.stdout
     if not report.ok():
-        print("Feasibility errors detected:")
+        print("Feasibility errors detected:", file=out)
         for e in report.errors:
-            print(f" - {e}")
+            print(f" - {e}", file=out)
         if report.warnings:
-            print("Warnings:")
+            print("Warnings:", file=out)
             for w in report.warnings:
-                print(f" - {w}")
+                print(f" - {w}", file=out)
+        if progress is not None:
+            progress({"event": "summary", "exit_code": 2, "status": "FEASIBILITY_ERROR", "errors": report.errors, "warnings": report.warnings})
         return 2
     if report.warnings:
-        print("Feasibility warnings:")
+        print("Feasibility warnings:", file=out)
         for w in report.warnings:
-            print(f" - {w}")
+            print(f" - {w}", file=out)
 
-    result = solve(problem, time_limit_sec=args.time_limit_sec, optimize_gaps=args.optimize_gaps)
+    hint = load_hint(problem, args.hint) if args.hint else None
+    options = dict(
+        time_limit_sec=args.time_limit_sec,
+        optimize_gaps=args.optimize_gaps,
+        gap_mode=args.gap_mode,
+        room_mode=args.room_mode,
+        engine=args.engine,
+        strategy=args.strategy,
+        group_by=args.group_by,
+        hint=hint,
+        greedy=args.greedy,
+        polish_sec=args.polish_sec,
+        profile=args.profile,
+        stop=StopCriteria(
+            relative_gap=args.relative_gap,
+            no_improvement_sec=args.no_improvement_sec,
+            target_objective=args.target_objective,
+            first_feasible=args.first_feasible,
+            feasibility_sec=args.feasibility_sec,
+            optimization_sec=args.optimization_sec,
+        ),
+    )
+    start = time.perf_counter()
+    if args.portfolio is not None:
+        # The configurations run in other processes; only the final status is reported
+        result = solve_portfolio(problem, processes=args.portfolio or None, **options)
+    else:
+        result = solve(problem, progress=progress, **options)
+    wall_sec = time.perf_counter() - start
+    if progress is not None:
+        progress(done_event(result, wall_sec))
     if result.status == "INFEASIBLE":
-        print("Solver could not find a feasible timetable.")
+        print("Solver could not find a feasible timetable.", file=out)
+        if result.stop_reason is not None:
+            print(f"Stopped: {result.stop_reason}", file=out)
+        if progress is not None:
+            progress(dict(done_event(result, wall_sec), event="summary", exit_code=3, output=None, warnings=report.warnings))
         return 3
 
     export_all(result, args.output)
-    print(f"Solver status: {result.status}")
+    print(f"Solver status: {result.status}", file=out)
     if result.objective_value is not None:
-        print(f"Objective value: {result.objective_value}")
-    print(f"Outputs written to: {args.output}")
+        print(f"Objective value: {result.objective_value} (best bound {result.best_bound})", file=out)
+    if result.stop_reason is not None:
+        print(f"Stopped: {result.stop_reason}", file=out)
+    print(f"Outputs written to: {args.output}", file=out)
+    if progress is not None:
+        progress(dict(done_event(result, wall_sec), event="summary", exit_code=0, output=args.output, warnings=report.warnings))
     return 0
 
 
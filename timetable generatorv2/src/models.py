@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 try:
-    from pydantic import BaseModel, Field, validator
+    from pydantic import BaseModel, Field, PrivateAttr, validator
     PYDANTIC_V2 = False
 except ImportError:
     try:
-        from pydantic import BaseModel, Field, field_validator as validator
+        from pydantic import BaseModel, Field, PrivateAttr, field_validator as validator
         PYDANTIC_V2 = True
     except ImportError:
         # Fallback if pydantic is not available
@@ -16,6 +16,8 @@ except ImportError:
             pass
         def Field(*args, **kwargs):
             return None
+        def PrivateAttr(default=None):
+            return default
         def validator(*args, **kwargs):
             def decorator(func):
                 return func
@@ -34,6 +36,8 @@ class Section(BaseModel):
     section_id: str
     section_name: str
     num_students: int = Field(..., ge=0)
+    group: Optional[str] = None  # optional department/year label, used by the rolling strategy
+    preferred_buildings: List[str] = []  # rooms in these buildings are its only candidates when one fits
 
 
 class Faculty(BaseModel):
@@ -81,6 +85,27 @@ class Room(BaseModel):
     room_name: str
     capacity: int = Field(..., ge=0)
     is_lab: bool = False
+    building: Optional[str] = None
+
+
+class RoomPolicy(BaseModel):
+    """Which rooms become a section's room candidates (see src/room_policy.py)."""
+    # Blocks holding a lab get lab rooms, the others non-lab rooms
+    separate_lab_rooms: bool = False
+    # Per section and kind, only the rooms with the least spare capacity (ties kept)
+    max_candidates: Optional[int] = Field(None, ge=1)
+
+
+class FacultyUnavailability(BaseModel):
+    faculty_id: str
+    day_name: str
+    period_index: Optional[int] = Field(None, ge=1)  # None: the whole day
+
+
+class RoomUnavailability(BaseModel):
+    room_id: str
+    day_name: str
+    period_index: Optional[int] = Field(None, ge=1)  # None: the whole day
 
 
 @dataclass(frozen=True)
@@ -100,6 +125,11 @@ class ProblemData(BaseModel):
     section_requirements: List[SectionCourseRequirement]
     faculty_courses: List[FacultyCourseAssignment]
     rooms: Optional[List[Room]] = None
+    faculty_unavailability: List[FacultyUnavailability] = []
+    room_unavailability: List[RoomUnavailability] = []
+    room_policy: RoomPolicy = Field(default_factory=RoomPolicy)
+    # CompiledProblem built lazily by compiled.compile_problem()
+    _compiled: Any = PrivateAttr(default=None)
 
     class Config:
         arbitrary_types_allowed = True
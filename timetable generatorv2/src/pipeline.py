@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from typing import AbstractSet, Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import CompiledProblem
+    from .hints import solve_with_hint
+    from .models import ProblemData
+    from .progress import ProgressFn, model_event
+    from .room_assignment import match_rooms
+    from .stopping import StopCriteria
+    from .timetable_solver import DEFERRED_ROOMS, BuiltModel, SolveResult, _extract_result, build_model, make_solver, run_search
+except ImportError:
+    from compiled import CompiledProblem
+    from hints import solve_with_hint
+    from models import ProblemData
+    from progress import ProgressFn, model_event
+    from room_assignment import match_rooms
+    from stopping import StopCriteria
+    from timetable_solver import DEFERRED_ROOMS, BuiltModel, SolveResult, _extract_result, build_model, make_solver, run_search
+
+
+# Seconds given to the CP-SAT fallback of one block
+BLOCK_FALLBACK_SEC = 5.0
+
+
+def _block_occupancy(built: BuiltModel, solver: cp_model.CpSolver) -> Dict[int, Dict[str, List[int]]]:
+    """block_id -> section_id -> timeslots the section occupies in that block."""
+    cp = built.compiled
+    occupancy: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+    for (s, _c, t), var in built.X_lec.items():
+        if solver.Value(var) == 1:
+            occupancy[cp.timeslot_to_block[t]][s].append(t)
+    for (s, c, start_t), var in built.Y_lab_start.items():
+        if solver.Value(var) == 1:
+            occupancy[cp.timeslot_to_block[start_t]][s].extend(cp.lab_cover[built.lab_block_size[(s, c)]][start_t])
+    return occupancy
+
+
+def _block_labs(built: BuiltModel, solver: cp_model.CpSolver) -> Set[Tuple[str, int]]:
+    """(section_id, block_id) pairs whose block holds a lab."""
+    cp = built.compiled
+    return {(s, cp.timeslot_to_block[start_t]) for (s, _c, start_t), var in built.Y_lab_start.items() if solver.Value(var) == 1}
+
+
+def _usable_rooms(cp: CompiledProblem, blocked_block_rooms: Set[Tuple[int, int]], s: str, block_id: int, has_lab: bool) -> List[int]:
+    # Tightest rooms first so large rooms stay free for large sections
+    rooms = [
+        r_idx for r_idx in cp.block_rooms(cp.section_index[s], has_lab)
+        if (block_id, r_idx) not in blocked_block_rooms and (block_id, r_idx) not in cp.unavailable_block_rooms
+    ]
+    return sorted(rooms, key=lambda r_idx: int(cp.room_capacity[r_idx]))
+
+
+def _solve_block_rooms(
+    cp: CompiledProblem,
+    blocked_block_rooms: Set[Tuple[int, int]],
+    block_id: int,
+    sections: Dict[str, List[int]],
+    labs: AbstractSet[Tuple[str, int]],
+    time_limit_sec: float,
+) -> Optional[Dict[str, int]]:
+    """Per-slot room assignment for one block: one room per section for the
+    whole block, but two sections may share a room when their classes do not
+    overlap in time."""
+    if any(not _usable_rooms(cp, blocked_block_rooms, s, block_id, (s, block_id) in labs) for s in sections):
+        return None
+    model = cp_model.CpModel()
+    choice: Dict[Tuple[str, int], cp_model.IntVar] = {}
+    room_slot_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)
+    for s, tids in sections.items():
+        candidates = _usable_rooms(cp, blocked_block_rooms, s, block_id, (s, block_id) in labs)
+        for r_idx in candidates:
+            v = model.NewBoolVar(f"room_s{s}_r{r_idx}")
+            choice[(s, r_idx)] = v
+            for t in set(tids):
+                room_slot_terms[(t, r_idx)].append(v)
+        model.AddExactlyOne(choice[(s, r_idx)] for r_idx in candidates)
+    for terms in room_slot_terms.values():
+        if len(terms) > 1:
+            model.AddAtMostOne(terms)
+
+    solver = make_solver(time_limit_sec)
+    if solver.Solve(model) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    return {s: r_idx for (s, r_idx), v in choice.items() if solver.Value(v) == 1}
+
+
+def assign_block_rooms(
+    built: BuiltModel,
+    solver: cp_model.CpSolver,
+    fallback_sec: float = BLOCK_FALLBACK_SEC,
+) -> Tuple[Dict[Tuple[str, int], str], List[int]]:
+    """Stage 2: give every section one room per block it is active in.
+
+    Returns the block rooms and the blocks that could not be assigned at all
+    (see assign_rooms_for_occupancy).
+    """
+    return assign_rooms_for_occupancy(
+        built.compiled, _block_occupancy(built, solver), built.blocked_block_rooms, fallback_sec, labs=_block_labs(built, solver)
+    )
+
+
+def assign_rooms_for_occupancy(
+    cp: CompiledProblem,
+    occupancy: Dict[int, Dict[str, List[int]]],
+    blocked_block_rooms: Set[Tuple[int, int]] = frozenset(),
+    fallback_sec: float = BLOCK_FALLBACK_SEC,
+    labs: AbstractSet[Tuple[str, int]] = frozenset(),
+    share_rooms: bool = True,
+) -> Tuple[Dict[Tuple[str, int], str], List[int]]:
+    """Rooms for fixed class times: block_id -> section_id -> timeslots.
+
+    Each block is first solved as a bipartite matching (a distinct room per
+    section). Only blocks where that fails go to a small CP-SAT model that
+    lets sections share a room at different timeslots, unless
+    ``share_rooms`` is False (the compact and classes room modes forbid
+    it); such blocks then fail. ``labs`` lists the
+    (section_id, block_id) pairs holding a lab, which take the section's lab
+    rooms (CompiledProblem.block_rooms).
+    """
+    block_room: Dict[Tuple[str, int], str] = {}
+    failed: List[int] = []
+    if not cp.have_rooms:
+        return block_room, failed
+
+    for block_id, sections in sorted(occupancy.items()):
+        roomed = {s: tids for s, tids in sections.items() if cp.candidate_rooms[cp.section_index[s]]}
+        matched = match_rooms([(s, _usable_rooms(cp, blocked_block_rooms, s, block_id, (s, block_id) in labs)) for s in sorted(roomed)])
+        if matched is None and share_rooms:
+            matched = _solve_block_rooms(cp, blocked_block_rooms, block_id, roomed, labs, fallback_sec)
+        if matched is None:
+            failed.append(block_id)
+            continue
+        for s, r_idx in matched.items():
+            block_room[(s, block_id)] = cp.room_ids[r_idx]
+    return block_room, failed
+
+
+def _add_block_capacity_cuts(built: BuiltModel, block_ids: Set[int]) -> None:
+    """Strengthen stage 1 for blocks whose rooms could not be assigned: the
+    sections active in the block whose candidate rooms all lie in one
+    section's candidate rooms may not outnumber those rooms. Candidates are
+    nested by capacity unless a room policy narrows them, and then this is
+    "sections that need capacity >= v <= rooms with capacity >= v". With
+    separate lab rooms a section counts with its lab rooms in a block holding
+    a lab and with its lecture rooms otherwise."""
+    cp = built.compiled
+    model = built.model
+    block_terms: Dict[Tuple[str, int], List[cp_model.IntVar]] = defaultdict(list)
+    block_labs: Dict[Tuple[str, int], List[cp_model.IntVar]] = defaultdict(list)
+    for (s, _c, t), var in built.X_lec.items():
+        if cp.timeslot_to_block[t] in block_ids:
+            block_terms[(s, cp.timeslot_to_block[t])].append(var)
+    for (s, _c, start_t), var in built.Y_lab_start.items():
+        if cp.timeslot_to_block[start_t] in block_ids:
+            block_terms[(s, cp.timeslot_to_block[start_t])].append(var)
+            block_labs[(s, cp.timeslot_to_block[start_t])].append(var)
+
+    entries_by_block: Dict[int, List[Tuple[List[int], cp_model.IntVar]]] = defaultdict(list)
+    for (s, block_id), terms in block_terms.items():
+        s_idx = cp.section_index[s]
+        if not cp.candidate_rooms[s_idx]:
+            continue
+        active = built.SectionBlockActive.get((s, block_id))
+        if active is None:
+            active = model.NewBoolVar(f"active_s{s}_b{block_id}")
+            built.SectionBlockActive[(s, block_id)] = active
+            for v in terms:
+                model.AddImplication(v, active)
+        labs = block_labs.get((s, block_id), [])
+        if not labs or cp.lab_rooms[s_idx] == cp.lecture_rooms[s_idx]:
+            entries_by_block[block_id].append((cp.block_rooms(s_idx, False) if not labs else cp.candidate_rooms[s_idx], active))
+            continue
+        has_lab = model.NewBoolVar(f"has_lab_s{s}_b{block_id}")
+        for y in labs:
+            model.AddImplication(y, has_lab)
+        model.Add(has_lab <= sum(labs))
+        lectures_only = model.NewBoolVar(f"lectures_only_s{s}_b{block_id}")
+        model.Add(lectures_only >= active - has_lab)
+        entries_by_block[block_id].append((cp.lab_rooms[s_idx], has_lab))
+        entries_by_block[block_id].append((cp.lecture_rooms[s_idx], lectures_only))
+
+    for block_id, entries in entries_by_block.items():
+        rooms_of = [(frozenset(r_idx for r_idx in rooms if (block_id, r_idx) not in built.blocked_block_rooms), a) for rooms, a in entries]
+        for rooms in sorted({rooms for rooms, _ in rooms_of}, key=len):
+            terms = [a for other, a in rooms_of if other <= rooms]
+            if len(terms) > len(rooms):
+                model.Add(sum(terms) <= len(rooms))
+
+
+def _exclude_block_times(built: BuiltModel, solver: cp_model.CpSolver, block_ids: Set[int]) -> None:
+    """For blocks still unassignable after their capacity cut (possible only
+    when a room policy makes candidates overlap without nesting): forbid
+    those classes at those times together again. More classes in the block
+    only make rooming harder, so no roomable timetable is cut off."""
+    placed: Dict[int, List[cp_model.IntVar]] = defaultdict(list)
+    for (_s, _c, t), var in list(built.X_lec.items()) + list(built.Y_lab_start.items()):
+        if built.compiled.timeslot_to_block[t] in block_ids and solver.Value(var):
+            placed[built.compiled.timeslot_to_block[t]].append(var)
+    for terms in placed.values():
+        built.model.AddBoolOr([v.Not() for v in terms])
+
+
+def _hint_times(built: BuiltModel, solver: cp_model.CpSolver) -> None:
+    built.model.ClearHints()
+    for var in list(built.X_lec.values()) + list(built.Y_lab_start.values()):
+        built.model.AddHint(var, solver.Value(var))
+
+
+def solve_two_stage(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    optimize_gaps: bool = False,
+    hint: Optional[SolveResult] = None,
+    progress: Optional[ProgressFn] = None,
+    gap_mode: str = "triple",
+    stop: Optional[StopCriteria] = None,
+) -> SolveResult:
+    """Place classes in time first, then assign rooms block by block.
+
+    Stage 1 is the time-indexed model without room variables, plus the
+    per-timeslot aggregate room capacity cut. Stage 2 is assign_block_rooms.
+    If some block cannot be roomed, stage 1 is re-solved (warm-started from
+    the previous times) with block capacity cuts for those blocks, until it
+    succeeds or the time limit runs out. ``hint`` warm-starts stage 1.
+    ``progress`` gets the stage 1 model and solutions; ``stop`` applies
+    to each stage 1 search.
+    """
+    deadline = time.perf_counter() + time_limit_sec
+    built = build_model(problem, optimize_gaps=optimize_gaps, room_mode=DEFERRED_ROOMS, gap_mode=gap_mode)
+    if progress is not None:
+        progress(model_event(built.model, time.perf_counter() - (deadline - time_limit_sec)))
+    cut_blocks: Set[int] = set()
+    reason = "time_limit"
+
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        if hint is not None and not cut_blocks:
+            solver, status, reason = solve_with_hint(built, hint, remaining, progress=progress, stop=stop)
+        else:
+            solver = make_solver(remaining)
+            status, reason = run_search(solver, built.model, progress, bool(built.objective_terms), stop)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            break
+
+        block_room, failed = assign_block_rooms(built, solver)
+        if not failed:
+            result = _extract_result(problem, built, solver, status, block_room=block_room)
+            result.stop_reason = reason
+            return result
+        # With nested candidates a block capacity cut makes its matching always succeed,
+        # so each block is cut at most once
+        _add_block_capacity_cuts(built, set(failed) - cut_blocks)
+        _exclude_block_times(built, solver, set(failed) & cut_blocks)
+        cut_blocks.update(failed)
+        _hint_times(built, solver)
+
+    return SolveResult(
+        status="INFEASIBLE",
+        schedule_by_section={},
+        schedule_by_faculty={},
+        timeslots=built.timeslots,
+        objective_value=None,
+        stop_reason=reason,
+    )
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    from . import timetable_solver
+    from .models import ProblemData
+    from .stopping import EARLY_STOPS
+    from .timetable_solver import SolveResult, solve
+except ImportError:
+    import timetable_solver
+    from models import ProblemData
+    from stopping import EARLY_STOPS
+    from timetable_solver import SolveResult, solve
+
+
+DEFAULT_STATS_PATH = os.environ.get("ATGS_PORTFOLIO_STATS", os.path.join(tempfile.gettempdir(), "atgs_portfolio_stats.json"))
+# Extra seconds, beyond the search time limit, allowed for process start-up and model building
+STARTUP_GRACE_SEC = 60.0
+# CP-SAT search workers per process; single-worker CP-SAT loses its internal
+# portfolio and was up to 15x slower on TT_Flexinput
+MIN_WORKERS = 4
+# How often a child process repeats stop_searches() once its parent stopped
+CHILD_STOP_POLL_SEC = 0.2
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    """One portfolio member: CP-SAT parameters applied on top of make_solver's."""
+    name: str
+    random_seed: int
+    search_branching: str = "AUTOMATIC_SEARCH"
+    linearization_level: int = 1
+    extra: Dict[str, Any] = field(default_factory=dict, hash=False)
+
+    def params(self, num_workers: int) -> Dict[str, Any]:
+        params = {
+            "random_seed": self.random_seed,
+            "search_branching": self.search_branching,
+            "linearization_level": self.linearization_level,
+            "num_search_workers": num_workers,
+        }
+        params.update(self.extra)
+        return params
+
+
+# Ordered by expected usefulness; trimmed to the number of processes
+DEFAULT_PORTFOLIO: List[SolverConfig] = [
+    SolverConfig("default", random_seed=1),
+    SolverConfig("quick_restart", random_seed=2, search_branching="PORTFOLIO_WITH_QUICK_RESTART_SEARCH"),
+    SolverConfig("no_lp", random_seed=3, search_branching="PORTFOLIO_SEARCH", linearization_level=0),
+    SolverConfig("lp", random_seed=4, search_branching="LP_SEARCH", linearization_level=2),
+    SolverConfig("pseudo_cost", random_seed=5, search_branching="PSEUDO_COST_SEARCH"),
+    SolverConfig("randomized", random_seed=6, search_branching="RANDOMIZED_SEARCH", linearization_level=0),
+]
+
+
+def available_cores() -> int:
+    """CPU cores this process may run on (respects affinity masks / cpusets)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # pragma: no cover - not Linux
+        return max(1, os.cpu_count() or 1)
+
+
+def worker_budget() -> int:
+    """CP-SAT workers this process may use in all: those admission granted
+    its job (SOLVER_PARAMS num_search_workers, set by src/jobs.py), else
+    the available cores."""
+    return int(timetable_solver.SOLVER_PARAMS.get("num_search_workers") or available_cores())
+
+
+def split_workers(tasks: int, processes: Optional[int] = None) -> Tuple[int, int]:
+    """(processes, CP-SAT workers per process) to run ``tasks`` solves in
+    parallel within worker_budget(): by default one process per MIN_WORKERS
+    workers, each with an equal share."""
+    budget = worker_budget()
+    processes = max(1, min(tasks, processes or budget // MIN_WORKERS))
+    return processes, max(1, budget // processes)
+
+
+@contextmanager
+def child_solvers(ctx: Any, workers: int) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], Any]]:
+    """Arguments for init_child in child solve processes: this process's
+    solver parameters with ``workers`` CP-SAT workers, its solver profile,
+    and a stop event that stop_searches() here sets while the block runs."""
+    stop = ctx.Event()
+    timetable_solver.CHILD_STOPS.add(stop)
+    if timetable_solver.STOP_REQUESTED.is_set():
+        stop.set()
+    try:
+        yield dict(timetable_solver.SOLVER_PARAMS, num_search_workers=workers), dict(timetable_solver.PROFILE_PARAMS), stop
+    finally:
+        timetable_solver.CHILD_STOPS.discard(stop)
+
+
+def init_child(solver_params: Dict[str, Any], profile_params: Dict[str, Any], stop: Any) -> None:
+    """Set up a child solve process (see child_solvers): its solver
+    parameters and profile, and a thread stopping its searches once the
+    parent's stop event is set."""
+    timetable_solver.SOLVER_PARAMS.clear()
+    timetable_solver.SOLVER_PARAMS.update(solver_params)
+    timetable_solver.PROFILE_PARAMS.clear()
+    timetable_solver.PROFILE_PARAMS.update(profile_params)
+
+    def watch() -> None:
+        stop.wait()
+        while True:
+            timetable_solver.stop_searches()
+            time.sleep(CHILD_STOP_POLL_SEC)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def load_stats(path: str = DEFAULT_STATS_PATH) -> Dict[str, Dict[str, float]]:
+    """config name -> {"runs", "wins", "win_sec"} (win_sec sums the winners' wall times)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _record(path: str, names: List[str], winner: Optional[str], elapsed: float) -> None:
+    stats = load_stats(path)
+    for name in names:
+        entry = stats.setdefault(name, {"runs": 0, "wins": 0, "win_sec": 0.0})
+        entry["runs"] += 1
+        if name == winner:
+            entry["wins"] += 1
+            entry["win_sec"] = round(entry["win_sec"] + elapsed, 3)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def select_configs(n: int, stats_path: Optional[str] = DEFAULT_STATS_PATH) -> List[SolverConfig]:
+    """The ``n`` default configurations with the best recorded win rate.
+
+    Win rates are Laplace-smoothed (an unseen configuration counts as 1/2,
+    so one lucky win does not dominate); ties keep DEFAULT_PORTFOLIO order,
+    so with no statistics this is the head of DEFAULT_PORTFOLIO.
+    """
+    stats = load_stats(stats_path) if stats_path else {}
+
+    def rank(item: Tuple[int, SolverConfig]) -> Tuple[float, int]:
+        position, config = item
+        entry = stats.get(config.name, {})
+        return (-(entry.get("wins", 0) + 1) / (entry.get("runs", 0) + 2), position)
+
+    return [config for _pos, config in sorted(enumerate(DEFAULT_PORTFOLIO), key=rank)[:n]]
+
+
+def _run_config(results: "multiprocessing.Queue", index: int, child: Tuple, params: Dict[str, Any], problem: ProblemData, time_limit_sec: float, solve_kwargs: Dict[str, Any]) -> None:
+    init_child(*child)
+    timetable_solver.SOLVER_PARAMS.update(params)
+    try:
+        result = solve(problem, time_limit_sec=time_limit_sec, **solve_kwargs)
+    except Exception as e:  # pragma: no cover - reported to the parent
+        results.put((index, None, repr(e)))
+        return
+    results.put((index, result, None))
+
+
+def _better(a: SolveResult, b: Optional[SolveResult]) -> bool:
+    if b is None or b.status not in ("OPTIMAL", "FEASIBLE"):
+        return a.status in ("OPTIMAL", "FEASIBLE")
+    if a.status not in ("OPTIMAL", "FEASIBLE"):
+        return False
+    if a.objective_value is None or b.objective_value is None:
+        return False
+    return a.objective_value < b.objective_value
+
+
+def solve_portfolio(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    configs: Optional[List[SolverConfig]] = None,
+    processes: Optional[int] = None,
+    stats_path: Optional[str] = DEFAULT_STATS_PATH,
+    **solve_kwargs: Any,
+) -> SolveResult:
+    """Race differently parameterised CP-SAT configurations in separate processes.
+
+    ``processes`` defaults to one per MIN_WORKERS workers of
+    worker_budget() (the cores granted to an API job, else the available
+    cores), and each process gets an equal share of them (at least
+    MIN_WORKERS) as CP-SAT workers. stop_searches() stops every process,
+    which then reports its best timetable so far. Without an objective the first
+    timetable found wins; with optimize_gaps the first OPTIMAL result (or
+    one whose ``stop`` criteria were met) wins, otherwise the best one once
+    every run has hit the time limit. The
+    remaining processes are terminated. Wins are recorded in ``stats_path``
+    (None to skip), which select_configs uses to pick the default portfolio.
+    ``solve_kwargs`` are passed to solve() (room_mode, engine, strategy, ...).
+    """
+    budget = worker_budget()
+    n = processes or max(1, budget // MIN_WORKERS)
+    configs = list(configs) if configs is not None else select_configs(n, stats_path)
+    configs = configs[:n]
+    workers = max(MIN_WORKERS, budget // len(configs))
+    stop_at_feasible = not solve_kwargs.get("optimize_gaps", False)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    best: Optional[SolveResult] = None
+    winner: Optional[int] = None
+    reported: Set[int] = set()
+    with child_solvers(ctx, workers) as child:
+        procs = [
+            ctx.Process(target=_run_config, args=(results, i, child, config.params(workers), problem, time_limit_sec, solve_kwargs), daemon=True)
+            for i, config in enumerate(configs)
+        ]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        deadline = start + time_limit_sec + STARTUP_GRACE_SEC
+        try:
+            while len(reported) < len(procs) and time.perf_counter() < deadline:
+                try:
+                    index, result, _error = results.get(timeout=0.5)
+                except queue.Empty:
+                    # A process killed (e.g. out of memory) never reports
+                    if not any(p.is_alive() for i, p in enumerate(procs) if i not in reported):
+                        break
+                    continue
+                reported.add(index)
+                if result is not None and _better(result, best):
+                    best, winner = result, index
+                    if result.status == "OPTIMAL" or stop_at_feasible or result.stop_reason in EARLY_STOPS:
+                        break
+        finally:
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+            for p in procs:
+                p.join()
+
+    elapsed = time.perf_counter() - start
+    if stats_path:
+        _record(stats_path, [c.name for c in configs], configs[winner].name if winner is not None else None, elapsed)
+    if best is None:
+        return SolveResult(
+            status="INFEASIBLE",
+            schedule_by_section={},
+            schedule_by_faculty={},
+            timeslots=problem.build_timeslots(),
+            objective_value=None,
+        )
+    return best
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, TextIO
+
+from ortools.sat.python import cp_model
+
+
+# Receives one progress event (a JSON-serialisable dict) at a time
+ProgressFn = Callable[[Dict[str, Any]], None]
+
+
+def model_event(model: cp_model.CpModel, build_sec: Optional[float] = None) -> Dict[str, Any]:
+    """Sent once a model is built, before its search starts."""
+    proto = model.Proto()
+    event: Dict[str, Any] = {
+        "event": "model",
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+    }
+    if build_sec is not None:
+        event["build_sec"] = round(build_sec, 3)
+    return event
+
+
+def done_event(result: Any, wall_sec: float) -> Dict[str, Any]:
+    """Sent once a solve() call has returned ``result``."""
+    return {
+        "event": "done",
+        "status": result.status,
+        "objective": result.objective_value,
+        "best_bound": result.best_bound,
+        "stop_reason": result.stop_reason,
+        "wall_sec": round(wall_sec, 3),
+    }
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """Send a "solution" event for every improving solution CP-SAT finds.
+
+    ``has_objective`` is False for pure feasibility models, whose objective
+    and bound are then reported as None rather than CP-SAT's 0.
+    """
+
+    def __init__(self, progress: ProgressFn, has_objective: bool) -> None:
+        super().__init__()
+        self.progress = progress
+        self.has_objective = has_objective
+        self.solutions = 0
+
+    def on_solution_callback(self) -> None:
+        self.solutions += 1
+        self.progress({
+            "event": "solution",
+            "solutions": self.solutions,
+            "elapsed_sec": round(self.WallTime(), 3),
+            "objective": self.ObjectiveValue() if self.has_objective else None,
+            "best_bound": self.BestObjectiveBound() if self.has_objective else None,
+        })
+
+
+def solve_with_progress(solver: cp_model.CpSolver, model: cp_model.CpModel, progress: Optional[ProgressFn], has_objective: bool) -> int:
+    """solver.Solve(model), reporting each solution to ``progress`` if given."""
+    if progress is None:
+        return solver.Solve(model)
+    return solver.Solve(model, ProgressCallback(progress, has_objective))
+
+
+class JsonLinesWriter:
+    """A ProgressFn writing one JSON object per line (flushed) to ``stream``;
+    each event gets a ``time`` field (seconds since the writer was created)."""
+
+    def __init__(self, stream: TextIO = sys.stdout) -> None:
+        self.stream = stream
+        self.start = time.perf_counter()
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        line = dict(event, time=round(time.perf_counter() - self.start, 3))
+        self.stream.write(json.dumps(line) + "\n")
+        self.stream.flush()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import CompiledProblem, compile_problem
+    from .hints import HintPlan, apply_hint, plan_hint
+    from .models import ProblemData
+    from .timetable_solver import BuiltModel, SolveResult, _extract_result, build_model, make_solver
+except ImportError:
+    from compiled import CompiledProblem, compile_problem
+    from hints import HintPlan, apply_hint, plan_hint
+    from models import ProblemData
+    from timetable_solver import BuiltModel, SolveResult, _extract_result, build_model, make_solver
+
+
+# Radii above this free the whole timetable (a warm-started full solve)
+MAX_RADIUS = 3
+
+
+@dataclass
+class RepairChanges:
+    """What changed since the base timetable was solved.
+
+    Changes already reflected in ``problem`` (new demands, reassigned
+    faculty) are detected by comparing it with the base timetable and need
+    not be listed here.
+    """
+    faculty_unavailable: Dict[str, List[int]] = field(default_factory=dict)  # faculty_id -> timeslot ids, [] = whole week
+    room_unavailable: Dict[str, List[int]] = field(default_factory=dict)  # room_id -> timeslot ids, [] = whole week
+    sections: List[str] = field(default_factory=list)  # sections to re-place entirely
+
+
+@dataclass
+class RepairResult:
+    result: SolveResult
+    radius: int  # neighbourhood radius that produced the result (MAX_RADIUS + 1 = full solve)
+    freed_classes: int  # time variables left free in the final attempt
+    moved_classes: int  # section timeslots whose class differs from the base timetable
+
+
+@dataclass
+class _Seeds:
+    pairs: Set[Tuple[str, str]]  # (section, course) pairs whose base classes are no longer valid
+    sections: Set[str]
+    faculty: Set[int]
+    days: Set[int]
+
+
+def _expand_blocked(cp: CompiledProblem, blocked: Dict[str, List[int]]) -> Dict[str, Set[int]]:
+    return {key: set(tids) if tids else set(cp.grid.non_break) for key, tids in blocked.items()}
+
+
+def _seed(cp: CompiledProblem, built: BuiltModel, plan: HintPlan, changes: RepairChanges, faculty_blocked: Dict[str, Set[int]]) -> _Seeds:
+    day_of = {t.timeslot_id: t.day_index for t in cp.timeslots}
+    blocked_f = {(cp.faculty_index[f], t) for f, tids in faculty_blocked.items() if f in cp.faculty_index for t in tids}
+
+    pairs = set(plan.dropped)
+    days: Set[int] = set()
+    # Sections missing from the base timetable, or listed explicitly, are re-placed entirely
+    redo_sections = {s for s in cp.section_ids if s not in plan.sections} | set(changes.sections)
+    for s_idx, c_idx in list(cp.scheduled_lectures()) + list(cp.scheduled_labs()):
+        if cp.section_ids[s_idx] in redo_sections:
+            pairs.add((cp.section_ids[s_idx], cp.course_ids[c_idx]))
+
+    for placed, is_lab in ((plan.lectures, False), (plan.lab_starts, True)):
+        for (s, c), starts in placed.items():
+            s_idx, c_idx = cp.section_index[s], cp.course_index[c]
+            f_idx = int(cp.faculty_of[s_idx, c_idx])
+            for start_t in starts:
+                tids = cp.lab_cover[int(cp.lab_block[s_idx, c_idx])][start_t] if is_lab else [start_t]
+                room_id = plan.block_room.get((s, cp.timeslot_to_block[start_t]))
+                room_lost = room_id is not None and (cp.timeslot_to_block[start_t], cp.room_index[room_id]) in built.blocked_block_rooms
+                if room_lost or any((f_idx, t) in blocked_f for t in tids):
+                    pairs.add((s, c))
+                    days.add(day_of[start_t])
+
+    for tids in faculty_blocked.values():
+        days.update(day_of[t] for t in tids)
+    for s, c in pairs:
+        days.update(day_of[t] for t in plan.lectures.get((s, c), []) + plan.lab_starts.get((s, c), []))
+
+    faculty = {int(cp.faculty_of[cp.section_index[s], cp.course_index[c]]) for s, c in pairs}
+    faculty.update(cp.faculty_index[f] for f in faculty_blocked if f in cp.faculty_index)
+    faculty.discard(-1)
+    return _Seeds(pairs=pairs, sections={s for s, _c in pairs}, faculty=faculty, days=days)
+
+
+def _neighbourhood(cp: CompiledProblem, seeds: _Seeds, radius: int) -> Tuple[Set[Tuple[str, str]], Set[Tuple[str, str]]]:
+    """(pairs free all week, pairs free only on the affected days) for ``radius``.
+
+    0: the invalid classes move anywhere; the other classes of the affected
+       sections and faculty may move within the affected days.
+    1: every class of the affected sections and faculty moves anywhere.
+    r: as 1, after r - 1 hops section -> its faculty -> their sections.
+    """
+    all_pairs = [(cp.section_ids[s_idx], cp.course_ids[c_idx], int(cp.faculty_of[s_idx, c_idx]))
+                 for s_idx, c_idx in set(cp.scheduled_lectures()) | set(cp.scheduled_labs())]
+    sections, faculty = set(seeds.sections), set(seeds.faculty)
+    for _ in range(max(0, radius - 1)):
+        faculty |= {f for s, _c, f in all_pairs if s in sections and f >= 0}
+        sections |= {s for s, _c, f in all_pairs if f in faculty}
+    touched = {(s, c) for s, c, f in all_pairs if s in sections or f in faculty}
+    if radius == 0:
+        return set(seeds.pairs), touched - seeds.pairs
+    return touched | seeds.pairs, set()
+
+
+def _restrict(built: BuiltModel, plan: HintPlan, free_all: Set[Tuple[str, str]], free_days: Set[Tuple[str, str]], days: Set[int]) -> Tuple[cp_model.CpModel, List[cp_model.IntVar]]:
+    """Clone the model with every time and room choice outside the neighbourhood
+    fixed to the base timetable. Returns the clone and its free time variables."""
+    cp = built.compiled
+    day_of = {t.timeslot_id: t.day_index for t in cp.timeslots}
+    lecture_set = {(s, c, t) for (s, c), tids in plan.lectures.items() for t in tids}
+    lab_set = {(s, c, t) for (s, c), tids in plan.lab_starts.items() for t in tids}
+    restricted = built.model.Clone()
+
+    def fix(var: cp_model.IntVar, value: int) -> None:
+        restricted.Add(restricted.GetBoolVarFromProtoIndex(var.Index()) == value)
+
+    free_vars: List[cp_model.IntVar] = []
+    free_blocks: Set[Tuple[str, int]] = set()  # (section, block) whose rooms may change
+    fixed_vars: Dict[Tuple[str, str, int], bool] = {}
+    for time_vars, placed in ((built.X_lec, lecture_set), (built.Y_lab_start, lab_set)):
+        for (s, c, t), var in time_vars.items():
+            if (s, c) in free_all or ((s, c) in free_days and day_of[t] in days):
+                free_vars.append(var)
+                free_blocks.add((s, cp.timeslot_to_block[t]))
+            else:
+                fix(var, int((s, c, t) in placed))
+                fixed_vars[(s, c, t)] = True
+
+    def base_room(s: str, t: int) -> Optional[str]:
+        return plan.block_room.get((s, cp.timeslot_to_block[t]))
+
+    for room_vars in (built.R_lec, built.R_lab_start):
+        for (s, c, t, rid), rv in room_vars.items():
+            if (s, c, t) in fixed_vars and (s, cp.timeslot_to_block[t]) not in free_blocks:
+                placed = (s, c, t) in lecture_set or (s, c, t) in lab_set
+                fix(rv, int(placed and base_room(s, t) == rid))
+    for (s, block_id, rid), v in built.SectionBlockRoom.items():
+        if s in plan.sections and (s, block_id) not in free_blocks:
+            fix(v, int(plan.block_room.get((s, block_id)) == rid))
+    for (s, block_id, k), v in built.SectionBlockClass.items():
+        if s in plan.sections and (s, block_id) not in free_blocks:
+            rid = plan.block_room.get((s, block_id))
+            fix(v, int(rid is not None and int(cp.room_class_of[cp.room_index[rid]]) == k))
+    return restricted, free_vars
+
+
+def _moved(cp: CompiledProblem, base: SolveResult, result: SolveResult) -> int:
+    moved = 0
+    for s, by_t in result.schedule_by_section.items():
+        before = base.schedule_by_section.get(s, {})
+        for t, (c, _f, _r, kind) in by_t.items():
+            prev = before.get(t)
+            if prev is None or prev[0] != c or prev[3] != kind:
+                moved += 1
+    return moved
+
+
+def repair(
+    problem: ProblemData,
+    base_result: SolveResult,
+    changes: Optional[RepairChanges] = None,
+    radius: int = 0,
+    time_limit_sec: float = 30,
+    room_mode: str = "compact",
+) -> RepairResult:
+    """Re-solve only a neighbourhood of a change to an existing timetable.
+
+    Every class outside the affected faculty, sections, days and rooms keeps
+    its time and room from ``base_result``. Inside the neighbourhood the
+    solver minimises the number of classes that move. If the neighbourhood
+    is infeasible (or not solved in its share of the time), the radius grows
+    by one, up to a warm-started full solve.
+    """
+    changes = changes or RepairChanges()
+    deadline = time.perf_counter() + time_limit_sec
+    cp = compile_problem(problem)
+    faculty_blocked = _expand_blocked(cp, changes.faculty_unavailable)
+    room_blocked = _expand_blocked(cp, changes.room_unavailable)
+    built = build_model(problem, room_mode=room_mode, blocked_faculty_slots=faculty_blocked, blocked_room_slots=room_blocked)
+    plan = plan_hint(cp, base_result.schedule_by_section)
+    seeds = _seed(cp, built, plan, changes, faculty_blocked)
+    time_vars = list(built.X_lec.items()) + list(built.Y_lab_start.items())
+    placed_before = {(s, c, t) for (s, c), tids in plan.lectures.items() for t in tids}
+    placed_before |= {(s, c, t) for (s, c), tids in plan.lab_starts.items() for t in tids}
+
+    for r in range(radius, MAX_RADIUS + 2):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        if r > MAX_RADIUS:
+            restricted, free_vars, share = built.model.Clone(), [v for _key, v in time_vars], remaining
+        else:
+            free_all, free_days = _neighbourhood(cp, seeds, r)
+            restricted, free_vars = _restrict(built, plan, free_all, free_days, seeds.days)
+            share = max(1.0, 0.5 * remaining)
+
+        apply_hint(dataclasses.replace(built, model=restricted), base_result)
+        # Keep the timetable stable: count free classes placed where the base had none
+        free_ids = {v.Index() for v in free_vars}
+        moves = [
+            restricted.GetBoolVarFromProtoIndex(v.Index())
+            for key, v in time_vars
+            if v.Index() in free_ids and key not in placed_before
+        ]
+        if moves:
+            restricted.Minimize(sum(moves))
+
+        solver = make_solver(min(share, remaining))
+        status = solver.Solve(restricted)
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            result = _extract_result(problem, built, solver, status)
+            # Minimised moves are not the timetable's objective
+            result.objective_value = None
+            return RepairResult(result=result, radius=r, freed_classes=len(free_vars), moved_classes=_moved(cp, base_result, result))
+
+    return RepairResult(
+        result=SolveResult(status="INFEASIBLE", schedule_by_section={}, schedule_by_faculty={}, timeslots=cp.timeslots),
+        radius=MAX_RADIUS + 1,
+        freed_classes=0,
+        moved_classes=0,
+    )
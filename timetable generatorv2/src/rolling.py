@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+try:
+    from .compiled import compile_problem
+    from .decompose import subproblem
+    from .models import ProblemData
+    from .timetable_solver import Assignment, SolveResult, _extract_result, build_model, make_solver, result_from_assignments, solve
+except ImportError:
+    from compiled import compile_problem
+    from decompose import subproblem
+    from models import ProblemData
+    from timetable_solver import Assignment, SolveResult, _extract_result, build_model, make_solver, result_from_assignments, solve
+
+
+GROUP_BY = ("auto", "group", "year", "prefix", "chunk")
+# Sections per group when grouping by chunk
+DEFAULT_CHUNK_SIZE = 20
+# Times a failed group may be merged into the group solved before it
+MAX_BACKTRACK = 2
+
+
+def _group_key(section_id: str, group: Optional[str], group_by: str) -> str:
+    if group_by == "group":
+        return group or ""
+    if group_by == "year":
+        m = re.match(r"\d+", section_id)
+        return m.group(0) if m else ""
+    # prefix: the id without its trailing number, e.g. 3A1 -> 3A
+    return re.sub(r"\d+$", "", section_id)
+
+
+def section_groups(problem: ProblemData, group_by: str = "auto", chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[List[str]]:
+    """Split sections into groups, heaviest weekly load first.
+
+    group_by "group" uses the optional ``group`` column of sections.csv,
+    "year" the leading digits of the section id, "prefix" the id without
+    its trailing number and "chunk" consecutive runs of ``chunk_size``
+    sections. "auto" takes the first of group, year, prefix that yields
+    more than one group, else chunk.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"Unknown group_by {group_by!r}; expected one of {GROUP_BY}")
+    cp = compile_problem(problem)
+    candidates = ["group", "year", "prefix"] if group_by == "auto" else [group_by]
+
+    groups: List[List[str]] = []
+    for key_by in candidates:
+        if key_by == "chunk":
+            break
+        by_key: Dict[str, List[str]] = defaultdict(list)
+        for s in problem.sections:
+            by_key[_group_key(s.section_id, s.group, key_by)].append(s.section_id)
+        groups = list(by_key.values())
+        if len(groups) > 1 or group_by != "auto":
+            break
+    if group_by == "chunk" or (group_by == "auto" and len(groups) <= 1):
+        ids = cp.section_ids
+        groups = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+    periods = cp.required_periods()
+    return sorted(groups, key=lambda g: -int(sum(periods[cp.section_index[s]] for s in g)))
+
+
+def _busy(problem: ProblemData, placed: List[Tuple[List[str], List[Assignment], Optional[int]]]) -> Tuple[Dict[str, Set[int]], Dict[str, Set[int]], Dict[str, int]]:
+    """Faculty and room timeslots used by the placed groups, and their P1 classes per faculty."""
+    cp = compile_problem(problem)
+    faculty_busy: Dict[str, Set[int]] = defaultdict(set)
+    room_busy: Dict[str, Set[int]] = defaultdict(set)
+    p1_used: Dict[str, int] = defaultdict(int)
+    for _sections, assignments, _obj in placed:
+        for s, c, _kind, tids, room_id in assignments:
+            f = cp.faculty_id_of(cp.section_index[s], cp.course_index[c])
+            for t in tids:
+                if f:
+                    faculty_busy[f].add(t)
+                    p1_used[f] += t in cp.grid.p1_timeslots
+                if room_id:
+                    room_busy[room_id].add(t)
+    return faculty_busy, room_busy, p1_used
+
+
+def _solve_group(
+    problem: ProblemData,
+    sections: List[str],
+    placed: List[Tuple[List[str], List[Assignment], Optional[int]]],
+    time_limit_sec: float,
+    room_mode: str,
+    optimize_gaps: bool,
+    gap_mode: str = "triple",
+) -> Optional[Tuple[List[Assignment], Optional[int]]]:
+    sub = subproblem(problem, sections)
+    faculty_busy, room_busy, p1_used = _busy(problem, placed)
+    built = build_model(
+        sub,
+        optimize_gaps=optimize_gaps,
+        room_mode=room_mode,
+        blocked_faculty_slots=dict(faculty_busy),
+        blocked_room_slots=dict(room_busy),
+        faculty_p1_used=dict(p1_used),
+        gap_mode=gap_mode,
+    )
+    solver = make_solver(time_limit_sec)
+    status = solver.Solve(built.model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    result = _extract_result(sub, built, solver, status)
+    assignments = [
+        (s, c, kind, [t], room_id)
+        for s, by_t in result.schedule_by_section.items()
+        for t, (c, _f, room_id, kind) in by_t.items()
+    ]
+    return assignments, result.objective_value
+
+
+def solve_rolling(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    optimize_gaps: bool = False,
+    room_mode: str = "compact",
+    group_by: str = "auto",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_backtrack: int = MAX_BACKTRACK,
+    gap_mode: str = "triple",
+) -> SolveResult:
+    """Solve section groups one after another (see section_groups).
+
+    Each group is its own model. The faculty and room timeslots used by the
+    groups already placed are blocked for it, so later groups fit around
+    earlier ones. If a group finds no timetable in its share of the time,
+    the group placed just before it is undone and both are re-solved as
+    one group, at most ``max_backtrack`` times; after that the whole
+    problem is solved directly, warm-started from the groups placed so far.
+    The result is FEASIBLE, not OPTIMAL: earlier groups never see later ones.
+    """
+    deadline = time.perf_counter() + time_limit_sec
+    cp = compile_problem(problem)
+    periods = cp.required_periods()
+
+    def weight(sections: List[str]) -> float:
+        return float(sum(periods[cp.section_index[s]] for s in sections)) or 1.0
+
+    pending = section_groups(problem, group_by, chunk_size)
+    placed: List[Tuple[List[str], List[Assignment], Optional[int]]] = []
+    backtracks = 0
+    while pending:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        sections = pending.pop(0)
+        # Budget proportional to the group's share of the periods still to place
+        share = remaining * weight(sections) / sum(weight(g) for g in [sections] + pending)
+        solved = _solve_group(problem, sections, placed, max(1.0, share), room_mode, optimize_gaps, gap_mode)
+        if solved is not None:
+            placed.append((sections, solved[0], solved[1]))
+            continue
+        if not placed or backtracks >= max_backtrack:
+            pending.insert(0, sections)
+            break
+        backtracks += 1
+        previous, _assignments, _obj = placed.pop()
+        pending.insert(0, previous + sections)
+
+    assignments = [a for _sections, group_assignments, _obj in placed for a in group_assignments]
+    if not pending:
+        objectives = [obj for _sections, _a, obj in placed]
+        objective = sum(objectives) if optimize_gaps and all(o is not None for o in objectives) else None
+        return result_from_assignments(problem, assignments, status="FEASIBLE", objective_value=objective)
+
+    hint = result_from_assignments(problem, assignments, status="IMPORTED")
+    return solve(
+        problem,
+        time_limit_sec=max(1, int(deadline - time.perf_counter())),
+        optimize_gaps=optimize_gaps,
+        room_mode=room_mode,
+        hint=hint,
+        gap_mode=gap_mode,
+    )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import AbstractSet, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+def match_rooms(requests: Sequence[Tuple[Hashable, Sequence[int]]]) -> Optional[Dict[Hashable, int]]:
+    """Maximum bipartite matching of requests to rooms (augmenting paths).
+
+    ``requests`` is a list of (key, allowed room indexes). Returns key -> room
+    index when every request can be given its own room, otherwise None.
+    Requests with the fewest options are matched first, which keeps the
+    augmenting paths short for the nested capacity sets typical of rooms.
+    """
+    order = sorted(range(len(requests)), key=lambda i: len(requests[i][1]))
+    room_owner: Dict[int, int] = {}  # room index -> request position
+
+    def try_assign(i: int, seen: set) -> bool:
+        for r_idx in requests[i][1]:
+            if r_idx in seen:
+                continue
+            seen.add(r_idx)
+            owner = room_owner.get(r_idx)
+            if owner is None or try_assign(owner, seen):
+                room_owner[r_idx] = i
+                return True
+        return False
+
+    for i in order:
+        if not try_assign(i, set()):
+            return None
+    return {requests[i][0]: r_idx for r_idx, i in room_owner.items()}
+
+
+def assign_class_rooms(
+    block_classes: Dict[int, List[Tuple[str, int]]],
+    room_classes: List[List[int]],
+    blocked_block_rooms: AbstractSet[Tuple[int, int]] = frozenset(),
+) -> Optional[Dict[Tuple[str, int], int]]:
+    """Turn per-block room-class choices into concrete rooms.
+
+    ``block_classes`` maps block_id -> [(section_id, class index)]. Each
+    section keeps the returned room for the whole block, so stickiness is
+    preserved. Rooms in ``blocked_block_rooms`` ((block_id, room index))
+    are not used in that block. Returns (section_id, block_id) -> room
+    index, or None if some block asks for more rooms of a class than exist.
+    """
+    assigned: Dict[Tuple[str, int], int] = {}
+    for block_id, choices in block_classes.items():
+        matched = match_rooms([
+            ((s, block_id), [r_idx for r_idx in room_classes[k] if (block_id, r_idx) not in blocked_block_rooms])
+            for s, k in sorted(choices)
+        ])
+        if matched is None:
+            return None
+        assigned.update(matched)
+    return assigned
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    from .models import ProblemData, RoomPolicy
+except ImportError:
+    from models import ProblemData, RoomPolicy
+
+
+def with_room_policy(problem: ProblemData, policy: RoomPolicy) -> ProblemData:
+    """``problem`` with another room policy (and no compiled form yet)."""
+    update = {"room_policy": policy}
+    copy = problem.model_copy(update=update) if hasattr(problem, "model_copy") else problem.copy(update=update)
+    copy._compiled = None
+    return copy
+
+
+def _candidates(
+    policy: RoomPolicy,
+    size: int,
+    preferred: Set[str],
+    pool: List[int],
+    room_capacity: np.ndarray,
+    room_building: List[Optional[str]],
+) -> List[int]:
+    fitting = [r_idx for r_idx in pool if room_capacity[r_idx] >= size]
+    if preferred:
+        in_preferred = [r_idx for r_idx in fitting if room_building[r_idx] in preferred]
+        if in_preferred:
+            fitting = in_preferred
+    if policy.max_candidates is not None and len(fitting) > policy.max_candidates:
+        # Rooms tied with the k-th best fit stay, so equal rooms stay interchangeable
+        cutoff = sorted(int(room_capacity[r_idx]) - size for r_idx in fitting)[policy.max_candidates - 1]
+        fitting = [r_idx for r_idx in fitting if room_capacity[r_idx] - size <= cutoff]
+    return fitting
+
+
+def section_room_candidates(
+    problem: ProblemData,
+    section_size: np.ndarray,
+    room_capacity: np.ndarray,
+    room_is_lab: np.ndarray,
+    needs_lectures: np.ndarray,
+    needs_labs: np.ndarray,
+) -> Tuple[List[List[int]], List[List[int]], List[List[int]]]:
+    """Room indexes per section under ``problem.room_policy``: the rooms a
+    block of lectures only may use, the rooms a block holding a lab may use,
+    and their union over the kinds the section has (its candidate rooms).
+
+    Every room needs the section's size. Then, per kind:
+      - separate_lab_rooms keeps non-lab rooms for lectures and lab rooms
+        for labs (lectures sharing a block with a lab follow its room);
+      - a section's preferred_buildings keep only the rooms in those
+        buildings, unless none of them fits;
+      - max_candidates keeps the k rooms with the least spare capacity,
+        plus any room tied with the k-th.
+    The default policy gives every fitting room for both kinds.
+    """
+    policy = problem.room_policy
+    rooms = problem.rooms or []
+    room_building = [r.building for r in rooms]
+    every_room = list(range(len(rooms)))
+    if policy.separate_lab_rooms:
+        lecture_pool = [r_idx for r_idx in every_room if not room_is_lab[r_idx]]
+        lab_pool = [r_idx for r_idx in every_room if room_is_lab[r_idx]]
+    else:
+        lecture_pool = lab_pool = every_room
+
+    lecture_rooms: List[List[int]] = []
+    lab_rooms: List[List[int]] = []
+    candidate_rooms: List[List[int]] = []
+    for s_idx, section in enumerate(problem.sections):
+        size, preferred = int(section_size[s_idx]), set(section.preferred_buildings)
+        lectures = _candidates(policy, size, preferred, lecture_pool, room_capacity, room_building)
+        labs = lectures if lab_pool is lecture_pool else _candidates(policy, size, preferred, lab_pool, room_capacity, room_building)
+        lecture_rooms.append(lectures)
+        lab_rooms.append(labs)
+        if labs is lectures:
+            candidate_rooms.append(lectures)
+        else:
+            # A kind the section never has adds no candidates
+            used = (lectures if needs_lectures[s_idx] else []) + (labs if needs_labs[s_idx] else [])
+            candidate_rooms.append(sorted(set(used)))
+    return lecture_rooms, lab_rooms, candidate_rooms
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from ortools.sat.python import cp_model
+
+try:
+    from .progress import ProgressCallback, ProgressFn
+except ImportError:
+    from progress import ProgressCallback, ProgressFn
+
+
+# Why a search ended (SolveResult.stop_reason)
+STOP_REASONS = (
+    "optimal",            # proven optimal objective
+    "feasible",           # no objective: the first timetable ends the search
+    "infeasible",         # proven infeasible
+    "time_limit",         # time_limit_sec ran out
+    "cancelled",          # stop_searches() (a cancelled API job)
+    "greedy",             # no search: built by src/greedy.py
+    "relative_gap",       # StopCriteria.relative_gap reached
+    "no_improvement",     # StopCriteria.no_improvement_sec without a better objective
+    "target_objective",   # StopCriteria.target_objective reached
+    "first_feasible",     # StopCriteria.first_feasible
+    "feasibility_time",   # StopCriteria.feasibility_sec without a timetable
+    "optimization_time",  # StopCriteria.optimization_sec after the first timetable
+)
+
+# Reasons meaning a StopCriteria was met with a timetable in hand
+EARLY_STOPS = ("relative_gap", "no_improvement", "target_objective", "first_feasible", "optimization_time")
+
+# How often the no-improvement and budget timers are checked
+POLL_SEC = 0.05
+
+
+@dataclass
+class StopCriteria:
+    """Early-stop controls for one CP-SAT search, on top of its time limit.
+
+    The search stops once any criterion is met and keeps its best timetable
+    so far. ``relative_gap`` is (objective - bound) / max(1, objective), and
+    it, ``no_improvement_sec``, ``target_objective`` and
+    ``optimization_sec`` only apply to models with an objective
+    (optimize_gaps). ``feasibility_sec`` is the budget for the first
+    timetable and ``optimization_sec`` the budget after it.
+    """
+    relative_gap: Optional[float] = None
+    no_improvement_sec: Optional[float] = None
+    target_objective: Optional[int] = None
+    first_feasible: bool = False
+    feasibility_sec: Optional[float] = None
+    optimization_sec: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        for name in ("relative_gap", "no_improvement_sec", "feasibility_sec", "optimization_sec"):
+            value = getattr(self, name)
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must be >= 0, got {value}")
+
+    def active(self) -> bool:
+        return self != StopCriteria()
+
+
+class StopMonitor(ProgressCallback):
+    """Runs one search: reports solutions to ``progress`` (if given) and
+    stops it once a StopCriteria is met.
+
+    The objective criteria are checked on every improving solution (the
+    relative gap also by CP-SAT itself, as relative_gap_limit, when the
+    bound moves) and the timers by a thread polling every POLL_SEC.
+    """
+
+    def __init__(self, stop: Optional[StopCriteria], progress: Optional[ProgressFn], has_objective: bool) -> None:
+        super().__init__(progress, has_objective)
+        self.stop = stop or StopCriteria()
+        self.reason: Optional[str] = None
+        self._solver: Optional[cp_model.CpSolver] = None
+        self._start = 0.0
+        self._first_at: Optional[float] = None
+        self._improved_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _stop(self, reason: str) -> None:
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+                self._solver.StopSearch()
+
+    def on_solution_callback(self) -> None:
+        if self.progress is not None:
+            super().on_solution_callback()
+        now = time.perf_counter()
+        self._improved_at = now
+        if self._first_at is None:
+            self._first_at = now
+        if self.stop.first_feasible:
+            self._stop("first_feasible")
+        elif not self.has_objective:
+            return
+        objective = self.ObjectiveValue()
+        if self.stop.target_objective is not None and objective <= self.stop.target_objective:
+            self._stop("target_objective")
+        elif self.stop.relative_gap is not None and objective - self.BestObjectiveBound() <= self.stop.relative_gap * max(1.0, abs(objective)):
+            self._stop("relative_gap")
+
+    def _watch(self, finished: threading.Event) -> None:
+        stop = self.stop
+        while not finished.wait(POLL_SEC):
+            now = time.perf_counter()
+            if self._first_at is None:
+                if stop.feasibility_sec is not None and now - self._start >= stop.feasibility_sec:
+                    self._stop("feasibility_time")
+            elif self.has_objective:
+                if stop.optimization_sec is not None and now - self._first_at >= stop.optimization_sec:
+                    self._stop("optimization_time")
+                elif stop.no_improvement_sec is not None and now - self._improved_at >= stop.no_improvement_sec:
+                    self._stop("no_improvement")
+
+    def solve(self, solver: cp_model.CpSolver, model: cp_model.CpModel) -> int:
+        if self.progress is None and not self.stop.active():
+            return solver.Solve(model)
+        if self.has_objective and self.stop.relative_gap is not None:
+            solver.parameters.relative_gap_limit = float(self.stop.relative_gap)
+        self._solver = solver
+        self._start = time.perf_counter()
+        finished = threading.Event()
+        timers = (self.stop.feasibility_sec, self.stop.optimization_sec, self.stop.no_improvement_sec)
+        watcher = threading.Thread(target=self._watch, args=(finished,), daemon=True)
+        if any(t is not None for t in timers):
+            watcher.start()
+        try:
+            return solver.Solve(model, self)
+        finally:
+            finished.set()
+            if watcher.is_alive():
+                watcher.join()
+
+    def stop_reason(self, solver: cp_model.CpSolver, status: int, cancelled: bool = False) -> str:
+        """Why the search that returned ``status`` ended."""
+        if status in (cp_model.INFEASIBLE, cp_model.MODEL_INVALID):
+            return "infeasible"
+        if status == cp_model.OPTIMAL:
+            if not self.has_objective:
+                return "feasible"
+            # CP-SAT reports OPTIMAL when relative_gap_limit stops it
+            if solver.ObjectiveValue() > solver.BestObjectiveBound():
+                return "relative_gap"
+            return "optimal"
+        if self.reason is not None:
+            return self.reason
+        return "cancelled" if cancelled else "time_limit"
@@ -1,17 +1,47 @@
 from __future__ import annotations
 
+import threading
+import time
+import weakref
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from ortools.sat.python import cp_model
 
 try:
-    from .feasibility import compute_valid_lab_starts
+    from .compiled import CompiledProblem, compile_problem
     from .models import ProblemData, Timeslot
+    from .progress import ProgressFn, model_event
+    from .room_assignment import assign_class_rooms
+    from .stopping import StopCriteria, StopMonitor
 except ImportError:
-    from feasibility import compute_valid_lab_starts
+    from compiled import CompiledProblem, compile_problem
     from models import ProblemData, Timeslot
+    from progress import ProgressFn, model_event
+    from room_assignment import assign_class_rooms
+    from stopping import StopCriteria, StopMonitor
+
+if TYPE_CHECKING:
+    from .cache import ModelCache
+
+
+# CP-SAT random seed used by make_solver (part of result cache keys)
+RANDOM_SEED = 1
+
+# SatParameters overriding make_solver's defaults in this process (set by
+# portfolio workers); enum fields are given by name, e.g. "FIXED_SEARCH"
+SOLVER_PARAMS: Dict[str, Any] = {}
+# SatParameters of the solver profile in use (src/tuning.py), applied
+# before SOLVER_PARAMS
+PROFILE_PARAMS: Dict[str, Any] = {}
+
+# Set by stop_searches(); solvers made afterwards get no search time
+STOP_REQUESTED = threading.Event()
+_ACTIVE_SOLVERS: "weakref.WeakSet[cp_model.CpSolver]" = weakref.WeakSet()
+# multiprocessing Events of the child processes solving for this one
+# (src/portfolio.py child_solvers); stop_searches() sets them too
+CHILD_STOPS: set = set()
 
 
 @dataclass
@@ -23,6 +53,26 @@ class SolveResult:
     objective_value: Optional[int] = None
     available_rooms: Dict[int, List[str]] = None  # timeslot_id -> list of available room_ids
     available_faculty: Dict[int, List[str]] = None  # timeslot_id -> list of available faculty_ids
+    best_bound: Optional[int] = None  # CP-SAT's lower bound on the objective, with objective_value
+    stop_reason: Optional[str] = None  # why the (last) search ended, see src/stopping.py
+
+
+@dataclass
+class BuiltModel:
+    """A CP-SAT model plus the variable maps needed to decode a solution."""
+    model: cp_model.CpModel
+    compiled: CompiledProblem
+    timeslots: List[Timeslot]
+    X_lec: Dict[Tuple[str, str, int], cp_model.IntVar]
+    Y_lab_start: Dict[Tuple[str, str, int], cp_model.IntVar]
+    R_lec: Dict[Tuple[str, str, int, str], cp_model.IntVar]
+    R_lab_start: Dict[Tuple[str, str, int, str], cp_model.IntVar]
+    SectionBlockRoom: Dict[Tuple[str, int, str], cp_model.IntVar]
+    SectionBlockActive: Dict[Tuple[str, int], cp_model.IntVar]  # (section_id, block_id), compact/classes room modes
+    lab_block_size: Dict[Tuple[str, str], int]  # (section_id, course_id) -> effective block size
+    objective_terms: List[cp_model.IntVar] = field(default_factory=list)
+    SectionBlockClass: Dict[Tuple[str, int, int], cp_model.IntVar] = field(default_factory=dict)  # (section_id, block_id, class), classes room mode only
+    blocked_block_rooms: Set[Tuple[int, int]] = field(default_factory=set)  # (block_id, room index) unusable for the whole block
 
 
 def _identify_continuous_blocks(timeslots: List[Timeslot]) -> Dict[int, List[Tuple[int, List[int]]]]:
@@ -32,7 +82,7 @@ def _identify_continuous_blocks(timeslots: List[Timeslot]) -> Dict[int, List[Tup
     by_day: Dict[int, List[Timeslot]] = defaultdict(list)
     for t in timeslots:
         by_day[t.day_index].append(t)
-    
+
     block_counter = 0
     for day_idx, day_slots in by_day.items():
         day_slots = sorted(day_slots, key=lambda x: x.period_index)
@@ -51,276 +101,624 @@ def _identify_continuous_blocks(timeslots: List[Timeslot]) -> Dict[int, List[Tup
     return blocks_by_day
 
 
-def solve(problem: ProblemData, time_limit_sec: int = 60, optimize_gaps: bool = False) -> SolveResult:
+ROOM_MODES = ("per_slot", "compact", "classes")
+GAP_MODES = ("triple", "span")
+# Internal room mode of the two-stage pipeline: rooms are left out of the model
+DEFERRED_ROOMS = "deferred"
+
+
+def build_model(
+    problem: ProblemData,
+    optimize_gaps: bool = False,
+    room_mode: str = "per_slot",
+    blocked_faculty_slots: Optional[Dict[str, Iterable[int]]] = None,
+    blocked_room_slots: Optional[Dict[str, Iterable[int]]] = None,
+    faculty_p1_used: Optional[Dict[str, int]] = None,
+    gap_mode: str = "triple",
+) -> BuiltModel:
+    """Build the time-indexed CP-SAT model.
+
+    Every variable is registered in inverted indexes as it is created
+    (section/timeslot, faculty/timeslot, timeslot/room), so each clash and
+    occupancy constraint is emitted in a single pass over those indexes and
+    build time grows with the number of variables rather than with
+    rooms x timeslots x variables.
+
+    room_mode:
+      - "per_slot": an R_lec / R_lab_start boolean per class and candidate
+        room, linked to the section's block room (default).
+      - "compact": no per-slot room variables. A section that has any class
+        in a block is "active" there and holds its SectionBlockRoom for the
+        whole block; rooms are exclusive per block.
+      - "classes": like "compact", but rooms with the same capacity, lab
+        flag and building form one class and the model only picks a class per active
+        section and block, capped by the class size. Interchangeable rooms
+        then carry no symmetric copies of the same solution; concrete rooms
+        are assigned after the solve by per-block matching.
+      - DEFERRED_ROOMS ("deferred"): no room decisions at all, only the
+        aggregate cut "sections with a class at t that need capacity >= v
+        <= rooms with capacity >= v" per timeslot. Used by the two-stage
+        pipeline (src/pipeline.py), which assigns rooms afterwards.
+
+    Room variables exist only for the section's candidate rooms under the
+    problem's room_policy (src/room_policy.py). With separate_lab_rooms, a
+    block holding a lab takes one of the section's lab rooms and any other
+    block a lecture room, in every room mode.
+
+    blocked_faculty_slots / blocked_room_slots map faculty or room ids to
+    timeslot ids they cannot be used in. No variable is created for a class
+    whose faculty is blocked in any period it covers, nor for a per-slot
+    room at a blocked timeslot. Block-level room choices (compact, classes,
+    deferred) leave out a room blocked anywhere in the block. The
+    problem's faculty_unavailability / room_unavailability rows are blocked
+    the same way, so a tighter input gives a smaller model.
+
+    faculty_p1_used counts P1 classes a faculty already teaches outside
+    this model; they come off the weekly P1 limit.
+
+    gap_mode (with optimize_gaps):
+      - "triple": an occupancy boolean per section and slot, and a gap
+        boolean per three adjacent slots that is 1 when the middle one is
+        free between two classes. Counts single-period gaps only (default).
+      - "span": first/last occupied slot integers per section and day, and
+        idle = last - first + 1 - classes that day. Counts every idle
+        period with three variables per section and day and no extra
+        booleans.
+    """
+    if room_mode not in ROOM_MODES and room_mode != DEFERRED_ROOMS:
+        raise ValueError(f"Unknown room_mode {room_mode!r}; expected one of {ROOM_MODES}")
+    if gap_mode not in GAP_MODES:
+        raise ValueError(f"Unknown gap_mode {gap_mode!r}; expected one of {GAP_MODES}")
     model = cp_model.CpModel()
 
-    timeslots = problem.build_timeslots()
-    T = [t.timeslot_id for t in timeslots]
-    T_non_break = [t.timeslot_id for t in timeslots if not t.is_break]
-    timeslot_by_id = {t.timeslot_id: t for t in timeslots}
-    
-    # Identify continuous blocks for room stickiness
-    blocks_by_day = _identify_continuous_blocks(timeslots)
-    all_blocks = [(day, blk_id, tids) for day, blks in blocks_by_day.items() for blk_id, tids in blks]
+    cp = compile_problem(problem)
+    timeslots = cp.timeslots
+    T_non_break = cp.grid.non_break
+    timeslot_to_block = cp.timeslot_to_block
+    P1_timeslots = cp.grid.p1_timeslots
+    section_ids = cp.section_ids
+    course_ids = cp.course_ids
+    room_ids = cp.room_ids
 
-    section_ids = problem.section_ids()
-    faculty_ids = problem.faculty_ids()
-    course_ids = problem.course_ids()
-    course_by_id = problem.course_by_id()
-    req_map = problem.section_course_requirements_map()
-    fac_map = problem.faculty_assignment_map()
+    # Unavailability from the inputs prunes variables exactly like blocked slots
+    faculty_blocked: Set[Tuple[int, int]] = cp.faculty_unavailable | {
+        (cp.faculty_index[f], t) for f, tids in (blocked_faculty_slots or {}).items() if f in cp.faculty_index for t in tids
+    }
+    room_blocked: Set[Tuple[int, int]] = cp.room_unavailable | {
+        (t, cp.room_index[r]) for r, tids in (blocked_room_slots or {}).items() if r in cp.room_index for t in tids
+    }
+    blocked_block_rooms = {(timeslot_to_block[t], r_idx) for t, r_idx in room_blocked if t in timeslot_to_block}
 
     # Variables
     X_lec: Dict[Tuple[str, str, int], cp_model.IntVar] = {}
     Y_lab_start: Dict[Tuple[str, str, int], cp_model.IntVar] = {}
+    lab_block_of: Dict[Tuple[str, str], int] = {}
+
+    # Inverted indexes filled while variables are created
+    section_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (section, t) -> vars covering t
+    faculty_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (faculty, t) -> vars covering t
+    faculty_p1_terms: Dict[int, List[cp_model.IntVar]] = defaultdict(list)  # faculty -> vars starting in P1
+    room_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (t, room) -> room vars covering t
+    block_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (section, block) -> vars in block
+    block_lab_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (section, block) -> lab starts in block
 
     # Rooms
-    rooms = problem.rooms or []
-    have_rooms = len(rooms) > 0
-    candidate_rooms_by_section: Dict[str, List[str]] = {}
-    if have_rooms:
-        room_by_id = {r.room_id: r for r in rooms}
-        for s_obj in problem.sections:
-            s = s_obj.section_id
-            # All rooms with sufficient capacity (both lecture and lab rooms)
-            candidate_rooms_by_section[s] = [r.room_id for r in rooms if r.capacity >= s_obj.num_students]
+    have_rooms = cp.have_rooms
+    per_slot_rooms = have_rooms and room_mode == "per_slot"
     R_lec: Dict[Tuple[str, str, int, str], cp_model.IntVar] = {}
     R_lab_start: Dict[Tuple[str, str, int, str], cp_model.IntVar] = {}
-    
+
     # Block-level room assignment for stickiness (ONE room per section per block)
     # Section stays in same room for ALL classes (lectures and labs) within block
     SectionBlockRoom: Dict[Tuple[str, int, str], cp_model.IntVar] = {}  # (section_id, block_id, room_id)
-    if have_rooms:
-        for s in section_ids:
-            for day_idx, blocks in blocks_by_day.items():
+    SectionBlockActive: Dict[Tuple[str, int], cp_model.IntVar] = {}
+    SectionBlockClass: Dict[Tuple[str, int, int], cp_model.IntVar] = {}  # (section_id, block_id, class)
+    if have_rooms and room_mode != "classes":
+        for s_idx, s in enumerate(section_ids):
+            candidates = cp.candidate_rooms[s_idx]
+            for day_idx, blocks in cp.blocks_by_day.items():
                 for block_id, block_tids in blocks:
+                    # Per-slot rooms skip blocked slots themselves; block rooms skip rooms blocked in the block
+                    block_candidates = candidates if per_slot_rooms else [r for r in candidates if (block_id, r) not in blocked_block_rooms]
                     # Section can be assigned to ONE room per block (for both lectures and labs)
-                    for room_id in candidate_rooms_by_section.get(s, []):
+                    for r_idx in block_candidates:
+                        room_id = room_ids[r_idx]
                         SectionBlockRoom[(s, block_id, room_id)] = model.NewBoolVar(f"secblkroom_s{s}_b{block_id}_r{room_id}")
                     # Exactly one room per section per block (if section has classes in that block)
-                    if candidate_rooms_by_section.get(s):
-                        model.Add(sum(SectionBlockRoom[(s, block_id, rid)] for rid in candidate_rooms_by_section[s]) <= 1)
-
-    valid_starts_cache: Dict[int, List[int]] = {}
+                    if block_candidates:
+                        model.Add(sum(SectionBlockRoom[(s, block_id, room_ids[r_idx])] for r_idx in block_candidates) <= 1)
 
     # Create variables only where needed
-    for s in section_ids:
-        for c in course_ids:
-            defaults = course_by_id[c]
-            r = req_map.get((s, c))
-            weekly_lectures = defaults.lecture_periods_per_week if r is None else r.weekly_lectures
-            weekly_lab_sessions = (defaults.lab_sessions_per_week if defaults.is_lab else 0) if r is None else r.weekly_lab_sessions
-            lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
+    for s_idx, s in enumerate(section_ids):
+        candidates = cp.candidate_rooms[s_idx] if per_slot_rooms else []
+        lab_candidates = cp.lab_rooms[s_idx] if per_slot_rooms else []
+        for c_idx, c in enumerate(course_ids):
+            weekly_lectures = int(cp.lectures[s_idx, c_idx])
+            weekly_lab_sessions = int(cp.lab_sessions[s_idx, c_idx])
+            lab_block_size = int(cp.lab_block[s_idx, c_idx])
+            f_idx = int(cp.faculty_of[s_idx, c_idx])
 
             if weekly_lectures > 0:
+                lec_vars: List[cp_model.IntVar] = []
                 for t in T_non_break:
-                    X_lec[(s, c, t)] = model.NewBoolVar(f"lec_s{s}_c{c}_t{t}")
-                    if have_rooms and candidate_rooms_by_section.get(s):
-                        for room_id in candidate_rooms_by_section[s]:
-                            R_lec[(s, c, t, room_id)] = model.NewBoolVar(f"rlec_s{s}_c{c}_t{t}_r{room_id}")
-
-            if weekly_lab_sessions > 0 and lab_block_size > 0:
-                if lab_block_size not in valid_starts_cache:
-                    starts_by_day = compute_valid_lab_starts(timeslots, lab_block_size)
-                    valid_starts_cache[lab_block_size] = [ts for v in starts_by_day.values() for ts in v]
-                for start_t in valid_starts_cache[lab_block_size]:
-                    Y_lab_start[(s, c, start_t)] = model.NewBoolVar(f"labstart_s{s}_c{c}_t{start_t}_b{lab_block_size}")
-                    if have_rooms and candidate_rooms_by_section.get(s):
-                        for room_id in candidate_rooms_by_section[s]:
-                            R_lab_start[(s, c, start_t, room_id)] = model.NewBoolVar(f"rlab_s{s}_c{c}_t{start_t}_b{lab_block_size}_r{room_id}")
-
-    # Requirements constraints
-    for s in section_ids:
-        for c in course_ids:
-            defaults = course_by_id[c]
-            r = req_map.get((s, c))
-            weekly_lectures = defaults.lecture_periods_per_week if r is None else r.weekly_lectures
-            weekly_lab_sessions = (defaults.lab_sessions_per_week if defaults.is_lab else 0) if r is None else r.weekly_lab_sessions
-            lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-
-            if weekly_lectures > 0:
-                lec_vars = [X_lec[(s, c, t)] for t in T_non_break if (s, c, t) in X_lec]
+                    if (f_idx, t) in faculty_blocked:
+                        continue
+                    x = model.NewBoolVar(f"lec_s{s}_c{c}_t{t}")
+                    X_lec[(s, c, t)] = x
+                    lec_vars.append(x)
+                    section_terms[(s_idx, t)].append(x)
+                    block_terms[(s_idx, timeslot_to_block[t])].append(x)
+                    if f_idx >= 0:
+                        faculty_terms[(f_idx, t)].append(x)
+                        if t in P1_timeslots:
+                            faculty_p1_terms[f_idx].append(x)
+                    if candidates:
+                        room_vars: List[cp_model.IntVar] = []
+                        block_id = timeslot_to_block.get(t)
+                        for r_idx in candidates:
+                            if (t, r_idx) in room_blocked:
+                                continue
+                            room_id = room_ids[r_idx]
+                            rv = model.NewBoolVar(f"rlec_s{s}_c{c}_t{t}_r{room_id}")
+                            R_lec[(s, c, t, room_id)] = rv
+                            room_vars.append(rv)
+                            room_terms[(t, r_idx)].append(rv)
+                            # STICKINESS: If lecture uses this room, the section-block must also use this room
+                            if block_id is not None:
+                                model.AddImplication(rv, SectionBlockRoom[(s, block_id, room_id)])
+                        model.Add(sum(room_vars) == x)
+                # Requirements constraint
                 model.Add(sum(lec_vars) == weekly_lectures)
 
             if weekly_lab_sessions > 0 and lab_block_size > 0:
-                lab_vars = [Y_lab_start[(s, c, t)] for t in T if (s, c, t) in Y_lab_start]
+                lab_block_of[(s, c)] = lab_block_size
+                cover = cp.lab_cover[lab_block_size]
+                lab_vars: List[cp_model.IntVar] = []
+                for start_t in cp.lab_starts[lab_block_size]:
+                    covered = cover[start_t]
+                    if any((f_idx, tid) in faculty_blocked for tid in covered):
+                        continue
+                    y = model.NewBoolVar(f"labstart_s{s}_c{c}_t{start_t}_b{lab_block_size}")
+                    Y_lab_start[(s, c, start_t)] = y
+                    lab_vars.append(y)
+                    block_terms[(s_idx, timeslot_to_block[start_t])].append(y)
+                    block_lab_terms[(s_idx, timeslot_to_block[start_t])].append(y)
+                    for tid in covered:
+                        section_terms[(s_idx, tid)].append(y)
+                        if f_idx >= 0:
+                            faculty_terms[(f_idx, tid)].append(y)
+                    if f_idx >= 0 and start_t in P1_timeslots:
+                        faculty_p1_terms[f_idx].append(y)
+                    if lab_candidates:
+                        room_vars = []
+                        block_id = timeslot_to_block.get(start_t)
+                        for r_idx in lab_candidates:
+                            if any((tid, r_idx) in room_blocked for tid in covered):
+                                continue
+                            room_id = room_ids[r_idx]
+                            rv = model.NewBoolVar(f"rlab_s{s}_c{c}_t{start_t}_b{lab_block_size}_r{room_id}")
+                            R_lab_start[(s, c, start_t, room_id)] = rv
+                            room_vars.append(rv)
+                            for tid in covered:
+                                room_terms[(tid, r_idx)].append(rv)
+                            # STICKINESS: If lab uses this room, the section-block must also use this room (same as lectures)
+                            if block_id is not None:
+                                model.AddImplication(rv, SectionBlockRoom[(s, block_id, room_id)])
+                        model.Add(sum(room_vars) == y)
+                # Requirements constraint
                 model.Add(sum(lab_vars) == weekly_lab_sessions)
 
-    # Precompute coverage mapping for labs
-    day_period_to_tid: Dict[Tuple[int, int], int] = {(t.day_index, t.period_index): t.timeslot_id for t in timeslots}
-    cover_by_block_size: Dict[int, Dict[int, List[int]]] = {}
-    for block_size, start_list in valid_starts_cache.items():
-        cover_map: Dict[int, List[int]] = defaultdict(list)
-        for start_t in start_list:
-            start_ts = timeslot_by_id[start_t]
-            for k in range(block_size):
-                tid = day_period_to_tid[(start_ts.day_index, start_ts.period_index + k)]
-                cover_map[tid].append(start_t)
-        cover_by_block_size[block_size] = cover_map
+    # Compact rooms: the block room is chosen iff the section is active in the block,
+    # and each room hosts at most one section per block. In classes mode the choice
+    # is a room class instead, and a class hosts at most as many sections as it has rooms.
+    if have_rooms and room_mode in ("compact", "classes"):
+        use_classes = room_mode == "classes"
+        # Rooms of each class still usable in each block
+        class_capacity: Dict[Tuple[int, int], int] = {
+            (block_id, k): sum(1 for r_idx in members if (block_id, r_idx) not in blocked_block_rooms)
+            for block_id in set(timeslot_to_block.values())
+            for k, members in enumerate(cp.room_classes)
+        }
+        block_room_terms: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (block, room or class) -> vars
+        for s_idx, s in enumerate(section_ids):
+            options = cp.candidate_room_classes[s_idx] if use_classes else cp.candidate_rooms[s_idx]
+            if not options:
+                continue
+            for blocks in cp.blocks_by_day.values():
+                for block_id, _ in blocks:
+                    terms = block_terms.get((s_idx, block_id))
+                    if use_classes:
+                        if not terms:
+                            continue
+                        block_options = [k for k in options if class_capacity[(block_id, k)] > 0]
+                        room_vars = []
+                        for k in block_options:
+                            kv = model.NewBoolVar(f"secblkclass_s{s}_b{block_id}_k{k}")
+                            SectionBlockClass[(s, block_id, k)] = kv
+                            room_vars.append(kv)
+                    else:
+                        block_options = [r_idx for r_idx in options if (block_id, r_idx) not in blocked_block_rooms]
+                        room_vars = [SectionBlockRoom[(s, block_id, room_ids[r_idx])] for r_idx in block_options]
+                    for key, rv in zip(block_options, room_vars):
+                        block_room_terms[(block_id, key)].append(rv)
+                    if not terms:
+                        model.Add(sum(room_vars) == 0)
+                        continue
+                    active = model.NewBoolVar(f"active_s{s}_b{block_id}")
+                    SectionBlockActive[(s, block_id)] = active
+                    for v in terms:
+                        model.AddImplication(v, active)
+                    model.AddBoolOr(terms).OnlyEnforceIf(active)
+                    model.Add(sum(room_vars) == active)
+        for (block_id, key), terms in block_room_terms.items():
+            cap = class_capacity[(block_id, key)] if use_classes else 1
+            if len(terms) > cap:
+                model.Add(sum(terms) <= cap)
+
+    # Room policy with separate lab rooms: a block holding a lab takes one of the
+    # section's lab rooms, and a room only labs may use needs a lab in the block
+    if have_rooms and room_mode != DEFERRED_ROOMS and cp.splits_room_kinds:
+        for s_idx, s in enumerate(section_ids):
+            lecture_options, lab_options = set(cp.lecture_rooms[s_idx]), set(cp.lab_rooms[s_idx])
+            if lecture_options == lab_options:
+                continue
+            if room_mode == "classes":
+                lecture_options = {int(cp.room_class_of[r_idx]) for r_idx in lecture_options}
+                lab_options = {int(cp.room_class_of[r_idx]) for r_idx in lab_options}
+            for blocks in cp.blocks_by_day.values():
+                for block_id, _ in blocks:
+                    if room_mode == "classes":
+                        choices = {k: SectionBlockClass.get((s, block_id, k)) for k in cp.candidate_room_classes[s_idx]}
+                    else:
+                        choices = {r_idx: SectionBlockRoom.get((s, block_id, room_ids[r_idx])) for r_idx in cp.candidate_rooms[s_idx]}
+                    choices = {key: var for key, var in choices.items() if var is not None}
+                    labs = block_lab_terms.get((s_idx, block_id), [])
+                    for key, var in choices.items():
+                        if key not in lecture_options:
+                            model.Add(var <= sum(labs))
+                    lab_vars = [var for key, var in choices.items() if key in lab_options]
+                    for y in labs:
+                        model.Add(sum(lab_vars) >= y)
 
-    # No overlaps per section per timeslot
-    for s in section_ids:
+    # Deferred rooms: candidate rooms are nested by capacity, so per timeslot the
+    # sections needing capacity >= v may not outnumber the rooms that fit them
+    if have_rooms and room_mode == DEFERRED_ROOMS:
+        thresholds = sorted({int(cp.section_size[s_idx]) for s_idx in range(len(section_ids)) if cp.candidate_rooms[s_idx]})
         for t in T_non_break:
-            lec_terms = [X_lec[(s, c, t)] for c in course_ids if (s, c, t) in X_lec]
-            lab_terms: List[cp_model.IntVar] = []
-            for c in course_ids:
-                defaults = course_by_id[c]
-                r = req_map.get((s, c))
-                weekly_lab_sessions = (defaults.lab_sessions_per_week if defaults.is_lab else 0) if r is None else r.weekly_lab_sessions
-                lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-                if weekly_lab_sessions > 0 and lab_block_size > 0 and t in cover_by_block_size.get(lab_block_size, {}):
-                    for start_t in cover_by_block_size[lab_block_size][t]:
-                        var = Y_lab_start.get((s, c, start_t))
-                        if var is not None:
-                            lab_terms.append(var)
-            model.Add(sum(lec_terms + lab_terms) <= 1)
+            usable = [r_idx for r_idx in range(len(room_ids)) if (timeslot_to_block[t], r_idx) not in blocked_block_rooms]
+            rooms_fitting = {v: int((cp.room_capacity[usable] >= v).sum()) for v in thresholds}
+            for v in thresholds:
+                terms = [
+                    x for s_idx in range(len(section_ids))
+                    if cp.section_size[s_idx] >= v
+                    for x in section_terms.get((s_idx, t), [])
+                ]
+                if len(terms) > rooms_fitting[v]:
+                    model.Add(sum(terms) <= rooms_fitting[v])
+
+    # No overlaps per section per timeslot
+    for terms in section_terms.values():
+        if len(terms) > 1:
+            model.Add(sum(terms) <= 1)
 
     # Faculty clashes
-    for f in faculty_ids:
-        for t in T_non_break:
-            terms: List[cp_model.IntVar] = []
-            for (s, c_key), fac in fac_map.items():
-                if fac != f:
-                    continue
-                if (s, c_key, t) in X_lec:
-                    terms.append(X_lec[(s, c_key, t)])
-                defaults = course_by_id[c_key]
-                r = req_map.get((s, c_key))
-                weekly_lab_sessions = (defaults.lab_sessions_per_week if defaults.is_lab else 0) if r is None else r.weekly_lab_sessions
-                lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-                if weekly_lab_sessions > 0 and lab_block_size > 0 and t in cover_by_block_size.get(lab_block_size, {}):
-                    for start_t in cover_by_block_size[lab_block_size][t]:
-                        var = Y_lab_start.get((s, c_key, start_t))
-                        if var is not None:
-                            terms.append(var)
-            if terms:
-                model.Add(sum(terms) <= 1)
+    for terms in faculty_terms.values():
+        if len(terms) > 1:
+            model.Add(sum(terms) <= 1)
 
     # Faculty P1 (first period) constraint: max 3 times per week per faculty
-    # Identify all P1 timeslots (period_index == 1)
-    P1_timeslots = [t.timeslot_id for t in timeslots if t.period_index == 1 and not t.is_break]
-    for f in faculty_ids:
-        p1_terms: List[cp_model.IntVar] = []
-        for (s, c_key), fac in fac_map.items():
-            if fac != f:
-                continue
-            # Check lectures in P1
-            for t in P1_timeslots:
-                if (s, c_key, t) in X_lec:
-                    p1_terms.append(X_lec[(s, c_key, t)])
-            # Check labs starting in P1
-            defaults = course_by_id[c_key]
-            r = req_map.get((s, c_key))
-            weekly_lab_sessions = (defaults.lab_sessions_per_week if defaults.is_lab else 0) if r is None else r.weekly_lab_sessions
-            lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-            if weekly_lab_sessions > 0 and lab_block_size > 0:
-                for start_t in P1_timeslots:
-                    if (s, c_key, start_t) in Y_lab_start:
-                        p1_terms.append(Y_lab_start[(s, c_key, start_t)])
-        if p1_terms:
-            model.Add(sum(p1_terms) <= 3)
+    p1_used = {cp.faculty_index[f]: n for f, n in (faculty_p1_used or {}).items() if f in cp.faculty_index}
+    for f_idx, terms in faculty_p1_terms.items():
+        p1_limit = max(0, 3 - p1_used.get(f_idx, 0))
+        if len(terms) > p1_limit:
+            model.Add(sum(terms) <= p1_limit)
 
-    # Room linking and occupancy with STICKINESS constraint
-    if have_rooms:
-        # Link lecture room assignments to block-level room
-        timeslot_to_block: Dict[int, int] = {}
-        for day_idx, blocks in blocks_by_day.items():
-            for block_id, block_tids in blocks:
-                for tid in block_tids:
-                    timeslot_to_block[tid] = block_id
-        
-        for (s, c, t), x in X_lec.items():
-            candidates = candidate_rooms_by_section.get(s, [])
-            if candidates:
-                room_vars = [R_lec[(s, c, t, r_id)] for r_id in candidates]
-                model.Add(sum(room_vars) == x)
-                # STICKINESS: If lecture is scheduled, room must match unified block room
-                block_id = timeslot_to_block.get(t)
-                if block_id is not None:
-                    for r_id in candidates:
-                        # If this lecture uses this room, the section-block must also use this room
-                        model.Add(R_lec[(s, c, t, r_id)] <= SectionBlockRoom[(s, block_id, r_id)])
-        for (s, c, start_t), y in Y_lab_start.items():
-            candidates = candidate_rooms_by_section.get(s, [])
-            if candidates:
-                room_vars = [R_lab_start[(s, c, start_t, r_id)] for r_id in candidates]
-                model.Add(sum(room_vars) == y)
-                # STICKINESS: If lab is scheduled, room must match unified block room (same as lectures)
-                block_id = timeslot_to_block.get(start_t)
-                if block_id is not None:
-                    for r_id in candidates:
-                        # If this lab uses this room, the section-block must also use this room
-                        model.Add(R_lab_start[(s, c, start_t, r_id)] <= SectionBlockRoom[(s, block_id, r_id)])
-        for r in rooms:
-            r_id = r.room_id
-            for t in T_non_break:
-                occ_terms: List[cp_model.IntVar] = []
-                for (s, c, tt), _ in list(X_lec.items()):
-                    if tt != t:
-                        continue
-                    if (s, c, t, r_id) in R_lec:
-                        occ_terms.append(R_lec[(s, c, t, r_id)])
-                for (s, c, start_t), y in Y_lab_start.items():
-                    defaults = course_by_id[c]
-                    r_req = req_map.get((s, c))
-                    lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r_req is None else (r_req.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-                    if lab_block_size and t in cover_by_block_size.get(lab_block_size, {}):
-                        if start_t in cover_by_block_size[lab_block_size][t]:
-                            if (s, c, start_t, r_id) in R_lab_start:
-                                occ_terms.append(R_lab_start[(s, c, start_t, r_id)])
-                if occ_terms:
-                    model.Add(sum(occ_terms) <= 1)
+    # Room occupancy: at most one class per room per timeslot
+    for terms in room_terms.values():
+        if len(terms) > 1:
+            model.Add(sum(terms) <= 1)
 
     # Optional objective minimize gaps
     objective_terms: List[cp_model.IntVar] = []
-    if optimize_gaps:
-        Occ: Dict[Tuple[str, int], cp_model.IntVar] = {}
-        for s in section_ids:
+    if optimize_gaps and gap_mode == "span":
+        for day_idx, ordered in cp.grid.non_break_by_day.items():
+            n = len(ordered)
+            for s_idx, s in enumerate(section_ids):
+                # At most one class per section and slot, so each sum is the slot's 0/1 occupancy
+                occ = [sum(section_terms.get((s_idx, t), [])) for t in ordered]
+                if not any(section_terms.get((s_idx, t)) for t in ordered):
+                    continue
+                # An empty day can take last < first, so its idle count is 0
+                first = model.NewIntVar(0, n, f"first_s{s}_d{day_idx}")
+                last = model.NewIntVar(-1, n - 1, f"last_s{s}_d{day_idx}")
+                for i, o in enumerate(occ):
+                    if isinstance(o, int):
+                        continue
+                    model.Add(first <= i + n * (1 - o))
+                    model.Add(last >= i - (i + 1) * (1 - o))
+                idle = model.NewIntVar(0, n, f"idle_s{s}_d{day_idx}")
+                model.Add(idle >= last - first + 1 - sum(occ))
+                objective_terms.append(idle)
+    elif optimize_gaps:
+        Occ: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        for s_idx, s in enumerate(section_ids):
             for t in T_non_break:
                 occ = model.NewBoolVar(f"occ_s{s}_t{t}")
-                Occ[(s, t)] = occ
-                terms: List[cp_model.IntVar] = [X_lec[(s, c, t)] for c in course_ids if (s, c, t) in X_lec]
-                for c in course_ids:
-                    defaults = course_by_id[c]
-                    r = req_map.get((s, c))
-                    weekly_lab_sessions = (defaults.lab_sessions_per_week if defaults.is_lab else 0) if r is None else r.weekly_lab_sessions
-                    lab_block_size = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-                    if weekly_lab_sessions > 0 and lab_block_size > 0 and t in cover_by_block_size.get(lab_block_size, {}):
-                        for start_t in cover_by_block_size[lab_block_size][t]:
-                            var = Y_lab_start.get((s, c, start_t))
-                            if var is not None:
-                                terms.append(var)
+                Occ[(s_idx, t)] = occ
+                terms = section_terms.get((s_idx, t), [])
                 if terms:
                     for v in terms:
                         model.Add(v <= occ)
                     model.Add(sum(terms) >= occ)
                 else:
                     model.Add(occ == 0)
-        times_by_day: Dict[int, List[int]] = defaultdict(list)
-        for t in timeslots:
-            if not t.is_break:
-                times_by_day[t.day_index].append(t.timeslot_id)
-        for day_idx, ordered in times_by_day.items():
-            ordered.sort(key=lambda tid: timeslot_by_id[tid].period_index)
-            for s in section_ids:
+        for day_idx, ordered in cp.grid.non_break_by_day.items():
+            for s_idx, s in enumerate(section_ids):
                 for i in range(1, len(ordered) - 1):
                     prev_t = ordered[i - 1]
                     mid_t = ordered[i]
                     next_t = ordered[i + 1]
                     g = model.NewBoolVar(f"gap_s{s}_d{day_idx}_i{i}")
-                    model.Add(Occ[(s, prev_t)] + Occ[(s, next_t)] - 1 <= g)
-                    model.Add(Occ[(s, mid_t)] == 0).OnlyEnforceIf(g)
+                    # Minimised, so g is 1 exactly when the middle slot is free between two classes
+                    model.Add(Occ[(s_idx, prev_t)] + Occ[(s_idx, next_t)] - Occ[(s_idx, mid_t)] - 1 <= g)
                     objective_terms.append(g)
     if objective_terms:
         model.Minimize(sum(objective_terms))
 
+    return BuiltModel(
+        model=model,
+        compiled=cp,
+        timeslots=timeslots,
+        X_lec=X_lec,
+        Y_lab_start=Y_lab_start,
+        R_lec=R_lec,
+        R_lab_start=R_lab_start,
+        SectionBlockRoom=SectionBlockRoom,
+        SectionBlockActive=SectionBlockActive,
+        lab_block_size=lab_block_of,
+        objective_terms=objective_terms,
+        SectionBlockClass=SectionBlockClass,
+        blocked_block_rooms=blocked_block_rooms,
+    )
+
+
+ENGINES = ("time_indexed", "interval", "local")
+STRATEGIES = ("direct", "two_stage", "decomposed", "rolling", "labs_first", "day_split")
+
+
+def make_solver(time_limit_sec: float) -> cp_model.CpSolver:
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = float(time_limit_sec)
     solver.parameters.num_search_workers = 8
     solver.parameters.log_search_progress = False
-    solver.parameters.random_seed = 1
+    solver.parameters.random_seed = RANDOM_SEED
+    for name, value in {**PROFILE_PARAMS, **SOLVER_PARAMS}.items():
+        if isinstance(value, str):
+            value = getattr(type(solver.parameters), value)
+        setattr(solver.parameters, name, value)
+    if STOP_REQUESTED.is_set():
+        solver.parameters.max_time_in_seconds = 0.0
+    _ACTIVE_SOLVERS.add(solver)
+    return solver
+
+
+def stop_searches() -> None:
+    """Stop the CP-SAT searches of this process and of its child solve
+    processes (used to cancel API jobs).
+
+    Running searches return their best solution so far. StopSearch has no
+    effect on a solver whose Solve has not started yet, so callers repeat
+    this until the solve returns.
+    """
+    STOP_REQUESTED.set()
+    for event in list(CHILD_STOPS):
+        event.set()
+    for solver in list(_ACTIVE_SOLVERS):
+        solver.StopSearch()
+
+
+def run_search(
+    solver: cp_model.CpSolver,
+    model: cp_model.CpModel,
+    progress: Optional[ProgressFn] = None,
+    has_objective: bool = False,
+    stop: Optional[StopCriteria] = None,
+) -> Tuple[int, str]:
+    """solver.Solve(model) with progress events and early-stop criteria;
+    returns the status and why the search ended (src/stopping.py). A search
+    stopped at its relative gap is FEASIBLE, not OPTIMAL."""
+    monitor = StopMonitor(stop, progress, has_objective)
+    status = monitor.solve(solver, model)
+    reason = monitor.stop_reason(solver, status, cancelled=STOP_REQUESTED.is_set())
+    if reason == "relative_gap":
+        status = cp_model.FEASIBLE
+    return status, reason
+
+
+def solve(
+    problem: ProblemData,
+    time_limit_sec: int = 60,
+    optimize_gaps: bool = False,
+    room_mode: str = "per_slot",
+    engine: str = "time_indexed",
+    strategy: str = "direct",
+    hint: Optional[SolveResult] = None,
+    model_cache: Optional["ModelCache"] = None,
+    group_by: str = "auto",
+    progress: Optional[ProgressFn] = None,
+    gap_mode: str = "triple",
+    stop: Optional[StopCriteria] = None,
+    greedy: bool = False,
+    polish_sec: float = 0,
+    profile: Optional[str] = None,
+) -> SolveResult:
+    """Solve ``problem`` with CP-SAT.
+
+    engine "local" (direct strategy only) builds no CP-SAT model: it runs
+    the simulated annealing / tabu search of src/local_search.py from the
+    greedy timetable (or ``hint``), for instances too large for CP-SAT.
 
-    status = solver.Solve(model)
+    strategy "direct" solves one model with the given room_mode and engine.
+    strategy "two_stage" places classes in time first and assigns rooms
+    afterwards per block (see src/pipeline.py); room_mode is not used.
+    strategy "decomposed" solves groups of sections that share no faculty
+    separately (see src/decompose.py) and reconciles their rooms.
+    strategy "rolling" solves section groups (``group_by``) one after
+    another around the faculty and rooms used so far (see src/rolling.py).
+    strategy "labs_first" places labs and their rooms in a labs-only model
+    first, then lectures around them, backtracking into the lab placement
+    when the lectures do not fit (see src/labs_first.py).
+    strategy "day_split" plans how many classes of each section and
+    course fall on each day, then solves every day as its own model, in
+    parallel processes (see src/day_split.py).
+
+    ``gap_mode`` picks the optimize_gaps encoding (see build_model).
+
+    ``hint`` is a previous (or imported) timetable used as a CP-SAT solution
+    hint (see src/hints.py); entries that no longer exist are ignored.
+
+    ``model_cache`` (src/cache.py) reuses a time-indexed model built by an
+    earlier solve of the same problem and options.
+
+    ``progress`` (src/progress.py) receives a "model" event once the model
+    is built and a "solution" event per improving solution, for the direct,
+    two_stage and labs_first strategies; the decomposed, rolling and
+    day_split strategies solve many small models and report nothing.
+
+    ``greedy`` first tries the constructive heuristic of src/greedy.py.
+    Without optimize_gaps its timetable is returned as is (stop_reason
+    "greedy"); with it, the timetable becomes the CP-SAT hint (direct and
+    two_stage strategies). If it fails, the solve runs as usual.
+
+    ``stop`` (src/stopping.py) ends the search early: relative gap, no
+    improvement, target objective, first timetable, or separate budgets
+    for the first timetable and the optimization after it. Like progress
+    it applies to the direct and two_stage strategies. The result records
+    ``stop_reason`` and ``best_bound``.
+
+    ``polish_sec`` > 0 (with optimize_gaps) spends that much longer on
+    lowering the gaps of a FEASIBLE result by local search
+    (src/local_search.py), after time_limit_sec of the given strategy.
+
+    ``profile`` ("fast", "balanced", "quality" or "auto") applies the
+    tuned CP-SAT parameters stored for the problem's size class (see
+    src/tuning.py) to every search of this solve.
+    """
+    if profile is not None:
+        try:
+            from .tuning import profile_params, select_profile
+        except ImportError:
+            from tuning import profile_params, select_profile
+        with profile_params(select_profile(problem, profile, optimize_gaps)):
+            return solve(
+                problem, time_limit_sec, optimize_gaps, room_mode, engine, strategy, hint,
+                model_cache, group_by, progress, gap_mode, stop, greedy, polish_sec,
+            )
+    if stop is not None and stop.active() and strategy not in ("direct", "two_stage"):
+        raise ValueError(f"stop criteria are not supported by the {strategy} strategy")
+    if engine == "local" and (strategy != "direct" or (stop is not None and stop.active())):
+        raise ValueError("the local engine requires the direct strategy and no stop criteria")
+    if polish_sec > 0 and optimize_gaps:
+        try:
+            from .local_search import polish
+        except ImportError:
+            from local_search import polish
+        result = solve(
+            problem, time_limit_sec, optimize_gaps, room_mode, engine, strategy, hint,
+            model_cache, group_by, progress, gap_mode, stop, greedy,
+        )
+        return polish(problem, result, polish_sec, gap_mode=gap_mode, progress=progress)
+    if greedy and hint is None:
+        if optimize_gaps and strategy not in ("direct", "two_stage"):
+            raise ValueError(f"a greedy hint is not supported by the {strategy} strategy")
+        try:
+            from .greedy import construct
+        except ImportError:
+            from greedy import construct
+        greedy_start = time.perf_counter()
+        constructed = construct(problem)
+        if progress is not None:
+            progress({"event": "greedy", "placed": constructed is not None, "elapsed_sec": round(time.perf_counter() - greedy_start, 3)})
+        if constructed is not None and not optimize_gaps:
+            return constructed
+        hint = constructed
+    if strategy == "two_stage":
+        if engine != "time_indexed":
+            raise ValueError("the two_stage strategy requires the time_indexed engine")
+        try:
+            from .pipeline import solve_two_stage
+        except ImportError:
+            from pipeline import solve_two_stage
+        return solve_two_stage(problem, time_limit_sec=time_limit_sec, optimize_gaps=optimize_gaps, hint=hint, progress=progress, gap_mode=gap_mode, stop=stop)
+    if strategy == "decomposed":
+        if hint is not None:
+            raise ValueError("hint is not supported by the decomposed strategy")
+        try:
+            from .decompose import solve_decomposed
+        except ImportError:
+            from decompose import solve_decomposed
+        return solve_decomposed(problem, time_limit_sec=time_limit_sec, optimize_gaps=optimize_gaps, room_mode=room_mode, engine=engine, gap_mode=gap_mode)
+    if strategy == "rolling":
+        if engine != "time_indexed" or hint is not None:
+            raise ValueError("the rolling strategy requires the time_indexed engine and no hint")
+        try:
+            from .rolling import solve_rolling
+        except ImportError:
+            from rolling import solve_rolling
+        return solve_rolling(problem, time_limit_sec=time_limit_sec, optimize_gaps=optimize_gaps, room_mode=room_mode, group_by=group_by, gap_mode=gap_mode)
+    if strategy == "labs_first":
+        if engine != "time_indexed" or hint is not None:
+            raise ValueError("the labs_first strategy requires the time_indexed engine and no hint")
+        try:
+            from .labs_first import solve_labs_first
+        except ImportError:
+            from labs_first import solve_labs_first
+        return solve_labs_first(problem, time_limit_sec=time_limit_sec, optimize_gaps=optimize_gaps, room_mode=room_mode, progress=progress, gap_mode=gap_mode)
+    if strategy == "day_split":
+        if engine != "time_indexed" or hint is not None:
+            raise ValueError("the day_split strategy requires the time_indexed engine and no hint")
+        try:
+            from .day_split import solve_day_split
+        except ImportError:
+            from day_split import solve_day_split
+        return solve_day_split(problem, time_limit_sec=time_limit_sec, optimize_gaps=optimize_gaps, room_mode=room_mode, gap_mode=gap_mode)
+    if strategy != "direct":
+        raise ValueError(f"Unknown strategy {strategy!r}; expected one of {STRATEGIES}")
+    if engine == "local":
+        try:
+            from .local_search import solve_local
+        except ImportError:
+            from local_search import solve_local
+        return solve_local(problem, time_limit_sec=time_limit_sec, optimize_gaps=optimize_gaps, gap_mode=gap_mode, start=hint, progress=progress)
+
+    build_start = time.perf_counter()
+    if engine == "time_indexed" and model_cache is not None:
+        built = model_cache.build_model(problem, optimize_gaps=optimize_gaps, room_mode=room_mode, gap_mode=gap_mode)
+    elif engine == "time_indexed":
+        built = build_model(problem, optimize_gaps=optimize_gaps, room_mode=room_mode, gap_mode=gap_mode)
+    elif engine == "interval":
+        if optimize_gaps:
+            raise ValueError("optimize_gaps is not supported by the interval engine")
+        built = build_interval_model(problem)
+    else:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}")
+    timeslots = built.timeslots
+    has_objective = isinstance(built, BuiltModel) and bool(built.objective_terms)
+    if progress is not None:
+        progress(model_event(built.model, time.perf_counter() - build_start))
+
+    if hint is not None:
+        try:
+            from .hints import apply_hint, solve_with_hint
+        except ImportError:
+            from hints import apply_hint, solve_with_hint
+    if hint is not None and isinstance(built, BuiltModel):
+        solver, status, reason = solve_with_hint(built, hint, time_limit_sec, progress=progress, stop=stop)
+    else:
+        if hint is not None:
+            apply_hint(built, hint)
+        solver = make_solver(time_limit_sec)
+        status, reason = run_search(solver, built.model, progress, has_objective, stop)
 
     if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
         return SolveResult(
@@ -329,79 +727,332 @@ def solve(problem: ProblemData, time_limit_sec: int = 60, optimize_gaps: bool =
             schedule_by_faculty={},
             timeslots=timeslots,
             objective_value=None,
+            stop_reason=reason,
         )
 
-    schedule_by_section: Dict[str, Dict[int, Tuple[str, str, str, str]]] = defaultdict(dict)
-    schedule_by_faculty: Dict[str, Dict[int, Tuple[str, str, str, str]]] = defaultdict(dict)
+    if isinstance(built, IntervalModel):
+        result = _extract_interval_result(problem, built, solver, status)
+    else:
+        result = _extract_result(problem, built, solver, status)
+    result.stop_reason = reason
+    return result
 
-    for (s, c, t), var in X_lec.items():
-        if solver.Value(var) == 1:
-            f = fac_map.get((s, c), "")
-            room_id = ""
-            if have_rooms and candidate_rooms_by_section.get(s):
-                for rid in candidate_rooms_by_section[s]:
-                    v = R_lec.get((s, c, t, rid))
-                    if v is not None and solver.Value(v) == 1:
-                        room_id = rid
-                        break
-            schedule_by_section[s][t] = (c, f, room_id, "lecture")
-            if f:
-                schedule_by_faculty[f][t] = (c, s, room_id, "lecture")
 
-    day_period_to_tid = {(t.day_index, t.period_index): t.timeslot_id for t in timeslots}
-    for (s, c, start_t), var in Y_lab_start.items():
-        if solver.Value(var) == 1:
-            defaults = course_by_id[c]
-            r = req_map.get((s, c))
-            bsize = (defaults.lab_block_size if defaults.is_lab else 0) if r is None else (r.lab_block_size or (defaults.lab_block_size if defaults.is_lab else 0))
-            start_ts = timeslot_by_id[start_t]
-            f = fac_map.get((s, c), "")
-            room_id = ""
-            if have_rooms and candidate_rooms_by_section.get(s):
-                for rid in candidate_rooms_by_section[s]:
-                    v = R_lab_start.get((s, c, start_t, rid))
-                    if v is not None and solver.Value(v) == 1:
-                        room_id = rid
-                        break
-            for k in range(bsize):
-                tid = day_period_to_tid[(start_ts.day_index, start_ts.period_index + k)]
-                schedule_by_section[s][tid] = (c, f, room_id, "lab")
-                if f:
-                    schedule_by_faculty[f][tid] = (c, s, room_id, "lab")
+# (section_id, course_id, kind, covered timeslot ids, room_id)
+Assignment = Tuple[str, str, str, List[int], str]
 
-    obj_val: Optional[int] = None
-    if objective_terms and status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        obj_val = int(solver.ObjectiveValue())
+
+def result_from_assignments(
+    problem: ProblemData,
+    assignments: List[Assignment],
+    status: str,
+    objective_value: Optional[int] = None,
+) -> SolveResult:
+    """Assemble a SolveResult (schedules plus availability maps) from decoded classes."""
+    cp = compile_problem(problem)
+    T_non_break = cp.grid.non_break
+
+    schedule_by_section: Dict[str, Dict[int, Tuple[str, str, str, str]]] = defaultdict(dict)
+    schedule_by_faculty: Dict[str, Dict[int, Tuple[str, str, str, str]]] = defaultdict(dict)
+    for s, c, kind, tids, room_id in assignments:
+        f = cp.faculty_id_of(cp.section_index[s], cp.course_index[c]) or ""
+        for tid in tids:
+            schedule_by_section[s][tid] = (c, f, room_id, kind)
+            if f:
+                schedule_by_faculty[f][tid] = (c, s, room_id, kind)
 
     # Compute available rooms and faculty per timeslot
     available_rooms_map: Dict[int, List[str]] = {}
     available_faculty_map: Dict[int, List[str]] = {}
-    
-    if have_rooms:
+
+    if cp.have_rooms:
+        occupied_rooms: Dict[int, set] = defaultdict(set)
+        for s, by_t in schedule_by_section.items():
+            for t, (_, _, room_id, _) in by_t.items():
+                if room_id:
+                    occupied_rooms[t].add(room_id)
         for t in T_non_break:
-            occupied_rooms = set()
-            for s, by_t in schedule_by_section.items():
-                if t in by_t:
-                    _, _, room_id, _ = by_t[t]
-                    if room_id:
-                        occupied_rooms.add(room_id)
-            available_rooms_map[t] = [r.room_id for r in rooms if r.room_id not in occupied_rooms]
-    
+            available_rooms_map[t] = [r for r in cp.room_ids if r not in occupied_rooms[t]]
+
+    occupied_faculty: Dict[int, set] = defaultdict(set)
+    for f, by_t in schedule_by_faculty.items():
+        for t in by_t:
+            occupied_faculty[t].add(f)
+    faculty_ids = problem.faculty_ids()
     for t in T_non_break:
-        occupied_faculty = set()
-        for f, by_t in schedule_by_faculty.items():
-            if t in by_t:
-                occupied_faculty.add(f)
-        available_faculty_map[t] = [f for f in faculty_ids if f not in occupied_faculty]
-    
+        available_faculty_map[t] = [f for f in faculty_ids if f not in occupied_faculty[t]]
+
     return SolveResult(
-        status=("OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"),
+        status=status,
         schedule_by_section=schedule_by_section,
         schedule_by_faculty=schedule_by_faculty,
-        timeslots=timeslots,
-        objective_value=obj_val,
+        timeslots=cp.timeslots,
+        objective_value=objective_value,
         available_rooms=available_rooms_map,
         available_faculty=available_faculty_map,
     )
 
 
+def _extract_result(
+    problem: ProblemData,
+    built: BuiltModel,
+    solver: cp_model.CpSolver,
+    status: int,
+    block_room: Optional[Dict[Tuple[str, int], str]] = None,
+) -> SolveResult:
+    """Decode a solved BuiltModel. ``block_room`` supplies (section_id, block_id)
+    -> room_id when rooms were assigned outside the model."""
+    cp = built.compiled
+
+    # Rooms chosen per scheduled class, read from the (sparse) room variable maps
+    lec_room: Dict[Tuple[str, str, int], str] = {}
+    for (s, c, t, rid), v in built.R_lec.items():
+        if solver.Value(v) == 1:
+            lec_room[(s, c, t)] = rid
+    lab_room: Dict[Tuple[str, str, int], str] = {}
+    for (s, c, start_t, rid), v in built.R_lab_start.items():
+        if solver.Value(v) == 1:
+            lab_room[(s, c, start_t)] = rid
+    # Compact room mode: every class takes its section's block room
+    if block_room is None:
+        block_room = {}
+        if built.SectionBlockClass:
+            # Classes room mode: match the chosen room classes to concrete rooms per block
+            block_classes: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+            for (s, block_id, k), v in built.SectionBlockClass.items():
+                if solver.Value(v) == 1:
+                    block_classes[block_id].append((s, k))
+            matched = assign_class_rooms(block_classes, cp.room_classes, built.blocked_block_rooms)
+            if matched is None:
+                # Unreachable: the class caps are exactly the class sizes
+                raise RuntimeError("room classes could not be matched to concrete rooms")
+            block_room = {key: cp.room_ids[r_idx] for key, r_idx in matched.items()}
+        elif built.SectionBlockActive:
+            for (s, block_id, rid), v in built.SectionBlockRoom.items():
+                if solver.Value(v) == 1:
+                    block_room[(s, block_id)] = rid
+
+    assignments: List[Assignment] = []
+    for (s, c, t), var in built.X_lec.items():
+        if solver.Value(var) == 1:
+            room_id = lec_room.get((s, c, t)) or block_room.get((s, cp.timeslot_to_block[t]), "")
+            assignments.append((s, c, "lecture", [t], room_id))
+
+    for (s, c, start_t), var in built.Y_lab_start.items():
+        if solver.Value(var) == 1:
+            bsize = built.lab_block_size[(s, c)]
+            room_id = lab_room.get((s, c, start_t)) or block_room.get((s, cp.timeslot_to_block[start_t]), "")
+            assignments.append((s, c, "lab", cp.lab_cover[bsize][start_t], room_id))
+
+    obj_val: Optional[int] = None
+    bound: Optional[int] = None
+    if built.objective_terms and status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        obj_val = int(solver.ObjectiveValue())
+        bound = int(solver.BestObjectiveBound())
+
+    result = result_from_assignments(
+        problem,
+        assignments,
+        status=("OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"),
+        objective_value=obj_val,
+    )
+    result.best_bound = bound
+    return result
+
+
+@dataclass
+class IntervalModel:
+    """Interval/NoOverlap formulation of the same timetable.
+
+    Each lecture and lab block is an interval on a single timeline in which
+    consecutive days are separated by one empty position. A class sits in
+    exactly one block (optional per-block presence literals). Rooms use the
+    compact block semantics: an optional interval spanning the whole block
+    per (section, block, candidate room), with NoOverlap per room. Start
+    domains and room candidates leave out unavailable faculty slots and
+    rooms; room candidates follow the room policy as in build_model.
+    """
+    model: cp_model.CpModel
+    compiled: CompiledProblem
+    timeslots: List[Timeslot]
+    starts: Dict[Tuple[str, str, str, int], cp_model.IntVar]  # (section, course, kind, k) -> start position
+    sizes: Dict[Tuple[str, str, str, int], int]
+    SectionBlockRoom: Dict[Tuple[str, int, str], cp_model.IntVar]
+    pos_to_tid: Dict[int, int]
+
+
+def build_interval_model(problem: ProblemData) -> IntervalModel:
+    model = cp_model.CpModel()
+    cp = compile_problem(problem)
+    timeslots = cp.timeslots
+    section_ids = cp.section_ids
+    course_ids = cp.course_ids
+    room_ids = cp.room_ids
+
+    # Timeline position: timeslot ids are contiguous in (day, period) order; shift each
+    # day by its index so the last period of a day never touches the next day
+    pos_of = {t.timeslot_id: t.timeslot_id + t.day_index for t in timeslots}
+    pos_to_tid = {p: tid for tid, p in pos_of.items()}
+
+    # Breaks and day ends as fixed intervals, shared by every section timeline
+    fixed: List[cp_model.IntervalVar] = []
+    for t in timeslots:
+        if t.is_break:
+            fixed.append(model.NewFixedSizeIntervalVar(pos_of[t.timeslot_id], 1, f"break_t{t.timeslot_id}"))
+    for day_idx, _ in cp.grid.days:
+        last_tid = cp.grid.day_period_to_tid[(day_idx, cp.grid.periods_by_day[day_idx][-1])]
+        fixed.append(model.NewFixedSizeIntervalVar(pos_of[last_tid] + 1, 1, f"dayend_d{day_idx}"))
+
+    blocks = [(block_id, tids) for day_blocks in cp.blocks_by_day.values() for block_id, tids in day_blocks]
+    block_span = {block_id: (pos_of[tids[0]], pos_of[tids[-1]]) for block_id, tids in blocks}
+    p1_positions = [pos_of[tid] for tid in sorted(cp.grid.p1_timeslots)]
+
+    starts: Dict[Tuple[str, str, str, int], cp_model.IntVar] = {}
+    sizes: Dict[Tuple[str, str, str, int], int] = {}
+    section_intervals: Dict[int, List[cp_model.IntervalVar]] = defaultdict(list)
+    faculty_intervals: Dict[int, List[cp_model.IntervalVar]] = defaultdict(list)
+    faculty_starts: Dict[int, List[Tuple[cp_model.IntVar, set]]] = defaultdict(list)  # faculty -> (start, valid positions)
+    block_presence: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (section, block) -> literals
+    lab_presence: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)  # (section, block) -> lab literals
+
+    for s_idx, s in enumerate(section_ids):
+        for c_idx, c in enumerate(course_ids):
+            f_idx = int(cp.faculty_of[s_idx, c_idx])
+            activities: List[Tuple[str, int, int, List[int]]] = []  # (kind, count, size, valid start tids)
+            if cp.lectures[s_idx, c_idx] > 0:
+                lecture_tids = [t for t in cp.grid.non_break if (f_idx, t) not in cp.faculty_unavailable]
+                activities.append(("lecture", int(cp.lectures[s_idx, c_idx]), 1, lecture_tids))
+            bsize = int(cp.lab_block[s_idx, c_idx])
+            if cp.lab_sessions[s_idx, c_idx] > 0 and bsize > 0:
+                lab_tids = [
+                    t for t in cp.lab_starts[bsize]
+                    if not any((f_idx, tid) in cp.faculty_unavailable for tid in cp.lab_cover[bsize][t])
+                ]
+                activities.append(("lab", int(cp.lab_sessions[s_idx, c_idx]), bsize, lab_tids))
+
+            for kind, count, size, valid_tids in activities:
+                starts_by_block: Dict[int, List[int]] = defaultdict(list)
+                for tid in valid_tids:
+                    starts_by_block[cp.timeslot_to_block[tid]].append(pos_of[tid])
+                valid_positions = {pos_of[tid] for tid in valid_tids}
+                domain = cp_model.Domain.FromValues(sorted(valid_positions))
+                prev_start: Optional[cp_model.IntVar] = None
+                for k in range(count):
+                    key = (s, c, kind, k)
+                    start = model.NewIntVarFromDomain(domain, f"start_s{s}_c{c}_{kind}{k}")
+                    interval = model.NewFixedSizeIntervalVar(start, size, f"iv_s{s}_c{c}_{kind}{k}")
+                    starts[key] = start
+                    sizes[key] = size
+                    section_intervals[s_idx].append(interval)
+                    if f_idx >= 0:
+                        faculty_intervals[f_idx].append(interval)
+                        faculty_starts[f_idx].append((start, valid_positions))
+                    # Identical classes of one course: order them to break symmetry
+                    if prev_start is not None:
+                        model.Add(start >= prev_start + size)
+                    prev_start = start
+
+                    # Exactly one block holds the class
+                    presence: List[cp_model.IntVar] = []
+                    for block_id, positions in starts_by_block.items():
+                        lit = model.NewBoolVar(f"inblk_s{s}_c{c}_{kind}{k}_b{block_id}")
+                        model.AddLinearExpressionInDomain(start, cp_model.Domain.FromValues(positions)).OnlyEnforceIf(lit)
+                        presence.append(lit)
+                        block_presence[(s_idx, block_id)].append(lit)
+                        if kind == "lab":
+                            lab_presence[(s_idx, block_id)].append(lit)
+                    model.AddExactlyOne(presence)
+
+    # Section, faculty clashes
+    for intervals in section_intervals.values():
+        model.AddNoOverlap(intervals + fixed)
+    for intervals in faculty_intervals.values():
+        if len(intervals) > 1:
+            model.AddNoOverlap(intervals)
+
+    # Faculty P1 (first period) constraint: max 3 times per week per faculty
+    for f_idx, f_starts in faculty_starts.items():
+        if len(f_starts) <= 3:
+            continue
+        p1_terms: List[cp_model.IntVar] = []
+        for start, valid_positions in f_starts:
+            for q in p1_positions:
+                if q in valid_positions:
+                    at_q = model.NewBoolVar(f"p1_{start.Name()}_{q}")
+                    model.Add(start == q).OnlyEnforceIf(at_q)
+                    model.Add(start != q).OnlyEnforceIf(at_q.Not())
+                    p1_terms.append(at_q)
+        if len(p1_terms) > 3:
+            model.Add(sum(p1_terms) <= 3)
+
+    # Rooms: a section active in a block holds one room for the whole block
+    SectionBlockRoom: Dict[Tuple[str, int, str], cp_model.IntVar] = {}
+    if cp.have_rooms:
+        room_intervals: Dict[int, List[cp_model.IntervalVar]] = defaultdict(list)
+        for (s_idx, block_id), lits in block_presence.items():
+            candidates = cp.candidate_rooms[s_idx]
+            if not candidates:
+                continue
+            s = section_ids[s_idx]
+            active = model.NewBoolVar(f"active_s{s}_b{block_id}")
+            for lit in lits:
+                model.AddImplication(lit, active)
+            model.AddBoolOr(lits).OnlyEnforceIf(active)
+            lo, hi = block_span[block_id]
+            room_vars: List[cp_model.IntVar] = []
+            labs = lab_presence.get((s_idx, block_id), [])
+            lecture_options, lab_options = set(cp.lecture_rooms[s_idx]), set(cp.lab_rooms[s_idx])
+            lab_vars: List[cp_model.IntVar] = []
+            for r_idx in candidates:
+                if (block_id, r_idx) in cp.unavailable_block_rooms:
+                    continue
+                rv = model.NewBoolVar(f"secblkroom_s{s}_b{block_id}_r{room_ids[r_idx]}")
+                SectionBlockRoom[(s, block_id, room_ids[r_idx])] = rv
+                room_vars.append(rv)
+                room_intervals[r_idx].append(model.NewOptionalFixedSizeIntervalVar(lo, hi - lo + 1, rv, f"room_s{s}_b{block_id}_r{room_ids[r_idx]}"))
+                # Separate lab rooms: a lab room only with a lab in the block, a lab only in one
+                if r_idx not in lecture_options:
+                    model.Add(rv <= sum(labs))
+                if r_idx in lab_options:
+                    lab_vars.append(rv)
+            model.Add(sum(room_vars) == active)
+            if lecture_options != lab_options:
+                for lit in labs:
+                    model.Add(sum(lab_vars) >= lit)
+        for intervals in room_intervals.values():
+            if len(intervals) > 1:
+                model.AddNoOverlap(intervals)
+
+    return IntervalModel(
+        model=model,
+        compiled=cp,
+        timeslots=timeslots,
+        starts=starts,
+        sizes=sizes,
+        SectionBlockRoom=SectionBlockRoom,
+        pos_to_tid=pos_to_tid,
+    )
+
+
+def _extract_interval_result(problem: ProblemData, built: IntervalModel, solver: cp_model.CpSolver, status: int) -> SolveResult:
+    cp = built.compiled
+    block_room: Dict[Tuple[str, int], str] = {}
+    for (s, block_id, rid), v in built.SectionBlockRoom.items():
+        if solver.Value(v) == 1:
+            block_room[(s, block_id)] = rid
+
+    assignments: List[Assignment] = []
+    for (s, c, kind, _k), start in built.starts.items():
+        start_tid = built.pos_to_tid[solver.Value(start)]
+        if kind == "lab":
+            tids = cp.lab_cover[built.sizes[(s, c, kind, _k)]][start_tid]
+        else:
+            tids = [start_tid]
+        room_id = block_room.get((s, cp.timeslot_to_block[start_tid]), "")
+        assignments.append((s, c, kind, tids, room_id))
+
+    return result_from_assignments(
+        problem,
+        assignments,
+        status=("OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"),
+    )
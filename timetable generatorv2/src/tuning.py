@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from . import timetable_solver
+    from .compiled import compile_problem
+    from .generate_synthetic import generate_dataset
+    from .loader import load_problem_from_directory
+    from .models import ProblemData
+    from .timetable_solver import solve
+except ImportError:
+    import timetable_solver
+    from compiled import compile_problem
+    from generate_synthetic import generate_dataset
+    from loader import load_problem_from_directory
+    from models import ProblemData
+    from timetable_solver import solve
+
+
+DEFAULT_PROFILES_PATH = os.environ.get("ATGS_SOLVER_PROFILES", os.path.join(tempfile.gettempdir(), "atgs_solver_profiles.json"))
+# fast: earliest first timetable; quality: lowest final gaps; balanced: both
+PROFILES = ("fast", "balanced", "quality")
+# Used until a tuning run has written a profile: make_solver's defaults
+DEFAULT_PROFILE: Dict[str, Any] = {}
+# Size classes by weekly class periods, with exclusive upper bounds: TT_Flexinput
+# (378) and large_1000 (476) are small, large_3000 (1400) medium, large_5000 (2352) large
+SIZE_CLASSES: Tuple[Tuple[str, Optional[int]], ...] = (("small", 600), ("medium", 1800), ("large", None))
+
+# Default search space: CP-SAT parameters that changed time to first
+# solution or final gaps on our datasets; enum values by name
+PARAM_SPACE: Dict[str, List[Any]] = {
+    "search_branching": ["AUTOMATIC_SEARCH", "PORTFOLIO_WITH_QUICK_RESTART_SEARCH", "PORTFOLIO_SEARCH"],
+    "linearization_level": [0, 1, 2],
+    "symmetry_level": [0, 2],
+    "optimize_with_core": [False, True],
+}
+# Seconds charged for a run without a timetable, as a multiple of the time limit
+MISSING_PENALTY = 2.0
+
+DEFAULT_DATASETS = ["data/templates", "TT_Flexinput", "data/large_1000", "data/large_3000", "data/large_5000"]
+
+
+def size_class(problem: ProblemData) -> str:
+    periods = int(compile_problem(problem).required_periods().sum())
+    return next(name for name, bound in SIZE_CLASSES if bound is None or periods < bound)
+
+
+def load_profiles(path: str = DEFAULT_PROFILES_PATH) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """size class -> profile name -> SatParameters."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_profiles(profiles: Dict[str, Dict[str, Dict[str, Any]]], path: str = DEFAULT_PROFILES_PATH) -> None:
+    """Write tuned profiles over those stored for the same size classes."""
+    stored = load_profiles(path)
+    stored.update(profiles)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(stored, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def select_profile(problem: ProblemData, profile: str = "auto", optimize_gaps: bool = False, path: str = DEFAULT_PROFILES_PATH) -> Dict[str, Any]:
+    """SatParameters of ``profile`` for the size class of ``problem``.
+
+    "auto" is "balanced" with optimize_gaps and "fast" without. A profile
+    not tuned for that size class is DEFAULT_PROFILE.
+    """
+    if profile == "auto":
+        profile = "balanced" if optimize_gaps else "fast"
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile!r}; expected one of {('auto',) + PROFILES}")
+    return dict(load_profiles(path).get(size_class(problem), {}).get(profile, DEFAULT_PROFILE))
+
+
+@contextmanager
+def profile_params(params: Dict[str, Any]) -> Iterator[None]:
+    """Apply ``params`` to every solver made by make_solver in the block."""
+    saved = dict(timetable_solver.PROFILE_PARAMS)
+    timetable_solver.PROFILE_PARAMS.clear()
+    timetable_solver.PROFILE_PARAMS.update(params)
+    try:
+        yield
+    finally:
+        timetable_solver.PROFILE_PARAMS.clear()
+        timetable_solver.PROFILE_PARAMS.update(saved)
+
+
+def grid_configs(space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_configs(space: Dict[str, List[Any]], samples: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """``samples`` distinct grid points; make_solver's defaults are always the first."""
+    grid = grid_configs(space)
+    random.Random(seed).shuffle(grid)
+    return [{}] + grid[:max(0, samples - 1)]
+
+
+def measure(problem: ProblemData, params: Dict[str, Any], time_limit_sec: float, room_mode: str = "compact") -> Dict[str, Any]:
+    """One gap-minimising solve with ``params``: seconds to the first
+    timetable (search time, as in progress events) and the final objective."""
+    events: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    with profile_params(params):
+        result = solve(problem, time_limit_sec=time_limit_sec, optimize_gaps=True, room_mode=room_mode, progress=events.append)
+    solutions = [e for e in events if e["event"] == "solution"]
+    return {
+        "status": result.status,
+        "first_sec": solutions[0]["elapsed_sec"] if solutions else None,
+        "objective": result.objective_value,
+        "wall_sec": round(time.perf_counter() - t0, 2),
+    }
+
+
+def choose_profiles(rows: List[Dict[str, Any]], configs: List[Dict[str, Any]], time_limit_sec: float) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Pick each size class's profiles from measured ``rows`` (one per
+    dataset and config index): fast by mean time to the first timetable,
+    quality by mean objective regret against the dataset's best, balanced
+    by the sum of both ranks. Ties go to the earlier config."""
+    best_objective: Dict[str, int] = {}
+    for row in rows:
+        if row["objective"] is not None:
+            best_objective[row["dataset"]] = min(row["objective"], best_objective.get(row["dataset"], row["objective"]))
+    profiles: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for size in sorted({row["size_class"] for row in rows}):
+        first: Dict[int, List[float]] = {}
+        regret: Dict[int, List[float]] = {}
+        for row in rows:
+            if row["size_class"] != size:
+                continue
+            first.setdefault(row["config"], []).append(row["first_sec"] if row["first_sec"] is not None else MISSING_PENALTY * time_limit_sec)
+            best = best_objective.get(row["dataset"])
+            regret.setdefault(row["config"], []).append(
+                (row["objective"] - best) / max(1, best) if row["objective"] is not None else MISSING_PENALTY
+            )
+        mean_first = {i: sum(v) / len(v) for i, v in first.items()}
+        mean_regret = {i: sum(v) / len(v) for i, v in regret.items()}
+        by_first = sorted(mean_first, key=lambda i: (mean_first[i], mean_regret[i], i))
+        by_regret = sorted(mean_regret, key=lambda i: (mean_regret[i], mean_first[i], i))
+        balanced = min(mean_first, key=lambda i: (by_first.index(i) + by_regret.index(i), mean_first[i], i))
+        profiles[size] = {"fast": configs[by_first[0]], "balanced": configs[balanced], "quality": configs[by_regret[0]]}
+    return profiles
+
+
+def tune(
+    datasets: List[str],
+    configs: List[Dict[str, Any]],
+    time_limit_sec: float,
+    room_mode: str = "compact",
+) -> Tuple[Dict[str, Dict[str, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Solve every dataset with every config; returns the chosen profiles
+    per size class (choose_profiles) and the measured rows."""
+    rows: List[Dict[str, Any]] = []
+    for inputs_dir in datasets:
+        problem = load_problem_from_directory(inputs_dir)
+        size = size_class(problem)
+        for index, params in enumerate(configs):
+            row = {"dataset": inputs_dir, "size_class": size, "config": index}
+            row.update(measure(problem, params, time_limit_sec, room_mode))
+            rows.append(row)
+            print(json.dumps(dict(row, params=params)), flush=True)
+    return choose_profiles(rows, configs, time_limit_sec), rows
+
+
+def _parse_value(text: str) -> Any:
+    if text in ("true", "false"):
+        return text == "true"
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tune CP-SAT parameters and write solver profiles (fast, balanced, quality) per instance size")
+    parser.add_argument("datasets", nargs="*", default=DEFAULT_DATASETS, help="Input directories")
+    parser.add_argument("--generate", type=int, nargs="*", default=[], metavar="STUDENTS", help="Also tune on generated instances with these total student counts")
+    parser.add_argument("--search", choices=["grid", "random"], default="random", help="Every parameter combination, or --samples random ones")
+    parser.add_argument("--samples", type=int, default=8, help="Configurations tried by random search, make_solver's defaults included")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2", help="Search these values of a SatParameters field instead of the default space (repeatable)")
+    parser.add_argument("--time_limit_sec", type=float, default=30)
+    parser.add_argument("--room_mode", default="compact")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_PROFILES_PATH, help="Profiles file (ATGS_SOLVER_PROFILES) read by solve(profile=...)")
+    args = parser.parse_args()
+
+    space = {name: [_parse_value(v) for v in values.split(",")] for name, values in (p.split("=", 1) for p in args.param)} or PARAM_SPACE
+    configs = grid_configs(space) if args.search == "grid" else random_configs(space, args.samples, args.seed)
+    datasets = [d for d in args.datasets if os.path.isdir(d)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for students in args.generate:
+            out_dir = os.path.join(tmpdir, f"generated_{students}")
+            generate_dataset(out_dir, total_students=students, section_size=60, num_courses=10, num_lab_courses=3)
+            datasets.append(out_dir)
+        profiles, _rows = tune(datasets, configs, args.time_limit_sec, args.room_mode)
+    save_profiles(profiles, args.out)
+    print(json.dumps(profiles, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""
+Test admission control for concurrent solves: memory estimates match the
+built model and count parallel processes, jobs share the core budget,
+repairs start before queued solves, and jobs that can never fit in memory
+are rejected.
+"""
+from src import admission as admission_module
+from src.admission import BASE_MB, KB_PER_VARIABLE, PRIORITY_REPAIR, PRIORITY_SOLVE, Admission, MemoryLimitExceeded, estimate_memory_mb, section_variables
+from src.compiled import compile_problem
+from src.decompose import section_components
+from src.loader import load_problem_from_directory
+from src.timetable_solver import ROOM_MODES, build_model
+
+
+def test_variable_estimate_matches_model():
+    problem = load_problem_from_directory("TT_Flexinput")
+    cp = compile_problem(problem)
+    for room_mode in ROOM_MODES:
+        built = build_model(problem, room_mode=room_mode)
+        estimated = int(section_variables(cp, room_mode).sum())
+        print(f"{room_mode}: {estimated} estimated, {len(built.model.Proto().variables)} built")
+        assert estimated == len(built.model.Proto().variables)
+    for gap_mode in ("triple", "span"):
+        built = build_model(problem, optimize_gaps=True, room_mode="compact", gap_mode=gap_mode)
+        assert int(section_variables(cp, "compact", True, gap_mode).sum()) == len(built.model.Proto().variables)
+    assert estimate_memory_mb(problem, "per_slot") > estimate_memory_mb(problem, "compact")
+    assert estimate_memory_mb(problem, "per_slot", strategy="two_stage") < estimate_memory_mb(problem, "per_slot")
+    assert estimate_memory_mb(problem, engine="local") < estimate_memory_mb(problem, "compact")
+    print("✅ Variable estimate matches the built model")
+
+
+def test_estimate_counts_parallel_processes():
+    problem = load_problem_from_directory("TT_Flexinput")
+    cp = compile_problem(problem)
+    sizes = sorted(float(section_variables(cp, "compact")[c].sum()) for c in section_components(cp))
+    budget = admission_module.CORE_BUDGET
+    admission_module.CORE_BUDGET = 8
+    try:
+        # Two racing processes of 4 workers, or two components side by side
+        direct = estimate_memory_mb(problem, "compact")
+        assert estimate_memory_mb(problem, "compact", portfolio=True) == round(2 * direct, 1)
+        decomposed = estimate_memory_mb(problem, "compact", strategy="decomposed")
+        assert decomposed == round(2 * BASE_MB + sum(sizes[-2:]) * KB_PER_VARIABLE / 1024, 1)
+        assert estimate_memory_mb(problem, "compact", strategy="decomposed", portfolio=True) == round(2 * (BASE_MB + sizes[-1] * KB_PER_VARIABLE / 1024), 1)
+    finally:
+        admission_module.CORE_BUDGET = budget
+    print("✅ Estimates count the processes solving at once")
+
+
+def test_core_budget_and_priorities():
+    print("=" * 70)
+    print("Testing admission control")
+    print("=" * 70)
+
+    admission = Admission(cores=8, memory_limit_mb=1000)
+    assert admission.max_running == 2
+    for job_id in ("solve1", "solve2", "solve3"):
+        admission.request(job_id, PRIORITY_SOLVE, memory_mb=300)
+    # Three waiting: the budget is split between the two that fit
+    assert admission.admit() == [("solve1", 4), ("solve2", 4)]
+    admission.request("repair", PRIORITY_REPAIR, memory_mb=100)
+    assert admission.admit() == []
+    assert admission.position("repair") == 0 and admission.position("solve3") == 1
+
+    admission.release("solve1")
+    assert admission.admit() == [("repair", 4)]
+    stats = admission.stats()
+    print(stats)
+    assert (stats["running"], stats["queued"], stats["coresInUse"]) == (2, 1, 8)
+    assert stats["waitSec"]["count"] == 3
+
+    # Memory: solve3 waits until it fits next to the running jobs
+    admission.release("solve2")
+    admission.request("big", PRIORITY_REPAIR, memory_mb=950)
+    assert admission.admit() == []
+    admission.release("repair")
+    assert admission.admit() == [("big", 4)]
+    assert admission.stats()["memoryInUseMb"] == 950
+    assert admission.withdraw("solve3") and not admission.withdraw("solve3")
+
+    try:
+        admission.request("huge", PRIORITY_SOLVE, memory_mb=5000)
+        assert False, "expected MemoryLimitExceeded"
+    except MemoryLimitExceeded as e:
+        print(f"Rejected: {e}")
+    assert admission.stats()["rejected"] == 1
+
+    # Fewer cores than MIN_WORKERS: one job at a time, holding every core
+    small = Admission(cores=2, memory_limit_mb=1000)
+    small.request("solve", PRIORITY_SOLVE)
+    small.request("next", PRIORITY_SOLVE)
+    assert small.admit() == [("solve", 4)]
+    assert small.stats()["coresInUse"] == 2
+    # Cores held match the workers handed out
+    admission = Admission(cores=6, memory_limit_mb=1000)
+    admission.request("solve", PRIORITY_SOLVE)
+    assert admission.admit() == [("solve", 6)] and admission.stats()["coresInUse"] == 6
+    print("✅ Jobs share cores, repairs go first, oversized jobs are rejected")
+
+
+if __name__ == "__main__":
+    test_variable_estimate_matches_model()
+    test_estimate_counts_parallel_processes()
+    test_core_budget_and_priorities()
@@ -0,0 +1,67 @@
+"""
+Test the compact room formulation: no per-slot room variables, yet every
+class still gets a room, rooms are never double-booked and each section
+keeps ONE room per block.
+"""
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.timetable_solver import build_model, solve
+
+
+def test_compact_room_mode():
+    print("=" * 70)
+    print("Testing compact room mode")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+
+    per_slot = build_model(problem, room_mode="per_slot")
+    compact = build_model(problem, room_mode="compact")
+    n_per_slot = len(per_slot.model.Proto().variables)
+    n_compact = len(compact.model.Proto().variables)
+    print(f"Variables: per_slot={n_per_slot}, compact={n_compact}")
+    assert not compact.R_lec and not compact.R_lab_start
+    assert n_compact < n_per_slot
+
+    result = solve(problem, time_limit_sec=60, room_mode="compact")
+    print(f"Solver Status: {result.status}")
+    assert result.status != "INFEASIBLE"
+
+    missing_rooms = [
+        (sid, tid) for sid, by_t in result.schedule_by_section.items()
+        for tid, (_c, _f, room_id, _k) in by_t.items() if not room_id
+    ]
+    assert not missing_rooms, f"Classes without a room: {missing_rooms[:5]}"
+
+    violations = validate_solution(problem, result.schedule_by_section)
+    for v in violations:
+        print(f"  ❌ {v}")
+    assert not violations
+    print("✅ Compact room mode produces a valid, room-sticky timetable")
+
+
+def test_room_class_mode():
+    print("=" * 70)
+    print("Testing room class mode")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+
+    built = build_model(problem, room_mode="classes")
+    assert not built.SectionBlockRoom and built.SectionBlockClass
+    print(f"Room classes: {len(built.compiled.room_classes)} for {len(built.compiled.room_ids)} rooms")
+
+    result = solve(problem, time_limit_sec=60, room_mode="classes")
+    print(f"Solver Status: {result.status}")
+    assert result.status != "INFEASIBLE"
+
+    violations = validate_solution(problem, result.schedule_by_section)
+    for v in violations:
+        print(f"  ❌ {v}")
+    assert not violations
+    print("✅ Room classes are matched to concrete, room-sticky rooms")
+
+
+if __name__ == "__main__":
+    test_compact_room_mode()
+    test_room_class_mode()
@@ -0,0 +1,47 @@
+"""
+Test that CompiledProblem resolves weekly demands exactly like the per-row
+defaults (section override first, then course defaults).
+"""
+from src.compiled import compile_problem
+from src.loader import load_problem_from_directory
+
+
+def test_compiled_demands_match_defaults():
+    print("Testing CompiledProblem demand resolution...")
+    print("-" * 60)
+
+    for inputs_dir in ["TT_Flexinput", "data/templates", "data/large_1000"]:
+        problem = load_problem_from_directory(inputs_dir)
+        cp = compile_problem(problem)
+        assert compile_problem(problem) is cp, "CompiledProblem should be built once per ProblemData"
+
+        req_map = problem.section_course_requirements_map()
+        fac_map = problem.faculty_assignment_map()
+        mismatches = 0
+        for course in problem.courses:
+            for section in problem.sections:
+                r = req_map.get((section.section_id, course.course_id))
+                if r is None:
+                    lectures = course.lecture_periods_per_week
+                    labs = course.lab_sessions_per_week if course.is_lab else 0
+                    block = course.lab_block_size if course.is_lab else 0
+                else:
+                    lectures = r.weekly_lectures
+                    labs = r.weekly_lab_sessions
+                    block = r.lab_block_size or (course.lab_block_size if course.is_lab else 0)
+                s_idx = cp.section_index[section.section_id]
+                c_idx = cp.course_index[course.course_id]
+                got = (int(cp.lectures[s_idx, c_idx]), int(cp.lab_sessions[s_idx, c_idx]), int(cp.lab_block[s_idx, c_idx]))
+                if got != (lectures, labs, block):
+                    mismatches += 1
+                fac = cp.faculty_id_of(s_idx, c_idx)
+                if fac != fac_map.get((section.section_id, course.course_id)):
+                    mismatches += 1
+
+        status = "✅" if mismatches == 0 else "❌"
+        print(f"{status} {inputs_dir}: {len(cp.section_ids)} sections x {len(cp.course_ids)} courses, {mismatches} mismatches")
+        assert mismatches == 0
+
+
+if __name__ == "__main__":
+    test_compiled_demands_match_defaults()
@@ -0,0 +1,78 @@
+"""
+Test the day_split strategy: a plan of classes per (section, course, day)
+that keeps weekly demand and day capacity, then one model per day, merged
+into a valid timetable, also when the days are solved in pool processes.
+"""
+from collections import defaultdict
+
+from src.compiled import compile_problem
+from src.day_split import build_plan_model, solve_day_split, solve_plan
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.timetable_solver import SOLVER_PARAMS, solve
+
+
+def test_day_plan():
+    print("=" * 70)
+    print("Testing the day plan")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    cp = compile_problem(problem)
+    plan, p1_allowed, _status = solve_plan(cp, build_plan_model(cp), 10)
+    assert plan is not None
+
+    weekly = defaultdict(lambda: [0, 0])
+    for d, counts in plan.items():
+        capacity = len(cp.grid.non_break_by_day[d])
+        load = defaultdict(int)
+        for (s_idx, c_idx), (lectures, labs) in counts.items():
+            weekly[(s_idx, c_idx)][0] += lectures
+            weekly[(s_idx, c_idx)][1] += labs
+            load[s_idx] += lectures + labs * int(cp.lab_block[s_idx, c_idx])
+        assert max(load.values()) <= capacity
+    for s_idx, c_idx in cp.scheduled_lectures():
+        assert weekly[(s_idx, c_idx)][0] == cp.lectures[s_idx, c_idx]
+    for s_idx, c_idx in cp.scheduled_labs():
+        assert weekly[(s_idx, c_idx)][1] == cp.lab_sessions[s_idx, c_idx]
+    # P1 at most three days a week per faculty
+    days_allowed = defaultdict(int)
+    for faculty in p1_allowed.values():
+        for f in faculty:
+            days_allowed[f] += 1
+    assert max(days_allowed.values()) <= 3
+    print("✅ The plan keeps weekly demand, day capacity and the P1 limit")
+
+
+def test_day_split_valid():
+    for inputs_dir, room_mode in (("TT_Flexinput", "compact"), ("data/large_1000", "per_slot")):
+        problem = load_problem_from_directory(inputs_dir)
+        result = solve(problem, time_limit_sec=60, optimize_gaps=True, room_mode=room_mode, strategy="day_split")
+        print(f"{inputs_dir} ({room_mode}): {result.status}, objective {result.objective_value}")
+        assert result.status in ("OPTIMAL", "FEASIBLE")
+        assert result.objective_value is not None
+        assert validate_solution(problem, result.schedule_by_section) == []
+
+    try:
+        solve(problem, strategy="day_split", engine="interval")
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    print("✅ Day-split timetables are valid")
+
+    # Two pool processes sharing a grant of 8 workers
+    problem = load_problem_from_directory("TT_Flexinput")
+    SOLVER_PARAMS["num_search_workers"] = 8
+    try:
+        result = solve_day_split(problem, time_limit_sec=60, optimize_gaps=True, processes=2)
+    finally:
+        SOLVER_PARAMS.clear()
+    print(f"2 processes: {result.status}, objective {result.objective_value}")
+    assert result.status == "FEASIBLE"
+    assert validate_solution(problem, result.schedule_by_section) == []
+    print("✅ Days solved in pool processes merge into a valid timetable")
+
+
+if __name__ == "__main__":
+    test_day_plan()
+    test_day_split_valid()
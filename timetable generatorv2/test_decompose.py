@@ -0,0 +1,98 @@
+"""
+Test independent-component decomposition: TT_Flexinput splits into
+groups of sections that share no faculty, the merged timetable is valid,
+clashing rooms between groups are re-assigned with times kept, and pool
+processes get their share of the workers and stop with their parent.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src import timetable_solver
+from src.compiled import compile_problem
+from src.decompose import _merge, _reconcile_rooms, section_components, solve_decomposed
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.portfolio import child_solvers, init_child, split_workers
+from src.timetable_solver import result_from_assignments, solve
+
+
+def child_state(wait_sec):
+    # Runs in a pool process, so it lives at module level
+    stopped = timetable_solver.STOP_REQUESTED.wait(wait_sec)
+    return dict(timetable_solver.SOLVER_PARAMS), dict(timetable_solver.PROFILE_PARAMS), stopped
+
+
+def test_components_and_decomposed_solve():
+    print("=" * 70)
+    print("Testing decomposed solve on TT_Flexinput")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    cp = compile_problem(problem)
+    components = section_components(cp)
+    print(f"Components: {[[cp.section_ids[s] for s in c] for c in components]}")
+    assert len(components) > 1
+    assert sorted(s for c in components for s in c) == list(range(len(cp.section_ids)))
+    # No faculty teaches in two components
+    faculty_sets = [{int(f) for s in c for f in cp.faculty_of[s] if f >= 0} for c in components]
+    assert all(not (a & b) for i, a in enumerate(faculty_sets) for b in faculty_sets[i + 1:])
+
+    for processes in (1, 2):
+        result = solve_decomposed(problem, time_limit_sec=60, processes=processes, room_mode="compact")
+        print(f"processes={processes}: {result.status}")
+        assert result.status != "INFEASIBLE"
+        assert not validate_solution(problem, result.schedule_by_section)
+    print("✅ Decomposed solve gives a valid timetable")
+
+
+def test_room_reconciliation():
+    problem = load_problem_from_directory("TT_Flexinput")
+    cp = compile_problem(problem)
+    base = solve(problem, time_limit_sec=60, room_mode="compact")
+    assert base.status != "INFEASIBLE"
+
+    # Every class in the same room: every busy block clashes
+    merged = [(s, c, kind, tids, cp.room_ids[-1]) for s, c, kind, tids, _r in _merge([base])]
+    reconciled = _reconcile_rooms(cp, merged)
+    assert reconciled is not None
+    assignments, n_blocks = reconciled
+    print(f"Re-roomed {n_blocks} blocks")
+    assert n_blocks > 0
+    assert sorted((s, c, tuple(t)) for s, c, _k, t, _r in assignments) == sorted((s, c, tuple(t)) for s, c, _k, t, _r in merged)
+
+    result = result_from_assignments(problem, assignments, status="FEASIBLE")
+    assert not validate_solution(problem, result.schedule_by_section)
+    print("✅ Room clashes are resolved with class times unchanged")
+
+
+def test_pool_processes_share_workers_and_stop():
+    timetable_solver.SOLVER_PARAMS["num_search_workers"] = 8
+    timetable_solver.PROFILE_PARAMS["linearization_level"] = 2
+    try:
+        processes, workers = split_workers(25)
+        assert (processes, workers) == (2, 4)
+        ctx = multiprocessing.get_context("spawn")
+        with child_solvers(ctx, workers) as child, ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=init_child, initargs=child) as ex:
+            future = ex.submit(child_state, 60)
+            time.sleep(5)
+            start = time.perf_counter()
+            timetable_solver.stop_searches()
+            params, profile, stopped = future.result()
+            stop_sec = time.perf_counter() - start
+    finally:
+        timetable_solver.SOLVER_PARAMS.clear()
+        timetable_solver.PROFILE_PARAMS.clear()
+        timetable_solver.STOP_REQUESTED.clear()
+    print(f"Child: {params} {profile}, stopped in {stop_sec:.1f}s")
+    assert params == {"num_search_workers": 4}
+    assert profile == {"linearization_level": 2}
+    assert stopped and stop_sec < 10
+    assert not timetable_solver.CHILD_STOPS
+    print("✅ Pool processes split the workers and stop with their parent")
+
+
+if __name__ == "__main__":
+    test_components_and_decomposed_solve()
+    test_room_reconciliation()
+    test_pool_processes_share_workers_and_stop()
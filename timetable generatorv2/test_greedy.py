@@ -0,0 +1,71 @@
+"""
+Test the greedy constructor: it builds valid timetables without search
+(TT_Flexinput fills every period, so it needs the ejection step) and never
+shares a room within a block, solve() returns them as is without
+optimize_gaps and uses them as the CP-SAT hint with it.
+"""
+import time
+
+from src.compiled import compile_problem
+from src.feasibility import validate_solution
+from src.greedy import construct
+from src.loader import load_problem_from_directory
+from src.models import RoomPolicy
+from src.pipeline import assign_rooms_for_occupancy
+from src.room_policy import with_room_policy
+from src.timetable_solver import solve
+
+
+def test_construct():
+    print("=" * 70)
+    print("Testing the greedy constructor")
+    print("=" * 70)
+
+    for inputs_dir in ("TT_Flexinput", "data/large_1000"):
+        problem = load_problem_from_directory(inputs_dir)
+        t0 = time.perf_counter()
+        result = construct(problem)
+        print(f"{inputs_dir}: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        assert result is not None
+        assert result.status == "FEASIBLE" and result.stop_reason == "greedy"
+        assert not validate_solution(problem, result.schedule_by_section)
+    print("✅ Greedy timetables are valid")
+
+    # Two sections whose only room is the same, at different slots of a block:
+    # sharing it is fine per slot, but not in the compact and classes room modes
+    problem = with_room_policy(load_problem_from_directory("TT_Flexinput"), RoomPolicy(max_candidates=1))
+    cp = compile_problem(problem)
+    s1, s2 = [s for s_idx, s in enumerate(cp.section_ids) if list(cp.candidate_rooms[s_idx]) == [2]][:2]
+    block_id, tids = cp.blocks_by_day[0][0]
+    occupancy = {block_id: {s1: [tids[0]], s2: [tids[1]]}}
+    block_room, failed = assign_rooms_for_occupancy(cp, occupancy)
+    assert not failed and block_room[(s1, block_id)] == block_room[(s2, block_id)]
+    assert assign_rooms_for_occupancy(cp, occupancy, share_rooms=False) == ({}, [block_id])
+    print("✅ Greedy room matching never shares a room within a block")
+
+
+def test_solve_greedy():
+    problem = load_problem_from_directory("TT_Flexinput")
+    events = []
+    result = solve(problem, time_limit_sec=60, room_mode="compact", greedy=True, progress=events.append)
+    assert result.stop_reason == "greedy"
+    assert [e["event"] for e in events] == ["greedy"] and events[0]["placed"]
+
+    events = []
+    result = solve(problem, time_limit_sec=60, optimize_gaps=True, room_mode="compact", greedy=True, progress=events.append)
+    print(f"hinted: {result.status} {result.objective_value}")
+    assert result.status == "OPTIMAL"
+    assert events[0]["event"] == "greedy" and any(e["event"] == "solution" for e in events)
+    assert not validate_solution(problem, result.schedule_by_section)
+
+    try:
+        solve(problem, optimize_gaps=True, strategy="rolling", greedy=True)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    print("✅ solve() returns or hints the greedy timetable")
+
+
+if __name__ == "__main__":
+    test_construct()
+    test_solve_greedy()
@@ -0,0 +1,63 @@
+"""
+Test warm starts: an exported timetable reads back into the same schedule,
+and solving with it (or with the hand-made workbook) as a hint still gives
+a valid timetable.
+"""
+import tempfile
+
+from src.exporter import export_all
+from src.feasibility import validate_solution
+from src.hints import load_hint
+from src.loader import load_problem_from_directory
+from src.stopping import StopCriteria
+from src.timetable_solver import solve
+
+
+def test_hint_round_trip_and_warm_start():
+    print("=" * 70)
+    print("Testing warm start from an exported timetable")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    base = solve(problem, time_limit_sec=60, room_mode="compact")
+    assert base.status != "INFEASIBLE"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        export_all(base, tmpdir)
+        hint = load_hint(problem, tmpdir)
+    assert {s: dict(by_t) for s, by_t in hint.schedule_by_section.items()} == \
+        {s: dict(by_t) for s, by_t in base.schedule_by_section.items()}
+    print("✅ Exported section CSVs read back unchanged")
+
+    result = solve(problem, time_limit_sec=60, room_mode="compact", hint=hint)
+    print(f"Solver Status: {result.status}")
+    assert result.status != "INFEASIBLE"
+    assert not validate_solution(problem, result.schedule_by_section)
+    # The status and stop reason are those of the search that gave the timetable
+    assert (result.status, result.stop_reason) == (base.status, base.stop_reason)
+    print("✅ Warm-started solve is valid")
+
+    stopped = solve(problem, time_limit_sec=60, room_mode="compact", optimize_gaps=True, hint=hint, stop=StopCriteria(first_feasible=True))
+    print(f"First feasible: {stopped.status} ({stopped.stop_reason})")
+    # The first timetable can already meet the gap bound
+    assert (stopped.status, stopped.stop_reason) in (("FEASIBLE", "first_feasible"), ("OPTIMAL", "optimal"))
+    assert not validate_solution(problem, stopped.schedule_by_section)
+    print("✅ Early stop applies to warm starts")
+
+
+def test_hint_from_timetable_workbook():
+    problem = load_problem_from_directory("TT_Flexinput")
+    hint = load_hint(problem, "TT_Flexinput/main time table.xlsx")
+    n_classes = sum(len(by_t) for by_t in hint.schedule_by_section.values())
+    print(f"Workbook hint: {len(hint.schedule_by_section)} sections, {n_classes} periods")
+    assert n_classes > 0
+
+    result = solve(problem, time_limit_sec=60, room_mode="compact", hint=hint)
+    assert result.status != "INFEASIBLE"
+    assert not validate_solution(problem, result.schedule_by_section)
+    print("✅ Workbook hint gives a valid timetable")
+
+
+if __name__ == "__main__":
+    test_hint_round_trip_and_warm_start()
+    test_hint_from_timetable_workbook()
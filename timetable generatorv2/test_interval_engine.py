@@ -0,0 +1,31 @@
+"""
+Test the interval/NoOverlap engine returns the same kind of SolveResult as
+the time-indexed model and respects every hard constraint.
+"""
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.timetable_solver import solve
+
+
+def test_interval_engine():
+    print("=" * 70)
+    print("Testing interval engine")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    result = solve(problem, time_limit_sec=90, engine="interval")
+    print(f"Solver Status: {result.status}")
+    assert result.status != "INFEASIBLE"
+
+    assert set(result.schedule_by_section) == set(problem.section_ids())
+    assert result.available_rooms and result.available_faculty
+
+    violations = validate_solution(problem, result.schedule_by_section)
+    for v in violations:
+        print(f"  ❌ {v}")
+    assert not violations
+    print("✅ Interval engine produces a valid timetable")
+
+
+if __name__ == "__main__":
+    test_interval_engine()
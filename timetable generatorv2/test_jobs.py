@@ -0,0 +1,59 @@
+"""
+Test the background job API: jobs run in pool processes, and cancelling a
+running job stops its CP-SAT search and finishes it as "cancelled" long
+before its time limit.
+"""
+import time
+
+from src.admission import Admission
+from src.jobs import JobStore
+from src.loader import load_problem_from_directory
+from src.timetable_solver import solve
+
+
+def solve_directory(inputs_dir, time_limit_sec, progress=None):
+    # Job functions run in a spawned process, so they live at module level
+    result = solve(load_problem_from_directory(inputs_dir), time_limit_sec=time_limit_sec, room_mode="compact", progress=progress)
+    return {"status": result.status}
+
+
+def test_job_runs_in_pool_process():
+    store = JobStore(Admission(cores=1))
+    job = store.submit(solve_directory, "TT_Flexinput", 60)
+    assert job.wait(180)
+    print(f"{job.status}: {[e['event'] for e in job.events]}")
+    assert job.status == "done"
+    assert job.result["status"] != "INFEASIBLE"
+    assert job.events[0]["event"] == "status" and job.events[0]["status"] == "running"
+    assert job.events[0]["workers"] >= 4
+    print("✅ Job solved in a pool process")
+
+
+def test_cancel_running_job():
+    print("=" * 70)
+    print("Testing job cancellation")
+    print("=" * 70)
+
+    store = JobStore(Admission(cores=1))
+    job = store.submit(solve_directory, "data/large_3000", 300)
+    queued = store.submit(solve_directory, "TT_Flexinput", 60)
+    # Cancel once the search has started
+    for item in job.iter_events():
+        if item is not None and item[1]["event"] == "model":
+            break
+    start = time.perf_counter()
+    store.cancel(job)
+    store.cancel(queued)
+    assert job.wait(60) and queued.wait(60)
+    stop_sec = time.perf_counter() - start
+    print(f"Stopped in {stop_sec:.1f}s: {job.status} {job.result}, queued job: {queued.status}")
+    assert job.status == "cancelled"
+    assert job.result["status"] in ("FEASIBLE", "INFEASIBLE")
+    assert stop_sec < 30
+    assert queued.status == "cancelled" and queued.result is None
+    print("✅ Cancelled job stopped its search")
+
+
+if __name__ == "__main__":
+    test_job_runs_in_pool_process()
+    test_cancel_running_job()
@@ -0,0 +1,91 @@
+"""
+Test the labs-first strategy: labs and their rooms are placed first, the
+lectures around them, and a lab placement the lectures cannot fit around is
+excluded by its infeasible core and replaced.
+"""
+import tempfile
+
+from src import labs_first
+from src.feasibility import validate_solution
+from src.generate_synthetic import generate_dataset
+from src.labs_first import labs_only
+from src.loader import load_problem_from_directory
+from src.timetable_solver import solve
+
+
+def test_labs_only():
+    problem = load_problem_from_directory("TT_Flexinput")
+    labs = labs_only(problem)
+    assert all(c.lecture_periods_per_week == 0 for c in labs.courses)
+    assert all(r.weekly_lectures == 0 for r in labs.section_requirements)
+    assert [r.weekly_lab_sessions for r in labs.section_requirements] == [r.weekly_lab_sessions for r in problem.section_requirements]
+    print("✅ Labs-only problem keeps the labs and drops the lectures")
+
+
+def test_labs_first_valid():
+    print("=" * 70)
+    print("Testing labs-first solving")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    result = solve(problem, time_limit_sec=30, optimize_gaps=True, room_mode="compact", strategy="labs_first")
+    print(f"TT_Flexinput: {result.status}, objective {result.objective_value}, stop {result.stop_reason}")
+    assert result.status in ("OPTIMAL", "FEASIBLE")
+    assert result.objective_value is not None
+    assert validate_solution(problem, result.schedule_by_section) == []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generate_dataset(tmpdir, total_students=600, section_size=60, num_courses=10, num_lab_courses=6)
+        problem = load_problem_from_directory(tmpdir)
+    for room_mode in ("compact", "per_slot"):
+        result = solve(problem, time_limit_sec=60, room_mode=room_mode, strategy="labs_first")
+        print(f"Lab-heavy ({room_mode}): {result.status}")
+        assert result.status in ("OPTIMAL", "FEASIBLE")
+        assert validate_solution(problem, result.schedule_by_section) == []
+    print("✅ Labs-first timetables are valid")
+
+
+def test_labs_first_backtracks():
+    problem = load_problem_from_directory("TT_Flexinput")
+    greedy_placement = labs_first._greedy_placement
+
+    def clashing_placement(problem):
+        # Two labs of one section starting together: stage 2 is infeasible
+        placement = greedy_placement(problem)
+        starts = sorted(placement["Y_lab_start"])
+        s, c, t = starts[0]
+        other = next(key for key in starts if key[0] == s and key[1] != c)
+        placement["Y_lab_start"] = (set(starts) - {other}) | {(s, other[1], t)}
+        return placement
+
+    solver_calls = []
+    make_solver = labs_first.make_solver
+
+    def counting_solver(time_limit_sec):
+        solver_calls.append(time_limit_sec)
+        return make_solver(time_limit_sec)
+
+    labs_first._greedy_placement = clashing_placement
+    labs_first.make_solver = counting_solver
+    try:
+        result = solve(problem, time_limit_sec=30, room_mode="compact", strategy="labs_first")
+    finally:
+        labs_first._greedy_placement = greedy_placement
+        labs_first.make_solver = make_solver
+    # Stage 2, then the lab model and stage 2 again
+    print(f"{result.status} after {len(solver_calls)} solves")
+    assert result.status in ("OPTIMAL", "FEASIBLE") and len(solver_calls) >= 3
+    assert validate_solution(problem, result.schedule_by_section) == []
+
+    try:
+        solve(problem, strategy="labs_first", engine="interval")
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    print("✅ A clashing lab placement is replaced")
+
+
+if __name__ == "__main__":
+    test_labs_only()
+    test_labs_first_valid()
+    test_labs_first_backtracks()
@@ -0,0 +1,96 @@
+"""
+Test the local search engine: it repairs a random timetable into a valid
+one, solve(engine="local") returns valid timetables whose objective is the
+counted gaps, and polishing removes gaps from a valid timetable.
+"""
+import random
+
+from src.compiled import compile_problem
+from src.feasibility import validate_solution
+from src.greedy import construct
+from src.loader import load_problem_from_directory
+from src.local_search import LocalState, polish, search
+from src.timetable_solver import solve
+
+
+def _count_gaps(result):
+    by_day = {}
+    for ts in result.timeslots:
+        if not ts.is_break:
+            by_day.setdefault(ts.day_index, []).append(ts.timeslot_id)
+    days = [[t in by_t for t in ordered] for by_t in result.schedule_by_section.values() for ordered in by_day.values()]
+    return sum(o[i - 1] and o[i + 1] and not o[i] for o in days for i in range(1, len(o) - 1))
+
+
+def test_incremental_costs():
+    print("=" * 70)
+    print("Testing local search moves and incremental costs")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("data/large_1000")
+    state = LocalState(compile_problem(problem), True, "triple", random.Random(0))
+    assert state.load({})  # no timetable given: random free periods
+    print(f"Random start: {state.hard} hard violations, {state.gaps} gaps")
+    assert state.hard > 0
+
+    # A rolled-back move leaves every array and total as it was
+    arrays = (state.grid, state.faculty_occ, state.room_occ, state.block_room, state.row_gaps)
+    before = [a.copy() for a in arrays] + [state.cost]
+    for k in range(50):
+        totals = state.begin()
+        if state.size[k]:
+            state.move_lab(k, state.lab_starts[int(state.size[k])][0])
+        else:
+            state.swap(int(state.section[k]), int(state.start[k]), 0)
+        state._refresh_gaps()
+        state.rollback(totals)
+    assert all((a == b).all() for a, b in zip(arrays, before)) and state.cost == before[-1]
+
+    best, hard, gaps = search(state, 60)
+    print(f"After search: {hard} hard violations, {gaps} gaps")
+    assert hard == 0
+    # The running totals match a recount
+    assert state.gaps == sum(state._row_gaps(s, d) for s in range(state.grid.shape[0]) for d in range(len(state.day_positions)))
+    assert state.faculty_conflicts == int((state.faculty_occ - 1).clip(0).sum())
+    print("✅ Moves undo exactly and the search repairs a random timetable")
+
+
+def test_local_engine():
+    for inputs_dir in ("TT_Flexinput", "data/large_1000"):
+        problem = load_problem_from_directory(inputs_dir)
+        events = []
+        result = solve(problem, time_limit_sec=30, optimize_gaps=True, engine="local", progress=events.append)
+        print(f"{inputs_dir}: {result.status}, {result.objective_value} gaps, {result.stop_reason}")
+        assert result.status in ("OPTIMAL", "FEASIBLE")
+        assert not validate_solution(problem, result.schedule_by_section)
+        assert result.objective_value == _count_gaps(result)
+        assert events and events[-1]["objective"] == result.objective_value
+
+    try:
+        solve(problem, engine="local", strategy="two_stage")
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    print("✅ The local engine returns valid timetables")
+
+
+def test_polish():
+    problem = load_problem_from_directory("data/large_1000")
+    # The greedy timetable, scored as a FEASIBLE gap-minimising result
+    result = construct(problem)
+    result.status, result.objective_value = "FEASIBLE", _count_gaps(result)
+    polished = polish(problem, result, 20)
+    print(f"Greedy: {result.objective_value} gaps, polished: {polished.status} {polished.objective_value}")
+    assert result.objective_value > 0 and polished.objective_value < result.objective_value
+    assert not validate_solution(problem, polished.schedule_by_section)
+    assert polished.objective_value == _count_gaps(polished)
+
+    # Only FEASIBLE results are polished
+    assert polish(problem, polished, 0) is polished
+    print("✅ Polishing keeps the timetable valid and removes gaps")
+
+
+if __name__ == "__main__":
+    test_incremental_costs()
+    test_local_engine()
+    test_polish()
@@ -0,0 +1,83 @@
+"""
+Test the solver portfolio: racing two configurations returns a valid
+timetable, records the winner, recorded wins reorder the default
+portfolio, and the race keeps to a job's workers and stops with it.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.portfolio import DEFAULT_PORTFOLIO, load_stats, select_configs, solve_portfolio, split_workers
+from src.timetable_solver import SOLVER_PARAMS, STOP_REQUESTED, stop_searches
+
+
+def test_portfolio_race():
+    print("=" * 70)
+    print("Testing a two-configuration portfolio race")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats_path = os.path.join(tmpdir, "stats.json")
+        result = solve_portfolio(problem, time_limit_sec=60, processes=2, stats_path=stats_path, room_mode="compact")
+        print(f"Solver Status: {result.status}")
+        assert result.status != "INFEASIBLE"
+        assert not validate_solution(problem, result.schedule_by_section)
+
+        stats = load_stats(stats_path)
+        print(f"Stats: {stats}")
+        assert set(stats) == {c.name for c in DEFAULT_PORTFOLIO[:2]}
+        assert sum(e["runs"] for e in stats.values()) == 2
+        assert sum(e["wins"] for e in stats.values()) == 1
+    print("✅ Portfolio returns a valid timetable and records the winner")
+
+
+def test_select_configs_uses_win_rate():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats_path = os.path.join(tmpdir, "stats.json")
+        assert select_configs(2, stats_path) == DEFAULT_PORTFOLIO[:2]
+
+        last = DEFAULT_PORTFOLIO[-1].name
+        with open(stats_path, "w") as f:
+            json.dump({
+                DEFAULT_PORTFOLIO[0].name: {"runs": 10, "wins": 1, "win_sec": 5.0},
+                last: {"runs": 10, "wins": 9, "win_sec": 5.0},
+            }, f)
+        chosen = [c.name for c in select_configs(2, stats_path)]
+        assert chosen == [last, DEFAULT_PORTFOLIO[1].name]
+    print("✅ Frequent winners move to the front of the portfolio")
+
+
+def test_worker_budget_and_stop():
+    SOLVER_PARAMS["num_search_workers"] = 8
+    try:
+        assert split_workers(5) == (2, 4)
+        assert split_workers(1) == (1, 8)
+        assert split_workers(5, processes=4) == (4, 2)
+    finally:
+        SOLVER_PARAMS.clear()
+    print("✅ Parallel solves split the granted workers")
+
+    problem = load_problem_from_directory("data/large_3000")
+    timer = threading.Timer(15, stop_searches)
+    start = time.perf_counter()
+    timer.start()
+    try:
+        result = solve_portfolio(problem, time_limit_sec=300, processes=2, stats_path=None, room_mode="compact", optimize_gaps=True)
+    finally:
+        timer.cancel()
+        STOP_REQUESTED.clear()
+    elapsed = time.perf_counter() - start
+    print(f"Stopped after {elapsed:.1f}s: {result.status}")
+    assert elapsed < 40
+    print("✅ stop_searches() stops the racing processes")
+
+
+if __name__ == "__main__":
+    test_portfolio_race()
+    test_select_configs_uses_win_rate()
+    test_worker_budget_and_stop()
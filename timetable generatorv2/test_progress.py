@@ -0,0 +1,91 @@
+"""
+Test solver progress events: solve() reports the model size and each
+solution, and a background job from POST /api/jobs streams status, model,
+solution and done events as server-sent events and ends with the result,
+and the CLI's --progress jsonl prints JSON lines only on stdout.
+"""
+import base64
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from src.app_fastapi import FilePayload, SolveRequest, _event_stream, create_job, job_status, jobs
+from src.loader import load_problem_from_directory
+from src.timetable_solver import solve
+
+
+def _payload(inputs_dir: str) -> list:
+    files = []
+    for path in sorted(glob.glob(os.path.join(inputs_dir, "*.csv"))):
+        with open(path, "rb") as f:
+            files.append(FilePayload(name=os.path.basename(path), content=base64.b64encode(f.read()).decode("utf-8")))
+    return files
+
+
+def test_solve_progress_events():
+    print("=" * 70)
+    print("Testing solve() progress events")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    events = []
+    result = solve(problem, time_limit_sec=60, room_mode="compact", progress=events.append)
+    assert result.status != "INFEASIBLE"
+    print(events)
+
+    assert events[0]["event"] == "model"
+    assert events[0]["variables"] > 0 and events[0]["constraints"] > 0
+    solutions = [e for e in events if e["event"] == "solution"]
+    assert solutions
+    assert [e["solutions"] for e in solutions] == list(range(1, len(solutions) + 1))
+    # No objective without optimize_gaps
+    assert all(e["objective"] is None and e["best_bound"] is None for e in solutions)
+    print("✅ Model and solution events reported")
+
+
+def test_job_event_stream():
+    payload = SolveRequest(files=_payload("TT_Flexinput"), timeLimit=60, roomMode="compact", useCache=False)
+    job_id = create_job(payload)["jobId"]
+    job = jobs.get(job_id)
+
+    messages = list(_event_stream(job))
+    names = [m.split("\n")[1][len("event: "):] for m in messages if not m.startswith(":")]
+    print(names)
+    assert names[0] == "status" and names[-1] == "done"
+    assert "model" in names and "solution" in names
+    done = json.loads(messages[-1].split("\n")[2][len("data: "):])
+    assert done["status"] != "INFEASIBLE" and done["cached"] is False
+
+    status = job_status(job_id)
+    assert status["status"] == "done"
+    assert status["result"]["status"] == done["status"]
+    assert status["result"]["sections"]
+
+    # Resuming after the third event replays the rest only
+    assert list(_event_stream(job, after=3)) == messages[3:]
+    print("✅ Job streams progress and ends with the result")
+
+
+def test_cli_jsonl_stdout():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        proc = subprocess.run(
+            [sys.executable, "-m", "src.main", "--inputs", "TT_Flexinput", "--output", tmpdir, "--room_mode", "compact", "--progress", "jsonl"],
+            capture_output=True, text=True, timeout=300,
+        )
+    assert proc.returncode == 0, proc.stderr
+    # Every stdout line is JSON; the messages are on stderr
+    events = [json.loads(line) for line in proc.stdout.splitlines()]
+    print([e["event"] for e in events])
+    assert events[0]["event"] == "model" and events[-1]["event"] == "summary"
+    assert events[-1]["exit_code"] == 0 and events[-1]["output"] == tmpdir
+    assert "Outputs written to" in proc.stderr
+    print("✅ --progress jsonl keeps stdout to JSON lines")
+
+
+if __name__ == "__main__":
+    test_solve_progress_events()
+    test_job_event_stream()
+    test_cli_jsonl_stdout()
@@ -0,0 +1,35 @@
+"""
+Test localized repair: making the busiest faculty unavailable on Monday
+moves only a few classes and leaves a valid timetable.
+"""
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.repair import RepairChanges, repair
+from src.timetable_solver import solve
+
+
+def test_repair_faculty_unavailable():
+    print("=" * 70)
+    print("Testing repair after a faculty becomes unavailable on Monday")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    base = solve(problem, time_limit_sec=60, room_mode="compact")
+    assert base.status != "INFEASIBLE"
+
+    faculty_id = max(base.schedule_by_faculty, key=lambda f: len(base.schedule_by_faculty[f]))
+    monday = [t.timeslot_id for t in base.timeslots if t.day_index == 0 and not t.is_break]
+    repaired = repair(problem, base, RepairChanges(faculty_unavailable={faculty_id: monday}), radius=0, time_limit_sec=60)
+    result = repaired.result
+    print(f"Status: {result.status}, radius {repaired.radius}, moved {repaired.moved_classes}")
+
+    assert result.status != "INFEASIBLE"
+    assert not validate_solution(problem, result.schedule_by_section)
+    assert not set(result.schedule_by_faculty.get(faculty_id, {})) & set(monday)
+    total = sum(len(by_t) for by_t in base.schedule_by_section.values())
+    assert repaired.moved_classes < total // 10
+    print("✅ Repaired timetable is valid and mostly unchanged")
+
+
+if __name__ == "__main__":
+    test_repair_faculty_unavailable()
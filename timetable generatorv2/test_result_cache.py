@@ -0,0 +1,121 @@
+"""
+Test the solve result cache: the problem fingerprint ignores row order, a
+stored result reads back unchanged, and the directory stays within its
+size bound by evicting the least recently used entries. Also test that a
+model loaded from the model cache solves to a valid timetable, and that
+GET /api/cache counts the hits of solves run in job processes.
+"""
+import base64
+import glob
+import os
+import pickle
+import tempfile
+import time
+
+from src.app_fastapi import FilePayload, SolveRequest, cache_stats, solve_api
+from src.cache import ModelCache, ResultCache, cache_key, problem_fingerprint
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.timetable_solver import solve
+
+
+def test_fingerprint_ignores_row_order():
+    problem = load_problem_from_directory("TT_Flexinput")
+    other = load_problem_from_directory("TT_Flexinput")
+    other.sections.reverse()
+    other.faculty_courses.reverse()
+    assert problem_fingerprint(problem) == problem_fingerprint(other)
+    assert cache_key(problem, time_limit_sec=60) != cache_key(problem, time_limit_sec=90)
+
+    other.rooms.pop()
+    assert problem_fingerprint(problem) != problem_fingerprint(other)
+    print("✅ Fingerprint is canonical and sensitive to content")
+
+
+def test_result_cache_round_trip_and_eviction():
+    print("=" * 70)
+    print("Testing the solve result cache")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    result = solve(problem, time_limit_sec=60, room_mode="compact")
+    assert result.status != "INFEASIBLE"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResultCache(tmpdir)
+        key = cache_key(problem, time_limit_sec=60, room_mode="compact")
+        assert cache.get(key) is None
+        assert cache.put(key, result)
+
+        start = time.perf_counter()
+        cached = cache.get(key)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Cache hit in {elapsed_ms:.1f} ms")
+        assert cached.status == result.status
+        assert cached.schedule_by_section == {s: dict(by_t) for s, by_t in result.schedule_by_section.items()}
+        assert cached.available_rooms == result.available_rooms
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # Room for a single entry: the older one is evicted
+        entry_bytes = os.path.getsize(os.path.join(tmpdir, f"{key}.json"))
+        small = ResultCache(tmpdir, max_bytes=entry_bytes + entry_bytes // 2)
+        os.utime(os.path.join(tmpdir, f"{key}.json"), (1, 1))
+        small.put("other", result)
+        assert small.get(key) is None
+        assert small.get("other") is not None
+        assert small.evictions == 1
+    print("✅ Cached result reads back unchanged; LRU eviction keeps the size bound")
+
+
+def test_model_cache():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ModelCache(tmpdir)
+        problem = load_problem_from_directory("TT_Flexinput")
+        built = cache.build_model(problem, room_mode="compact")
+        assert (cache.hits, cache.misses) == (0, 1)
+
+        problem = load_problem_from_directory("TT_Flexinput")
+        loaded = cache.build_model(problem, room_mode="compact")
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert len(loaded.model.Proto().variables) == len(built.model.Proto().variables)
+        assert loaded.X_lec.keys() == built.X_lec.keys()
+        assert all(loaded.X_lec[k].Index() == v.Index() for k, v in built.X_lec.items())
+
+        # An entry this OR-Tools cannot decode is a miss, and build_model runs
+        key = cache.key(problem, room_mode="per_slot")
+        with open(os.path.join(tmpdir, f"{key}.model"), "wb") as f:
+            pickle.dump({"proto": "", "maps": None}, f)
+        assert cache.get(key, problem) is None and cache.misses == 2
+        assert cache.build_model(problem, room_mode="per_slot").X_lec
+
+        result = solve(problem, time_limit_sec=60, room_mode="compact", model_cache=cache)
+        assert cache.hits == 2
+        assert result.status != "INFEASIBLE"
+        assert not validate_solution(problem, result.schedule_by_section)
+    print("✅ Cached model solves to a valid timetable")
+
+
+def test_api_cache_counters():
+    files = []
+    for path in sorted(glob.glob(os.path.join("TT_Flexinput", "*.csv"))):
+        with open(path, "rb") as f:
+            files.append(FilePayload(name=os.path.basename(path), content=base64.b64encode(f.read()).decode("utf-8")))
+    payload = SolveRequest(files=files, timeLimit=60, roomMode="compact")
+
+    before = cache_stats()["results"]
+    solve_api(payload)
+    repeat = solve_api(payload)
+    after = cache_stats()["results"]
+    print(f"Before {before}, after {after}")
+    # The solves ran in pool processes; their counts reach this process
+    assert repeat["cached"] is True
+    assert after["hits"] - before["hits"] >= 1
+    assert after["hits"] + after["misses"] - before["hits"] - before["misses"] == 2
+    print("✅ /api/cache counts job hits and misses")
+
+
+if __name__ == "__main__":
+    test_fingerprint_ignores_row_order()
+    test_result_cache_round_trip_and_eviction()
+    test_model_cache()
+    test_api_cache_counters()
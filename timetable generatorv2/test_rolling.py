@@ -0,0 +1,52 @@
+"""
+Test the rolling strategy: sections split by group column, id year/prefix
+or chunks, and solving the groups one after another around the faculty and
+rooms already used gives a valid timetable (no clashes, P1 limit kept).
+"""
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.rolling import section_groups, solve_rolling
+from src.timetable_solver import solve
+
+
+def test_section_groups():
+    print("=" * 70)
+    print("Testing rolling section groups on TT_Flexinput")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    ids = sorted(s.section_id for s in problem.sections)
+
+    # Ids 3A1..3A9 share year 3 and prefix 3A
+    assert section_groups(problem, "year") == section_groups(problem, "prefix")
+    assert len(section_groups(problem, "prefix")) == 1
+
+    chunks = section_groups(problem, "chunk", chunk_size=4)
+    assert sorted(len(g) for g in chunks) == [1, 4, 4]
+    assert sorted(s for g in chunks for s in g) == ids
+
+    for i, s in enumerate(problem.sections):
+        s.group = "even" if i % 2 == 0 else "odd"
+    by_column = section_groups(problem, "auto")
+    print(f"group column: {by_column}")
+    assert sorted(len(g) for g in by_column) == sorted([len(ids[0::2]), len(ids[1::2])])
+    print("✅ Sections are grouped by column, prefix/year and chunk")
+
+
+def test_rolling_solve():
+    problem = load_problem_from_directory("TT_Flexinput")
+    for chunk_size in (3, 1):
+        result = solve_rolling(problem, time_limit_sec=60, room_mode="compact", group_by="chunk", chunk_size=chunk_size)
+        print(f"chunks of {chunk_size}: {result.status}")
+        assert result.status == "FEASIBLE"
+        assert not validate_solution(problem, result.schedule_by_section)
+
+    result = solve(problem, time_limit_sec=60, strategy="rolling")
+    assert result.status == "FEASIBLE"
+    assert not validate_solution(problem, result.schedule_by_section)
+    print("✅ Rolling solve gives a valid timetable")
+
+
+if __name__ == "__main__":
+    test_section_groups()
+    test_rolling_solve()
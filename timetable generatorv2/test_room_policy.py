@@ -0,0 +1,134 @@
+"""
+Test the room candidate policy: lecture and lab rooms kept apart, the k
+best-fitting rooms, preferred buildings, fewer variables and timetables that
+keep to the candidates, also after an API repair.
+"""
+import base64
+import glob
+import os
+import shutil
+import tempfile
+
+from src.app_fastapi import FilePayload, RepairRequest, SolveRequest, _repair_payload, _solve_payload
+from src.compiled import compile_problem
+from src.feasibility import validate_solution
+from src.hints import load_hint_from_section_rows
+from src.loader import load_problem_from_directory
+from src.models import RoomPolicy
+from src.room_policy import with_room_policy
+from src.timetable_solver import build_model, solve
+
+
+def test_room_candidates():
+    print("=" * 70)
+    print("Testing room candidates")
+    print("=" * 70)
+
+    base = load_problem_from_directory("TT_Flexinput")
+    cp = compile_problem(base)
+    assert not cp.splits_room_kinds
+    assert cp.lecture_rooms[0] == cp.lab_rooms[0] == cp.candidate_rooms[0]
+
+    problem = with_room_policy(base, RoomPolicy(separate_lab_rooms=True, max_candidates=3))
+    assert base.room_policy == RoomPolicy() and problem._compiled is None
+    cp = compile_problem(problem)
+    assert cp.splits_room_kinds
+    for s_idx in range(len(cp.section_ids)):
+        size = cp.section_size[s_idx]
+        assert not any(cp.room_is_lab[r] for r in cp.lecture_rooms[s_idx])
+        assert all(cp.room_is_lab[r] for r in cp.lab_rooms[s_idx])
+        for rooms in (cp.lecture_rooms[s_idx], cp.lab_rooms[s_idx]):
+            assert all(cp.room_capacity[r] >= size for r in rooms)
+            # Only rooms tied with the third best fit go past three
+            if len(rooms) > 3:
+                assert len({int(cp.room_capacity[r]) for r in rooms}) <= 3
+    print("✅ Lecture and lab rooms are apart, at most the 3 best fits plus ties")
+
+
+def test_preferred_buildings():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        shutil.copytree("TT_Flexinput", tmpdir, dirs_exist_ok=True)
+        rooms_csv = os.path.join(tmpdir, "rooms.csv")
+        with open(rooms_csv) as f:
+            lines = f.read().splitlines()
+        # Rooms alternate between two buildings
+        lines = [lines[0] + ",building"] + [f"{line},{'North' if i % 2 else 'South'}" for i, line in enumerate(lines[1:]) if line]
+        with open(rooms_csv, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        sections_csv = os.path.join(tmpdir, "sections.csv")
+        with open(sections_csv) as f:
+            lines = f.read().splitlines()
+        lines = [lines[0] + ",preferred_buildings"] + [line + (",North;West" if i == 0 else ",") for i, line in enumerate(lines[1:]) if line]
+        with open(sections_csv, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        problem = load_problem_from_directory(tmpdir)
+
+    assert problem.sections[0].preferred_buildings == ["North", "West"] and problem.sections[1].preferred_buildings == []
+    cp = compile_problem(problem)
+    buildings = [r.building for r in problem.rooms]
+    assert cp.candidate_rooms[0] and all(buildings[r] == "North" for r in cp.candidate_rooms[0])
+    assert any(buildings[r] == "South" for r in cp.candidate_rooms[1])
+    print("✅ Preferred buildings narrow the candidates")
+
+
+def test_room_policy_model_and_solve():
+    base = load_problem_from_directory("TT_Flexinput")
+    problem = with_room_policy(base, RoomPolicy(separate_lab_rooms=True, max_candidates=3))
+    for room_mode in ("per_slot", "compact"):
+        before = len(build_model(base, room_mode=room_mode).model.Proto().variables)
+        after = len(build_model(problem, room_mode=room_mode).model.Proto().variables)
+        print(f"{room_mode}: {before} -> {after} variables")
+        assert after < before
+
+    cp = compile_problem(problem)
+    for kwargs in ({"room_mode": "compact"}, {"strategy": "two_stage"}, {"engine": "local"}):
+        result = solve(problem, time_limit_sec=60, **kwargs)
+        print(f"{kwargs}: {result.status}")
+        assert result.status in ("OPTIMAL", "FEASIBLE")
+        assert validate_solution(problem, result.schedule_by_section) == []
+        for by_t in result.schedule_by_section.values():
+            for _course_id, _faculty_id, room_id, kind in by_t.values():
+                if kind == "lab":
+                    assert cp.room_is_lab[cp.room_index[room_id]]
+
+    # A lab room for a block of lectures only breaks the policy
+    kinds_by_block = {}
+    for s, by_t in result.schedule_by_section.items():
+        for t, entry in by_t.items():
+            kinds_by_block.setdefault((s, cp.timeslot_to_block[t]), set()).add(entry[3])
+    s, block_id = next(key for key, kinds in sorted(kinds_by_block.items()) if kinds == {"lecture"})
+    lab_room = cp.room_ids[cp.lab_rooms[cp.section_index[s]][0]]
+    bad = {s: dict(by_t) for s, by_t in result.schedule_by_section.items()}
+    for t, (course_id, faculty_id, _room_id, kind) in bad[s].items():
+        if cp.timeslot_to_block[t] == block_id:
+            bad[s][t] = (course_id, faculty_id, lab_room, kind)
+    assert any("room policy" in v for v in validate_solution(problem, bad))
+    print("✅ Timetables keep to the policy's candidate rooms")
+
+
+def test_repair_keeps_room_policy():
+    files = []
+    for path in sorted(glob.glob(os.path.join("TT_Flexinput", "*.csv"))):
+        with open(path, "rb") as f:
+            files.append(FilePayload(name=os.path.basename(path), content=base64.b64encode(f.read()).decode("utf-8")))
+    policy = {"separateLabRooms": True, "maxRoomCandidates": 3}
+    solved = _solve_payload(SolveRequest(files=files, timeLimit=60, roomMode="compact", useCache=False, **policy))
+    assert solved["status"] in ("OPTIMAL", "FEASIBLE")
+
+    problem = with_room_policy(load_problem_from_directory("TT_Flexinput"), RoomPolicy(separate_lab_rooms=True, max_candidates=3))
+    base = load_hint_from_section_rows(problem, solved["sections"])
+    faculty_id = max(base.schedule_by_faculty, key=lambda f: len(base.schedule_by_faculty[f]))
+    monday = [t.timeslot_id for t in base.timeslots if t.day_index == 0 and not t.is_break]
+    repaired = _repair_payload(RepairRequest(files=files, baseSections=solved["sections"], facultyUnavailable={faculty_id: monday}, timeLimit=60, **policy))
+    print(f"Repair: {repaired['status']}")
+    assert repaired["status"] in ("OPTIMAL", "FEASIBLE")
+    result = load_hint_from_section_rows(problem, repaired["sections"])
+    assert validate_solution(problem, result.schedule_by_section) == []
+    print("✅ A repair keeps the room policy of its base timetable")
+
+
+if __name__ == "__main__":
+    test_room_candidates()
+    test_preferred_buildings()
+    test_room_policy_model_and_solve()
+    test_repair_keeps_room_policy()
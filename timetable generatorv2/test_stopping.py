@@ -0,0 +1,76 @@
+"""
+Test early-stop criteria: each one ends the gap optimization early with its
+stop reason and the best bound, the relative gap is reported as FEASIBLE,
+and /api/solve accepts the criteria and returns stopReason and bestBound.
+"""
+import base64
+import glob
+import os
+
+from fastapi import HTTPException
+
+from src.app_fastapi import FilePayload, SolveRequest, _solve_payload
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.stopping import StopCriteria
+from src.timetable_solver import solve
+
+
+def test_stop_criteria():
+    print("=" * 70)
+    print("Testing early-stop criteria on TT_Flexinput")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    options = dict(time_limit_sec=60, optimize_gaps=True, room_mode="compact")
+
+    result = solve(problem, **options)
+    print(f"full: {result.status} {result.objective_value} bound {result.best_bound} ({result.stop_reason})")
+    assert result.status == "OPTIMAL" and result.stop_reason == "optimal"
+    assert result.best_bound == result.objective_value
+    assert solve(problem, time_limit_sec=60, room_mode="compact").stop_reason == "feasible"
+
+    for stop, reason in (
+        (StopCriteria(first_feasible=True), "first_feasible"),
+        (StopCriteria(relative_gap=1.0), "relative_gap"),
+        (StopCriteria(optimization_sec=0), "optimization_time"),
+    ):
+        result = solve(problem, stop=stop, **options)
+        print(f"{reason}: {result.status} {result.objective_value} bound {result.best_bound}")
+        assert result.status == "FEASIBLE" and result.stop_reason == reason
+        assert result.objective_value > result.best_bound
+        assert not validate_solution(problem, result.schedule_by_section)
+
+    result = solve(problem, stop=StopCriteria(feasibility_sec=0.1), **options)
+    assert result.status == "INFEASIBLE" and result.stop_reason == "feasibility_time"
+
+    try:
+        solve(problem, strategy="rolling", stop=StopCriteria(first_feasible=True), **options)
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    print("✅ Each criterion stops the search and is recorded")
+
+
+def test_api_stop_options():
+    files = []
+    for path in sorted(glob.glob(os.path.join("TT_Flexinput", "*.csv"))):
+        with open(path, "rb") as f:
+            files.append(FilePayload(name=os.path.basename(path), content=base64.b64encode(f.read()).decode("utf-8")))
+    payload = SolveRequest(files=files, timeLimit=60, roomMode="compact", optimizeGaps=True, stopAtFirstFeasible=True, useCache=False)
+    response = _solve_payload(payload)
+    print({k: response[k] for k in ("status", "objectiveValue", "bestBound", "stopReason")})
+    assert response["status"] == "FEASIBLE" and response["stopReason"] == "first_feasible"
+    assert response["objectiveValue"] > response["bestBound"]
+
+    try:
+        _solve_payload(SolveRequest(files=files, relativeGap=-1))
+        assert False, "expected HTTPException"
+    except HTTPException as e:
+        assert e.status_code == 400
+    print("✅ API takes stop criteria and returns the stop reason")
+
+
+if __name__ == "__main__":
+    test_stop_criteria()
+    test_api_stop_options()
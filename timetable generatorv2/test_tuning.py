@@ -0,0 +1,79 @@
+"""
+Test solver profiles: a tuning run picks and stores fast/balanced/quality
+parameters per instance size class, select_profile reads them back
+("auto" by objective), and their parameters reach every CP-SAT solver.
+"""
+import os
+import tempfile
+
+from src import timetable_solver
+from src.loader import load_problem_from_directory
+from src.timetable_solver import make_solver, solve
+from src.tuning import choose_profiles, load_profiles, profile_params, save_profiles, select_profile, size_class, tune
+
+
+def test_choose_profiles():
+    print("=" * 70)
+    print("Testing profile selection from measurements")
+    print("=" * 70)
+
+    configs = [{}, {"linearization_level": 0}, {"linearization_level": 2}]
+    rows = [
+        # config 1 finds a timetable first, config 2 ends with the fewest gaps
+        {"dataset": "a", "size_class": "small", "config": 0, "first_sec": 2.0, "objective": 10},
+        {"dataset": "a", "size_class": "small", "config": 1, "first_sec": 1.0, "objective": 12},
+        {"dataset": "a", "size_class": "small", "config": 2, "first_sec": 3.0, "objective": 8},
+        {"dataset": "b", "size_class": "large", "config": 0, "first_sec": None, "objective": None},
+        {"dataset": "b", "size_class": "large", "config": 1, "first_sec": 5.0, "objective": 40},
+        {"dataset": "b", "size_class": "large", "config": 2, "first_sec": 9.0, "objective": 40},
+    ]
+    profiles = choose_profiles(rows, configs, time_limit_sec=10)
+    print(profiles)
+    assert profiles["small"]["fast"] == configs[1] and profiles["small"]["quality"] == configs[2]
+    assert profiles["large"] == {"fast": configs[1], "balanced": configs[1], "quality": configs[1]}
+    print("✅ Fast, balanced and quality picked per size class")
+
+
+def test_profiles_roundtrip():
+    problem = load_problem_from_directory("TT_Flexinput")
+    assert size_class(problem) == "small"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "profiles.json")
+        # Untuned: make_solver's defaults
+        assert select_profile(problem, "quality", path=path) == {}
+
+        profiles, rows = tune(["TT_Flexinput"], [{}, {"linearization_level": 0}], time_limit_sec=10)
+        assert len(rows) == 2 and all(r["first_sec"] is not None for r in rows)
+        save_profiles(profiles, path)
+        save_profiles({"large": {"fast": {"symmetry_level": 0}}}, path)
+        stored = load_profiles(path)
+        assert set(stored) == {"small", "large"} and set(stored["small"]) == {"fast", "balanced", "quality"}
+        assert select_profile(problem, "auto", optimize_gaps=False, path=path) == stored["small"]["fast"]
+        assert select_profile(problem, "auto", optimize_gaps=True, path=path) == stored["small"]["balanced"]
+
+    try:
+        solve(problem, profile="fastest")
+        assert False, "expected ValueError"
+    except ValueError as e:
+        print(f"Rejected: {e}")
+    print("✅ Profiles are stored per size class and selected automatically")
+
+
+def test_profile_params():
+    with profile_params({"linearization_level": 0, "num_search_workers": 2}):
+        timetable_solver.SOLVER_PARAMS["num_search_workers"] = 4
+        try:
+            solver = make_solver(1)
+        finally:
+            timetable_solver.SOLVER_PARAMS.clear()
+    # Process-level SOLVER_PARAMS (API job workers, portfolio) win over the profile
+    assert solver.parameters.linearization_level == 0 and solver.parameters.num_search_workers == 4
+    assert not timetable_solver.PROFILE_PARAMS
+    assert make_solver(1).parameters.linearization_level == 1
+    print("✅ Profile parameters apply inside the block only")
+
+
+if __name__ == "__main__":
+    test_choose_profiles()
+    test_profiles_roundtrip()
+    test_profile_params()
@@ -0,0 +1,45 @@
+"""
+Test the two-stage strategy: times are placed without room variables and
+rooms are assigned per block afterwards, giving the same result structure
+as a direct solve.
+"""
+from src.feasibility import validate_solution
+from src.loader import load_problem_from_directory
+from src.room_assignment import match_rooms
+from src.timetable_solver import solve
+
+
+def test_match_rooms():
+    # Nested candidate sets: the small section must not take the only large room
+    assert match_rooms([("big", [2]), ("small", [0, 1, 2]), ("mid", [1, 2])]) == {"big": 2, "mid": 1, "small": 0}
+    assert match_rooms([("a", [0]), ("b", [0])]) is None
+    print("✅ Per-block room matching")
+
+
+def test_two_stage_strategy():
+    print("=" * 70)
+    print("Testing two-stage strategy")
+    print("=" * 70)
+
+    problem = load_problem_from_directory("TT_Flexinput")
+    result = solve(problem, time_limit_sec=60, strategy="two_stage")
+    print(f"Solver Status: {result.status}")
+    assert result.status != "INFEASIBLE"
+
+    missing_rooms = [
+        (sid, tid) for sid, by_t in result.schedule_by_section.items()
+        for tid, (_c, _f, room_id, _k) in by_t.items() if not room_id
+    ]
+    assert not missing_rooms, f"Classes without a room: {missing_rooms[:5]}"
+
+    violations = validate_solution(problem, result.schedule_by_section)
+    for v in violations:
+        print(f"  ❌ {v}")
+    assert not violations
+    assert result.available_rooms and result.available_faculty
+    print("✅ Two-stage strategy produces a valid, room-sticky timetable")
+
+
+if __name__ == "__main__":
+    test_match_rooms()
+    test_two_stage_strategy()
@@ -0,0 +1,85 @@
+"""
+Test faculty and room unavailability: the optional CSVs are loaded, no
+variable is created for an unavailable slot, timetables respect them and the
+feasibility check counts the capacity left.
+"""
+import os
+import shutil
+import tempfile
+
+from src.compiled import compile_problem
+from src.feasibility import pre_solve_feasibility_check, validate_solution
+from src.greedy import construct
+from src.loader import load_problem_from_directory
+from src.timetable_solver import build_model, solve
+
+
+def _load_with(faculty_rows, room_rows):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        shutil.copytree("TT_Flexinput", tmpdir, dirs_exist_ok=True)
+        with open(os.path.join(tmpdir, "faculty_unavailability.csv"), "w") as f:
+            f.write("faculty_id,day_name,period_index\n" + "".join(f"{row}\n" for row in faculty_rows))
+        with open(os.path.join(tmpdir, "room_unavailability.csv"), "w") as f:
+            f.write("room_id,day_name,period_index\n" + "".join(f"{row}\n" for row in room_rows))
+        return load_problem_from_directory(tmpdir)
+
+
+def test_unavailability_prunes_model():
+    print("=" * 70)
+    print("Testing unavailability pruning")
+    print("=" * 70)
+
+    base = load_problem_from_directory("TT_Flexinput")
+    problem = _load_with(["VU001,Monday,", "VU002,Tuesday,1", "VU002,Tuesday,2"], ["N401,Monday,", "N402,Friday,2"])
+    assert len(problem.faculty_unavailability) == 3 and problem.faculty_unavailability[0].period_index is None
+    cp = compile_problem(problem)
+    monday = set(cp.grid.non_break_by_day[0])
+    assert {t for f_idx, t in cp.faculty_unavailable if cp.faculty_ids[f_idx] == "VU001"} >= monday
+
+    for room_mode in ("per_slot", "compact"):
+        before = len(build_model(base, room_mode=room_mode).model.Proto().variables)
+        built = build_model(problem, room_mode=room_mode)
+        after = len(built.model.Proto().variables)
+        print(f"{room_mode}: {before} -> {after} variables")
+        assert after < before
+    assert not any(cp.faculty_id_of(cp.section_index[s], cp.course_index[c]) == "VU001" and t in monday for s, c, t in built.X_lec)
+    assert not any(block_id == cp.timeslot_to_block[min(monday)] and r == "N401" for _s, block_id, r in built.SectionBlockRoom)
+
+    result = solve(problem, time_limit_sec=60, room_mode="compact")
+    print(f"Solve: {result.status}")
+    assert result.status in ("OPTIMAL", "FEASIBLE")
+    assert validate_solution(problem, result.schedule_by_section) == []
+    greedy = construct(problem)
+    assert greedy is not None and validate_solution(problem, greedy.schedule_by_section) == []
+
+    # A class at an unavailable slot is a violation
+    bad = {s: dict(by_t) for s, by_t in result.schedule_by_section.items()}
+    s, by_t = next(iter(bad.items()))
+    t, (course_id, faculty_id, room_id, kind) = next(iter(by_t.items()))
+    unavailable = _load_with([f"{faculty_id},{cp.grid.timeslot_by_id[t].day_name},"], [])
+    assert any("unavailable" in v for v in validate_solution(unavailable, bad))
+    print("✅ Unavailable slots carry no variables and no classes")
+
+
+def test_unavailability_feasibility_check():
+    problem = _load_with(["VU001,Monday,1", "VU999,Monday,1", "VU002,Someday,"], [])
+    report = pre_solve_feasibility_check(problem)
+    print(f"Warnings: {report.warnings}")
+    assert report.ok() and len(report.warnings) == 2
+
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    problem = _load_with([f"VU001,{day}," for day in days], [])
+    report = pre_solve_feasibility_check(problem)
+    print(f"Errors: {report.errors}")
+    assert any(e.startswith("Faculty VU001 teaches") for e in report.errors)
+
+    rooms = [r.room_id for r in load_problem_from_directory("TT_Flexinput").rooms]
+    problem = _load_with([], [f"{r},{day}," for r in rooms for day in days[:4]])
+    report = pre_solve_feasibility_check(problem)
+    assert any("room periods" in e for e in report.errors)
+    print("✅ The feasibility check counts the capacity left")
+
+
+if __name__ == "__main__":
+    test_unavailability_prunes_model()
+    test_unavailability_feasibility_check()